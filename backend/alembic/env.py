@@ -59,6 +59,8 @@ from app.modules.relation.model import Relation  # noqa: F401
 from app.modules.event.model import Event, EventParticipant, EventPlot, EventRole  # noqa: F401
 from app.modules.landscape.model import Landscape  # noqa: F401
 from app.integrations.embedding.model import Embedding  # noqa: F401
+from app.integrations.translation.model import TranslationMemoryEntry  # noqa: F401
+from app.integrations.ratelimit.model import RateLimitBucket  # noqa: F401
 from app.modules.billing.model import (  # noqa: F401
     BillingDailyServicesTasks,
     BillingDailySummary,
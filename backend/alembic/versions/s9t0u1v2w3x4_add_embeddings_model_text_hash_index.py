@@ -0,0 +1,31 @@
+"""Add index on embeddings (model, text_hash)
+
+Revision ID: s9t0u1v2w3x4
+Revises: r8s9t0u1v2w3
+Create Date: 2026-04-06
+
+Индекс для кеша эмбеддингов: поиск готового вектора по модели и хешу текста.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "s9t0u1v2w3x4"
+down_revision: Union[str, Sequence[str], None] = "r8s9t0u1v2w3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_embeddings_model_text_hash",
+        "embeddings",
+        ["model", "text_hash"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_embeddings_model_text_hash", table_name="embeddings")
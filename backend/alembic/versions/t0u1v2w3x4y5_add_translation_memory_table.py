@@ -0,0 +1,76 @@
+"""Add translation_memory table
+
+Revision ID: t0u1v2w3x4y5
+Revises: s9t0u1v2w3x4
+Create Date: 2026-04-06
+
+Память переводов: переводы фрагментов (заголовки, summary, key points, термины) по
+(translator, source_lang, target_lang, text_hash), чтобы не переводить повторно тот же текст.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "t0u1v2w3x4y5"
+down_revision: Union[str, Sequence[str], None] = "s9t0u1v2w3x4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "translation_memory",
+        sa.Column(
+            "id",
+            sa.UUID(),
+            server_default=sa.text("gen_random_uuid()"),
+            nullable=False,
+            comment="Идентификатор записи",
+        ),
+        sa.Column(
+            "translator",
+            sa.String(length=50),
+            nullable=False,
+            comment="Кто переводил: deepl, yandex_translator, llm, llm_terms",
+        ),
+        sa.Column("source_lang", sa.String(length=16), nullable=False, comment="Код исходного языка"),
+        sa.Column("target_lang", sa.String(length=16), nullable=False, comment="Код целевого языка"),
+        sa.Column(
+            "text_hash",
+            sa.String(length=64),
+            nullable=False,
+            comment="SHA-256 нормализованного исходного текста",
+        ),
+        sa.Column("source_text", sa.Text(), nullable=False, comment="Исходный текст (для отладки и аудита)"),
+        sa.Column("translated_text", sa.Text(), nullable=False, comment="Перевод"),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+            comment="Дата создания записи",
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+            comment="Дата последнего обновления перевода",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "translator",
+            "source_lang",
+            "target_lang",
+            "text_hash",
+            name="uq_translation_memory_key",
+        ),
+        comment="Память переводов: переводы фрагментов текста по хешу нормализованного исходника",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("translation_memory")
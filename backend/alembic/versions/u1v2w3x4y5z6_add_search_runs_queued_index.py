@@ -0,0 +1,32 @@
+"""Add partial index for claiming queued search_runs (background run queue).
+
+Revision ID: u1v2w3x4y5z6
+Revises: t0u1v2w3x4y5
+Create Date: 2026-10-17
+
+Воркер забирает самый старый queued-запуск (FOR UPDATE SKIP LOCKED) по всем темам —
+частичный индекс по queued_at только для очереди.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "u1v2w3x4y5z6"
+down_revision: Union[str, Sequence[str], None] = "t0u1v2w3x4y5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_search_runs_queued",
+        "search_runs",
+        ["queued_at"],
+        unique=False,
+        postgresql_where=sa.text("status = 'queued' AND deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_search_runs_queued", table_name="search_runs")
@@ -0,0 +1,32 @@
+"""Add partial index for chunked billing rollup over not-deleted usage events.
+
+Revision ID: v2w3x4y5z6a7
+Revises: u1v2w3x4y5z6
+Create Date: 2026-10-17
+
+Свёртка биллинга берёт чанками самые старые несвёрнутые события по всем темам —
+частичный индекс по occurred_at только для deleted = false.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "v2w3x4y5z6a7"
+down_revision: Union[str, Sequence[str], None] = "u1v2w3x4y5z6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_billing_usage_not_deleted_occurred",
+        "billing_usage_events",
+        ["occurred_at"],
+        unique=False,
+        postgresql_where=sa.text("deleted = false"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_billing_usage_not_deleted_occurred", table_name="billing_usage_events")
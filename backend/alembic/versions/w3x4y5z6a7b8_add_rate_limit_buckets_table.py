@@ -0,0 +1,51 @@
+"""Add rate_limit_buckets table
+
+Revision ID: w3x4y5z6a7b8
+Revises: v2w3x4y5z6a7
+Create Date: 2026-10-17
+
+Token bucket'ы лимитов внешних API (arXiv, NCBI, Semantic Scholar, OpenAlex), общие для всех
+процессов приложения: строка на upstream, запас токенов пересчитывается одним UPSERT по часам БД.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "w3x4y5z6a7b8"
+down_revision: Union[str, Sequence[str], None] = "v2w3x4y5z6a7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column(
+            "name",
+            sa.String(length=64),
+            nullable=False,
+            comment="Имя лимита (upstream): arxiv, ncbi, semanticscholar, openalex",
+        ),
+        sa.Column(
+            "tokens",
+            sa.Float(),
+            nullable=False,
+            comment="Запас токенов на момент updated_at (отрицательный — долг резерваций)",
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+            comment="Момент последнего пересчёта запаса (часы БД)",
+        ),
+        sa.PrimaryKeyConstraint("name"),
+        comment="Token bucket'ы лимитов внешних API, общие для всех процессов приложения",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rate_limit_buckets")
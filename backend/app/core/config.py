@@ -133,13 +133,50 @@ class Settings:
     }
     SEARCH_DEFAULT_TIME_WINDOW_DAYS: int = _int("SEARCH_DEFAULT_TIME_WINDOW_DAYS", 7)
     SEARCH_DEFAULT_TARGET_LINKS: int = _int("SEARCH_DEFAULT_TARGET_LINKS", 50)
+    # Конкурентное выполнение шагов плана: общий лимит одновременных шагов и лимиты на retriever
+    SEARCH_MAX_CONCURRENT_STEPS: int = _int("SEARCH_MAX_CONCURRENT_STEPS", 4)
+    SEARCH_MAX_CONCURRENT_PER_RETRIEVER: dict[str, int] = {
+        "publication_retriever": _int("SEARCH_MAX_CONCURRENT_PUBLICATION", 2),
+    }
+    # PublicationRetriever: источники опрашиваются параллельно; таймаут на источник (сек).
+    # Источник, не уложившийся в таймаут, не блокирует остальные — шаг вернёт то, что успели собрать.
+    SEARCH_PUBLICATION_SOURCE_TIMEOUT_S: dict[str, float] = {
+        "openalex": _float("SEARCH_PUBLICATION_TIMEOUT_OPENALEX_S", 60.0),
+        "semanticscholar": _float("SEARCH_PUBLICATION_TIMEOUT_SEMANTICSCHOLAR_S", 120.0),
+        "arxiv": _float("SEARCH_PUBLICATION_TIMEOUT_ARXIV_S", 180.0),
+        "pubmed": _float("SEARCH_PUBLICATION_TIMEOUT_PUBMED_S", 240.0),
+    }
+    # PubMed: конвейер esearch/efetch (следующая страница запрашивается, пока качается текущая;
+    # маппинг статей — в отдельном потоке); false — страницы строго по очереди
+    SEARCH_PUBMED_PIPELINED: bool = _bool("SEARCH_PUBMED_PIPELINED", True)
+    # OpenAlex / Semantic Scholar: максимум страниц выдачи (cursor / token) на один запрос шага
+    SEARCH_PUBLICATION_MAX_PAGES: int = _int("SEARCH_PUBLICATION_MAX_PAGES", 10)
+    # Ранний дедуп публикаций между источниками по DOI/PMID/arXiv id (до маппинга, в пределах шага)
+    SEARCH_PUBLICATION_EARLY_DEDUP: bool = _bool("SEARCH_PUBLICATION_EARLY_DEDUP", True)
+    # Лимиты частоты запросов к источникам (token bucket): postgres — общий для всех процессов
+    # (несколько воркеров uvicorn, run_worker), memory — в памяти процесса
+    RATE_LIMIT_BACKEND: str = _str("RATE_LIMIT_BACKEND", "postgres")
+    # Запросов в секунду на upstream; ncbi: 0 — по наличию NCBI_API_KEY (9/с с ключом, 2.8/с без)
+    RATE_LIMIT_PER_S: dict[str, float] = {
+        "arxiv": _float("RATE_LIMIT_ARXIV_PER_S", 1 / 3),
+        "ncbi": _float("RATE_LIMIT_NCBI_PER_S", 0.0),
+        "semanticscholar": _float("RATE_LIMIT_SEMANTICSCHOLAR_PER_S", 1.0),
+        "openalex": _float("RATE_LIMIT_OPENALEX_PER_S", 10.0),
+    }
 
     # Перевод квантов: метод "translator" (DeepL и др.) | "llm" (текущий ИИ)
     QUANTA_TRANSLATION_METHOD: str = _str("QUANTA_TRANSLATION_METHOD", "translator")
     # Макс. число квантов для перевода: 0 = все, >0 = только первые N (для отладки и экономии лимитов)
     QUANTA_TRANSLATION_LIMIT: int = _int("QUANTA_TRANSLATION_LIMIT", 0)
+    # Перевод через LLM: пакеты по оценке токенов входа и числу квантов, параллельных вызовов LLM
+    QUANTA_TRANSLATION_LLM_BATCH_MAX_ITEMS: int = _int("QUANTA_TRANSLATION_LLM_BATCH_MAX_ITEMS", 20)
+    QUANTA_TRANSLATION_LLM_BATCH_MAX_TOKENS: int = _int("QUANTA_TRANSLATION_LLM_BATCH_MAX_TOKENS", 2500)
+    QUANTA_TRANSLATION_LLM_MAX_CONCURRENCY: int = _int("QUANTA_TRANSLATION_LLM_MAX_CONCURRENCY", 4)
     # Используемый переводчик (при QUANTA_TRANSLATION_METHOD=translator): deepl, ...
     TRANSLATOR: str = _str("TRANSLATOR", "deepl")
+    # Память переводов (translation_memory) по (переводчик, языки, хеш текста): размер in-process LRU
+    # (0 — отключить LRU; поиск в БД остаётся)
+    TRANSLATION_MEMORY_MAX_ITEMS: int = _int("TRANSLATION_MEMORY_MAX_ITEMS", 10000)
     # DeepL API (REST)
     DEEPL_API_KEY: SecretStr = SecretStr(_str("DEEPL_API_KEY", ""))
     # Yandex Cloud Translate API (REST); folder — тот же YANDEX_FOLDER_ID
@@ -163,6 +200,13 @@ class Settings:
     YANDEX_OPERATION_POLL_ATTEMPTS: int = _int("YANDEX_OPERATION_POLL_ATTEMPTS", 10)
     YANDEX_OPERATION_POLL_INTERVAL_SECONDS: float = _float("YANDEX_OPERATION_POLL_INTERVAL_SECONDS", 0.5)
 
+    # Общие HTTP-клиенты интеграций (пул на upstream/прокси): лимиты соединений, keep-alive, HTTP/2
+    HTTP_POOL_MAX_CONNECTIONS: int = _int("HTTP_POOL_MAX_CONNECTIONS", 50)
+    HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS: int = _int("HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS", 20)
+    HTTP_POOL_KEEPALIVE_EXPIRY_S: float = _float("HTTP_POOL_KEEPALIVE_EXPIRY_S", 60.0)
+    HTTP_DEFAULT_TIMEOUT_S: float = _float("HTTP_DEFAULT_TIMEOUT_S", 60.0)
+    HTTP_HTTP2_ENABLED: bool = _bool("HTTP_HTTP2_ENABLED", True)
+
     # Туннель (прокси) для части интеграций (например OpenAI Embeddings).
     # URL в формате socks5://[user:password@]host:port или http://...; пусто — без прокси.
     TUNNEL_PROXY_URL: str = _str("TUNNEL_PROXY_URL", "")
@@ -179,6 +223,14 @@ class Settings:
     EMBEDDING_MODEL: str = _str("EMBEDDING_MODEL", "text-embedding-3-small")
     EMBEDDING_DIMENSIONS: int = _int("EMBEDDING_DIMENSIONS", 1536)
     EMBEDDING_COST_PER_TOKEN: Decimal = _decimal("EMBEDDING_COST_PER_TOKEN", 0)
+    # Батчевые эмбеддинги (embed_many): макс. текстов и оценочных токенов в одном запросе, параллельных запросов
+    EMBEDDING_BATCH_MAX_ITEMS: int = _int("EMBEDDING_BATCH_MAX_ITEMS", 256)
+    EMBEDDING_BATCH_MAX_TOKENS: int = _int("EMBEDDING_BATCH_MAX_TOKENS", 100_000)
+    EMBEDDING_BATCH_MAX_CONCURRENCY: int = _int("EMBEDDING_BATCH_MAX_CONCURRENCY", 2)
+    # Кеш эмбеддингов по (model, dims, text_hash): размер in-process LRU (0 — отключить LRU; поиск в БД остаётся)
+    EMBEDDING_CACHE_MAX_ITEMS: int = _int("EMBEDDING_CACHE_MAX_ITEMS", 5000)
+    # Семантический поиск по embeddings (HNSW): hnsw.ef_search по умолчанию (больше — точнее и медленнее)
+    SEMANTIC_SEARCH_EF_SEARCH: int = _int("SEMANTIC_SEARCH_EF_SEARCH", 100)
 
     # Двухуровневая фильтрация квантов:
     # 1) По векторам: rank_score >= EMBEDDING_QUANTUM_RELEVANCE_THRESHOLD (-1..1, косинус); ниже — не запрашиваем ИИ и не сохраняем.
@@ -197,6 +249,10 @@ class Settings:
         "BATCH_SIZE_FOR_ENTITIES_EXTRACTION",
         100,
     )
+    # Сколько вызовов ИИ по квантам батча идёт одновременно (атомы/кластеры, tech и явления)
+    ENTITY_EXTRACTION_MAX_CONCURRENCY: int = _int("ENTITY_EXTRACTION_MAX_CONCURRENCY", 4)
+    # Общий на батч запас повторных попыток извлечения tech/явлений после ошибки разбора ответа ИИ (JSON/схема)
+    ENTITY_EXTRACTION_RETRY_BUDGET: int = _int("ENTITY_EXTRACTION_RETRY_BUDGET", 5)
     ENTITY_EXTRACTION_VERSION: str = _str(
         "ENTITY_EXTRACTION_VERSION",
         "v2.0",
@@ -211,6 +267,21 @@ class Settings:
         "EVENT_EXTRACTION_VERSION",
         "mvp.v1",
     )
+    # Сколько квантов одной темы отправлять в одном промпте (1 — по одному кванту на промпт)
+    EVENT_EXTRACTION_QUANTA_PER_PROMPT: int = _int("EVENT_EXTRACTION_QUANTA_PER_PROMPT", 5)
+
+    # Фоновые запуски (search_runs): воркер в процессе API (иначе — python -m app.scripts.run_worker),
+    # параллельных запусков на воркер, опрос очереди, heartbeat-таймаут и число попыток после падения воркера
+    RUN_WORKER_ENABLED: bool = _bool("RUN_WORKER_ENABLED", True)
+    RUN_WORKER_CONCURRENCY: int = _int("RUN_WORKER_CONCURRENCY", 2)
+    RUN_WORKER_POLL_INTERVAL_S: float = _float("RUN_WORKER_POLL_INTERVAL_S", 2.0)
+    RUN_STALE_AFTER_S: int = _int("RUN_STALE_AFTER_S", 600)
+    RUN_MAX_ATTEMPTS: int = _int("RUN_MAX_ATTEMPTS", 3)
+
+    # Свёртка биллинга при старте (в фоне): детальных событий на один оператор/транзакцию
+    BILLING_ROLLUP_CHUNK_SIZE: int = _int("BILLING_ROLLUP_CHUNK_SIZE", 5000)
+    # Кеш тарифов, курсов и настроек биллинга тем в процессе (сек); 0 — читать из БД на каждое событие
+    BILLING_CACHE_TTL_S: float = _float("BILLING_CACHE_TTL_S", 300.0)
 
     # Ландшафт темы (LLM): лимит размера промпта (символы) и ответа (max_tokens)
     LANDSCAPE_MAX_PROMPT_CHARS: int = _int("LANDSCAPE_MAX_PROMPT_CHARS", 180_000)
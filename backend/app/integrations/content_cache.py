@@ -0,0 +1,103 @@
+"""
+Кеш, адресуемый по содержимому: ключ — (scope, text_hash), где scope — например (model, dims)
+эмбеддинга или (translator, source_lang, target_lang) перевода.
+
+Два уровня:
+1) in-process LRU;
+2) таблица БД (если передана session) — поиск промахов LRU одним SELECT на пачку хешей.
+
+Общая основа EmbeddingCache и TranslationMemory.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Hashable, Iterable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+Scope = tuple[Hashable, ...]
+
+
+class ContentCache(Generic[V]):
+    """In-process LRU значений по (scope, text_hash) + поиск промахов в БД в SAVEPOINT."""
+
+    #: Имя кеша для логов
+    label = "content_cache"
+
+    def __init__(self, max_items: int) -> None:
+        self._max_items = max(0, int(max_items))
+        self._items: OrderedDict[tuple[Hashable, ...], Any] = OrderedDict()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def _pack(self, value: V) -> Any:
+        """Представление значения в LRU (переопределяется, например, для компактного хранения)."""
+        return value
+
+    def _unpack(self, stored: Any) -> V:
+        return stored
+
+    def _get_many(self, scope: Scope, text_hashes: Iterable[str]) -> dict[str, V]:
+        """Найти значения в LRU; возвращает {text_hash: значение} только для найденных."""
+        found: dict[str, V] = {}
+        for h in text_hashes:
+            key = (*scope, h)
+            stored = self._items.get(key)
+            if stored is None:
+                continue
+            self._items.move_to_end(key)
+            found[h] = self._unpack(stored)
+        return found
+
+    def _put_many(self, scope: Scope, values: dict[str, V]) -> None:
+        """Положить значения {text_hash: значение} в LRU, вытесняя самые старые при переполнении."""
+        if self._max_items <= 0:
+            return
+        for h, value in values.items():
+            key = (*scope, h)
+            self._items[key] = self._pack(value)
+            self._items.move_to_end(key)
+        while len(self._items) > self._max_items:
+            self._items.popitem(last=False)
+
+    async def _lookup(
+        self,
+        scope: Scope,
+        text_hashes: Iterable[str],
+        *,
+        session: Any | None,
+        select_missing: Callable[[list[str]], Awaitable[dict[str, V]]],
+    ) -> dict[str, V]:
+        """
+        Пакетный поиск: сначала LRU, затем (если передана session) select_missing для оставшихся хешей.
+        Найденное в БД попадает в LRU. Ошибка БД не пробрасывается — просто меньше попаданий.
+        """
+        unique = list(dict.fromkeys(h for h in text_hashes if h))
+        found = self._get_many(scope, unique)
+        self.hits += len(found)
+        missing = [h for h in unique if h not in found]
+        if missing and session is not None:
+            try:
+                # SAVEPOINT: сбой поиска не должен ломать транзакцию вызывающего на общей сессии
+                async with session.begin_nested():
+                    from_db = await select_missing(missing)
+            except Exception as e:
+                logger.warning("%s: поиск в БД не удался: %s", self.label, e)
+                from_db = {}
+            if from_db:
+                self.db_hits += len(from_db)
+                self._put_many(scope, from_db)
+                found.update(from_db)
+        self.misses += len(unique) - len(found)
+        return found
@@ -3,7 +3,9 @@
 Верхний слой — EmbeddingService; провайдеры в providers/ (openai, ...).
 """
 
+from app.integrations.embedding.cache import EmbeddingCache, get_embedding_cache
 from app.integrations.embedding.ports import (
+    EmbeddingBatchResult,
     EmbeddingCost,
     EmbeddingProviderPort,
     EmbeddingResult,
@@ -11,8 +13,11 @@ from app.integrations.embedding.ports import (
 from app.integrations.embedding.service import EmbeddingService
 
 __all__ = [
+    "EmbeddingBatchResult",
+    "EmbeddingCache",
     "EmbeddingCost",
     "EmbeddingProviderPort",
     "EmbeddingResult",
     "EmbeddingService",
+    "get_embedding_cache",
 ]
@@ -0,0 +1,109 @@
+"""
+Кеш эмбеддингов, адресуемый по содержимому: ключ — (model, dims, text_hash).
+
+Два уровня (общая основа с памятью переводов — app.integrations.content_cache):
+1) in-process LRU (векторы хранятся как array('f') — так же, как float4 в pgvector);
+2) таблица embeddings: вектор с тем же model/dims/text_hash, построенный ранее
+   для любого объекта любой темы (text_hash — SHA-256 исходного текста).
+
+EmbeddingService обращается к кешу до вызова провайдера и кладёт в LRU новые векторы.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from array import array
+from typing import Any, Iterable
+
+from sqlalchemy import select
+
+from app.integrations.content_cache import ContentCache
+from app.integrations.embedding.model import Embedding
+
+# Ограничение на размер IN (...) в одном запросе к embeddings
+_DB_LOOKUP_CHUNK = 500
+
+def embedding_text_hash(text: str) -> str:
+    """SHA-256 hash текста в hex — тот же, что пишется в embeddings.text_hash."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache(ContentCache[list[float]]):
+    """In-process LRU векторов + пакетный поиск в таблице embeddings по (model, dims, text_hash)."""
+
+    label = "embedding/cache"
+
+    def __init__(self, max_items: int = 5000) -> None:
+        super().__init__(max_items)
+
+    def _pack(self, value: list[float]) -> array:
+        return array("f", value)
+
+    def _unpack(self, stored: array) -> list[float]:
+        return stored.tolist()
+
+    def get_many(self, model: str, dims: int, text_hashes: Iterable[str]) -> dict[str, list[float]]:
+        """Найти векторы в LRU; возвращает {text_hash: vector} только для найденных."""
+        return self._get_many((model, dims), text_hashes)
+
+    def put_many(self, model: str, dims: int, vectors: dict[str, list[float]]) -> None:
+        """Положить векторы в LRU, вытесняя самые старые при переполнении."""
+        self._put_many((model, dims), vectors)
+
+    async def lookup(
+        self,
+        model: str,
+        dims: int,
+        text_hashes: list[str],
+        *,
+        session: Any | None = None,
+    ) -> dict[str, list[float]]:
+        """
+        Пакетный поиск: сначала LRU, затем (если передана session) таблица embeddings
+        для оставшихся хешей. Найденное в БД попадает в LRU.
+        """
+        return await self._lookup(
+            (model, dims),
+            text_hashes,
+            session=session,
+            select_missing=lambda missing: lookup_embeddings_by_hash(session, model, dims, missing),
+        )
+
+
+async def lookup_embeddings_by_hash(
+    session: Any,
+    model: str,
+    dims: int,
+    text_hashes: list[str],
+) -> dict[str, list[float]]:
+    """
+    Найти в embeddings векторы по (model, dims, text_hash); один SELECT на пачку хешей.
+    Один текст может быть в нескольких строках (темы, объекты) — берётся самый свежий вектор.
+    """
+    found: dict[str, list[float]] = {}
+    for i in range(0, len(text_hashes), _DB_LOOKUP_CHUNK):
+        chunk = text_hashes[i : i + _DB_LOOKUP_CHUNK]
+        result = await session.execute(
+            select(Embedding.text_hash, Embedding.embedding)
+            .where(
+                Embedding.model == model,
+                Embedding.dims == dims,
+                Embedding.text_hash.in_(chunk),
+            )
+            .order_by(Embedding.text_hash, Embedding.updated_at.desc(), Embedding.id)
+        )
+        for text_hash, vector in result.all():
+            if text_hash and vector is not None and text_hash not in found:
+                found[text_hash] = [float(x) for x in vector]
+    return found
+
+
+_cache: EmbeddingCache | None = None
+
+
+def get_embedding_cache(max_items: int = 5000) -> EmbeddingCache:
+    """Общий для процесса кеш эмбеддингов (singleton; max_items учитывается при первом вызове)."""
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache(max_items=max_items)
+    return _cache
@@ -7,7 +7,7 @@ from datetime import datetime
 from typing import Optional
 
 from pgvector.sqlalchemy import Vector  # type: ignore[import]
-from sqlalchemy import DateTime, ForeignKey, String, func, text
+from sqlalchemy import DateTime, ForeignKey, Index, String, func, text
 from sqlalchemy.dialects.postgresql import ENUM, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -43,6 +43,8 @@ class Embedding(Base):
 
     __tablename__ = "embeddings"
     __table_args__ = (
+        # Кеш эмбеддингов: поиск готового вектора по (model, text_hash)
+        Index("ix_embeddings_model_text_hash", "model", "text_hash"),
         {"comment": "Векторные эмбеддинги объектов для семантического поиска и кластеризации"},
     )
 
@@ -8,6 +8,13 @@ from decimal import Decimal
 from typing import Protocol
 
 
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов (~4 символа на токен для английского): без usage и для нарезки пачек."""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
 @dataclass(frozen=True)
 class EmbeddingCost:
     """Оценка стоимости эмбеддинга: токены и итоговая сумма."""
@@ -28,6 +35,16 @@ class EmbeddingResult:
     """Стоимость (токены + сумма)."""
 
 
+@dataclass
+class EmbeddingBatchResult:
+    """Результат батчевого эмбеддинга (один запрос к провайдеру): векторы в порядке входа и общая стоимость."""
+
+    vectors: list[list[float]]
+    """Векторы в том же порядке, что и входные тексты."""
+    cost: EmbeddingCost
+    """Суммарная стоимость запроса (токены + сумма)."""
+
+
 class EmbeddingProviderPort(Protocol):
     """Абстракция провайдера эмбеддингов."""
 
@@ -56,3 +73,19 @@ class EmbeddingProviderPort(Protocol):
             EmbeddingResult с вектором и стоимостью.
         """
         ...
+
+    async def embed_many(
+        self,
+        texts: list[str],
+        model: str,
+        dimensions: int,
+        cost_per_token: Decimal,
+    ) -> EmbeddingBatchResult:
+        """
+        Построить эмбеддинги для нескольких текстов одним запросом.
+        Разбиение на пачки (по числу текстов и токенам) — задача вызывающего (EmbeddingService).
+
+        Returns:
+            EmbeddingBatchResult: векторы в порядке texts и суммарная стоимость.
+        """
+        ...
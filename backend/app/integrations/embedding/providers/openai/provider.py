@@ -1,6 +1,6 @@
 """
 Провайдер эмбеддингов OpenAI (REST API).
-Запросы идут через туннель (get_httpx_proxy).
+Запросы идут через туннель (get_httpx_proxy); при переданном реестре — через общий клиент с пулом соединений.
 """
 
 from __future__ import annotations
@@ -12,17 +12,23 @@ from decimal import Decimal
 import httpx
 
 from app.core.config import Settings
-from app.integrations.embedding.ports import EmbeddingCost, EmbeddingResult, EmbeddingProviderPort
+from app.integrations.embedding.ports import (
+    EmbeddingBatchResult,
+    EmbeddingCost,
+    EmbeddingProviderPort,
+    EmbeddingResult,
+    estimate_tokens,
+)
+from app.integrations.http import HttpClientRegistry, borrow_client
 from app.integrations.tunnel import get_httpx_proxy
 
 logger = logging.getLogger(__name__)
 
 
-def _estimate_tokens(text: str) -> int:
-    """Грубая оценка числа токенов (~4 символа на токен для английского)."""
-    if not text:
-        return 0
-    return max(1, (len(text) + 3) // 4)
+def _usage_total_tokens(data: dict) -> int:
+    """Токены из usage ответа (total_tokens или prompt_tokens); 0, если usage нет."""
+    usage = data.get("usage") or {}
+    return int(usage.get("total_tokens") or usage.get("prompt_tokens") or 0)
 
 
 class OpenAIEmbeddingProvider:
@@ -34,11 +40,13 @@ class OpenAIEmbeddingProvider:
         base_url: str,
         timeout_s: int | float,
         settings: Settings,
+        http_clients: HttpClientRegistry | None = None,
     ) -> None:
         self._api_key = api_key
         self._base_url = base_url.rstrip("/")
         self._timeout_s = float(timeout_s)
         self._settings = settings
+        self._http_clients = http_clients
 
     @property
     def name(self) -> str:
@@ -55,12 +63,70 @@ class OpenAIEmbeddingProvider:
         Построить эмбеддинг через POST /v1/embeddings.
         Стоимость: из usage.total_tokens, если есть; иначе оценка по тексту * cost_per_token.
         """
+        data = await self._post_embeddings(text.strip() or " ", model, dimensions)
+
+        # Вектор из data.data[0].embedding
+        items = data.get("data") or []
+        if not items or "embedding" not in items[0]:
+            raise ValueError("OpenAI response missing data[0].embedding")
+        vector = list(items[0]["embedding"])
+
+        total_tokens = _usage_total_tokens(data) or estimate_tokens(text)
+        total_cost = cost_per_token * total_tokens
+
+        return EmbeddingResult(
+            vector=vector,
+            cost=EmbeddingCost(total_tokens=total_tokens, total_cost=total_cost),
+        )
+
+    async def embed_many(
+        self,
+        texts: list[str],
+        model: str,
+        dimensions: int,
+        cost_per_token: Decimal,
+    ) -> EmbeddingBatchResult:
+        """
+        Построить эмбеддинги для нескольких текстов одним POST /v1/embeddings (input — массив).
+        Векторы раскладываются по data[].index, т.е. в порядке texts.
+        Стоимость: usage.total_tokens на весь запрос; если нет — сумма оценок по текстам.
+        """
+        if not texts:
+            return EmbeddingBatchResult(vectors=[], cost=EmbeddingCost(total_tokens=0, total_cost=Decimal(0)))
+
+        data = await self._post_embeddings([t.strip() or " " for t in texts], model, dimensions)
+
+        vectors: list[list[float] | None] = [None] * len(texts)
+        for pos, item in enumerate(data.get("data") or []):
+            idx = item.get("index", pos)
+            if not isinstance(idx, int) or not (0 <= idx < len(texts)) or "embedding" not in item:
+                raise ValueError(f"OpenAI response has invalid data item at position {pos}")
+            vectors[idx] = list(item["embedding"])
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            raise ValueError(f"OpenAI response missing embeddings for {len(missing)} of {len(texts)} inputs")
+
+        total_tokens = _usage_total_tokens(data) or sum(estimate_tokens(t) for t in texts)
+        total_cost = cost_per_token * total_tokens
+
+        return EmbeddingBatchResult(
+            vectors=[v for v in vectors if v is not None],
+            cost=EmbeddingCost(total_tokens=total_tokens, total_cost=total_cost),
+        )
+
+    async def _post_embeddings(
+        self,
+        input_value: str | list[str],
+        model: str,
+        dimensions: int,
+    ) -> dict:
+        """POST /v1/embeddings с повторами (сеть, 429, 5xx); возвращает JSON ответа."""
         if not (self._api_key or self._api_key.strip()):
             raise ValueError("OpenAI API key is not set")
 
         body: dict = {
             "model": model,
-            "input": text.strip() or " ",
+            "input": input_value,
         }
         if dimensions > 0:
             body["dimensions"] = dimensions
@@ -75,23 +141,26 @@ class OpenAIEmbeddingProvider:
         max_retries = getattr(self._settings, "OPENAI_EMBEDDING_MAX_RETRIES", 3)
         retry_delay_s = getattr(self._settings, "OPENAI_EMBEDDING_RETRY_DELAY_S", 2.0)
         logger.debug(
-            "OpenAI Embeddings request: url=%s model=%s dimensions=%s input_len=%s proxy=%s timeout=%s retries=%s",
+            "OpenAI Embeddings request: url=%s model=%s dimensions=%s inputs=%s input_len=%s proxy=%s timeout=%s retries=%s",
             url,
             model,
             dimensions,
-            len(body.get("input", "")),
+            len(input_value) if isinstance(input_value, list) else 1,
+            sum(len(t) for t in input_value) if isinstance(input_value, list) else len(input_value),
             proxy if proxy else "none",
             self._timeout_s,
             max_retries,
         )
 
-        async with httpx.AsyncClient(proxy=proxy, timeout=self._timeout_s) as client:
+        shared = self._http_clients.get("openai", proxy=proxy) if self._http_clients is not None else None
+        async with borrow_client(shared, proxy=proxy, timeout=self._timeout_s) as client:
             for attempt in range(max_retries):
                 try:
                     resp = await client.post(
                         url,
                         json=body,
                         headers=headers,
+                        timeout=self._timeout_s,
                     )
                     resp.raise_for_status()
                     data = resp.json()
@@ -140,20 +209,4 @@ class OpenAIEmbeddingProvider:
                         logger.debug("OpenAI Embeddings request cause: %s", cause, exc_info=True)
                     raise
 
-        # Вектор из data.data[0].embedding
-        items = data.get("data") or []
-        if not items or "embedding" not in items[0]:
-            raise ValueError("OpenAI response missing data[0].embedding")
-        vector = list(items[0]["embedding"])
-
-        # Токены и стоимость
-        usage = data.get("usage") or {}
-        total_tokens = int(usage.get("total_tokens") or usage.get("prompt_tokens") or 0)
-        if total_tokens <= 0:
-            total_tokens = _estimate_tokens(text)
-        total_cost = cost_per_token * total_tokens
-
-        return EmbeddingResult(
-            vector=vector,
-            cost=EmbeddingCost(total_tokens=total_tokens, total_cost=total_cost),
-        )
+        return data
@@ -0,0 +1,165 @@
+"""
+Семантический поиск по таблице embeddings в рамках темы.
+
+k-NN по косинусному расстоянию pgvector (оператор <=>, индекс ix_embeddings_embedding_hnsw
+с vector_cosine_ops). Индекс общий для всей таблицы, а фильтры (тема, модель, статус, entity_kind,
+даты — по квантам theme_quanta) применяются к строкам, которые он уже вернул: за один проход
+в ef_search кандидатов тема с малой долей таблицы или узкий фильтр дадут меньше limit строк.
+Поэтому на время транзакции (set_config(..., is_local=true)) включается hnsw.iterative_scan =
+relaxed_order (pgvector >= 0.8): индекс продолжает обход, пока фильтры не пропустят limit строк
+(или не исчерпан hnsw.max_scan_tuples). В этом режиме порядок строк приблизительный — выдача
+досортировывается по расстоянию. hnsw.ef_search (не меньше limit) — глубина каждого прохода.
+
+Ищутся только кванты: эмбеддинги кластеров (entity) никто не пишет, а сюжеты событий (event_plot) —
+глобальный каталог без theme_id. Новый тип добавляется в SEMANTIC_OBJECT_TYPES вместе с его записью
+в embeddings и загрузкой метаданных.
+"""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.integrations.embedding.model import Embedding
+from app.modules.quanta.models import Quantum
+
+# Типы объектов embeddings, доступные в семантическом поиске (эмбеддинги темы пишутся только для квантов)
+SEMANTIC_OBJECT_TYPES: tuple[str, ...] = ("quantum",)
+
+# Итеративный обход HNSW: фильтры после индекса не урезают выдачу (порядок — приблизительный)
+_HNSW_ITERATIVE_SCAN = "relaxed_order"
+
+
+@dataclass
+class SemanticHit:
+    """Найденный объект: тип, id, сходство (1 - косинусное расстояние) и краткие метаданные."""
+
+    object_type: str
+    object_id: uuid.UUID
+    similarity: float
+    title: str | None = None
+    kind: str | None = None
+    date_at: datetime | None = None
+
+
+def build_knn_stmt(
+    *,
+    theme_id: uuid.UUID,
+    query_vector: Sequence[float],
+    model: str,
+    object_types: Sequence[str],
+    embedding_kind: str = "relevance",
+    limit: int = 20,
+    entity_kind: str | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> sa.Select:
+    """SELECT object_type, object_id, embedding <=> :query ORDER BY расстоянию LIMIT :limit."""
+    distance = Embedding.embedding.cosine_distance(list(query_vector))
+    stmt = (
+        sa.select(Embedding.object_type, Embedding.object_id, distance.label("distance"))
+        .join(
+            Quantum,
+            sa.and_(Embedding.object_type == "quantum", Quantum.id == Embedding.object_id),
+        )
+        .where(
+            Embedding.theme_id == theme_id,
+            Embedding.model == sa.literal(model),
+            Embedding.embedding_kind == embedding_kind,
+            Embedding.object_type.in_(list(object_types)),
+            Quantum.status == "active",
+        )
+    )
+    if entity_kind:
+        stmt = stmt.where(Quantum.entity_kind == entity_kind)
+    if date_from is not None:
+        stmt = stmt.where(Quantum.date_at >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(Quantum.date_at <= date_to)
+    return stmt.order_by(distance).limit(limit)
+
+
+async def _load_metadata(
+    session: AsyncSession,
+    ids_by_type: dict[str, list[uuid.UUID]],
+) -> dict[tuple[str, uuid.UUID], tuple[str | None, str | None, datetime | None]]:
+    """Заголовок, вид и дата для найденных объектов: по одному SELECT на тип (сейчас только кванты)."""
+    meta: dict[tuple[str, uuid.UUID], tuple[str | None, str | None, datetime | None]] = {}
+    if ids_by_type.get("quantum"):
+        rows = await session.execute(
+            sa.select(Quantum.id, Quantum.title, Quantum.entity_kind, Quantum.date_at).where(
+                Quantum.id.in_(ids_by_type["quantum"])
+            )
+        )
+        for qid, title, kind, date_at in rows.all():
+            meta[("quantum", qid)] = (title, kind.value if hasattr(kind, "value") else str(kind), date_at)
+    return meta
+
+
+async def semantic_search(
+    session: AsyncSession,
+    *,
+    theme_id: uuid.UUID,
+    query_vector: Sequence[float],
+    model: str,
+    object_types: Sequence[str] = SEMANTIC_OBJECT_TYPES,
+    embedding_kind: str = "relevance",
+    limit: int = 20,
+    ef_search: int = 100,
+    entity_kind: str | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> list[SemanticHit]:
+    """
+    Ранжированный список объектов темы, ближайших к query_vector (по убыванию сходства).
+    Вызывать внутри транзакции: hnsw.ef_search и hnsw.iterative_scan выставляются локально для неё.
+    """
+    types = [t for t in object_types if t in SEMANTIC_OBJECT_TYPES]
+    if not types or not query_vector:
+        return []
+    limit = max(1, int(limit))
+    await session.execute(
+        sa.select(
+            sa.func.set_config("hnsw.ef_search", str(max(int(ef_search), limit)), True),
+            sa.func.set_config("hnsw.iterative_scan", _HNSW_ITERATIVE_SCAN, True),
+        )
+    )
+    result = await session.execute(
+        build_knn_stmt(
+            theme_id=theme_id,
+            query_vector=query_vector,
+            model=model,
+            object_types=types,
+            embedding_kind=embedding_kind,
+            limit=limit,
+            entity_kind=entity_kind,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    )
+    # relaxed_order может слегка переставить соседние строки — досортировка по расстоянию
+    rows: list[Any] = sorted(result.all(), key=lambda row: float(row[2]))
+    ids_by_type: dict[str, list[uuid.UUID]] = {}
+    for object_type, object_id, _ in rows:
+        ids_by_type.setdefault(object_type, []).append(object_id)
+    meta = await _load_metadata(session, ids_by_type)
+
+    hits: list[SemanticHit] = []
+    for object_type, object_id, distance in rows:
+        title, kind, date_at = meta.get((object_type, object_id), (None, None, None))
+        hits.append(
+            SemanticHit(
+                object_type=object_type,
+                object_id=object_id,
+                similarity=1.0 - float(distance),
+                title=title,
+                kind=kind,
+                date_at=date_at,
+            )
+        )
+    return hits
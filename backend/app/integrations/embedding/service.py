@@ -3,18 +3,30 @@
 Выбирает провайдера по имени из конфига и делегирует ему построение вектора.
 Возвращает JSONB-совместимый dict (vector + cost).
 Опционально пишет billing_usage_events (service_type=embedding, unit_code=total_tokens).
+embed_many — батчевый путь: тексты режутся на пачки (по числу и оценке токенов),
+каждая пачка — один запрос к провайдеру и одна строка биллинга.
+Перед вызовом провайдера проверяется кеш эмбеддингов (cache.py) по text_hash.
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import uuid
 from decimal import Decimal
 from typing import TYPE_CHECKING, Any
 
 from app.core.config import Settings
-from app.integrations.embedding.ports import EmbeddingCost, EmbeddingProviderPort, EmbeddingResult
+from app.integrations.embedding.cache import EmbeddingCache, embedding_text_hash, get_embedding_cache
+from app.integrations.embedding.ports import (
+    EmbeddingBatchResult,
+    EmbeddingCost,
+    EmbeddingProviderPort,
+    EmbeddingResult,
+    estimate_tokens,
+)
 from app.integrations.embedding.providers.openai import OpenAIEmbeddingProvider
+from app.integrations.http import HttpClientRegistry
 from app.modules.billing.constants import (
     BillingQuantityUnitCode,
     BillingServiceType,
@@ -27,21 +39,64 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+def _chunk_indices(texts: list[str], max_items: int, max_tokens: int) -> list[list[int]]:
+    """
+    Разбить индексы texts на пачки: не больше max_items текстов и max_tokens оценочных токенов.
+    Текст, который сам по себе больше max_tokens, идёт отдельной пачкой.
+    """
+    max_items = max(1, max_items)
+    chunks: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_tokens(total_tokens: int, texts: list[str]) -> list[int]:
+    """Разложить токены пачки по текстам пропорционально оценке (сумма сохраняется)."""
+    weights = [estimate_tokens(t) for t in texts]
+    weight_sum = sum(weights) or 1
+    shares = [total_tokens * w // weight_sum for w in weights]
+    if shares:
+        shares[-1] += total_tokens - sum(shares)
+    return shares
+
+
 class EmbeddingService:
     """
     Сервис эмбеддингов: реестр провайдеров и имя текущего берутся из конфига.
     Вызывает провайдера с переданными моделью, размерностью, стоимостью за токен и текстом.
     """
 
-    def __init__(self, settings: Settings, *, billing_service: "BillingService | None" = None) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        *,
+        billing_service: "BillingService | None" = None,
+        cache: EmbeddingCache | None = None,
+        http_clients: HttpClientRegistry | None = None,
+    ) -> None:
         self._settings = settings
         self._billing_service = billing_service
+        self._cache = cache if cache is not None else get_embedding_cache(
+            int(getattr(settings, "EMBEDDING_CACHE_MAX_ITEMS", 5000) or 0)
+        )
         self._registry: dict[str, EmbeddingProviderPort] = {
             "openai": OpenAIEmbeddingProvider(
                 api_key=settings.OPENAI_API_KEY.get_secret_value(),
                 base_url=settings.OPENAI_BASE_URL,
                 timeout_s=settings.OPENAI_EMBEDDING_TIMEOUT_S,
                 settings=settings,
+                http_clients=http_clients,
             ),
         }
         self._provider_name = (settings.EMBEDDING_PROVIDER or "").strip() or "openai"
@@ -62,9 +117,11 @@ class EmbeddingService:
         billing_theme_id: uuid.UUID | None = None,
         billing_task_type: str | None = None,
         billing_extra: dict[str, Any] | None = None,
+        lookup_session: Any | None = None,
     ) -> dict[str, Any]:
         """
         Построить эмбеддинг для текста и вернуть JSONB-совместимый результат.
+        Сначала проверяется кеш (LRU, затем embeddings по text_hash при lookup_session).
 
         Args:
             text: текст для эмбеддинга.
@@ -76,10 +133,11 @@ class EmbeddingService:
             billing_theme_id: тема для события расхода.
             billing_task_type: тип задачи (например theme_relevance_embedding, search_quantum_embedding).
             billing_extra: дополнительные поля в JSON события.
+            lookup_session: AsyncSession для поиска готового вектора в embeddings (второй уровень кеша).
 
         Returns:
             Dict для JSONB: vector (list[float]), cost (dict с total_tokens, total_cost),
-            при необходимости model, dimensions, provider.
+            при необходимости model, dimensions, provider; cached=True — вектор из кеша (без биллинга).
             Стоимость берётся из ответа провайдера; если провайдер не вернул usage —
             считается как токены_оценка * cost_per_token.
         """
@@ -95,12 +153,18 @@ class EmbeddingService:
         dims_val = dimensions if dimensions is not None else self._settings.EMBEDDING_DIMENSIONS
         cost_per = cost_per_token if cost_per_token is not None else self._settings.EMBEDDING_COST_PER_TOKEN
 
+        text_hash = embedding_text_hash(text)
+        cached = await self._cache.lookup(model_val, dims_val, [text_hash], session=lookup_session)
+        if text_hash in cached:
+            return _cached_to_jsonb(cached[text_hash], provider.name, model_val, dims_val)
+
         result = await provider.embed(
             text=text,
             model=model_val,
             dimensions=dims_val,
             cost_per_token=cost_per,
         )
+        self._cache.put_many(model_val, dims_val, {text_hash: result.vector})
 
         await self._record_embedding_billing(
             provider_name=provider.name,
@@ -114,6 +178,157 @@ class EmbeddingService:
 
         return _result_to_jsonb(result, provider.name, model_val, dims_val)
 
+    async def embed_many(
+        self,
+        texts: list[str],
+        *,
+        provider_name: str | None = None,
+        model: str | None = None,
+        dimensions: int | None = None,
+        cost_per_token: Decimal | None = None,
+        billing_session: Any | None = None,
+        billing_theme_id: uuid.UUID | None = None,
+        billing_task_type: str | None = None,
+        billing_extra: dict[str, Any] | None = None,
+        lookup_session: Any | None = None,
+        skip_failed_chunks: bool = False,
+    ) -> list[dict[str, Any] | None]:
+        """
+        Построить эмбеддинги для списка текстов батчами.
+
+        Сначала пакетный поиск в кеше (LRU, затем embeddings по text_hash при lookup_session);
+        промахи режутся на пачки по EMBEDDING_BATCH_MAX_ITEMS и EMBEDDING_BATCH_MAX_TOKENS
+        (оценка токенов); пачки отправляются конкурентно (не больше EMBEDDING_BATCH_MAX_CONCURRENCY),
+        биллинг пишется последовательно — одна строка на пачку.
+
+        Args:
+            texts: тексты для эмбеддинга.
+            lookup_session: AsyncSession для поиска готовых векторов в embeddings.
+            skip_failed_chunks: если True — ошибка пачки не пробрасывается, для её текстов
+                в результате None; иначе первая ошибка пробрасывается — после биллинга всех
+                успешных пачек (их векторы остаются в кеше).
+            Остальные аргументы — как у embed.
+
+        Returns:
+            Список в порядке texts: dict как у embed (vector, cost, provider, model, dimensions);
+            cost — доля токенов пачки, пропорциональная оценке текста; для векторов из кеша
+            cost нулевой и cached=True. Повтор текста в texts — свой dict с нулевым cost
+            (текст отправлен и оплачен один раз), так что сумма cost по списку равна биллингу.
+        """
+        if not texts:
+            return []
+        provider = self._get_provider(provider_name)
+        if not provider:
+            logger.warning(
+                "embedding: провайдер '%s' не найден в реестре",
+                provider_name or self._provider_name,
+            )
+            raise ValueError(f"Embedding provider not found: {provider_name or self._provider_name}")
+
+        model_val = (model or self._settings.EMBEDDING_MODEL or "").strip() or "text-embedding-3-small"
+        dims_val = dimensions if dimensions is not None else self._settings.EMBEDDING_DIMENSIONS
+        cost_per = cost_per_token if cost_per_token is not None else self._settings.EMBEDDING_COST_PER_TOKEN
+
+        out: list[dict[str, Any] | None] = [None] * len(texts)
+        hashes = [embedding_text_hash(t) for t in texts]
+        cached = await self._cache.lookup(model_val, dims_val, hashes, session=lookup_session)
+        # К провайдеру уходят только промахи кеша, одинаковые тексты — один раз
+        pending: list[int] = []
+        pending_hashes: set[str] = set()
+        for i, h in enumerate(hashes):
+            if h in cached:
+                out[i] = _cached_to_jsonb(cached[h], provider.name, model_val, dims_val)
+            elif h not in pending_hashes:
+                pending_hashes.add(h)
+                pending.append(i)
+        if not pending:
+            logger.info("embedding: embed_many texts=%s — все векторы из кеша", len(texts))
+            return out
+
+        pending_texts = [texts[i] for i in pending]
+        chunks = [
+            [pending[j] for j in chunk]
+            for chunk in _chunk_indices(
+                pending_texts,
+                max_items=int(getattr(self._settings, "EMBEDDING_BATCH_MAX_ITEMS", 256) or 256),
+                max_tokens=int(getattr(self._settings, "EMBEDDING_BATCH_MAX_TOKENS", 100_000) or 100_000),
+            )
+        ]
+        sem = asyncio.Semaphore(max(1, int(getattr(self._settings, "EMBEDDING_BATCH_MAX_CONCURRENCY", 2) or 1)))
+
+        async def _embed_chunk(indices: list[int]) -> EmbeddingBatchResult:
+            async with sem:
+                return await provider.embed_many(
+                    texts=[texts[i] for i in indices],
+                    model=model_val,
+                    dimensions=dims_val,
+                    cost_per_token=cost_per,
+                )
+
+        chunk_results = await asyncio.gather(
+            *(_embed_chunk(indices) for indices in chunks),
+            return_exceptions=True,
+        )
+        logger.info(
+            "embedding: embed_many texts=%s cached=%s sent=%s chunks=%s model=%s",
+            len(texts),
+            len(texts) - len(pending),
+            len(pending),
+            len(chunks),
+            model_val,
+        )
+
+        embedded_by_hash: dict[str, dict[str, Any]] = {}
+        first_error: BaseException | None = None
+        for chunk_no, (indices, chunk_result) in enumerate(zip(chunks, chunk_results)):
+            if isinstance(chunk_result, BaseException):
+                # Ошибку пробрасываем только после биллинга всех успешных (оплаченных) пачек
+                first_error = first_error or chunk_result
+                logger.warning(
+                    "embedding: пачка %s/%s (%s текстов) не удалась: %s",
+                    chunk_no + 1,
+                    len(chunks),
+                    len(indices),
+                    chunk_result,
+                )
+                continue
+
+            await self._record_embedding_billing(
+                provider_name=provider.name,
+                model_val=model_val,
+                total_tokens=chunk_result.cost.total_tokens,
+                billing_session=billing_session,
+                billing_theme_id=billing_theme_id,
+                billing_task_type=billing_task_type,
+                billing_extra={**(billing_extra or {}), "batch_size": len(indices)},
+            )
+
+            chunk_texts = [texts[i] for i in indices]
+            token_shares = _split_tokens(chunk_result.cost.total_tokens, chunk_texts)
+            for i, vector, tokens in zip(indices, chunk_result.vectors, token_shares):
+                item_result = EmbeddingResult(
+                    vector=vector,
+                    cost=EmbeddingCost(total_tokens=tokens, total_cost=cost_per * tokens),
+                )
+                embedded_by_hash[hashes[i]] = _result_to_jsonb(item_result, provider.name, model_val, dims_val)
+
+        self._cache.put_many(
+            model_val,
+            dims_val,
+            {h: item["vector"] for h, item in embedded_by_hash.items()},
+        )
+        if first_error is not None and not skip_failed_chunks:
+            raise first_error
+        billed: set[str] = set()
+        for i, h in enumerate(hashes):
+            if out[i] is None and h in embedded_by_hash:
+                item = embedded_by_hash[h]
+                if h in billed:
+                    item = {**item, "cost": {"total_tokens": 0, "total_cost": 0.0}}
+                billed.add(h)
+                out[i] = item
+        return out
+
     async def _record_embedding_billing(
         self,
         *,
@@ -151,6 +366,23 @@ class EmbeddingService:
         )
 
 
+def _cached_to_jsonb(
+    vector: list[float],
+    provider: str,
+    model: str,
+    dimensions: int,
+) -> dict[str, Any]:
+    """Результат для вектора из кеша: без стоимости, с признаком cached."""
+    return {
+        "vector": vector,
+        "cost": {"total_tokens": 0, "total_cost": 0.0},
+        "provider": provider,
+        "model": model,
+        "dimensions": dimensions,
+        "cached": True,
+    }
+
+
 def _result_to_jsonb(
     result: EmbeddingResult,
     provider: str,
@@ -0,0 +1,74 @@
+"""
+Пакетная запись эмбеддингов в таблицу embeddings.
+
+upsert_embeddings — многострочный INSERT ... ON CONFLICT по уникальному ключу
+(theme_id, object_type, object_id, embedding_kind, model) = uq_embeddings_theme_object_kind_model:
+при конфликте обновляются вектор, dims, text_hash и updated_at.
+Заменяет цикл «SELECT существующей записи → UPDATE или INSERT» по одному объекту.
+"""
+
+from __future__ import annotations
+
+import uuid
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.integrations.embedding.model import Embedding
+
+# Строк в одном INSERT (вектор — один параметр, всего 8 параметров на строку)
+UPSERT_CHUNK_SIZE = 500
+
+_CONFLICT_KEY = ("theme_id", "object_type", "object_id", "embedding_kind", "model")
+
+
+def build_embeddings_upsert_stmt(rows: list[dict[str, Any]]) -> sa.sql.dml.Insert:
+    """INSERT ... ON CONFLICT (theme_id, object_type, object_id, embedding_kind, model) DO UPDATE."""
+    stmt = pg_insert(Embedding).values(rows)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=list(_CONFLICT_KEY),
+        set_={
+            "embedding": excluded.embedding,
+            "dims": excluded.dims,
+            "text_hash": excluded.text_hash,
+            "updated_at": sa.func.now(),
+        },
+    )
+
+
+async def upsert_embeddings(
+    session: AsyncSession,
+    *,
+    theme_id: uuid.UUID | None,
+    object_type: str,
+    embedding_kind: str,
+    model: str,
+    dims: int,
+    items: list[tuple[uuid.UUID, list[float], str | None]],
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+) -> int:
+    """
+    Записать векторы объектов одного типа: items — (object_id, vector, text_hash).
+    Повторы object_id схлопываются (побеждает последний — как при поштучном обновлении).
+    Возвращает число записанных строк.
+    """
+    by_object: dict[uuid.UUID, dict[str, Any]] = {}
+    for object_id, vector, text_hash in items:
+        by_object[object_id] = {
+            "theme_id": theme_id,
+            "object_type": object_type,
+            "object_id": object_id,
+            "embedding_kind": embedding_kind,
+            "model": model,
+            "dims": dims,
+            "embedding": vector,
+            "text_hash": str(text_hash) if text_hash is not None else None,
+        }
+    rows = list(by_object.values())
+    chunk_size = max(1, int(chunk_size))
+    for start in range(0, len(rows), chunk_size):
+        await session.execute(build_embeddings_upsert_stmt(rows[start : start + chunk_size]))
+    return len(rows)
@@ -0,0 +1,7 @@
+"""
+Общие HTTP-клиенты интеграций: один пул соединений на upstream/прокси на всё приложение.
+"""
+
+from app.integrations.http.registry import HttpClientRegistry, borrow_client
+
+__all__ = ["HttpClientRegistry", "borrow_client"]
@@ -0,0 +1,95 @@
+"""
+Реестр долгоживущих httpx.AsyncClient для внешних интеграций.
+
+Создаётся в lifespan приложения (app.state.http_clients) и передаётся в сервисы и провайдеры.
+На каждую пару (upstream, proxy) — свой клиент с пулом keep-alive соединений, поэтому
+TCP/TLS/SOCKS-рукопожатия через туннель не повторяются на каждый вызов.
+HTTP/2 включается, если разрешён в настройках и установлен пакет h2 (httpx[http2]).
+Таймауты задаются на уровне запроса (client.get/post(..., timeout=...)).
+
+Код, которому клиент не передан (скрипты, тесты), работает через borrow_client:
+он создаёт временный клиент на время вызова, как раньше.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import httpx
+
+from app.core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class HttpClientRegistry:
+    """Пул httpx.AsyncClient по ключу (upstream, proxy); закрывается в shutdown приложения."""
+
+    def __init__(self, settings: Settings) -> None:
+        self._limits = httpx.Limits(
+            max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_POOL_KEEPALIVE_EXPIRY_S,
+        )
+        self._timeout = httpx.Timeout(settings.HTTP_DEFAULT_TIMEOUT_S)
+        self._http2 = bool(settings.HTTP_HTTP2_ENABLED) and _http2_available()
+        if settings.HTTP_HTTP2_ENABLED and not self._http2:
+            logger.info("http/registry: HTTP/2 отключён — не установлен пакет h2 (httpx[http2])")
+        self._clients: dict[tuple[str, str | None], httpx.AsyncClient] = {}
+        self._closed = False
+
+    def get(self, upstream: str, *, proxy: str | None = None) -> httpx.AsyncClient:
+        """Вернуть (создав при первом обращении) общий клиент для upstream через proxy."""
+        if self._closed:
+            raise RuntimeError("HttpClientRegistry is closed")
+        key = (upstream, proxy or None)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                proxy=proxy or None,
+                limits=self._limits,
+                timeout=self._timeout,
+                http2=self._http2,
+            )
+            self._clients[key] = client
+            logger.info(
+                "http/registry: создан клиент upstream=%s proxy=%s http2=%s",
+                upstream,
+                "yes" if proxy else "none",
+                self._http2,
+            )
+        return client
+
+    async def aclose(self) -> None:
+        """Закрыть все клиенты (shutdown приложения)."""
+        self._closed = True
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning("http/registry: ошибка при закрытии клиента: %s", e)
+
+
+@asynccontextmanager
+async def borrow_client(
+    client: httpx.AsyncClient | None,
+    **client_kwargs: Any,
+) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Отдать переданный общий клиент (не закрывая его) или создать временный
+    httpx.AsyncClient(**client_kwargs) на время блока.
+    """
+    if client is not None:
+        yield client
+        return
+    async with httpx.AsyncClient(**client_kwargs) as own:
+        yield own
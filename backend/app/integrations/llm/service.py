@@ -2,15 +2,16 @@
 Единый LLMService: вызов провайдера, нормализация ответа, подсчёт токенов.
 Биллинг LLM: service_type=llm, service_impl={provider}_{model}_{in|out}, единицы input/output_tokens.
 """
+import asyncio
 import json
 import math
 import time
 import uuid
+import weakref
 from datetime import datetime, timezone
 from decimal import Decimal
 from typing import TYPE_CHECKING, Any, Literal
 
-import httpx
 from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -19,6 +20,7 @@ if TYPE_CHECKING:
     from app.modules.billing.service import BillingService
 
 from app.core.config import Settings
+from app.integrations.http import HttpClientRegistry, borrow_client
 from app.integrations.llm.factory import get_provider
 from app.integrations.llm.policies.retry import with_retry
 from app.integrations.llm.types import (
@@ -33,17 +35,40 @@ from app.modules.billing.constants import (
     BillingServiceType,
     llm_tariff_service_impl,
 )
+from app.modules.billing.service import BillingUsageItem
 
 OVERHEAD_TOTAL = 12
 OVERHEAD_PER_MESSAGE = 8
 CHARS_PER_TOKEN_ESTIMATE = 4
 
 
+async def _finish_shielded(coro: Any) -> None:
+    """
+    Выполнить coro до конца, даже если ожидающую задачу отменяют: отмена пробрасывается вызывающему
+    только после завершения coro (сессия к этому моменту уже не используется).
+    """
+    inner = asyncio.ensure_future(coro)
+    cancelled = False
+    while not inner.done():
+        try:
+            # wait не отменяет inner при отмене ожидающего
+            await asyncio.wait({inner})
+        except asyncio.CancelledError:
+            cancelled = True
+    if cancelled:
+        if not inner.cancelled():
+            inner.exception()  # ошибка записи уступает отмене; помечаем как полученную
+        raise asyncio.CancelledError
+    inner.result()
+
+
 class LLMService:
     """
     Единый сервис вызова LLM: провайдер, нормализация, токены.
 
     Для записи в биллинг передайте billing_session и billing_theme_id (и зарегистрируйте BillingService в приложении).
+    Вызовы можно выполнять конкурентно с общей billing_session: запись биллинга
+    сериализуется блокировкой на сессию (AsyncSession не допускает параллельных запросов).
     """
 
     def __init__(
@@ -51,9 +76,24 @@ class LLMService:
         settings: Settings,
         *,
         billing_service: "BillingService | None" = None,
+        http_clients: HttpClientRegistry | None = None,
     ) -> None:
         self._settings = settings
         self._billing_service = billing_service
+        self._http_clients = http_clients
+        self._session_locks: weakref.WeakKeyDictionary[AsyncSession, asyncio.Lock] = weakref.WeakKeyDictionary()
+
+    def session_lock(self, session: AsyncSession) -> asyncio.Lock:
+        """
+        Блокировка сессии (одна на сессию, живёт пока жива сессия): под ней пишется биллинг.
+        Код, который работает с той же сессией конкурентно с вызовами LLM, берёт эту же блокировку
+        на время своих запросов — и не держит её во время вызова LLM (блокировка не реентерабельна).
+        """
+        lock = self._session_locks.get(session)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session] = lock
+        return lock
 
     async def generate_text(
         self,
@@ -107,7 +147,8 @@ class LLMService:
             and billing_theme_id is not None
         )
 
-        async with httpx.AsyncClient() as client:
+        shared = self._http_clients.get(f"llm:{provider_name}") if self._http_clients is not None else None
+        async with borrow_client(shared) as client:
             provider_impl = get_provider(provider_name, self._settings, client)
 
             async def _call() -> dict:
@@ -151,15 +192,22 @@ class LLMService:
                 model_str = model if isinstance(model, str) else (str(model) if model is not None else None)
                 reg = self._settings.llm_registry.get(provider_name)
                 fallback_model = reg.model if reg else None
-                await self._record_llm_billing(
-                    bs,
-                    billing_session,
-                    theme_id=billing_theme_id,
-                    provider_name=provider_name,
-                    task=task,
-                    model=model_str or fallback_model,
-                    usage=usage,
-                )
+
+                async def _bill() -> None:
+                    async with self.session_lock(billing_session):
+                        await self._record_llm_billing(
+                            bs,
+                            billing_session,
+                            theme_id=billing_theme_id,
+                            provider_name=provider_name,
+                            task=task,
+                            model=model_str or fallback_model,
+                            usage=usage,
+                        )
+
+                # Запрос уже оплачен: отмена вызывающего (таймаут пакета) не должна прерывать запись
+                # биллинга на общей сессии — дописываем её и только затем отменяемся
+                await _finish_shielded(_bill())
 
         return LLMResponse(
             text=text,
@@ -223,7 +271,7 @@ class LLMService:
         model: str | None,
         usage: TokenUsage,
     ) -> None:
-        """Две строки: input_tokens / output_tokens, service_impl = provider_model_in|out."""
+        """Две строки одним INSERT: input_tokens / output_tokens, service_impl = provider_model_in|out."""
         task_type = (task or "").strip() or BillingServiceType.OTHER.value
         occurred_at = datetime.now(timezone.utc)
         correlation_id = str(uuid.uuid4())
@@ -235,32 +283,26 @@ class LLMService:
         }
         pt = usage.prompt_tokens
         ct = usage.completion_tokens
-        impl_in = llm_tariff_service_impl(provider_name, model, "in")
-        impl_out = llm_tariff_service_impl(provider_name, model, "out")
-        if pt > 0:
-            await billing_service.record_usage(
-                session,
-                theme_id=theme_id,
-                task_type=task_type,
-                service_type=BillingServiceType.LLM.value,
-                service_impl=impl_in,
-                quantity=Decimal(pt),
-                quantity_unit_code=BillingQuantityUnitCode.INPUT_TOKENS.value,
-                occurred_at=occurred_at,
-                extra={**base_extra, "leg": "input"},
-            )
-        if ct > 0:
-            await billing_service.record_usage(
-                session,
+        legs = (
+            ("input", pt, llm_tariff_service_impl(provider_name, model, "in"), BillingQuantityUnitCode.INPUT_TOKENS),
+            ("output", ct, llm_tariff_service_impl(provider_name, model, "out"), BillingQuantityUnitCode.OUTPUT_TOKENS),
+        )
+        items = [
+            BillingUsageItem(
                 theme_id=theme_id,
                 task_type=task_type,
                 service_type=BillingServiceType.LLM.value,
-                service_impl=impl_out,
-                quantity=Decimal(ct),
-                quantity_unit_code=BillingQuantityUnitCode.OUTPUT_TOKENS.value,
+                service_impl=impl,
+                quantity=Decimal(tokens),
+                quantity_unit_code=unit.value,
                 occurred_at=occurred_at,
-                extra={**base_extra, "leg": "output"},
+                extra={**base_extra, "leg": leg},
             )
+            for leg, tokens, impl, unit in legs
+            if tokens > 0
+        ]
+        if items:
+            await billing_service.record_usage_many(session, items)
 
     def _estimate_usage(self, messages: list[Message], answer_text: str) -> TokenUsage:
         """Оценка токенов: ~chars/4 + overhead."""
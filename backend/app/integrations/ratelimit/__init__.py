@@ -0,0 +1,21 @@
+"""
+Лимиты частоты запросов к внешним API: token bucket в памяти процесса или в Postgres (общий для процессов).
+"""
+
+from app.integrations.ratelimit.buckets import PostgresTokenBucket, RateLimiter, TokenBucket
+from app.integrations.ratelimit.registry import (
+    RateLimiterRegistry,
+    RateLimitSpec,
+    get_local_rate_limiter,
+    rate_limit_spec,
+)
+
+__all__ = [
+    "PostgresTokenBucket",
+    "RateLimitSpec",
+    "RateLimiter",
+    "RateLimiterRegistry",
+    "TokenBucket",
+    "get_local_rate_limiter",
+    "rate_limit_spec",
+]
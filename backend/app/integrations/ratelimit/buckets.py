@@ -0,0 +1,165 @@
+"""
+Token bucket: запас до burst токенов, пополнение rate_per_s токенов в секунду, запрос тратит cost.
+
+Оба варианта работают резервациями: acquire сразу списывает токены (запас может уйти в минус)
+и спит, пока долг не покроется пополнением. Так вызовы обслуживаются в порядке обращения,
+а между ними не нужна блокировка на время ожидания.
+
+- TokenBucket — в памяти процесса (один event loop);
+- PostgresTokenBucket — состояние в строке rate_limit_buckets, пересчёт одним UPSERT по часам БД:
+  лимит общий для всех процессов (несколько воркеров uvicorn, отдельный run_worker).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Protocol
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter(Protocol):
+    async def acquire(self, cost: float = 1.0) -> None:
+        """Дождаться права на запрос стоимостью cost токенов."""
+        ...
+
+    async def backoff(self, delay_s: float) -> None:
+        """Upstream попросил подождать (429/Retry-After): следующий запрос — не раньше чем через delay_s секунд."""
+        ...
+
+
+class TokenBucket:
+    """Token bucket в памяти процесса."""
+
+    def __init__(self, rate_per_s: float, burst: float = 1.0) -> None:
+        if rate_per_s <= 0:
+            raise ValueError("rate_per_s must be positive")
+        self.rate_per_s = float(rate_per_s)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Списать cost токенов; вернуть, сколько секунд ждать до начала запроса."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_s) - cost
+        self._updated = now
+        return max(0.0, -self._tokens / self.rate_per_s)
+
+    async def acquire(self, cost: float = 1.0) -> None:
+        wait = self.reserve(cost)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def backoff(self, delay_s: float) -> None:
+        self.reserve(0.0)
+        self._tokens = min(self._tokens, _backoff_cap(delay_s, self.rate_per_s))
+
+
+def _backoff_cap(delay_s: float, rate_per_s: float) -> float:
+    """Потолок запаса после backoff: ровно через delay_s пополнение даст один токен на следующий запрос."""
+    return 1.0 - max(0.0, delay_s) * rate_per_s
+
+
+# Запас на сейчас: пополнение по часам БД с момента updated_at, не выше burst
+_REFILLED = (
+    "LEAST(CAST(:burst AS double precision), b.tokens"
+    " + CAST(EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) AS double precision)"
+    " * CAST(:rate AS double precision))"
+)
+
+# Резервация: пополнить запас и списать cost; долг — в минус. Возвращает запас после списания
+_RESERVE_SQL = text(
+    f"""
+    INSERT INTO rate_limit_buckets AS b (name, tokens, updated_at)
+    VALUES (:name, CAST(:burst AS double precision) - CAST(:cost AS double precision), clock_timestamp())
+    ON CONFLICT (name) DO UPDATE SET
+        tokens = {_REFILLED} - CAST(:cost AS double precision),
+        updated_at = clock_timestamp()
+    RETURNING tokens
+    """
+)
+
+# Backoff: запас не выше cap (см. _backoff_cap) — следующая резервация стоимостью 1 ждёт delay_s
+_BACKOFF_SQL = text(
+    f"""
+    INSERT INTO rate_limit_buckets AS b (name, tokens, updated_at)
+    VALUES (:name, CAST(:cap AS double precision), clock_timestamp())
+    ON CONFLICT (name) DO UPDATE SET
+        tokens = LEAST({_REFILLED}, CAST(:cap AS double precision)),
+        updated_at = clock_timestamp()
+    """
+)
+
+
+class PostgresTokenBucket:
+    """
+    Token bucket в строке rate_limit_buckets: одна короткая транзакция на запрос.
+
+    Если БД недоступна (или таблицы ещё нет), лимит временно соблюдается локальным TokenBucket
+    с теми же параметрами — поиск не останавливается, в лог пишется одно предупреждение.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        rate_per_s: float,
+        burst: float = 1.0,
+    ) -> None:
+        self.name = name
+        self._session_factory = session_factory
+        self._fallback = TokenBucket(rate_per_s, burst)
+        self.rate_per_s = self._fallback.rate_per_s
+        self.burst = self._fallback.burst
+        self._degraded = False
+
+    def _params(self) -> dict[str, object]:
+        return {"name": self.name, "rate": self.rate_per_s, "burst": self.burst}
+
+    def _on_error(self, e: Exception) -> None:
+        if not self._degraded:
+            self._degraded = True
+            logger.warning(
+                "ratelimit: общий лимит %s недоступен, используем локальный до восстановления БД: %s",
+                self.name,
+                e,
+            )
+
+    def _on_success(self) -> None:
+        if self._degraded:
+            self._degraded = False
+            logger.info("ratelimit: общий лимит %s снова доступен", self.name)
+
+    async def acquire(self, cost: float = 1.0) -> None:
+        try:
+            async with self._session_factory() as session:
+                async with session.begin():
+                    tokens = (
+                        await session.execute(_RESERVE_SQL, {**self._params(), "cost": float(cost)})
+                    ).scalar_one()
+        except Exception as e:
+            self._on_error(e)
+            await self._fallback.acquire(cost)
+            return
+        self._on_success()
+        if tokens < 0:
+            await asyncio.sleep(-tokens / self.rate_per_s)
+
+    async def backoff(self, delay_s: float) -> None:
+        try:
+            async with self._session_factory() as session:
+                async with session.begin():
+                    await session.execute(
+                        _BACKOFF_SQL,
+                        {**self._params(), "cap": _backoff_cap(delay_s, self.rate_per_s)},
+                    )
+        except Exception as e:
+            self._on_error(e)
+        await self._fallback.backoff(delay_s)
@@ -0,0 +1,39 @@
+"""
+SQLAlchemy-модель для таблицы rate_limit_buckets (общие для процессов token bucket'ы внешних API).
+"""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class RateLimitBucket(Base):
+    """
+    Состояние token bucket одного upstream: запас токенов на момент updated_at.
+    Запас может быть отрицательным — это очередь уже выданных резерваций (каждая ждёт своей доли).
+    """
+
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = (
+        {"comment": "Token bucket'ы лимитов внешних API, общие для всех процессов приложения"},
+    )
+
+    name: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True,
+        comment="Имя лимита (upstream): arxiv, ncbi, semanticscholar, openalex",
+    )
+    tokens: Mapped[float] = mapped_column(
+        Float,
+        nullable=False,
+        comment="Запас токенов на момент updated_at (отрицательный — долг резерваций)",
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        comment="Момент последнего пересчёта запаса (часы БД)",
+    )
@@ -0,0 +1,103 @@
+"""
+Реестр лимитеров внешних API: один token bucket на upstream на всё приложение.
+
+Создаётся в lifespan (app.state.rate_limiters) и передаётся в сервисы так же, как HttpClientRegistry.
+RATE_LIMIT_BACKEND=postgres — bucket'ы в таблице rate_limit_buckets, общие для всех процессов;
+memory — в памяти процесса (один воркер uvicorn, скрипты).
+
+Код, которому лимитер не передан (скрипты, тесты), берёт get_local_rate_limiter — общий
+для процесса TokenBucket с параметрами по умолчанию клиента.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import Settings
+from app.integrations.ratelimit.buckets import PostgresTokenBucket, RateLimiter, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# NCBI E-utilities: до 10 запросов/с с api_key и до 3/с без него (с запасом, как раньше у клиента)
+_NCBI_RATE_WITH_KEY_PER_S = 9.0
+_NCBI_RATE_NO_KEY_PER_S = 2.8
+
+
+@dataclass(frozen=True)
+class RateLimitSpec:
+    rate_per_s: float
+    # burst = 1: между запросами не меньше 1 / rate_per_s — так же строго, как прежние интервалы клиентов
+    burst: float = 1.0
+
+
+def rate_limit_spec(settings: Settings, name: str) -> RateLimitSpec:
+    """Параметры bucket'а upstream из настроек (RATE_LIMIT_PER_S; для ncbi 0 — по наличию NCBI_API_KEY)."""
+    rate = float(settings.RATE_LIMIT_PER_S.get(name) or 0.0)
+    if name == "ncbi" and rate <= 0:
+        has_key = bool(settings.NCBI_API_KEY and settings.NCBI_API_KEY.strip())
+        rate = _NCBI_RATE_WITH_KEY_PER_S if has_key else _NCBI_RATE_NO_KEY_PER_S
+    if rate <= 0:
+        raise ValueError(f"No rate limit configured for {name!r} (RATE_LIMIT_PER_S)")
+    return RateLimitSpec(rate_per_s=rate)
+
+
+class RateLimiterRegistry:
+    """Лимитеры по имени upstream (arxiv, ncbi, semanticscholar, openalex)."""
+
+    def __init__(
+        self,
+        settings: Settings,
+        *,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+    ) -> None:
+        self._settings = settings
+        backend = (settings.RATE_LIMIT_BACKEND or "memory").strip().lower()
+        if backend == "postgres" and session_factory is None:
+            logger.info("ratelimit: RATE_LIMIT_BACKEND=postgres без фабрики сессий — лимиты в памяти процесса")
+            backend = "memory"
+        self._backend = backend
+        self._session_factory = session_factory
+        self._limiters: dict[str, RateLimiter] = {}
+
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    def get(self, name: str) -> RateLimiter:
+        """Вернуть (создав при первом обращении) лимитер upstream."""
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            spec = rate_limit_spec(self._settings, name)
+            if self._backend == "postgres" and self._session_factory is not None:
+                limiter = PostgresTokenBucket(
+                    name,
+                    self._session_factory,
+                    rate_per_s=spec.rate_per_s,
+                    burst=spec.burst,
+                )
+            else:
+                limiter = TokenBucket(spec.rate_per_s, spec.burst)
+            self._limiters[name] = limiter
+            logger.info(
+                "ratelimit: лимитер %s backend=%s rate=%.3f/s burst=%s",
+                name,
+                self._backend,
+                spec.rate_per_s,
+                spec.burst,
+            )
+        return limiter
+
+
+_local_limiters: dict[str, TokenBucket] = {}
+
+
+def get_local_rate_limiter(name: str, rate_per_s: float, burst: float = 1.0) -> TokenBucket:
+    """Общий для процесса TokenBucket по имени (параметры учитываются при первом вызове)."""
+    limiter = _local_limiters.get(name)
+    if limiter is None:
+        limiter = TokenBucket(rate_per_s, burst)
+        _local_limiters[name] = limiter
+    return limiter
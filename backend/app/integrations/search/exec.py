@@ -2,13 +2,16 @@
 SearchExecutor: выполняет план поиска, применяет TimeSlice, дедуп, обрезку.
 
 Работает с квантами (QuantumCreate). TimeSlice — фильтр по date_at.
+Шаги плана выполняются конкурентно (общий лимит и лимиты на retriever), а результаты
+разбираются строго в порядке плана: дедуп и отсечка по global_target_links детерминированы.
 После дедупа: эмбеддинги квантов, сходство с темой, фильтр по порогу релевантности, rank_score.
 
 Чтобы не перепутать порядок векторов и квантов при сохранении в БД, каждому кванту
 присваивается временный creation_id в attrs; он же кладётся в items_embedding_data.
-В роутере привязка эмбеддинга к кванту идёт по creation_id, после чего creation_id
-удаляется из attrs в БД.
+В роутере привязка эмбеддинга к кванту идёт по creation_id; в attrs записи в БД
+creation_id не сохраняется (save_quanta_from_search отбрасывает его при записи).
 """
+import asyncio
 import hashlib
 import logging
 import uuid as uuid_module
@@ -17,6 +20,7 @@ from typing import Any
 from app.integrations.search.ports import (
     RetrieverContext,
     RetrieverPort,
+    RetrieverResult,
     SearchBillingUsageLine,
 )
 from app.integrations.search.schemas import (
@@ -26,6 +30,7 @@ from app.integrations.search.schemas import (
     StepResult,
     TimeSlice,
 )
+from app.integrations.search.scoring import RelevanceScorer
 from app.integrations.search.utils import _quantum_dedup_key, dedup_quanta
 from app.modules.quanta.crud import record_rejected_quanta_candidates
 from app.modules.quanta.schemas import QuantumCreate
@@ -99,7 +104,10 @@ def _description_hash(description: str) -> str:
 
 
 def _cosine_similarity(a: list[float], b: list[float]) -> float:
-    """Косинусное сходство; возвращает значение в [-1, 1]."""
+    """
+    Косинусное сходство; возвращает значение в [-1, 1].
+    Поэлементный эталон; в executor используется пакетный RelevanceScorer (scoring.py).
+    """
     if not a or not b or len(a) != len(b):
         return 0.0
     dot = sum(x * y for x, y in zip(a, b))
@@ -150,6 +158,20 @@ async def _flush_search_billing(
         )
 
 
+def _skipped_target_reached(step: QueryStep) -> StepResult:
+    """StepResult для шага, не выполненного из-за достижения global_target_links."""
+    return StepResult(
+        step_id=step.step_id,
+        source_query_id=step.source_query_id,
+        retriever=step.retriever,
+        order_index=step.order_index,
+        status="skipped",
+        found=0,
+        returned=0,
+        error="Target links reached",
+    )
+
+
 class SearchExecutor:
     """
     Исполнитель плана поиска: вызывает retriever'ы (кванты),
@@ -166,6 +188,38 @@ class SearchExecutor:
         self._settings = settings
         self._embedding_service = embedding_service
 
+    def _schedule_steps(
+        self,
+        runnable: list[tuple[int, QueryStep, RetrieverPort | None]],
+        ctx: RetrieverContext,
+    ) -> dict[int, "asyncio.Task[RetrieverResult]"]:
+        """
+        Запустить шаги конкурентно: общий лимит SEARCH_MAX_CONCURRENT_STEPS
+        и лимит на retriever из SEARCH_MAX_CONCURRENT_PER_RETRIEVER.
+        Задачи стартуют в порядке плана; результаты разбирает execute в том же порядке.
+        """
+        global_limit = max(1, int(getattr(self._settings, "SEARCH_MAX_CONCURRENT_STEPS", 1) or 1))
+        per_retriever_limits: dict[str, int] = (
+            getattr(self._settings, "SEARCH_MAX_CONCURRENT_PER_RETRIEVER", None) or {}
+        )
+        global_sem = asyncio.Semaphore(global_limit)
+        retriever_sems: dict[str, asyncio.Semaphore] = {}
+        for _idx, step, retriever in runnable:
+            if retriever is not None and step.retriever not in retriever_sems:
+                limit = per_retriever_limits.get(step.retriever) or global_limit
+                retriever_sems[step.retriever] = asyncio.Semaphore(max(1, int(limit)))
+
+        async def _run(step: QueryStep, retriever: RetrieverPort) -> RetrieverResult:
+            async with retriever_sems[step.retriever]:
+                async with global_sem:
+                    return await retriever.retrieve(step, ctx)
+
+        return {
+            idx: asyncio.create_task(_run(step, retriever), name=f"search-step-{step.step_id}")
+            for idx, step, retriever in runnable
+            if retriever is not None
+        }
+
     async def execute(
         self,
         plan: SearchPlan,
@@ -180,41 +234,44 @@ class SearchExecutor:
             len(plan.steps),
         )
         all_items: list[QuantumCreate] = []
-        step_results: list[StepResult] = []
         seen_keys: set[tuple[str, str]] = set()
+        # Результаты шагов по индексу в плане: итоговый порядок step_results совпадает с планом
+        results_by_index: dict[int, StepResult] = {}
+        runnable: list[tuple[int, QueryStep, RetrieverPort | None]] = []
 
-        for step in plan.steps:
+        for idx, step in enumerate(plan.steps):
             if not isinstance(step, QueryStep):
-                step_results.append(
-                    StepResult(
-                        step_id=step.step_id,
-                        status="skipped",
-                        found=0,
-                        returned=0,
-                        error="Unknown step kind",
-                    )
-                )
-                continue
-
-            if len(all_items) >= global_target_links:
-                step_results.append(
-                    StepResult(
-                        step_id=step.step_id,
-                        source_query_id=step.source_query_id,
-                        retriever=step.retriever,
-                        order_index=step.order_index,
-                        status="skipped",
-                        found=0,
-                        returned=0,
-                        error="Target links reached",
-                    )
+                results_by_index[idx] = StepResult(
+                    step_id=step.step_id,
+                    status="skipped",
+                    found=0,
+                    returned=0,
+                    error="Unknown step kind",
                 )
                 continue
-
             retriever = self._registry.get(step.retriever)
-            if retriever is None:
-                step_results.append(
-                    StepResult(
+            runnable.append((idx, step, retriever))
+
+        target_reached = len(all_items) >= global_target_links
+        tasks = self._schedule_steps(runnable, ctx) if not target_reached else {}
+        try:
+            for idx, step, retriever in runnable:
+                task = tasks.get(idx)
+                if target_reached:
+                    if task is not None:
+                        task.cancel()
+                        # Шаг мог успеть выполниться до отмены: запросы уже оплачены, биллинг пишем
+                        if task.done() and not task.cancelled() and task.exception() is None:
+                            await _flush_search_billing(
+                                ctx=ctx,
+                                billing_lines=task.result().billing_lines,
+                                step=step,
+                            )
+                    results_by_index[idx] = _skipped_target_reached(step)
+                    continue
+
+                if retriever is None or task is None:
+                    results_by_index[idx] = StepResult(
                         step_id=step.step_id,
                         source_query_id=step.source_query_id,
                         retriever=step.retriever,
@@ -224,14 +281,12 @@ class SearchExecutor:
                         returned=0,
                         error=f"Retriever '{step.retriever}' not found",
                     )
-                )
-                continue
+                    continue
 
-            try:
-                r_result = await retriever.retrieve(step, ctx)
-            except Exception as e:
-                step_results.append(
-                    StepResult(
+                try:
+                    r_result = await task
+                except Exception as e:
+                    results_by_index[idx] = StepResult(
                         step_id=step.step_id,
                         source_query_id=step.source_query_id,
                         retriever=step.retriever,
@@ -241,64 +296,54 @@ class SearchExecutor:
                         returned=0,
                         error=str(e),
                     )
-                )
-                continue
-
-            await _flush_search_billing(
-                ctx=ctx,
-                billing_lines=r_result.billing_lines,
-                step=step,
-            )
-
-            raw_items = r_result.items
-            filtered = list(raw_items)
-            if time_slice is not None:
-                filtered = _apply_time_slice_quanta(filtered, time_slice)
-
-            step_items: list[QuantumCreate] = []
-            for q in filtered:
-                key = _quantum_dedup_key_for_seen(q)
-                if key in seen_keys:
                     continue
-                seen_keys.add(key)
-                step_items.append(q)
 
-            returned_count = len(step_items)
-            found_count = len(raw_items)
-            all_items.extend(step_items)
+                # Биллинг пишется последовательно: все шаги делят одну сессию БД
+                await _flush_search_billing(
+                    ctx=ctx,
+                    billing_lines=r_result.billing_lines,
+                    step=step,
+                )
 
-            step_results.append(
-                StepResult(
+                raw_items = r_result.items
+                filtered = list(raw_items)
+                if time_slice is not None:
+                    filtered = _apply_time_slice_quanta(filtered, time_slice)
+
+                step_items: list[QuantumCreate] = []
+                for q in filtered:
+                    key = _quantum_dedup_key_for_seen(q)
+                    if key in seen_keys:
+                        continue
+                    seen_keys.add(key)
+                    step_items.append(q)
+
+                all_items.extend(step_items)
+                results_by_index[idx] = StepResult(
                     step_id=step.step_id,
                     source_query_id=step.source_query_id,
                     retriever=step.retriever,
                     order_index=step.order_index,
                     status="done",
-                    found=found_count,
-                    returned=returned_count,
+                    found=len(raw_items),
+                    returned=len(step_items),
+                    meta=dict(r_result.meta or {}),
                 )
-            )
 
-            if len(all_items) >= global_target_links:
-                remaining = [
-                    s
-                    for s in plan.steps[plan.steps.index(step) + 1 :]
-                    if isinstance(s, QueryStep)
-                ]
-                for s in remaining:
-                    step_results.append(
-                        StepResult(
-                            step_id=s.step_id,
-                            source_query_id=s.source_query_id,
-                            retriever=s.retriever,
-                            order_index=s.order_index,
-                            status="skipped",
-                            found=0,
-                            returned=0,
-                            error="Target links reached",
-                        )
+                if len(all_items) >= global_target_links:
+                    target_reached = True
+                    logger.info(
+                        "search/executor: global_target_links достигнут после шага %s, оставшиеся шаги отменяются",
+                        step.step_id,
                     )
-                break
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        step_results = [results_by_index[i] for i in sorted(results_by_index)]
 
         all_items = dedup_quanta(all_items)
         all_items = _drop_already_stored_or_rejected_quanta(all_items, ctx)
@@ -320,48 +365,57 @@ class SearchExecutor:
             )
             # Кортеж: (квант, вектор, text_hash, rank_score, creation_id) — creation_id для однозначной привязки к эмбеддингу при сохранении в БД
             per_item: list[tuple[QuantumCreate, list[float] | None, str, float, str]] = []
-            embed_fail_count = 0
+            descriptions: list[str] = []
             for q in all_items:
                 # Временный id на время запроса: попадёт в attrs кванта и в items_embedding_data, в конце запроса удаляется из attrs в БД
                 creation_id = str(uuid_module.uuid4())
                 if q.attrs is None:
                     q.attrs = {}
                 q.attrs["creation_id"] = creation_id
+                descriptions.append(_quantum_description_for_embedding(q))
 
-                desc = _quantum_description_for_embedding(q)
-                text_hash = _description_hash(desc)
-                vector: list[float] | None = None
-                rank_score = 0.0
-                try:
-                    embed_kw: dict[str, Any] = {}
-                    if (
-                        ctx.billing_service is not None
-                        and ctx.billing_session is not None
-                        and ctx.theme_id is not None
-                    ):
-                        embed_kw = {
-                            "billing_session": ctx.billing_session,
-                            "billing_theme_id": ctx.theme_id,
-                            "billing_task_type": "search_quantum_embedding",
-                            "billing_extra": {"context": "search_executor"},
-                        }
-                    result = await self._embedding_service.embed(desc, **embed_kw)
-                    vec = result.get("vector")
-                    if vec and isinstance(vec, list):
-                        vector = vec
-                        sim = _cosine_similarity(vector, theme_vector)
-                        rank_score = sim
-                except Exception as e:
-                    embed_fail_count += 1
-                    logger.warning("search/executor: эмбеддинг кванта не удался: %s", e)
-                per_item.append((q, vector, text_hash, rank_score, creation_id))
+            embed_kw: dict[str, Any] = {}
+            if (
+                ctx.billing_service is not None
+                and ctx.billing_session is not None
+                and ctx.theme_id is not None
+            ):
+                embed_kw = {
+                    "billing_session": ctx.billing_session,
+                    "billing_theme_id": ctx.theme_id,
+                    "billing_task_type": "search_quantum_embedding",
+                    "billing_extra": {"context": "search_executor"},
+                }
+            # Батчами: пачка — один запрос к провайдеру; неудачная пачка даёт None для своих квантов
+            try:
+                results = await self._embedding_service.embed_many(
+                    descriptions,
+                    skip_failed_chunks=True,
+                    # Кеш по text_hash: кванты, уже эмбеддированные в прошлых прогонах/темах, не оплачиваем повторно
+                    lookup_session=ctx.billing_session,
+                    **embed_kw,
+                )
+            except Exception as e:
+                logger.warning("search/executor: эмбеддинг квантов не удался: %s", e)
+                results = [None] * len(descriptions)
+
+            vectors: list[list[float] | None] = []
+            for result in results:
+                vec = result.get("vector") if result else None
+                vectors.append(vec if vec and isinstance(vec, list) else None)
+            embed_fail_count = sum(1 for v in vectors if v is None)
+            # Все сходства одним матрично-векторным произведением, порог — маской
+            scores = RelevanceScorer(theme_vector).score(vectors)
+            keep_mask = RelevanceScorer.mask(scores, embedding_threshold)
+            for q, desc, vector, score in zip(all_items, descriptions, vectors, scores.tolist()):
+                per_item.append((q, vector, _description_hash(desc), score, q.attrs["creation_id"]))
 
             if embed_fail_count > 0:
                 warnings.append(f"Ошибка эмбеддинга для {embed_fail_count} квантов; для них установлен rank_score=0.")
 
             for q, _v, _h, score, _cid in per_item:
                 q.rank_score = score
-            embedding_rejected = [t[0] for t in per_item if t[3] < embedding_threshold]
+            embedding_rejected = [t[0] for t, keep in zip(per_item, keep_mask) if not keep]
             if (
                 embedding_rejected
                 and ctx.billing_session is not None
@@ -372,7 +426,7 @@ class SearchExecutor:
                     theme_id=ctx.billing_theme_id,
                     items=embedding_rejected,
                 )
-            filtered_per_item = [t for t in per_item if t[3] >= embedding_threshold]
+            filtered_per_item = [t for t, keep in zip(per_item, keep_mask) if keep]
             final_per_item = filtered_per_item[:global_target_links]
             final_items = [t[0] for t in final_per_item]
             # В каждом элементе — creation_id, чтобы в роутере привязать эмбеддинг к кванту по id, а не по индексу (порядок created_quanta может не совпадать с items из‑за пропусков при сохранении)
@@ -36,6 +36,8 @@ class RetrieverResult:
 
     items: list[QuantumCreate]
     billing_lines: list[SearchBillingUsageLine] = field(default_factory=list)
+    #: Диагностика шага (например тайминги по источникам); executor кладёт её в StepResult.meta
+    meta: dict[str, Any] = field(default_factory=dict)
 
 
 @dataclass
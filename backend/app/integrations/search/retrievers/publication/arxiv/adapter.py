@@ -2,25 +2,37 @@
 ArxivPublicationAdapter: поиск публикаций через arXiv API (Atom).
 
 Не возвращает строки биллинга (бесплатный API).
+Ответ разбирается потоково: entry маппятся по мере загрузки страницы; разбор XML каждого куска —
+в рабочем потоке (не блокирует event loop).
 """
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
 import logging
+import xml.etree.ElementTree as ET
+from collections import Counter
 from typing import Any
 
+import httpx
+
+from app.integrations.ratelimit import RateLimiter
 from app.integrations.search.ports import RetrieverResult
 from app.modules.quanta.schemas import QuantumCreate
 from app.integrations.search.schemas import QueryModel, TimeSlice
 
-from app.integrations.search.retrievers.publication.arxiv.client import arxiv_search_query
+from app.integrations.search.retrievers.publication.arxiv.client import arxiv_search_stream
 from app.integrations.search.retrievers.publication.arxiv.mapper import (
+    ArxivAtomStreamParser,
+    arxiv_entry_ids,
     map_arxiv_entry_to_quantum,
-    parse_arxiv_atom,
 )
 from app.integrations.search.retrievers.publication.arxiv.query_compiler import (
     compile_arxiv_query,
 )
+from app.integrations.search.retrievers.publication.id_index import SourceIdIndex
 
 logger = logging.getLogger(__name__)
 
@@ -35,9 +47,13 @@ class ArxivPublicationAdapter:
         *,
         timeout_s: float = 60.0,
         retries: int = 5,
+        http_client: httpx.AsyncClient | None = None,
+        rate_limiter: RateLimiter | None = None,
     ) -> None:
         self._timeout_s = timeout_s
         self._retries = retries
+        self._http_client = http_client
+        self._rate_limiter = rate_limiter
 
     async def search_publications(
         self,
@@ -52,6 +68,8 @@ class ArxivPublicationAdapter:
         require_abstract: bool = True,
         request_id: str | None = None,
         retriever_name: str = "publication_retriever",
+        id_index: SourceIdIndex | None = None,
+        partial: RetrieverResult | None = None,
     ) -> RetrieverResult:
         if not language or not isinstance(language, str) or not language.strip():
             raise ValueError("language is required for arXiv publication search")
@@ -77,61 +95,108 @@ class ArxivPublicationAdapter:
             return RetrieverResult(items=[], billing_lines=[])
 
         want = max(1, int(limit))
-        quanta: list[QuantumCreate] = []
+        # partial: кванты видны вызывающему по мере маппинга (останутся при таймауте источника)
+        quanta: list[QuantumCreate] = partial.items if partial is not None else []
         start = 0
-        skipped_mapper_none = 0
+        skipped: Counter[str] = Counter()
+        map_kw: dict[str, Any] = {
+            "compiled": compiled,
+            "language": language,
+            "theme_id": theme_id,
+            "run_id": run_id,
+            "require_abstract": require_abstract,
+            "retriever_name": retriever_name,
+        }
 
         while len(quanta) < want and start <= _ARXIV_START_CAP:
             batch = min(_ARXIV_PAGE_MAX, want - len(quanta))
-            xml = await arxiv_search_query(
+            # Записи разбираются и маппятся по мере загрузки ответа; набрали limit — соединение закрывается
+            parser = ArxivAtomStreamParser()
+            chunks = arxiv_search_stream(
                 search_query=compiled,
                 start=start,
                 max_results=batch,
                 timeout_s=self._timeout_s,
                 retries=self._retries,
+                http_client=self._http_client,
+                rate_limiter=self._rate_limiter,
             )
-            if not xml:
-                break
+            received = False
+            async with contextlib.aclosing(chunks):
+                try:
+                    async for chunk in chunks:
+                        received = True
+                        entries = await asyncio.to_thread(parser.feed, chunk)
+                        self._map_entries(entries, quanta, want, map_kw, skipped, id_index)
+                        if len(quanta) >= want:
+                            break
+                    if received and len(quanta) < want:
+                        entries = await asyncio.to_thread(parser.close)
+                        self._map_entries(entries, quanta, want, map_kw, skipped, id_index)
+                except ET.ParseError as e:
+                    logger.warning(
+                        "search/adapter: provider=%s Atom parse error at start=%s: %s (request_id=%s)",
+                        "arxiv",
+                        start,
+                        e,
+                        request_id,
+                    )
 
-            entries, total_hint = parse_arxiv_atom(xml)
             logger.info(
                 "search/adapter: provider=%s page start=%s raw_entries=%s total_hint=%s (request_id=%s)",
                 "arxiv",
                 start,
-                len(entries),
-                total_hint,
+                parser.entries_seen,
+                parser.total_hint,
                 request_id,
             )
 
-            if not entries:
-                break
-
-            for e in entries:
-                q = map_arxiv_entry_to_quantum(
-                    e,
-                    compiled,
-                    language,
-                    theme_id=theme_id,
-                    run_id=run_id,
-                    require_abstract=require_abstract,
-                    retriever_name=retriever_name,
-                )
-                if q is None:
-                    skipped_mapper_none += 1
-                    continue
-                quanta.append(q)
-                if len(quanta) >= want:
-                    break
-
-            if len(entries) < batch:
+            if parser.entries_seen < batch:
                 break
-            start += len(entries)
+            start += parser.entries_seen
 
         logger.info(
-            "search/adapter: provider=%s mapped_quanta=%s (request_id=%s); skipped mapper_none=%s",
+            "search/adapter: provider=%s mapped_quanta=%s (request_id=%s); skipped mapper_none=%s, duplicate=%s",
             "arxiv",
             len(quanta),
             request_id,
-            skipped_mapper_none,
+            skipped["mapper_none"],
+            skipped["duplicate"],
         )
         return RetrieverResult(items=quanta, billing_lines=[])
+
+    @staticmethod
+    def _map_entries(
+        entries: list[dict[str, Any]],
+        quanta: list[QuantumCreate],
+        want: int,
+        map_kw: dict[str, Any],
+        skipped: Counter[str],
+        id_index: SourceIdIndex | None,
+    ) -> None:
+        """Смапить entry в кванты (дописать в quanta, не больше want); пропуски — в skipped."""
+        for e in entries:
+            if len(quanta) >= want:
+                break
+            map_one = functools.partial(
+                map_arxiv_entry_to_quantum,
+                e,
+                map_kw["compiled"],
+                map_kw["language"],
+                theme_id=map_kw["theme_id"],
+                run_id=map_kw["run_id"],
+                require_abstract=map_kw["require_abstract"],
+                retriever_name=map_kw["retriever_name"],
+            )
+            ids = arxiv_entry_ids(e) if id_index is not None else []
+            if id_index is not None and id_index.is_duplicate(ids, map_one):
+                skipped["duplicate"] += 1
+                continue
+            q = map_one()
+            if q is None:
+                skipped["mapper_none"] += 1
+                continue
+            if id_index is not None and not id_index.admit(ids, q):
+                skipped["duplicate"] += 1
+                continue
+            quanta.append(q)
@@ -1,23 +1,31 @@
 """
 HTTP-клиент arXiv API (Atom XML).
 
-Рекомендация arXiv: ~3 с между последовательными вызовами — соблюдаем перед каждым запросом.
-Длинный search_query: POST с form-data.
+Рекомендация arXiv: не чаще запроса в 3 с и одно соединение за раз — перед каждым запросом
+берём токен лимитера (общий для процессов при RATE_LIMIT_BACKEND=postgres), в процессе
+запросы к arXiv идут по одному. Длинный search_query: POST с form-data.
+Тело ответа отдаётся кусками по мере загрузки (разбор — ArxivAtomStreamParser).
 """
 from __future__ import annotations
 
 import asyncio
 import logging
-import time
+import weakref
+from collections.abc import AsyncGenerator
 from urllib.parse import urlencode
 
 import httpx
 
+from app.integrations.http import borrow_client
+from app.integrations.ratelimit import RateLimiter, get_local_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 ARXIV_API_URL = "https://export.arxiv.org/api/query"
 MIN_INTERVAL_S = 3.0
 POST_QUERY_THRESHOLD = 1800
+# Тело ответа отдаётся кусками не меньше этого размера (разбор куска — один переход в рабочий поток)
+_STREAM_CHUNK = 64 * 1024
 
 
 def _encode_arxiv_query_params(search_query: str, start: int, max_results: int) -> str:
@@ -36,77 +44,93 @@ def _encode_arxiv_query_params(search_query: str, start: int, max_results: int)
     )
 
 
-class _ArxivRateLimiter:
-    _lock = asyncio.Lock()
-    _last_request_end: float = 0.0
+# Одно соединение с arXiv за раз в пределах процесса: семафор на event loop (создаётся при первом
+# запросе в цикле — asyncio-примитив нельзя разделять между циклами, например в тестах и run_worker)
+_in_flight: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+
+def _in_flight_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _in_flight.get(loop)
+    if sem is None:
+        sem = _in_flight[loop] = asyncio.Semaphore(1)
+    return sem
 
-    @classmethod
-    async def wait_turn(cls) -> None:
-        async with cls._lock:
-            now = time.monotonic()
-            wait = MIN_INTERVAL_S - (now - cls._last_request_end)
-            if wait > 0:
-                await asyncio.sleep(wait)
 
-    @classmethod
-    def mark_done(cls) -> None:
-        cls._last_request_end = time.monotonic()
+def _build_request(
+    client: httpx.AsyncClient, search_query: str, encoded: str, timeout_s: float
+) -> httpx.Request:
+    if len(search_query) > POST_QUERY_THRESHOLD:
+        return client.build_request(
+            "POST",
+            ARXIV_API_URL,
+            content=encoded,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=timeout_s,
+        )
+    return client.build_request("GET", f"{ARXIV_API_URL}?{encoded}", timeout=timeout_s)
 
 
-async def arxiv_search_query(
+async def arxiv_search_stream(
     *,
     search_query: str,
     start: int = 0,
     max_results: int = 50,
     timeout_s: float = 60.0,
     retries: int = 5,
-) -> str | None:
+    http_client: httpx.AsyncClient | None = None,
+    rate_limiter: RateLimiter | None = None,
+) -> AsyncGenerator[bytes, None]:
     """
-    Выполнить запрос к arXiv API, вернуть тело ответа (XML) или None.
+    Выполнить запрос к arXiv API и отдавать тело ответа (Atom XML) кусками по мере загрузки.
 
-    Между повторными попытками — пауза MIN_INTERVAL_S (этика arXiv).
+    Повтор (пауза MIN_INTERVAL_S, этика arXiv) — только пока не отдано ни одного куска;
+    обрыв посреди тела завершает поток (вызывающий получает то, что успело прийти).
+    Соединение с arXiv занято до конца итерации — закрывайте генератор (contextlib.aclosing).
+    rate_limiter: лимитер upstream arxiv; None — локальный для процесса (раз в MIN_INTERVAL_S).
     """
     sq = (search_query or "").strip()
     if not sq or sq == " ":
-        return None
+        return
 
     mr = max(1, min(int(max_results), 2000))
     st = max(0, int(start))
 
+    limiter = rate_limiter or get_local_rate_limiter("arxiv", 1 / MIN_INTERVAL_S)
+    encoded = _encode_arxiv_query_params(sq, st, mr)
     last_err: Exception | None = None
     for attempt in range(1, max(1, retries) + 1):
-        await _ArxivRateLimiter.wait_turn()
+        started = False
         try:
-            encoded = _encode_arxiv_query_params(sq, st, mr)
-            async with httpx.AsyncClient(timeout=timeout_s) as client:
-                if len(sq) > POST_QUERY_THRESHOLD:
-                    resp = await client.post(
-                        ARXIV_API_URL,
-                        content=encoded,
-                        headers={
-                            "Content-Type": "application/x-www-form-urlencoded",
-                        },
-                    )
-                else:
-                    resp = await client.get(f"{ARXIV_API_URL}?{encoded}")
-            _ArxivRateLimiter.mark_done()
-            if resp.status_code >= 500:
-                raise RuntimeError(f"arXiv API server error ({resp.status_code})")
-            if resp.status_code >= 400:
-                logger.warning(
-                    "arXiv API request rejected (status=%s): %s",
-                    resp.status_code,
-                    (resp.text or "")[:500],
-                )
-                return None
-            return resp.text
+            async with _in_flight_semaphore():
+                await limiter.acquire()
+                async with borrow_client(http_client, timeout=timeout_s) as client:
+                    resp = await client.send(_build_request(client, sq, encoded, timeout_s), stream=True)
+                    try:
+                        if resp.status_code >= 500:
+                            raise RuntimeError(f"arXiv API server error ({resp.status_code})")
+                        if resp.status_code >= 400:
+                            await resp.aread()
+                            logger.warning(
+                                "arXiv API request rejected (status=%s): %s",
+                                resp.status_code,
+                                (resp.text or "")[:500],
+                            )
+                            return
+                        async for chunk in resp.aiter_bytes(_STREAM_CHUNK):
+                            started = True
+                            yield chunk
+                    finally:
+                        await resp.aclose()
+            return
         except Exception as e:
             last_err = e
-            _ArxivRateLimiter.mark_done()
+            if started:
+                logger.warning("arXiv API response interrupted: %s", e)
+                return
             if attempt >= retries:
                 break
             logger.warning("arXiv API call failed (will retry after %ss): %s", MIN_INTERVAL_S, e)
             await asyncio.sleep(MIN_INTERVAL_S)
 
     logger.warning("arXiv API failed after retries: %s", last_err)
-    return None
@@ -7,8 +7,9 @@ from __future__ import annotations
 import logging
 import re
 import xml.etree.ElementTree as ET
+from collections.abc import Iterator
 from datetime import datetime
-from typing import Any
+from typing import Any, cast
 
 from app.integrations.search.retrievers.publication.schemas_publication_attrs import (
     PublicationAccess,
@@ -35,29 +36,68 @@ OPENSEARCH = "{http://a9.com/-/spec/opensearch/1.1/}"
 _ABS_ID_RE = re.compile(r"arxiv\.org/abs/([^/?#]+)", re.I)
 
 
+class ArxivAtomStreamParser:
+    """
+    Инкрементальный разбор Atom-ленты arXiv: тело ответа подаётся кусками (feed) по мере загрузки,
+    готовые entry возвращаются сразу и удаляются из дерева — в памяти не больше одной записи.
+
+    ET.ParseError пробрасывается из feed/close; уже возвращённые записи остаются валидными.
+    """
+
+    def __init__(self) -> None:
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._stack: list[ET.Element] = []
+        self.total_hint: int | None = None
+        self.entries_seen = 0
+
+    def feed(self, data: bytes | str) -> list[dict[str, Any]]:
+        """Подать очередной кусок XML; вернуть entry, закрытые в нём."""
+        self._parser.feed(data)
+        return self._drain()
+
+    def close(self) -> list[dict[str, Any]]:
+        """Конец документа: вернуть оставшиеся entry."""
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> list[dict[str, Any]]:
+        out: list[dict[str, Any]] = []
+        # events=("start", "end"): каждое событие — (имя, Element)
+        events = cast("Iterator[tuple[str, ET.Element]]", self._parser.read_events())
+        for event, el in events:
+            if event == "start":
+                self._stack.append(el)
+                continue
+            self._stack.pop()
+            if el.tag == f"{OPENSEARCH}totalResults":
+                t = (el.text or "").strip()
+                if t.isdigit():
+                    self.total_hint = int(t)
+            elif el.tag == f"{ATOM}entry":
+                self.entries_seen += 1
+                d = _entry_to_dict(el)
+                if d:
+                    out.append(d)
+                el.clear()
+                if self._stack:
+                    self._stack[-1].remove(el)
+        return out
+
+
 def parse_arxiv_atom(xml_text: str) -> tuple[list[dict[str, Any]], int | None]:
     """
     Разобрать Atom-ленту arXiv. Возвращает список словарей (поля entry) и totalResults при наличии.
     """
     if not xml_text or not xml_text.strip():
         return [], None
+    parser = ArxivAtomStreamParser()
     try:
-        root = ET.fromstring(xml_text)
+        entries_out = parser.feed(xml_text)
+        entries_out.extend(parser.close())
     except ET.ParseError as e:
         logger.warning("arXiv Atom parse error: %s", e)
         return [], None
-
-    total: int | None = None
-    tr = root.find(f"{OPENSEARCH}totalResults")
-    if tr is not None and tr.text and tr.text.strip().isdigit():
-        total = int(tr.text.strip())
-
-    entries_out: list[dict[str, Any]] = []
-    for entry in root.findall(f"{ATOM}entry"):
-        d = _entry_to_dict(entry)
-        if d:
-            entries_out.append(d)
-    return entries_out, total
+    return entries_out, parser.total_hint
 
 
 def _text(el: ET.Element | None) -> str:
@@ -146,6 +186,18 @@ def _parse_published(s: str) -> datetime | None:
     return None
 
 
+def arxiv_entry_ids(entry: dict[str, Any]) -> list[tuple[str, str]]:
+    """Идентификаторы разобранного entry (doi, arxiv) — для раннего дедупа до маппинга."""
+    out: list[tuple[str, str]] = []
+    doi = entry.get("doi")
+    if isinstance(doi, str) and doi.strip():
+        out.append(("doi", doi.strip()))
+    arxiv_id = (entry.get("arxiv_id") or "").strip()
+    if arxiv_id:
+        out.append(("arxiv", arxiv_id))
+    return out
+
+
 def map_arxiv_entry_to_quantum(
     entry: dict[str, Any],
     compiled_query_string: str,
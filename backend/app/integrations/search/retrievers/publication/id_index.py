@@ -0,0 +1,210 @@
+"""
+Ранний дедуп публикаций между источниками: общий индекс идентификаторов (DOI, PMID, arXiv id,
+id источника) на шаг поиска.
+
+Адаптер извлекает идентификаторы из сырой записи до маппинга: если запись уже отдал другой источник
+(или тот же на другой странице), она не маппится, а её идентификаторы дописываются в уцелевший квант.
+Запись, прошедшая маппинг, регистрируется; если за это время ту же работу успел зарегистрировать
+параллельный источник, свежий квант отбрасывается так же.
+
+Отброшенный дубликат запоминается как отложенный маппинг (не больше _MAX_FALLBACKS на работу): если
+источник уцелевшего кванта затем упал или не уложился в таймаут (его кванты не попадут в результат),
+SourceIdIndex.release отдаёт вместо них кванты дубликатов.
+
+Индекс потокобезопасен: PubMed маппит статьи в отдельном потоке.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable
+
+from app.modules.quanta.schemas import QuantumCreate, QuantumIdentifier
+
+# Идентификатор сырой записи: (схема как в QuantumIdentifier, значение)
+RawId = tuple[str, str]
+
+_DOI_PREFIX_RE = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:)", re.I)
+_ARXIV_PREFIX_RE = re.compile(r"^(?:https?://arxiv\.org/abs/|arxiv:)", re.I)
+_ARXIV_VERSION_RE = re.compile(r"v\d+$")
+
+# Сколько отброшенных дубликатов работы держать на случай сбоя источника уцелевшего кванта
+_MAX_FALLBACKS = 2
+
+# Отложенный маппинг отброшенного дубликата: (источник, функция маппинга)
+Fallback = tuple[str, Callable[[], QuantumCreate | None]]
+
+
+def normalize_id(scheme: str, value: str) -> RawId | None:
+    """Ключ индекса: схема в нижнем регистре, DOI без префикса и регистра, arXiv id без версии."""
+    s = (scheme or "").strip().lower()
+    v = (value or "").strip()
+    if not s or not v:
+        return None
+    if s == "doi":
+        v = _DOI_PREFIX_RE.sub("", v).lower()
+    elif s == "arxiv":
+        v = _ARXIV_VERSION_RE.sub("", _ARXIV_PREFIX_RE.sub("", v))
+    elif s == "pubmed":
+        v = v.rstrip("/").rsplit("/", 1)[-1]
+        if not v.isdigit():
+            return None
+    return (s, v) if v else None
+
+
+@dataclass
+class _Entry:
+    source: str
+    quantum: QuantumCreate
+    keys: set[RawId] = field(default_factory=set)
+    fallbacks: list[Fallback] = field(default_factory=list)
+
+
+class PublicationIdIndex:
+    """Индекс идентификаторов публикаций, общий для адаптеров одного шага."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._owners: dict[RawId, _Entry] = {}
+
+    def for_source(self, source: str) -> SourceIdIndex:
+        """Представление индекса для одного источника (со своими счётчиками пересечений)."""
+        return SourceIdIndex(self, source)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len({id(e) for e in self._owners.values()})
+
+    def _owner(self, keys: list[RawId]) -> _Entry | None:
+        for k in keys:
+            entry = self._owners.get(k)
+            if entry is not None:
+                return entry
+        return None
+
+    def _merge(self, entry: _Entry, ids: list[RawId]) -> None:
+        """Дописать в уцелевший квант идентификаторы дубликата, которых у него ещё нет."""
+        present = {
+            k for k in (normalize_id(i.scheme, i.value) for i in entry.quantum.identifiers) if k is not None
+        }
+        for scheme, value in ids:
+            k = normalize_id(scheme, value)
+            if k is None:
+                continue
+            if k not in present:
+                present.add(k)
+                entry.quantum.identifiers.append(
+                    QuantumIdentifier(scheme=scheme, value=value.strip(), is_primary=False)
+                )
+            entry.keys.add(k)
+            self._owners.setdefault(k, entry)
+
+    @staticmethod
+    def _keep_fallback(entry: _Entry, fallback: Fallback | None) -> None:
+        if fallback is not None and fallback[0] != entry.source and len(entry.fallbacks) < _MAX_FALLBACKS:
+            entry.fallbacks.append(fallback)
+
+    def claim_duplicate(self, ids: list[RawId], fallback: Fallback | None = None) -> str | None:
+        """Запись уже есть в индексе: слить идентификаторы и вернуть источник уцелевшего кванта."""
+        keys = [k for k in (normalize_id(s, v) for s, v in ids) if k is not None]
+        if not keys:
+            return None
+        with self._lock:
+            entry = self._owner(keys)
+            if entry is None:
+                return None
+            self._merge(entry, ids)
+            self._keep_fallback(entry, fallback)
+            return entry.source
+
+    def _release(self, entries: list[_Entry]) -> list[tuple[str, QuantumCreate]]:
+        """
+        Кванты entries не попадут в результат: снять их с учёта и вернуть вместо них кванты отброшенных
+        дубликатов (источник, квант) — первый дубликат каждой работы, прошедший маппинг.
+        """
+        out: list[tuple[str, QuantumCreate]] = []
+        with self._lock:
+            for entry in entries:
+                for k in entry.keys:
+                    if self._owners.get(k) is entry:
+                        del self._owners[k]
+                for fb_source, map_fn in entry.fallbacks:
+                    q = map_fn()
+                    if q is None:
+                        continue
+                    replacement = _Entry(source=fb_source, quantum=q)
+                    self._merge(replacement, sorted(entry.keys))
+                    out.append((fb_source, q))
+                    break
+        return out
+
+    def _register(self, source: str, ids: list[RawId], quantum: QuantumCreate) -> _Entry:
+        """
+        Зарегистрировать смапленный квант и вернуть запись работы. Если работу раньше зарегистрировал
+        другой квант (entry.quantum is not quantum), его идентификаторы дополнены — квант отбросить.
+        """
+        keys = [k for k in (normalize_id(s, v) for s, v in ids) if k is not None]
+        with self._lock:
+            entry = self._owner(keys)
+            if entry is not None:
+                self._merge(entry, ids)
+                self._keep_fallback(entry, (source, lambda: quantum))
+                return entry
+            entry = _Entry(source=source, quantum=quantum)
+            self._merge(entry, ids)
+            return entry
+
+
+class SourceIdIndex:
+    """
+    Индекс с точки зрения одного источника: is_duplicate до маппинга, admit после.
+    overlap — сколько записей источника отброшено как дубликаты кванта каждого источника.
+    """
+
+    def __init__(self, index: PublicationIdIndex, source: str) -> None:
+        self._index = index
+        self.source = source
+        self.overlap: Counter[str] = Counter()
+        self._admitted: list[_Entry] = []
+
+    @property
+    def duplicates_dropped(self) -> int:
+        return sum(self.overlap.values())
+
+    def is_duplicate(
+        self,
+        ids: list[RawId],
+        fallback: Callable[[], QuantumCreate | None] | None = None,
+    ) -> bool:
+        """
+        Сырая запись — дубликат уже принятого кванта (его идентификаторы дополнены).
+        fallback — маппинг этой записи, если источник уцелевшего кванта не вернёт результат.
+        """
+        owner = self._index.claim_duplicate(ids, (self.source, fallback) if fallback is not None else None)
+        if owner is None:
+            return False
+        self.overlap[owner] += 1
+        return True
+
+    def admit(self, ids: list[RawId], quantum: QuantumCreate) -> bool:
+        """Принять смапленный квант; False — параллельный источник успел раньше, квант отбросить."""
+        entry = self._index._register(self.source, ids, quantum)
+        if entry.quantum is quantum:
+            self._admitted.append(entry)
+            return True
+        self.overlap[entry.source] += 1
+        return False
+
+    def release(self, keep: list[QuantumCreate] | None = None) -> list[tuple[str, QuantumCreate]]:
+        """
+        Источник не вернул результат (сбой, таймаут): снять с учёта принятые через это представление
+        кванты и вернуть кванты их отброшенных дубликатов из других источников.
+        keep — частичный результат источника: эти кванты попадут в шаг и остаются за источником.
+        """
+        kept = {id(q) for q in keep or []}
+        entries = [e for e in self._admitted if id(e.quantum) not in kept]
+        self._admitted = [e for e in self._admitted if id(e.quantum) in kept]
+        return self._index._release(entries)
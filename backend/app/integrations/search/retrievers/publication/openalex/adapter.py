@@ -4,9 +4,13 @@ OpenAlexPublicationAdapter: поиск публикаций через OpenAlex
 возвращает кванты и строки биллинга (одна строка на успешный HTTP-запрос, не 5xx).
 """
 import logging
+import math
 from decimal import Decimal
 from typing import Any
 
+import httpx
+
+from app.integrations.ratelimit import RateLimiter
 from app.integrations.search.ports import RetrieverResult, SearchBillingUsageLine
 from app.integrations.search.schemas import QueryModel, TimeSlice
 from app.modules.quanta.schemas import QuantumCreate
@@ -19,6 +23,13 @@ from app.integrations.search.retrievers.publication.openalex.query_compiler impo
 )
 from app.integrations.search.retrievers.publication.openalex.mapper import (
     map_openalex_work_to_quantum,
+    openalex_work_ids,
+)
+from app.integrations.search.retrievers.publication.id_index import SourceIdIndex
+from app.integrations.search.retrievers.publication.paging import (
+    CursorPage,
+    PagingStats,
+    collect_cursor_pages,
 )
 
 logger = logging.getLogger(__name__)
@@ -28,15 +39,31 @@ OPENALEX_SEARCH_SERVICE_TYPE = "search"
 OPENALEX_SEARCH_SERVICE_IMPL = "openalex_fulltext-search"
 OPENALEX_SEARCH_UNIT_CODE = "requests"
 
+_OPENALEX_PER_PAGE_MAX = 200
+_PAGE_OVERFETCH = 1.5
+
 InfoQuantum = QuantumCreate
 
 
 class OpenAlexPublicationAdapter:
-    """Адаптер поиска публикаций в OpenAlex. Не делает дедуп, не занимается многими языками."""
+    """
+    Адаптер поиска публикаций в OpenAlex. Не дедуплицирует с другими источниками (только повторы
+    одной работы в своей выдаче), не занимается многими языками.
+    """
 
-    def __init__(self, api_key: str = "", timeout_s: float = 30.0) -> None:
+    def __init__(
+        self,
+        api_key: str = "",
+        timeout_s: float = 30.0,
+        http_client: httpx.AsyncClient | None = None,
+        rate_limiter: RateLimiter | None = None,
+        max_pages: int = 10,
+    ) -> None:
         self._api_key = api_key or ""
+        self._max_pages = max(1, int(max_pages))
         self._timeout_s = timeout_s
+        self._http_client = http_client
+        self._rate_limiter = rate_limiter
 
     async def search_publications(
         self,
@@ -53,12 +80,17 @@ class OpenAlexPublicationAdapter:
         request_id: str | None = None,
         step_id: str | None = None,
         source_query_id: str | None = None,
+        id_index: SourceIdIndex | None = None,
+        partial: RetrieverResult | None = None,
     ) -> RetrieverResult:
         """
         Поиск публикаций в OpenAlex по QueryModel.
 
-        Биллинг: одна строка на успешный ответ API (статус < 500), даже если results пусты.
-        Исключение или 5xx — без строк биллинга, кванты пустые.
+        Выдача обходится по курсору (cursor=*), пока не набрано limit валидных квантов без повторов,
+        не кончилась выдача или не исчерпан max_pages; следующая страница запрашивается заранее.
+
+        Биллинг: одна строка на каждый успешный ответ API (статус < 500), даже если results пусты.
+        Исключение или 5xx — страница без строки биллинга, обход останавливается на набранном.
         """
         if not language or not isinstance(language, str) or not language.strip():
             raise ValueError("language is required for OpenAlex publication search")
@@ -79,29 +111,17 @@ class OpenAlexPublicationAdapter:
             from_date = time_slice.published_from.strftime("%Y-%m-%d")
             to_date = time_slice.published_to.strftime("%Y-%m-%d")
 
+        want = max(1, int(limit))
+        # Страница с запасом: часть работ отсеет маппер (require_abstract); запрос биллится за вызов, не за запись
+        per_page = min(_OPENALEX_PER_PAGE_MAX, math.ceil(want * _PAGE_OVERFETCH))
         logger.info(
-            "search/adapter: provider=%s request limit=%s, per_page=%s (request_id=%s)",
+            "search/adapter: provider=%s request limit=%s, per_page=%s, max_pages=%s (request_id=%s)",
             "openalex",
-            limit,
-            min(limit, 200),
+            want,
+            per_page,
+            self._max_pages,
             request_id,
         )
-        try:
-            data = await openalex_search_works(
-                search=compiled,
-                api_key=self._api_key,
-                per_page=min(limit, 200),
-                page=1,
-                from_publication_date=from_date,
-                to_publication_date=to_date,
-                timeout_s=self._timeout_s,
-            )
-        except Exception as e:
-            logger.exception("OpenAlex search failed (request_id=%s): %s", request_id, e)
-            return RetrieverResult(items=[], billing_lines=[])
-
-        if data is None:
-            return RetrieverResult(items=[], billing_lines=[])
 
         billing_extra: dict[str, Any] = {
             "provider": "openalex",
@@ -112,31 +132,39 @@ class OpenAlexPublicationAdapter:
         if source_query_id is not None:
             billing_extra["source_query_id"] = source_query_id
 
-        billing_lines = [
-            SearchBillingUsageLine(
-                service_type=OPENALEX_SEARCH_SERVICE_TYPE,
-                service_impl=OPENALEX_SEARCH_SERVICE_IMPL,
-                quantity=Decimal(1),
-                quantity_unit_code=OPENALEX_SEARCH_UNIT_CODE,
-                extra=billing_extra,
+        # partial: кванты и строки биллинга видны вызывающему сразу — при таймауте источника
+        # оплаченные запросы не теряются
+        sink = partial if partial is not None else RetrieverResult(items=[], billing_lines=[])
+
+        async def fetch_page(cursor: str | None) -> CursorPage | None:
+            data = await openalex_search_works(
+                search=compiled,
+                api_key=self._api_key,
+                per_page=per_page,
+                cursor=cursor,
+                from_publication_date=from_date,
+                to_publication_date=to_date,
+                timeout_s=self._timeout_s,
+                http_client=self._http_client,
+                rate_limiter=self._rate_limiter,
+            )
+            if data is None:
+                return None
+            # Успешный ответ API (< 500): строка биллинга, включая заранее запрошенную страницу
+            sink.billing_lines.append(
+                SearchBillingUsageLine(
+                    service_type=OPENALEX_SEARCH_SERVICE_TYPE,
+                    service_impl=OPENALEX_SEARCH_SERVICE_IMPL,
+                    quantity=Decimal(1),
+                    quantity_unit_code=OPENALEX_SEARCH_UNIT_CODE,
+                    extra=dict(billing_extra),
+                )
             )
-        ]
+            meta = data.get("meta") or {}
+            return list(data.get("results") or []), meta.get("next_cursor") or None
 
-        results_raw = data.get("results") or []
-        logger.info(
-            "search/adapter: provider=%s response api_results=%s (request_id=%s)",
-            "openalex",
-            len(results_raw),
-            request_id,
-        )
-        quanta: list[InfoQuantum] = []
-        skipped_not_dict = 0
-        skipped_mapper_none = 0
-        for work in results_raw:
-            if not isinstance(work, dict):
-                skipped_not_dict += 1
-                continue
-            q = map_openalex_work_to_quantum(
+        def map_work(work: dict[str, Any]) -> InfoQuantum | None:
+            return map_openalex_work_to_quantum(
                 work,
                 compiled,
                 language,
@@ -145,19 +173,33 @@ class OpenAlexPublicationAdapter:
                 require_abstract=require_abstract,
                 retriever_name=retriever_name,
             )
-            if q is None:
-                skipped_mapper_none += 1
-                continue
-            quanta.append(q)
-            if len(quanta) >= limit:
-                break
+
+        stats = PagingStats()
+        quanta = await collect_cursor_pages(
+            fetch_page,
+            map_work,
+            lambda work: work.get("id") or None,
+            want=want,
+            first_cursor="*",
+            max_pages=self._max_pages,
+            stats=stats,
+            provider="openalex",
+            request_id=request_id,
+            id_index=id_index,
+            record_ids=openalex_work_ids,
+            out=sink.items,
+        )
 
         logger.info(
-            "search/adapter: provider=%s mapped_quanta=%s (request_id=%s); skipped: not_dict=%s, mapper_none=%s",
+            "search/adapter: provider=%s mapped_quanta=%s pages=%s api_results=%s (request_id=%s); "
+            "skipped: not_dict=%s, mapper_none=%s, duplicate=%s",
             "openalex",
             len(quanta),
+            stats.pages,
+            stats.raw,
             request_id,
-            skipped_not_dict,
-            skipped_mapper_none,
+            stats.skipped_not_dict,
+            stats.skipped_mapper_none,
+            stats.skipped_duplicate,
         )
-        return RetrieverResult(items=quanta, billing_lines=billing_lines)
+        return RetrieverResult(items=quanta, billing_lines=sink.billing_lines)
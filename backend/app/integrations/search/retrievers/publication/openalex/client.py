@@ -1,15 +1,20 @@
 """
 HTTP-клиент для OpenAlex API (GET /works).
-Поддержка search, filter по датам, api_key в query.
+Поддержка search, filter по датам, api_key в query; перед запросом — токен лимитера openalex.
 """
 import logging
 from typing import Any
 
 import httpx
 
+from app.integrations.http import borrow_client
+from app.integrations.ratelimit import RateLimiter, get_local_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 OPENALEX_WORKS_URL = "https://api.openalex.org/works"
+# Локальный лимит без переданного лимитера (OpenAlex: до 10 запросов/с)
+_DEFAULT_RATE_PER_S = 10.0
 
 
 async def openalex_search_works(
@@ -18,24 +23,34 @@ async def openalex_search_works(
     api_key: str = "",
     per_page: int = 200,
     page: int = 1,
+    cursor: str | None = None,
     from_publication_date: str | None = None,
     to_publication_date: str | None = None,
     timeout_s: float = 30.0,
+    http_client: httpx.AsyncClient | None = None,
+    rate_limiter: RateLimiter | None = None,
 ) -> dict[str, Any] | None:
     """
     GET https://api.openalex.org/works с параметрами search, filter, pagination.
 
     - search: boolean-запрос (скомпилированный).
     - api_key: query-параметр (обязателен с 2026).
+    - cursor: курсорная пагинация («*» — первая страница, далее meta.next_cursor); вместо page,
+      без ограничения в 10 000 записей.
     - from_publication_date / to_publication_date: YYYY-MM-DD для filter.
+    - http_client: общий клиент (пул соединений); None — временный клиент на вызов.
+    - rate_limiter: лимитер upstream openalex; None — локальный для процесса.
     Возвращает JSON (meta + results) или None при HTTP 5xx.
     Исключения: сеть/таймаут; ошибка разбора JSON при ответе < 500.
     """
     params: dict[str, str | int] = {
         "search": search,
         "per-page": min(per_page, 200),
-        "page": page,
     }
+    if cursor:
+        params["cursor"] = cursor
+    else:
+        params["page"] = page
     if api_key:
         params["api_key"] = api_key
 
@@ -47,9 +62,10 @@ async def openalex_search_works(
     if filters:
         params["filter"] = ",".join(filters)
 
-    async with httpx.AsyncClient(timeout=timeout_s) as client:
+    await (rate_limiter or get_local_rate_limiter("openalex", _DEFAULT_RATE_PER_S)).acquire()
+    async with borrow_client(http_client, timeout=timeout_s) as client:
         try:
-            resp = await client.get(OPENALEX_WORKS_URL, params=params)
+            resp = await client.get(OPENALEX_WORKS_URL, params=params, timeout=timeout_s)
         except httpx.RequestError as e:
             logger.warning("OpenAlex API request error: %s", e)
             raise
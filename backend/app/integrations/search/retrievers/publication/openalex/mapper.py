@@ -148,6 +148,22 @@ def _build_classification(work: dict[str, Any]) -> PublicationClassification | N
     return PublicationClassification(topics=topics)
 
 
+def openalex_work_ids(work_json: dict[str, Any]) -> list[tuple[str, str]]:
+    """Идентификаторы сырого Work (doi, pubmed, openalex) — для раннего дедупа до маппинга."""
+    out: list[tuple[str, str]] = []
+    doi = work_json.get("doi")
+    if isinstance(doi, str) and doi.strip():
+        out.append(("doi", doi.strip().replace("https://doi.org/", "")))
+    ids = work_json.get("ids")
+    pmid = ids.get("pmid") if isinstance(ids, dict) else None
+    if isinstance(pmid, str) and pmid.strip():
+        out.append(("pubmed", pmid.strip().rstrip("/").rsplit("/", 1)[-1]))
+    oa_id = work_json.get("id")
+    if oa_id:
+        out.append(("openalex", str(oa_id)))
+    return out
+
+
 def map_openalex_work_to_quantum(
     work_json: dict[str, Any],
     compiled_query_string: str,
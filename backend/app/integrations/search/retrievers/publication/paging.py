@@ -0,0 +1,154 @@
+"""
+Глубокая пагинация по курсору (OpenAlex cursor, Semantic Scholar bulk token) для адаптеров публикаций.
+
+Страницы запрашиваются, пока не набрано want валидных квантов без повторов (в пределах выдачи
+источника) или пока выдача/лимит страниц не кончились. Следующая страница запрашивается сразу
+по получении курсора — параллельно с маппингом текущей — если по доле валидных записей на уже
+разобранных страницах текущей страницы не хватит. Частоту запросов ограничивает лимитер клиента.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Coroutine
+
+from app.integrations.search.retrievers.publication.id_index import RawId, SourceIdIndex
+from app.modules.quanta.schemas import QuantumCreate
+
+logger = logging.getLogger(__name__)
+
+# Страница: (записи, курсор следующей страницы или None); None — ошибка/пустой ответ источника
+CursorPage = tuple[list[Any], str | None]
+FetchPage = Callable[[str | None], Coroutine[Any, Any, CursorPage | None]]
+
+
+@dataclass
+class PagingStats:
+    """Счётчики обхода выдачи (для логов адаптера)."""
+
+    pages: int = 0
+    raw: int = 0
+    skipped_not_dict: int = 0
+    skipped_mapper_none: int = 0
+    skipped_duplicate: int = 0
+    kept: int = 0
+
+    def yield_ratio(self) -> float:
+        """Доля записей, ставших квантами; до первой разобранной страницы — 1 (оптимистично)."""
+        processed = self.skipped_not_dict + self.skipped_mapper_none + self.skipped_duplicate + self.kept
+        return self.kept / processed if processed else 1.0
+
+
+async def collect_cursor_pages(
+    fetch_page: FetchPage,
+    map_record: Callable[[dict[str, Any]], QuantumCreate | None],
+    record_key: Callable[[dict[str, Any]], str | None],
+    *,
+    want: int,
+    first_cursor: str | None,
+    max_pages: int,
+    stats: PagingStats,
+    provider: str,
+    request_id: str | None = None,
+    id_index: SourceIdIndex | None = None,
+    record_ids: Callable[[dict[str, Any]], list[RawId]] | None = None,
+    out: list[QuantumCreate] | None = None,
+) -> list[QuantumCreate]:
+    """
+    Обойти выдачу по курсору и вернуть до want квантов.
+
+    record_key — идентификатор записи в источнике (повтор на другой странице пропускается).
+    id_index + record_ids — ранний дедуп с другими источниками по идентификаторам сырой записи.
+    Ошибка запроса страницы завершает обход: возвращается то, что уже набрано.
+    Лишняя запрошенная заранее страница при досрочной остановке отменяется.
+    out — список, куда дописываются кванты по мере маппинга (набранное видно и при отмене обхода).
+    """
+    quanta: list[QuantumCreate] = out if out is not None else []
+    seen: set[str] = set()
+    requested = 1
+    pending: asyncio.Task[CursorPage | None] | None = asyncio.create_task(fetch_page(first_cursor))
+
+    def can_continue(records: list[Any], next_cursor: str | None) -> bool:
+        return bool(records) and bool(next_cursor) and requested < max_pages
+
+    try:
+        while pending is not None:
+            try:
+                page = await pending
+            except Exception as e:
+                logger.warning(
+                    "search/adapter: provider=%s page=%s failed: %s (request_id=%s)",
+                    provider,
+                    stats.pages + 1,
+                    e,
+                    request_id,
+                )
+                break
+            finally:
+                pending = None
+            if page is None:
+                break
+            records, next_cursor = page
+            stats.pages += 1
+            stats.raw += len(records)
+
+            # Prefetch: если по текущей доле валидных записей этой страницы не хватит
+            if can_continue(records, next_cursor) and (
+                len(quanta) + len(records) * stats.yield_ratio() < want
+            ):
+                pending = asyncio.create_task(fetch_page(next_cursor))
+                requested += 1
+                # Маппинг ниже синхронный: уступить цикл, чтобы запрос страницы ушёл до него
+                await asyncio.sleep(0)
+
+            for rec in records:
+                if len(quanta) >= want:
+                    break
+                if not isinstance(rec, dict):
+                    stats.skipped_not_dict += 1
+                    continue
+                key = record_key(rec)
+                if key is not None and key in seen:
+                    stats.skipped_duplicate += 1
+                    continue
+                ids = record_ids(rec) if id_index is not None and record_ids is not None else []
+                if ids and id_index is not None and id_index.is_duplicate(ids, functools.partial(map_record, rec)):
+                    stats.skipped_duplicate += 1
+                    continue
+                q = map_record(rec)
+                if q is None:
+                    stats.skipped_mapper_none += 1
+                    continue
+                if ids and id_index is not None and not id_index.admit(ids, q):
+                    stats.skipped_duplicate += 1
+                    continue
+                if key is not None:
+                    seen.add(key)
+                quanta.append(q)
+                stats.kept += 1
+
+            logger.info(
+                "search/adapter: provider=%s page=%s api_results=%s mapped_so_far=%s prefetched_next=%s (request_id=%s)",
+                provider,
+                stats.pages,
+                len(records),
+                len(quanta),
+                pending is not None,
+                request_id,
+            )
+            if len(quanta) >= want:
+                break
+            # Прогноз оказался оптимистичным — следующая страница всё-таки нужна
+            if pending is None and can_continue(records, next_cursor):
+                pending = asyncio.create_task(fetch_page(next_cursor))
+                requested += 1
+    finally:
+        if pending is not None:
+            pending.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await pending
+    return quanta
@@ -2,25 +2,40 @@
 PubMedPublicationAdapter: поиск через NCBI E-utilities (esearch + efetch).
 
 Биллинга нет (бесплатный API).
+Ответ efetch разбирается потоково (PubmedEfetchStreamParser): статьи маппятся по мере загрузки;
+разбор XML каждого куска — в рабочем потоке (не блокирует event loop).
+pipelined=True — конвейер: esearch следующей страницы параллельно с efetch текущей,
+маппинг статей — тоже в отдельном потоке.
 """
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
 import logging
+import xml.etree.ElementTree as ET
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
 from typing import Any
 
+import httpx
+
+from app.integrations.ratelimit import RateLimiter
 from app.integrations.search.ports import RetrieverResult
 from app.integrations.search.schemas import QueryModel, TimeSlice
 from app.modules.quanta.schemas import QuantumCreate
 
+from app.integrations.search.retrievers.publication.id_index import SourceIdIndex
 from app.integrations.search.retrievers.publication.pubmed.client import (
     _EFETCH_BATCH,
-    pubmed_efetch_xml,
+    pubmed_efetch_stream,
     pubmed_esearch,
 )
 from app.integrations.search.retrievers.publication.pubmed.mapper import (
-    iter_pubmed_medline_citations,
+    PubmedEfetchStreamParser,
     map_pubmed_article_to_quantum,
+    pubmed_citation_ids,
 )
 from app.integrations.search.retrievers.publication.pubmed.query_compiler import (
     compile_pubmed_term,
@@ -28,6 +43,11 @@ from app.integrations.search.retrievers.publication.pubmed.query_compiler import
 
 logger = logging.getLogger(__name__)
 
+# Защита от бесконечного обхода выдачи при сбоях API
+_MAX_RETSTART = 50_000
+# Конвейер: сколько пачек статей efetch может ждать маппинга (ограничивает память и забег вперёд)
+_READY_BATCHES = 8
+
 
 class PubMedPublicationAdapter:
     def __init__(
@@ -38,12 +58,18 @@ class PubMedPublicationAdapter:
         api_key: str = "",
         timeout_esearch_s: float = 60.0,
         timeout_efetch_s: float = 120.0,
+        http_client: httpx.AsyncClient | None = None,
+        rate_limiter: RateLimiter | None = None,
+        pipelined: bool = False,
     ) -> None:
         self._tool = (tool or "").strip()
         self._email = (email or "").strip()
         self._api_key = (api_key or "").strip()
         self._timeout_esearch_s = timeout_esearch_s
         self._timeout_efetch_s = timeout_efetch_s
+        self._http_client = http_client
+        self._rate_limiter = rate_limiter
+        self._pipelined = pipelined
 
     async def search_publications(
         self,
@@ -58,6 +84,8 @@ class PubMedPublicationAdapter:
         require_abstract: bool = True,
         request_id: str | None = None,
         retriever_name: str = "publication_retriever",
+        id_index: SourceIdIndex | None = None,
+        partial: RetrieverResult | None = None,
     ) -> RetrieverResult:
         if not language or not isinstance(language, str) or not language.strip():
             raise ValueError("language is required for PubMed publication search")
@@ -101,105 +129,320 @@ class PubMedPublicationAdapter:
         # Как у arXiv: добираем страницы esearch+efetch, пока не наберём limit валидных квантов
         # (с абстрактом), либо пока выдача не кончится.
         want = max(1, int(limit))
-        quanta: list[QuantumCreate] = []
-        skipped_mapper_none = 0
-        retstart = 0
-        total_hint: int | None = None
-        seen_pmids: set[str] = set()
-        esearch_pages = 0
-        # Защита от бесконечного цикла при сбоях API
-        _max_retstart = 50_000
-
         logger.info(
-            "search/adapter: provider=%s target_mapped_quanta=%s (request_id=%s)",
+            "search/adapter: provider=%s target_mapped_quanta=%s pipelined=%s (request_id=%s)",
             "pubmed",
             want,
+            self._pipelined,
+            request_id,
+        )
+        map_kw: dict[str, Any] = {
+            "compiled": compiled,
+            "language": language,
+            "theme_id": theme_id,
+            "run_id": run_id,
+            "require_abstract": require_abstract,
+            "retriever_name": retriever_name,
+            "id_index": id_index,
+        }
+        pages = _PageStats()
+        # partial: кванты видны вызывающему по мере маппинга (останутся при таймауте источника)
+        quanta: list[QuantumCreate] = partial.items if partial is not None else []
+        if self._pipelined:
+            await self._collect_pipelined(want, map_kw, pages, quanta, request_id=request_id)
+        else:
+            await self._collect_sequential(want, map_kw, pages, quanta, request_id=request_id)
+
+        logger.info(
+            "search/adapter: provider=%s esearch_pages=%s total_hint=%s seen_pmids=%s (request_id=%s)",
+            "pubmed",
+            pages.esearch_pages,
+            pages.total_hint,
+            len(pages.seen_pmids),
+            request_id,
+        )
+        logger.info(
+            "search/adapter: provider=%s mapped_quanta=%s (request_id=%s); skipped mapper_none=%s, duplicate=%s",
+            "pubmed",
+            len(quanta),
             request_id,
+            pages.skipped_mapper_none,
+            pages.skipped_duplicate,
         )
+        return RetrieverResult(items=quanta, billing_lines=[])
 
-        while len(quanta) < want and retstart < _max_retstart:
+    async def _esearch(self, compiled: str, retstart: int, retmax: int) -> tuple[list[str], int | None]:
+        return await pubmed_esearch(
+            term=compiled,
+            retstart=retstart,
+            retmax=retmax,
+            tool=self._tool,
+            email=self._email,
+            api_key=self._api_key,
+            timeout_s=self._timeout_esearch_s,
+            http_client=self._http_client,
+            rate_limiter=self._rate_limiter,
+        )
+
+    def _efetch_stream(self, pmids: list[str]) -> AsyncGenerator[bytes, None]:
+        return pubmed_efetch_stream(
+            pmids=pmids,
+            tool=self._tool,
+            email=self._email,
+            api_key=self._api_key,
+            timeout_s=self._timeout_efetch_s,
+            http_client=self._http_client,
+            rate_limiter=self._rate_limiter,
+        )
+
+    async def _efetch_citations(
+        self,
+        pmids: list[str],
+        parser: PubmedEfetchStreamParser,
+        *,
+        request_id: str | None,
+    ) -> AsyncGenerator[list[ET.Element], None]:
+        """
+        Потоковый efetch: MedlineCitation отдаются пачками по мере загрузки ответа (parser.articles_seen —
+        сколько статей разобрано). Куски разбираются в рабочем потоке по одному (парсер не делится
+        между потоками одновременно). Битый или оборванный XML — в лог, уже отданные статьи остаются.
+        """
+        chunks = self._efetch_stream(pmids)
+        received = False
+        async with contextlib.aclosing(chunks):
+            try:
+                async for chunk in chunks:
+                    received = True
+                    citations = await asyncio.to_thread(parser.feed, chunk)
+                    if citations:
+                        yield citations
+                if received:
+                    citations = await asyncio.to_thread(parser.close)
+                    if citations:
+                        yield citations
+            except ET.ParseError as e:
+                logger.warning(
+                    "search/adapter: provider=%s efetch XML parse error after %s articles: %s (request_id=%s)",
+                    "pubmed",
+                    parser.articles_seen,
+                    e,
+                    request_id,
+                )
+
+    async def _collect_sequential(
+        self,
+        want: int,
+        map_kw: dict[str, Any],
+        pages: _PageStats,
+        quanta: list[QuantumCreate],
+        *,
+        request_id: str | None,
+    ) -> list[QuantumCreate]:
+        """Страницы строго по очереди: esearch → потоковый efetch с маппингом, затем следующая страница."""
+        retstart = 0
+        while len(quanta) < want and retstart < _MAX_RETSTART:
             deficit = want - len(quanta)
             # Одна страница esearch: до 200 PMID, как типичный батч efetch
             batch_need = min(_EFETCH_BATCH, max(deficit, 1))
 
-            chunk, tot = await pubmed_esearch(
-                term=compiled,
-                retstart=retstart,
-                retmax=batch_need,
-                tool=self._tool,
-                email=self._email,
-                api_key=self._api_key,
-                timeout_s=self._timeout_esearch_s,
-            )
-            esearch_pages += 1
-            if total_hint is None:
-                total_hint = tot
+            chunk, tot = await self._esearch(map_kw["compiled"], retstart, batch_need)
+            pages.on_esearch(tot)
             if not chunk:
                 break
-
-            new_ids: list[str] = []
-            for p in chunk:
-                if p not in seen_pmids:
-                    seen_pmids.add(p)
-                    new_ids.append(p)
+            new_ids = pages.new_pmids(chunk)
             retstart += len(chunk)
 
-            if not new_ids:
-                if len(chunk) < batch_need:
-                    break
-                continue
-
-            xml = await pubmed_efetch_xml(
-                pmids=new_ids,
-                tool=self._tool,
-                email=self._email,
-                api_key=self._api_key,
-                timeout_s=self._timeout_efetch_s,
-            )
-            citations = iter_pubmed_medline_citations(xml)
-            logger.info(
-                "search/adapter: provider=%s page=%s esearch_retstart=%s pmids=%s efetch_citations=%s mapped_so_far=%s (request_id=%s)",
-                "pubmed",
-                esearch_pages,
-                retstart - len(chunk),
-                len(new_ids),
-                len(citations),
-                len(quanta),
-                request_id,
-            )
-            for mc in citations:
-                q = map_pubmed_article_to_quantum(
-                    mc,
-                    compiled,
-                    language,
-                    theme_id=theme_id,
-                    run_id=run_id,
-                    require_abstract=require_abstract,
-                    retriever_name=retriever_name,
-                )
-                if q is None:
-                    skipped_mapper_none += 1
-                    continue
-                quanta.append(q)
-                if len(quanta) >= want:
-                    break
+            if new_ids:
+                mapped_before = len(quanta)
+                parser = PubmedEfetchStreamParser()
+                citations = self._efetch_citations(new_ids, parser, request_id=request_id)
+                async with contextlib.aclosing(citations):
+                    async for batch in citations:
+                        quanta.extend(_map_citations(batch, limit=want - len(quanta), pages=pages, **map_kw))
+                        if len(quanta) >= want:
+                            break
+                self._log_page(pages, retstart - len(chunk), new_ids, parser.articles_seen, mapped_before, request_id)
 
             if len(chunk) < batch_need:
                 break
+        return quanta
 
+    async def _collect_pipelined(
+        self,
+        want: int,
+        map_kw: dict[str, Any],
+        pages: _PageStats,
+        quanta: list[QuantumCreate],
+        *,
+        request_id: str | None,
+    ) -> list[QuantumCreate]:
+        """
+        Конвейер: пока идёт efetch страницы N, уже запрошен esearch страницы N+1; статьи из ответа efetch
+        уходят на маппинг (в отдельном потоке) по мере загрузки, пока докачивается остаток ответа и
+        следующая страница. Все запросы проходят через лимитер NCBI; вперёд разбирается не больше
+        _READY_BATCHES пачек статей.
+        """
+        compiled = map_kw["compiled"]
+        ready: asyncio.Queue[_EfetchBatch | None] = asyncio.Queue(maxsize=_READY_BATCHES)
+
+        async def esearch_page(retstart: int) -> tuple[int, int, list[str], int | None]:
+            # Размер страницы — по текущему дефициту (маппинг предыдущих страниц может отставать)
+            batch_need = min(_EFETCH_BATCH, max(want - len(quanta), 1))
+            chunk, tot = await self._esearch(compiled, retstart, batch_need)
+            return retstart, batch_need, chunk, tot
+
+        async def produce() -> None:
+            next_page: asyncio.Task[tuple[int, int, list[str], int | None]] | None = None
+            try:
+                next_page = asyncio.create_task(esearch_page(0))
+                while next_page is not None:
+                    retstart, batch_need, chunk, tot = await next_page
+                    next_page = None
+                    pages.on_esearch(tot)
+                    if not chunk:
+                        break
+                    following = retstart + len(chunk)
+                    if len(chunk) >= batch_need and following < _MAX_RETSTART:
+                        next_page = asyncio.create_task(esearch_page(following))
+                    new_ids = pages.new_pmids(chunk)
+                    if not new_ids:
+                        continue
+                    parser = PubmedEfetchStreamParser()
+                    citations = self._efetch_citations(new_ids, parser, request_id=request_id)
+                    async with contextlib.aclosing(citations):
+                        async for batch in citations:
+                            await ready.put(_EfetchBatch(retstart, new_ids, batch))
+                    await ready.put(_EfetchBatch(retstart, new_ids, [], page_articles=parser.articles_seen))
+            except Exception as e:
+                logger.warning("search/adapter: provider=%s pipeline failed: %s (request_id=%s)", "pubmed", e, request_id)
+            finally:
+                if next_page is not None:
+                    next_page.cancel()
+            await ready.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            page_mapped_before = 0
+            while len(quanta) < want:
+                item = await ready.get()
+                if item is None:
+                    break
+                if item.citations:
+                    quanta.extend(
+                        await asyncio.to_thread(
+                            _map_citations,
+                            item.citations,
+                            limit=want - len(quanta),
+                            pages=pages,
+                            **map_kw,
+                        )
+                    )
+                if item.page_articles is not None:
+                    self._log_page(pages, item.retstart, item.pmids, item.page_articles, page_mapped_before, request_id)
+                    page_mapped_before = len(quanta)
+        finally:
+            producer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await producer
+        return quanta
+
+    @staticmethod
+    def _log_page(
+        pages: _PageStats,
+        retstart: int,
+        pmids: list[str],
+        n_citations: int,
+        mapped_so_far: int,
+        request_id: str | None,
+    ) -> None:
         logger.info(
-            "search/adapter: provider=%s esearch_pages=%s total_hint=%s seen_pmids=%s (request_id=%s)",
+            "search/adapter: provider=%s page=%s esearch_retstart=%s pmids=%s efetch_citations=%s mapped_so_far=%s (request_id=%s)",
             "pubmed",
-            esearch_pages,
-            total_hint,
-            len(seen_pmids),
+            pages.esearch_pages,
+            retstart,
+            len(pmids),
+            n_citations,
+            mapped_so_far,
             request_id,
         )
-        logger.info(
-            "search/adapter: provider=%s mapped_quanta=%s (request_id=%s); skipped mapper_none=%s",
-            "pubmed",
-            len(quanta),
-            request_id,
-            skipped_mapper_none,
+
+
+@dataclass
+class _EfetchBatch:
+    """Пачка статей из потокового efetch; page_articles задан у завершающего элемента страницы."""
+
+    retstart: int
+    pmids: list[str]
+    citations: list[ET.Element]
+    page_articles: int | None = None
+
+
+@dataclass
+class _PageStats:
+    """Счётчики постраничного обхода esearch (общие для последовательного и конвейерного режимов)."""
+
+    esearch_pages: int = 0
+    total_hint: int | None = None
+    skipped_mapper_none: int = 0
+    skipped_duplicate: int = 0
+    seen_pmids: set[str] = field(default_factory=set)
+
+    def on_esearch(self, total: int | None) -> None:
+        self.esearch_pages += 1
+        if self.total_hint is None:
+            self.total_hint = total
+
+    def new_pmids(self, chunk: list[str]) -> list[str]:
+        """PMID страницы, которых ещё не было в выдаче."""
+        out: list[str] = []
+        for p in chunk:
+            if p not in self.seen_pmids:
+                self.seen_pmids.add(p)
+                out.append(p)
+        return out
+
+
+def _map_citations(
+    citations: list[ET.Element],
+    *,
+    limit: int,
+    pages: _PageStats,
+    compiled: str,
+    language: str,
+    theme_id: str,
+    run_id: str | None,
+    require_abstract: bool,
+    retriever_name: str,
+    id_index: SourceIdIndex | None,
+) -> list[QuantumCreate]:
+    """
+    Смапить MedlineCitation в кванты (не больше limit); пропущенные маппером — в pages.skipped_mapper_none,
+    дубликаты других источников (id_index) — в pages.skipped_duplicate.
+    """
+    out: list[QuantumCreate] = []
+    for mc in citations:
+        if len(out) >= limit:
+            break
+        map_one = functools.partial(
+            map_pubmed_article_to_quantum,
+            mc,
+            compiled,
+            language,
+            theme_id=theme_id,
+            run_id=run_id,
+            require_abstract=require_abstract,
+            retriever_name=retriever_name,
         )
-        return RetrieverResult(items=quanta[:want], billing_lines=[])
+        ids = pubmed_citation_ids(mc) if id_index is not None else []
+        if id_index is not None and id_index.is_duplicate(ids, map_one):
+            pages.skipped_duplicate += 1
+            continue
+        q = map_one()
+        if q is None:
+            pages.skipped_mapper_none += 1
+            continue
+        if id_index is not None and not id_index.admit(ids, q):
+            pages.skipped_duplicate += 1
+            continue
+        out.append(q)
+    return out
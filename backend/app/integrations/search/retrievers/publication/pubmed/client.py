@@ -1,48 +1,44 @@
 """
 NCBI E-utilities: esearch + efetch для PubMed.
 
-Лимиты: с api_key до ~10 запросов/с; без ключа — ~3/с. Соблюдаем паузу между запросами.
+Лимиты: с api_key до ~10 запросов/с; без ключа — ~3/с. Перед каждым запросом берём токен
+лимитера ncbi (общий для процессов при RATE_LIMIT_BACKEND=postgres).
 Длинный term — POST (application/x-www-form-urlencoded).
 """
 from __future__ import annotations
 
-import asyncio
 import logging
-import time
+from collections.abc import AsyncGenerator
 from typing import Any
 from urllib.parse import urlencode
 
 import httpx
 
+from app.integrations.http import borrow_client
+from app.integrations.ratelimit import RateLimiter, get_local_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 EUTILS_BASE = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
 ESEARCH_URL = f"{EUTILS_BASE}/esearch.fcgi"
 EFETCH_URL = f"{EUTILS_BASE}/efetch.fcgi"
 
-# Интервал между последовательными вызовами (сек): с ключом чаще, без — реже.
+# Интервал между вызовами (сек) для локального лимитера: с ключом чаще, без — реже.
 _MIN_INTERVAL_WITH_KEY_S = 0.11
 _MIN_INTERVAL_NO_KEY_S = 0.35
 _POST_TERM_THRESHOLD = 1500
 _EFETCH_BATCH = 200
+# Тело efetch отдаётся кусками не меньше этого размера (разбор куска — один переход в рабочий поток)
+_STREAM_CHUNK = 64 * 1024
 
 
-class _NcbiRateLimiter:
-    _lock = asyncio.Lock()
-    _last_end: float = 0.0
-
-    @classmethod
-    async def wait_turn(cls, *, has_api_key: bool) -> None:
-        interval = _MIN_INTERVAL_WITH_KEY_S if has_api_key else _MIN_INTERVAL_NO_KEY_S
-        async with cls._lock:
-            now = time.monotonic()
-            wait = interval - (now - cls._last_end)
-            if wait > 0:
-                await asyncio.sleep(wait)
-
-    @classmethod
-    def mark_done(cls) -> None:
-        cls._last_end = time.monotonic()
+def _ncbi_limiter(rate_limiter: RateLimiter | None, *, has_api_key: bool) -> RateLimiter:
+    """Переданный лимитер или локальный для процесса (интервал по наличию api_key)."""
+    if rate_limiter is not None:
+        return rate_limiter
+    if has_api_key:
+        return get_local_rate_limiter("ncbi_key", 1 / _MIN_INTERVAL_WITH_KEY_S)
+    return get_local_rate_limiter("ncbi", 1 / _MIN_INTERVAL_NO_KEY_S)
 
 
 def _base_params(*, tool: str, email: str, api_key: str) -> dict[str, str]:
@@ -61,6 +57,8 @@ async def pubmed_esearch(
     email: str,
     api_key: str,
     timeout_s: float = 60.0,
+    http_client: httpx.AsyncClient | None = None,
+    rate_limiter: RateLimiter | None = None,
 ) -> tuple[list[str], int | None]:
     """
     ESearch db=pubmed. Возвращает (список PMID, total из result или None).
@@ -84,18 +82,18 @@ async def pubmed_esearch(
     body = urlencode(params)
     has_key = bool(api_key and api_key.strip())
 
-    await _NcbiRateLimiter.wait_turn(has_api_key=has_key)
+    await _ncbi_limiter(rate_limiter, has_api_key=has_key).acquire()
     try:
-        async with httpx.AsyncClient(timeout=timeout_s) as client:
+        async with borrow_client(http_client, timeout=timeout_s) as client:
             if len(t) > _POST_TERM_THRESHOLD:
                 resp = await client.post(
                     ESEARCH_URL,
                     content=body,
                     headers={"Content-Type": "application/x-www-form-urlencoded"},
+                    timeout=timeout_s,
                 )
             else:
-                resp = await client.get(f"{ESEARCH_URL}?{body}")
-        _NcbiRateLimiter.mark_done()
+                resp = await client.get(f"{ESEARCH_URL}?{body}", timeout=timeout_s)
         if resp.status_code >= 400:
             logger.warning(
                 "PubMed esearch HTTP %s: %s",
@@ -117,22 +115,26 @@ async def pubmed_esearch(
         out = [str(x) for x in ids if x is not None]
         return out, total
     except Exception as e:
-        _NcbiRateLimiter.mark_done()
         logger.warning("PubMed esearch failed: %s", e)
         return [], None
 
 
-async def pubmed_efetch_xml(
+async def pubmed_efetch_stream(
     *,
     pmids: list[str],
     tool: str,
     email: str,
     api_key: str,
     timeout_s: float = 120.0,
-) -> str:
-    """EFetch db=pubmed, retmode=xml. pmids непустой список."""
+    http_client: httpx.AsyncClient | None = None,
+    rate_limiter: RateLimiter | None = None,
+) -> AsyncGenerator[bytes, None]:
+    """
+    EFetch db=pubmed, retmode=xml: тело ответа кусками по мере загрузки (разбор —
+    PubmedEfetchStreamParser). Ошибка HTTP или обрыв — в лог, поток завершается.
+    """
     if not pmids:
-        return ""
+        return
     params: dict[str, Any] = {
         **_base_params(tool=tool, email=email, api_key=api_key),
         "db": "pubmed",
@@ -142,24 +144,25 @@ async def pubmed_efetch_xml(
     body = urlencode(params)
     has_key = bool(api_key and api_key.strip())
 
-    await _NcbiRateLimiter.wait_turn(has_api_key=has_key)
+    await _ncbi_limiter(rate_limiter, has_api_key=has_key).acquire()
     try:
-        async with httpx.AsyncClient(timeout=timeout_s) as client:
-            resp = await client.post(
+        async with borrow_client(http_client, timeout=timeout_s) as client:
+            async with client.stream(
+                "POST",
                 EFETCH_URL,
                 content=body,
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
-        _NcbiRateLimiter.mark_done()
-        if resp.status_code >= 400:
-            logger.warning(
-                "PubMed efetch HTTP %s: %s",
-                resp.status_code,
-                (resp.text or "")[:500],
-            )
-            return ""
-        return resp.text or ""
+                timeout=timeout_s,
+            ) as resp:
+                if resp.status_code >= 400:
+                    await resp.aread()
+                    logger.warning(
+                        "PubMed efetch HTTP %s: %s",
+                        resp.status_code,
+                        (resp.text or "")[:500],
+                    )
+                    return
+                async for chunk in resp.aiter_bytes(_STREAM_CHUNK):
+                    yield chunk
     except Exception as e:
-        _NcbiRateLimiter.mark_done()
         logger.warning("PubMed efetch failed: %s", e)
-        return ""
@@ -7,8 +7,9 @@ import calendar
 import logging
 import re
 import xml.etree.ElementTree as ET
+from collections.abc import Iterator
 from datetime import datetime
-from typing import Any
+from typing import Any, cast
 
 from app.integrations.search.retrievers.publication.schemas_publication_attrs import (
     PublicationAccess,
@@ -134,6 +135,19 @@ def _extract_doi(article_el: ET.Element) -> str | None:
     return None
 
 
+def pubmed_citation_ids(medline_el: ET.Element) -> list[tuple[str, str]]:
+    """Идентификаторы MedlineCitation (pubmed, doi) — для раннего дедупа до маппинга."""
+    out: list[tuple[str, str]] = []
+    pmid = _text(_find(medline_el, "PMID"))
+    if pmid:
+        out.append(("pubmed", pmid))
+    article_el = _find(medline_el, "Article")
+    doi = _extract_doi(article_el) if article_el is not None else None
+    if doi:
+        out.append(("doi", doi))
+    return out
+
+
 def map_pubmed_article_to_quantum(
     medline_el: ET.Element,
     compiled_term: str,
@@ -301,18 +315,60 @@ def map_pubmed_article_to_quantum(
     )
 
 
+class PubmedEfetchStreamParser:
+    """
+    Инкрементальный разбор ответа efetch (PubmedArticleSet): тело подаётся кусками (feed) по мере
+    загрузки, MedlineCitation каждой закрытой PubmedArticle возвращается сразу, а сама статья
+    очищается и удаляется из дерева — в памяти только ещё не смапленные записи.
+
+    ET.ParseError пробрасывается из feed/close; уже возвращённые записи остаются валидными.
+    """
+
+    def __init__(self) -> None:
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._stack: list[ET.Element] = []
+        self.articles_seen = 0
+
+    def feed(self, data: bytes | str) -> list[ET.Element]:
+        """Подать очередной кусок XML; вернуть MedlineCitation статей, закрытых в нём."""
+        self._parser.feed(data)
+        return self._drain()
+
+    def close(self) -> list[ET.Element]:
+        """Конец документа: вернуть оставшиеся MedlineCitation."""
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> list[ET.Element]:
+        out: list[ET.Element] = []
+        # events=("start", "end"): каждое событие — (имя, Element)
+        events = cast("Iterator[tuple[str, ET.Element]]", self._parser.read_events())
+        for event, el in events:
+            if event == "start":
+                self._stack.append(el)
+                continue
+            self._stack.pop()
+            if _local_tag(el.tag) != "PubmedArticle":
+                continue
+            self.articles_seen += 1
+            mc = _find(el, "MedlineCitation")
+            if mc is not None:
+                out.append(mc)
+            # MedlineCitation остаётся у вызывающего; остальное поддерево статьи больше не нужно
+            el.clear()
+            if self._stack:
+                self._stack[-1].remove(el)
+        return out
+
+
 def iter_pubmed_medline_citations(xml_text: str) -> list[ET.Element]:
     if not xml_text or not xml_text.strip():
         return []
+    parser = PubmedEfetchStreamParser()
     try:
-        root = ET.fromstring(xml_text)
+        out = parser.feed(xml_text)
+        out.extend(parser.close())
     except ET.ParseError as e:
         logger.warning("PubMed XML parse error: %s", e)
         return []
-    out: list[ET.Element] = []
-    for el in root.iter():
-        if _local_tag(el.tag) == "PubmedArticle":
-            mc = _find(el, "MedlineCitation")
-            if mc is not None:
-                out.append(mc)
     return out
@@ -3,13 +3,28 @@ PublicationRetriever: оркестратор поиска публикаций 
 (OpenAlex, Semantic Scholar, arXiv, PubMed).
 
 Реализует RetrieverPort — возвращает RetrieverResult (кванты + строки биллинга).
+Источники опрашиваются параллельно, у каждого свой таймаут: сбой или зависание
+одного источника не блокирует остальные. Тайминги по источникам — в RetrieverResult.meta.
+Дубликаты между источниками шага отбрасываются до маппинга по общему индексу DOI/PMID/arXiv id;
+число отброшенных и пересечения по источникам — там же.
 """
+import asyncio
 import logging
-from typing import Any
+import time
+from typing import Any, Awaitable
+
+import httpx
+
+from app.integrations.http import HttpClientRegistry
+from app.integrations.ratelimit import RateLimiter, RateLimiterRegistry
 
 from app.integrations.search.ports import RetrieverContext, RetrieverPort, RetrieverResult
 from app.integrations.search.schemas import QueryStep
 
+from app.integrations.search.retrievers.publication.id_index import (
+    PublicationIdIndex,
+    SourceIdIndex,
+)
 from app.integrations.search.retrievers.publication.openalex.adapter import (
     OpenAlexPublicationAdapter,
 )
@@ -26,12 +41,74 @@ from app.integrations.search.retrievers.publication.pubmed.adapter import (
 logger = logging.getLogger(__name__)
 
 
+async def _run_source(
+    name: str,
+    coro: Awaitable[RetrieverResult],
+    timeout_s: float | None,
+    *,
+    step_id: str,
+    partial: RetrieverResult | None = None,
+) -> tuple[str, RetrieverResult | None, dict[str, Any]]:
+    """
+    Выполнить запрос к одному источнику с таймаутом.
+    Ошибку и таймаут не пробрасывает: возвращает (name, partial, meta) со статусом failed/timeout —
+    partial, куда адаптер дописывает кванты и строки биллинга по ходу запроса (None, если пуст).
+    """
+    started = time.monotonic()
+    status = "done"
+    error: str | None = None
+    result: RetrieverResult | None = None
+    try:
+        if timeout_s and timeout_s > 0:
+            result = await asyncio.wait_for(coro, timeout=timeout_s)
+        else:
+            result = await coro
+    except asyncio.TimeoutError:
+        status = "timeout"
+        error = f"timeout after {timeout_s}s"
+        logger.warning("search/retriever: step_id=%s source=%s timed out after %ss", step_id, name, timeout_s)
+    except Exception as e:
+        status = "failed"
+        error = str(e)
+        logger.exception("search/retriever: step_id=%s source=%s failed: %s", step_id, name, e)
+    if status != "done" and partial is not None and (partial.items or partial.billing_lines):
+        # Набранные страницы и оплаченные запросы не теряем
+        result = partial
+    meta: dict[str, Any] = {
+        "status": status,
+        "elapsed_ms": int((time.monotonic() - started) * 1000),
+        "returned": len(result.items) if result is not None else 0,
+    }
+    if error:
+        meta["error"] = error
+    if status != "done" and result is not None:
+        meta["partial"] = True
+    return name, result, meta
+
+
 class PublicationRetriever:
     """
-    Ретривер публикаций: OpenAlex, Semantic Scholar, arXiv, PubMed (по порядку).
+    Ретривер публикаций: OpenAlex, Semantic Scholar, arXiv, PubMed (параллельно;
+    кванты в результате — в этом порядке источников).
     Требует theme_id в контексте; language и terms_by_id задаются в ctx (из темы).
     """
 
+    def __init__(
+        self,
+        http_clients: HttpClientRegistry | None = None,
+        rate_limiters: RateLimiterRegistry | None = None,
+    ) -> None:
+        self._http_clients = http_clients
+        self._rate_limiters = rate_limiters
+
+    def _http_client(self, upstream: str) -> httpx.AsyncClient | None:
+        """Общий клиент источника из реестра; None — адаптер создаст временный."""
+        return self._http_clients.get(upstream) if self._http_clients is not None else None
+
+    def _rate_limiter(self, upstream: str) -> RateLimiter | None:
+        """Лимитер источника из реестра; None — клиент возьмёт локальный для процесса."""
+        return self._rate_limiters.get(upstream) if self._rate_limiters is not None else None
+
     @property
     def name(self) -> str:
         return "publication_retriever"
@@ -58,15 +135,23 @@ class PublicationRetriever:
         oa_adapter = OpenAlexPublicationAdapter(
             api_key=settings.OPENALEX_API_KEY,
             timeout_s=30.0,
+            http_client=self._http_client("openalex"),
+            rate_limiter=self._rate_limiter("openalex"),
+            max_pages=settings.SEARCH_PUBLICATION_MAX_PAGES,
         )
         s2_adapter = SemanticScholarPublicationAdapter(
             timeout_s=30.0,
             retries=10,
             retry_delay_s=2.0,
+            http_client=self._http_client("semanticscholar"),
+            rate_limiter=self._rate_limiter("semanticscholar"),
+            max_pages=settings.SEARCH_PUBLICATION_MAX_PAGES,
         )
         arxiv_adapter = ArxivPublicationAdapter(
             timeout_s=60.0,
             retries=5,
+            http_client=self._http_client("arxiv"),
+            rate_limiter=self._rate_limiter("arxiv"),
         )
         pubmed_adapter = PubMedPublicationAdapter(
             tool=settings.NCBI_TOOL,
@@ -74,75 +159,133 @@ class PublicationRetriever:
             api_key=settings.NCBI_API_KEY,
             timeout_esearch_s=60.0,
             timeout_efetch_s=120.0,
+            http_client=self._http_client("ncbi"),
+            rate_limiter=self._rate_limiter("ncbi"),
+            pipelined=settings.SEARCH_PUBMED_PIPELINED,
         )
 
-        oa_result = await oa_adapter.search_publications(
-            step.query_model,
-            terms_by_id,
-            language=language,
-            theme_id=theme_id,
-            run_id=run_id,
-            time_slice=time_slice,
-            limit=step.max_results,
-            require_abstract=True,
-            retriever_name=retriever_name,
-            request_id=ctx.request_id,
-            step_id=str(step.step_id),
-            source_query_id=str(step.source_query_id),
+        # Индекс на шаг: шаги выполняются параллельно, и общий индекс отдавал бы работу шагу, который
+        # executor может не учесть (global_target_links). Дубликаты между шагами снимает дедуп прогона.
+        id_index = PublicationIdIndex() if getattr(settings, "SEARCH_PUBLICATION_EARLY_DEDUP", True) else None
+        views: dict[str, SourceIdIndex] = (
+            {name: id_index.for_source(name) for name in ("openalex", "semanticscholar", "arxiv", "pubmed")}
+            if id_index is not None
+            else {}
         )
 
-        s2_result = await s2_adapter.search_publications(
-            step.query_model,
-            terms_by_id,
-            language=language,
-            theme_id=theme_id,
-            run_id=run_id,
-            time_slice=time_slice,
-            limit=step.max_results,
-            require_abstract=True,
-            retriever_name=retriever_name,
-            request_id=ctx.request_id,
+        common_kw: dict[str, Any] = {
+            "language": language,
+            "theme_id": theme_id,
+            "run_id": run_id,
+            "time_slice": time_slice,
+            "limit": step.max_results,
+            "require_abstract": True,
+            "retriever_name": retriever_name,
+            "request_id": ctx.request_id,
+        }
+        # Частичный результат источника: адаптер дописывает в него кванты и биллинг по ходу запроса
+        partials = {
+            name: RetrieverResult(items=[], billing_lines=[])
+            for name in ("openalex", "semanticscholar", "arxiv", "pubmed")
+        }
+        # Порядок источников задаёт порядок квантов в результате (как при последовательном опросе)
+        sources: list[tuple[str, Awaitable[RetrieverResult]]] = [
+            (
+                "openalex",
+                oa_adapter.search_publications(
+                    step.query_model,
+                    terms_by_id,
+                    **common_kw,
+                    step_id=str(step.step_id),
+                    source_query_id=str(step.source_query_id),
+                    id_index=views.get("openalex"),
+                    partial=partials["openalex"],
+                ),
+            ),
+            (
+                "semanticscholar",
+                s2_adapter.search_publications(
+                    step.query_model,
+                    terms_by_id,
+                    **common_kw,
+                    id_index=views.get("semanticscholar"),
+                    partial=partials["semanticscholar"],
+                ),
+            ),
+            (
+                "arxiv",
+                arxiv_adapter.search_publications(
+                    step.query_model,
+                    terms_by_id,
+                    **common_kw,
+                    id_index=views.get("arxiv"),
+                    partial=partials["arxiv"],
+                ),
+            ),
+            (
+                "pubmed",
+                pubmed_adapter.search_publications(
+                    step.query_model,
+                    terms_by_id,
+                    **common_kw,
+                    id_index=views.get("pubmed"),
+                    partial=partials["pubmed"],
+                ),
+            ),
+        ]
+        timeouts: dict[str, float] = getattr(settings, "SEARCH_PUBLICATION_SOURCE_TIMEOUT_S", None) or {}
+        outcomes = await asyncio.gather(
+            *(
+                _run_source(
+                    name, coro, timeouts.get(name), step_id=str(step.step_id), partial=partials[name]
+                )
+                for name, coro in sources
+            )
         )
 
-        arxiv_result = await arxiv_adapter.search_publications(
-            step.query_model,
-            terms_by_id,
-            language=language,
-            theme_id=theme_id,
-            run_id=run_id,
-            time_slice=time_slice,
-            limit=step.max_results,
-            require_abstract=True,
-            retriever_name=retriever_name,
-            request_id=ctx.request_id,
-        )
-
-        pubmed_result = await pubmed_adapter.search_publications(
-            step.query_model,
-            terms_by_id,
-            language=language,
-            theme_id=theme_id,
-            run_id=run_id,
-            time_slice=time_slice,
-            limit=step.max_results,
-            require_abstract=True,
-            retriever_name=retriever_name,
-            request_id=ctx.request_id,
-        )
+        items: list[Any] = []
+        billing_lines: list[Any] = []
+        sources_meta: dict[str, dict[str, Any]] = {}
+        for name, source_result, source_meta in outcomes:
+            if source_result is not None:
+                items.extend(source_result.items or [])
+                billing_lines.extend(source_result.billing_lines or [])
+            view = views.get(name)
+            if view is not None:
+                # Сколько записей источника отброшено как дубликаты (и чьих квантов)
+                source_meta["duplicates_dropped"] = view.duplicates_dropped
+                source_meta["overlap"] = dict(view.overlap)
+            sources_meta[name] = source_meta
+        # Источник не завершился: его непереданные кванты не попадут в шаг — возвращаем отброшенные ранее
+        # дубликаты (кванты частичного результата остаются за источником)
+        failed = {name for name, m in sources_meta.items() if m["status"] != "done"}
+        for name, source_result, _ in outcomes:
+            view = views.get(name)
+            if name not in failed or view is None:
+                continue
+            for fb_source, q in view.release(keep=source_result.items if source_result is not None else None):
+                if fb_source in failed:
+                    continue
+                items.append(q)
+                fb_meta = sources_meta[fb_source]
+                fb_meta["recovered"] = fb_meta.get("recovered", 0) + 1
+        if len(failed) == len(sources_meta) and not items and not billing_lines:
+            # Ни один источник не ответил — шаг считается неуспешным (executor пометит failed)
+            raise RuntimeError(
+                "all publication sources failed: "
+                + ", ".join(f"{name}={m.get('error')}" for name, m in sources_meta.items())
+            )
 
         result = RetrieverResult(
-            items=[
-                *(oa_result.items or []),
-                *(s2_result.items or []),
-                *(arxiv_result.items or []),
-                *(pubmed_result.items or []),
-            ],
-            billing_lines=[*(oa_result.billing_lines or [])],
+            items=items,
+            billing_lines=billing_lines,
+            meta={"sources": sources_meta},
         )
         logger.info(
-            "search/retriever: шаг step_id=%s, вернулось квантов=%s, строк биллинга=%s",
+            "search/retriever: шаг step_id=%s, вернулось квантов=%s, строк биллинга=%s, источники=%s",
             step.step_id,
             len(result.items),
             len(result.billing_lines),
+            {name: (m["status"], m["elapsed_ms"]) for name, m in sources_meta.items()},
         )
         return result
@@ -2,6 +2,7 @@
 SemanticScholarPublicationAdapter: поиск публикаций через Semantic Scholar API.
 
 Не возвращает строки биллинга (здесь нет платных вызовов).
+Выдача bulk-поиска обходится по token, пока не набрано limit валидных квантов (не больше max_pages страниц).
 """
 
 from __future__ import annotations
@@ -9,14 +10,25 @@ from __future__ import annotations
 import logging
 from typing import Any
 
+import httpx
+
+from app.integrations.ratelimit import RateLimiter
 from app.integrations.search.ports import RetrieverResult
 from app.integrations.search.schemas import QueryModel, TimeSlice
+from app.modules.quanta.schemas import QuantumCreate
 
+from app.integrations.search.retrievers.publication.id_index import SourceIdIndex
+from app.integrations.search.retrievers.publication.paging import (
+    CursorPage,
+    PagingStats,
+    collect_cursor_pages,
+)
 from app.integrations.search.retrievers.publication.semanticscholar.client import (
     semanticscholar_search_papers,
 )
 from app.integrations.search.retrievers.publication.semanticscholar.mapper import (
     map_semanticscholar_paper_to_quantum,
+    semanticscholar_paper_ids,
 )
 from app.integrations.search.retrievers.publication.semanticscholar.query_compiler import (
     compile_semanticscholar_query,
@@ -33,10 +45,16 @@ class SemanticScholarPublicationAdapter:
         timeout_s: float = 30.0,
         retries: int = 10,
         retry_delay_s: float = 2.0,
+        http_client: httpx.AsyncClient | None = None,
+        rate_limiter: RateLimiter | None = None,
+        max_pages: int = 10,
     ) -> None:
         self._timeout_s = timeout_s
+        self._max_pages = max(1, int(max_pages))
         self._retries = retries
         self._retry_delay_s = retry_delay_s
+        self._http_client = http_client
+        self._rate_limiter = rate_limiter
 
     async def search_publications(
         self,
@@ -51,6 +69,8 @@ class SemanticScholarPublicationAdapter:
         require_abstract: bool = True,
         request_id: str | None = None,
         retriever_name: str = "publication_retriever",
+        id_index: SourceIdIndex | None = None,
+        partial: RetrieverResult | None = None,
     ) -> RetrieverResult:
         if not language or not isinstance(language, str) or not language.strip():
             raise ValueError("language is required for Semantic Scholar publication search")
@@ -65,8 +85,7 @@ class SemanticScholarPublicationAdapter:
             request_id,
         )
 
-        # Ограничиваем число квантов после маппинга (bulk может вернуть до ~1000 записей за вызов).
-        hard_limit = max(1, min(int(limit), 100))
+        want = max(1, int(limit))
 
         fields = (
             "title,abstract,url,venue,publicationVenue,journal,year,publicationDate,"
@@ -75,65 +94,73 @@ class SemanticScholarPublicationAdapter:
         )
 
         logger.info(
-            "search/adapter: provider=%s endpoint=bulk max_mapped_quanta=%s (request_id=%s)",
+            "search/adapter: provider=%s endpoint=bulk max_mapped_quanta=%s max_pages=%s (request_id=%s)",
             "semantic_scholar",
-            hard_limit,
+            want,
+            self._max_pages,
             request_id,
         )
 
-        data = await semanticscholar_search_papers(
-            query=compiled,
-            fields=fields,
-            token=None,
-            timeout_s=self._timeout_s,
-            retries=self._retries,
-            retry_delay_s=self._retry_delay_s,
-            max_sleep_s=240.0,
-            give_up_retry_after_s=240.0,
-            total_timeout_s=240.0,
+        async def fetch_page(token: str | None) -> CursorPage | None:
+            # bulk: до ~1000 записей за вызов, продолжение выдачи — token из предыдущего ответа
+            data = await semanticscholar_search_papers(
+                query=compiled,
+                fields=fields,
+                token=token,
+                timeout_s=self._timeout_s,
+                retries=self._retries,
+                retry_delay_s=self._retry_delay_s,
+                max_sleep_s=240.0,
+                give_up_retry_after_s=240.0,
+                total_timeout_s=240.0,
+                http_client=self._http_client,
+                rate_limiter=self._rate_limiter,
+            )
+            if not data:
+                return None
+            items_raw = data.get("data") or []
+            if not isinstance(items_raw, list):
+                items_raw = []
+            return items_raw, data.get("token") or None
+
+        def map_paper(p: dict[str, Any]) -> QuantumCreate | None:
+            return map_semanticscholar_paper_to_quantum(
+                p,
+                compiled,
+                language,
+                theme_id=theme_id,
+                run_id=run_id,
+                require_abstract=require_abstract,
+                retriever_name=retriever_name,
+            )
+
+        stats = PagingStats()
+        quanta = await collect_cursor_pages(
+            fetch_page,
+            map_paper,
+            lambda p: p.get("paperId") or None,
+            want=want,
+            first_cursor=None,
+            max_pages=self._max_pages,
+            stats=stats,
+            provider="semantic_scholar",
+            request_id=request_id,
+            id_index=id_index,
+            record_ids=semanticscholar_paper_ids,
+            # partial: кванты видны вызывающему по мере маппинга (останутся при таймауте источника)
+            out=partial.items if partial is not None else None,
         )
-        if not data:
-            return RetrieverResult(items=[], billing_lines=[])
 
-        items_raw = data.get("data") or []
         logger.info(
-            "search/adapter: provider=%s response api_results=%s (request_id=%s)",
-            "semantic_scholar",
-            len(items_raw) if isinstance(items_raw, list) else 0,
-            request_id,
-        )
-
-        quanta = []
-        skipped_not_dict = 0
-        skipped_mapper_none = 0
-        if isinstance(items_raw, list):
-            for p in items_raw:
-                if not isinstance(p, dict):
-                    skipped_not_dict += 1
-                    continue
-                q = map_semanticscholar_paper_to_quantum(
-                    p,
-                    compiled,
-                    language,
-                    theme_id=theme_id,
-                    run_id=run_id,
-                    require_abstract=require_abstract,
-                    retriever_name=retriever_name,
-                )
-                if q is None:
-                    skipped_mapper_none += 1
-                    continue
-                quanta.append(q)
-                if len(quanta) >= hard_limit:
-                    break
-
-        logger.info(
-            "search/adapter: provider=%s mapped_quanta=%s (request_id=%s); skipped: not_dict=%s, mapper_none=%s",
+            "search/adapter: provider=%s mapped_quanta=%s pages=%s api_results=%s (request_id=%s); "
+            "skipped: not_dict=%s, mapper_none=%s, duplicate=%s",
             "semantic_scholar",
             len(quanta),
+            stats.pages,
+            stats.raw,
             request_id,
-            skipped_not_dict,
-            skipped_mapper_none,
+            stats.skipped_not_dict,
+            stats.skipped_mapper_none,
+            stats.skipped_duplicate,
         )
         return RetrieverResult(items=quanta, billing_lines=[])
-
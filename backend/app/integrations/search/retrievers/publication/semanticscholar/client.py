@@ -2,7 +2,8 @@
 HTTP-клиент для Semantic Scholar Academic Graph API.
 
 MVP: используем неавторизованный вызов (без API key), с ретраями и задержкой,
-чтобы не получить бан по IP при 429/перегрузке.
+чтобы не получить бан по IP при 429/перегрузке. Каждая попытка берёт токен лимитера
+semanticscholar; пауза по 429 сообщается лимитеру (backoff), чтобы притормозили и другие вызовы.
 """
 
 from __future__ import annotations
@@ -15,10 +16,15 @@ from typing import Any
 
 import httpx
 
+from app.integrations.http import borrow_client
+from app.integrations.ratelimit import RateLimiter, get_local_rate_limiter
+
 
 logger = logging.getLogger(__name__)
 
 SEMANTIC_SCHOLAR_BASE_URL = "https://api.semanticscholar.org/graph/v1"
+# Локальный лимит без переданного лимитера: неавторизованный доступ — не чаще 1 запроса/с
+_DEFAULT_RATE_PER_S = 1.0
 
 
 async def semanticscholar_search_papers(
@@ -32,6 +38,8 @@ async def semanticscholar_search_papers(
     max_sleep_s: float = 120.0,
     give_up_retry_after_s: float = 120.0,
     total_timeout_s: float = 240.0,
+    http_client: httpx.AsyncClient | None = None,
+    rate_limiter: RateLimiter | None = None,
 ) -> dict[str, Any] | None:
     """
     GET /paper/search/bulk
@@ -40,6 +48,7 @@ async def semanticscholar_search_papers(
     Пагинация через token в ответе (опционально).
     Возвращает JSON или None при ошибке после ретраев.
     """
+    limiter = rate_limiter or get_local_rate_limiter("semanticscholar", _DEFAULT_RATE_PER_S)
     url = f"{SEMANTIC_SCHOLAR_BASE_URL}/paper/search/bulk"
     params: dict[str, Any] = {
         "query": query,
@@ -83,8 +92,9 @@ async def semanticscholar_search_papers(
                 )
                 return None
         try:
-            async with httpx.AsyncClient(timeout=timeout_s) as client:
-                resp = await client.get(url, params=params, headers=headers)
+            await limiter.acquire()
+            async with borrow_client(http_client, timeout=timeout_s) as client:
+                resp = await client.get(url, params=params, headers=headers, timeout=timeout_s)
             last_status = resp.status_code
             if resp.status_code == 429:
                 ra_s = _retry_after_seconds(resp)
@@ -152,6 +162,9 @@ async def semanticscholar_search_papers(
                     return None
                 if sleep_s > remaining:
                     sleep_s = max(0.0, remaining)
+            if "(429)" in str(e):
+                # Лимит исчерпан для всех вызовов с этого IP — притормаживаем общий bucket
+                await limiter.backoff(sleep_s)
             if sleep_s >= 10 and not long_sleep_logged:
                 long_sleep_logged = True
                 logger.warning(
@@ -62,6 +62,24 @@ def _extract_doi(external_ids: Any) -> str | None:
     return None
 
 
+def semanticscholar_paper_ids(paper: dict[str, Any]) -> list[tuple[str, str]]:
+    """Идентификаторы сырой записи (doi, pubmed, arxiv, semanticscholar) — для раннего дедупа до маппинга."""
+    out: list[tuple[str, str]] = []
+    external_ids = paper.get("externalIds") if isinstance(paper.get("externalIds"), dict) else None
+    doi = _extract_doi(external_ids)
+    if doi:
+        out.append(("doi", doi))
+    if external_ids:
+        for key, scheme in (("PubMed", "pubmed"), ("ArXiv", "arxiv")):
+            v = external_ids.get(key)
+            if v is not None and str(v).strip():
+                out.append((scheme, str(v).strip()))
+    paper_id = paper.get("paperId")
+    if paper_id is not None and str(paper_id).strip():
+        out.append(("semanticscholar", str(paper_id).strip()))
+    return out
+
+
 def map_semanticscholar_paper_to_quantum(
     paper: dict[str, Any],
     compiled_query_string: str,
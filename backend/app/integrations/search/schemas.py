@@ -334,9 +334,51 @@ class QuantumCollectResult(BaseModel):
     total_returned: int
     items_embedding_data: list[dict] | None = Field(
         default=None,
-        description="Для записи в embeddings: каждый элемент {vector, text_hash, creation_id}. creation_id совпадает с attrs кванта — привязка по нему, а не по индексу; после сохранения creation_id удаляется из attrs в БД.",
+        description="Для записи в embeddings: каждый элемент {vector, text_hash, creation_id}. creation_id совпадает с attrs кванта — привязка по нему, а не по индексу; в attrs записи в БД creation_id не сохраняется.",
     )
     warnings: list[str] | None = Field(
         default=None,
         description="Предупреждения (например, ошибки эмбеддинга для части квантов)",
     )
+
+
+# --- Семантический поиск по эмбеддингам темы ---
+
+
+class SemanticSearchRequest(BaseModel):
+    """Запрос семантического поиска по объектам темы (пока только кванты)."""
+
+    theme_id: UUID
+    query: str = Field(..., min_length=1, max_length=4000, description="Свободный текст запроса")
+    object_types: list[Literal["quantum"]] = Field(
+        default_factory=lambda: ["quantum"],
+        description="Типы объектов: quantum — кванты (эмбеддинги других объектов темы не пишутся)",
+    )
+    entity_kind: str | None = Field(default=None, description="Фильтр квантов: publication|patent|webpage")
+    date_from: datetime | None = Field(default=None, description="Фильтр квантов: date_at >= date_from")
+    date_to: datetime | None = Field(default=None, description="Фильтр квантов: date_at <= date_to")
+    limit: int = Field(default=20, ge=1, le=200)
+    ef_search: int | None = Field(
+        default=None,
+        ge=1,
+        le=1000,
+        description="Глубина обхода HNSW (hnsw.ef_search); по умолчанию SEMANTIC_SEARCH_EF_SEARCH",
+    )
+
+
+class SemanticSearchHit(BaseModel):
+    """Найденный объект с косинусным сходством запросу."""
+
+    object_type: str
+    object_id: UUID
+    similarity: float
+    title: str | None = None
+    kind: str | None = None
+    date_at: datetime | None = None
+
+
+class SemanticSearchResult(BaseModel):
+    """Ранжированный результат семантического поиска (по убыванию similarity)."""
+
+    items: list[SemanticSearchHit]
+    total_returned: int
@@ -0,0 +1,46 @@
+"""
+Векторная оценка релевантности кандидатов: косинусное сходство с вектором темы.
+
+Вектор темы нормализуется один раз; векторы кандидатов складываются в матрицу
+NumPy, все сходства считаются одним произведением матрицы на вектор,
+порог EMBEDDING_QUANTUM_RELEVANCE_THRESHOLD применяется как маска.
+Семантика совпадает с поэлементной _cosine_similarity: отсутствующий вектор,
+вектор другой размерности или нулевой нормы даёт сходство 0.0.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+
+class RelevanceScorer:
+    """Косинусное сходство кандидатов с вектором темы (NumPy, пакетно)."""
+
+    def __init__(self, theme_vector: Sequence[float]) -> None:
+        theme = np.asarray(theme_vector, dtype=np.float64)
+        norm = float(np.linalg.norm(theme)) if theme.size else 0.0
+        self._dims = int(theme.size)
+        self._theme_unit = theme / norm if norm > 0 else None
+
+    def score(self, vectors: Sequence[Sequence[float] | None]) -> np.ndarray:
+        """Сходство каждого вектора с темой, значения в [-1, 1]; для невалидных векторов — 0.0."""
+        scores = np.zeros(len(vectors), dtype=np.float64)
+        if self._theme_unit is None or not vectors:
+            return scores
+        rows = [i for i, v in enumerate(vectors) if v is not None and len(v) == self._dims]
+        if not rows:
+            return scores
+        matrix = np.asarray([vectors[i] for i in rows], dtype=np.float64)
+        norms = np.linalg.norm(matrix, axis=1)
+        dots = matrix @ self._theme_unit
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sims = np.where(norms > 0, dots / norms, 0.0)
+        scores[rows] = sims
+        return scores
+
+    @staticmethod
+    def mask(scores: np.ndarray, threshold: float) -> np.ndarray:
+        """Булева маска кандидатов, прошедших порог (score >= threshold)."""
+        return scores >= threshold
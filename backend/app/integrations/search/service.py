@@ -16,7 +16,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import Settings
 from app.modules.billing.service import BillingService
 from app.integrations.embedding import EmbeddingService
+from app.integrations.http import HttpClientRegistry
+from app.integrations.ratelimit import RateLimiterRegistry
 from app.integrations.embedding.model import Embedding
+from app.integrations.embedding.semantic_search import semantic_search
 from app.integrations.embedding.theme_relevance import ensure_theme_relevance_embedding
 from app.integrations.search.exec import SearchExecutor
 from app.integrations.search.plan import SearchPlanner
@@ -25,6 +28,9 @@ from app.integrations.search.retrievers.publication.retriever import Publication
 from app.integrations.search.schemas import (
     QuantumCollectResult,
     SearchQuery,
+    SemanticSearchHit,
+    SemanticSearchRequest,
+    SemanticSearchResult,
     TimeSlice,
 )
 from app.modules.quanta.models import Quantum, RejectedQuantaCandidate
@@ -71,11 +77,22 @@ class SearchService:
     Перед поиском по теме создаётся/обновляется вектор релевантности темы (embedding_kind=relevance).
     """
 
-    def __init__(self, settings: Settings, *, billing_service: BillingService | None = None) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        *,
+        billing_service: BillingService | None = None,
+        http_clients: HttpClientRegistry | None = None,
+        rate_limiters: RateLimiterRegistry | None = None,
+    ) -> None:
         self._settings = settings
         self._billing_service = billing_service
-        self._embedding_service = EmbeddingService(settings, billing_service=self._billing_service)
-        _publication_retriever = PublicationRetriever()
+        self._embedding_service = EmbeddingService(
+            settings,
+            billing_service=self._billing_service,
+            http_clients=http_clients,
+        )
+        _publication_retriever = PublicationRetriever(http_clients=http_clients, rate_limiters=rate_limiters)
         self._registry: dict[str, "RetrieverPort"] = {
             "publication_retriever": _publication_retriever,
         }
@@ -182,6 +199,51 @@ class SearchService:
         limit = target_links or self._settings.SEARCH_DEFAULT_TARGET_LINKS
         return await self._executor.execute(plan, time_slice, limit, ctx)
 
+    async def semantic_search(
+        self,
+        session: AsyncSession,
+        body: SemanticSearchRequest,
+    ) -> SemanticSearchResult:
+        """
+        Семантический поиск по объектам темы: текст запроса -> эмбеддинг (EmbeddingService,
+        с кешем и биллингом) -> k-NN по embeddings (pgvector <=>, HNSW) с фильтрами.
+        """
+        embed_result = await self._embedding_service.embed(
+            body.query,
+            billing_session=session,
+            billing_theme_id=body.theme_id,
+            billing_task_type="semantic_search_query",
+            billing_extra={"object_types": list(body.object_types)},
+            lookup_session=session,
+        )
+        vector = embed_result.get("vector")
+        if not vector or not isinstance(vector, list):
+            raise ValueError("Не удалось построить эмбеддинг запроса")
+        hits = await semantic_search(
+            session,
+            theme_id=body.theme_id,
+            query_vector=vector,
+            model=(self._settings.EMBEDDING_MODEL or "").strip() or "text-embedding-3-small",
+            object_types=body.object_types,
+            limit=body.limit,
+            ef_search=body.ef_search or self._settings.SEMANTIC_SEARCH_EF_SEARCH,
+            entity_kind=body.entity_kind,
+            date_from=body.date_from,
+            date_to=body.date_to,
+        )
+        items = [
+            SemanticSearchHit(
+                object_type=h.object_type,
+                object_id=h.object_id,
+                similarity=h.similarity,
+                title=h.title,
+                kind=h.kind,
+                date_at=h.date_at,
+            )
+            for h in hits
+        ]
+        return SemanticSearchResult(items=items, total_returned=len(items))
+
     async def collect_links(
         self,
         query: SearchQuery,
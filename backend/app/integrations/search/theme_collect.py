@@ -0,0 +1,225 @@
+"""
+Сбор квантов по теме с сохранением: поиск, оценка релевантности, перевод, запись квантов и эмбеддингов.
+
+Общий код для POST /api/v1/search/collect-by-theme и фонового запуска search_collect (search_runs).
+"""
+import logging
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.integrations.embedding.store import upsert_embeddings
+from app.integrations.llm import LLMService
+from app.integrations.prompts import PromptService
+from app.integrations.search.schemas import (
+    QuantumCollectResult,
+    ThemeSearchCollectRequest,
+    TimeSlice,
+)
+from app.integrations.search.service import SearchService
+from app.integrations.translation import TranslationService, get_translation_memory
+from app.modules.quanta.crud import record_rejected_quanta_candidates
+from app.modules.quanta.service import (
+    get_translate_batch_count,
+    save_quanta_from_search_mapped,
+    score_quanta_relevance,
+    translate_quanta_create_items,
+)
+from app.modules.theme.service import get_theme_by_id
+
+logger = logging.getLogger(__name__)
+
+# Секунд на одну волну пакетов перевода; общий таймаут = ceil(пакетов / параллельность) * SECONDS_PER_TRANSLATE_BATCH
+SECONDS_PER_TRANSLATE_BATCH = 60
+
+
+async def collect_and_save_for_theme(
+    db: AsyncSession,
+    body: ThemeSearchCollectRequest,
+    *,
+    search_service: SearchService,
+    translation_service: TranslationService,
+    llm_service: LLMService,
+    prompt_service: PromptService,
+) -> QuantumCollectResult:
+    """
+    Собрать ссылки по теме из theme_search_queries и сохранить кванты.
+
+    Если переданы published_from и published_to — создаётся TimeSlice,
+    иначе time_slice = None (без фильтра по дате).
+    Перед записью квантов поля title, summary_text, key_points переводятся на основной язык темы (theme.languages[0]).
+    Метод перевода задаётся в конфиге: QUANTA_TRANSLATION_METHOD=translator (DeepL и др.) или llm (ИИ).
+    """
+    time_slice = None
+    if body.published_from is not None and body.published_to is not None:
+        time_slice = TimeSlice(
+            published_from=body.published_from,
+            published_to=body.published_to,
+        )
+    run_id_uuid: uuid.UUID | None = None
+    if body.run_id and str(body.run_id).strip():
+        try:
+            run_id_uuid = uuid.UUID(str(body.run_id))
+        except ValueError:
+            pass
+    result = await search_service.collect_links_for_theme(
+        session=db,
+        theme_id=body.theme_id,
+        time_slice=time_slice,
+        target_links=body.target_links,
+        mode="default",
+        request_id=None,
+        run_id=body.run_id,
+    )
+    if result.items:
+        theme_id_uuid: uuid.UUID | None = None
+        try:
+            theme_id_uuid = uuid.UUID(str(body.theme_id))
+        except (ValueError, TypeError):
+            pass
+        primary_language = "en"
+        if theme_id_uuid:
+            theme = await get_theme_by_id(db, theme_id_uuid)
+            if theme and theme.languages:
+                primary_language = theme.languages[0] if theme.languages else "en"
+
+        settings = get_settings()
+        relevance_by_index: dict[int, dict] = {}
+        items_to_save = result.items
+
+        # Сначала оценка релевантности ИИ и фильтр по total_score — потом переводим только то, что сохраняем
+        if result.items and theme_id_uuid and theme:
+            theme_description = (theme.description or theme.title or "").strip()
+            try:
+                relevance_list = await score_quanta_relevance(
+                    theme_description,
+                    result.items,
+                    model_names=["deepseek"],
+                    llm_service=llm_service,
+                    prompt_service=prompt_service,
+                    billing_session=db,
+                    billing_theme_id=theme_id_uuid,
+                )
+                total_threshold = max(
+                    0.0,
+                    min(1.0, (get_settings().QUANTUM_RELEVANCE_THRESHOLD or 0.0)),
+                )
+                kept_indices = [
+                    i
+                    for i in range(len(result.items))
+                    if (relevance_list[i].get("total_score") or -1.0) >= total_threshold
+                ]
+                kept_set = set(kept_indices)
+                llm_rejected = [
+                    result.items[i] for i in range(len(result.items)) if i not in kept_set
+                ]
+                if llm_rejected and theme_id_uuid:
+                    await record_rejected_quanta_candidates(
+                        db,
+                        theme_id=theme_id_uuid,
+                        items=llm_rejected,
+                    )
+                items_to_save = [result.items[i] for i in kept_indices]
+                relevance_by_index = {new_i: relevance_list[kept_indices[new_i]] for new_i in range(len(kept_indices))}
+                result.items = items_to_save
+                result.total_returned = len(items_to_save)
+            except Exception as e:
+                logger.warning("collect-by-theme: ошибка оценки релевантности квантов (LLM), сохраняем без opinion_score: %s", e)
+
+        # Перевод только квантов, прошедших обе проверки (embedding + total_score)
+        translations_by_index: dict[int, dict] = {}
+        if items_to_save and settings.QUANTA_TRANSLATION_METHOD.strip().lower() == "translator":
+            try:
+                translations_by_index, cost = await translation_service.translate_quanta_create_items(
+                    items_to_save,
+                    target_lang=primary_language,
+                    billing_session=db,
+                    billing_theme_id=theme_id_uuid,
+                    titles_only=True,
+                    memory_session=db,
+                )
+                logger.info(
+                    "collect-by-theme: перевод через %s, входящих символов=%s",
+                    settings.TRANSLATOR,
+                    cost.input_characters,
+                )
+            except Exception as e:
+                logger.warning("collect-by-theme: ошибка перевода квантов (translator), сохраняем без переводов: %s", e)
+        elif items_to_save:
+            translate_concurrency = max(1, settings.QUANTA_TRANSLATION_LLM_MAX_CONCURRENCY)
+            batch_count = get_translate_batch_count(
+                items_to_save,
+                primary_language,
+                limit=settings.QUANTA_TRANSLATION_LIMIT,
+                titles_only=True,
+                batch_max_items=settings.QUANTA_TRANSLATION_LLM_BATCH_MAX_ITEMS,
+                batch_max_tokens=settings.QUANTA_TRANSLATION_LLM_BATCH_MAX_TOKENS,
+            )
+            # Пакеты идут волнами по translate_concurrency; по таймауту сохраняются уже готовые переводы
+            waves = max(1, -(-batch_count // translate_concurrency))
+            translate_timeout_s = waves * SECONDS_PER_TRANSLATE_BATCH
+            try:
+                translations_by_index = await translate_quanta_create_items(
+                    items_to_save,
+                    primary_language,
+                    llm_service,
+                    prompt_service,
+                    limit=settings.QUANTA_TRANSLATION_LIMIT,
+                    billing_session=db,
+                    billing_theme_id=theme_id_uuid,
+                    titles_only=True,
+                    batch_max_items=settings.QUANTA_TRANSLATION_LLM_BATCH_MAX_ITEMS,
+                    batch_max_tokens=settings.QUANTA_TRANSLATION_LLM_BATCH_MAX_TOKENS,
+                    max_concurrency=translate_concurrency,
+                    timeout_s=translate_timeout_s,
+                    memory=get_translation_memory(settings.TRANSLATION_MEMORY_MAX_ITEMS),
+                    memory_session=db,
+                )
+                logger.info(
+                    "collect-by-theme: перевод через LLM, пакетов=%s, переведено квантов=%s",
+                    batch_count,
+                    len(translations_by_index),
+                )
+            except Exception as e:
+                logger.warning("collect-by-theme: ошибка перевода квантов (LLM), сохраняем без переводов: %s", e)
+
+        created_quanta, creation_id_to_quantum = await save_quanta_from_search_mapped(
+            db,
+            items_to_save,
+            run_id=run_id_uuid,
+            translations_by_index=translations_by_index,
+            relevance_by_index=relevance_by_index,
+        )
+
+        # Привязка эмбеддингов к квантам по creation_id (из входных attrs; в БД он не пишется), а не по индексу — чтобы порядок не перепутался при пропусках в save_quanta_from_search
+        if result.items_embedding_data and created_quanta and theme_id_uuid:
+            model_name = (settings.EMBEDDING_MODEL or "").strip() or "text-embedding-3-small"
+            dims = settings.EMBEDDING_DIMENSIONS or 1536
+            embedding_items: list[tuple[uuid.UUID, list[float], str]] = []
+            for ed in result.items_embedding_data:
+                if not isinstance(ed, dict):
+                    continue
+                creation_id = ed.get("creation_id")
+                quantum = creation_id_to_quantum.get(creation_id) if creation_id else None
+                if quantum is None:
+                    continue
+                vector = ed.get("vector")
+                text_hash = ed.get("text_hash")
+                if not vector or not isinstance(vector, list) or text_hash is None:
+                    continue
+                embedding_items.append((quantum.id, vector, str(text_hash)))
+            # Один пакетный upsert вместо SELECT + INSERT/UPDATE на каждый квант
+            await upsert_embeddings(
+                db,
+                theme_id=theme_id_uuid,
+                object_type="quantum",
+                embedding_kind="relevance",
+                model=model_name,
+                dims=dims,
+                items=embedding_items,
+            )
+    if result.warnings:
+        for w in result.warnings:
+            logger.warning("collect-by-theme: %s", w)
+    return result
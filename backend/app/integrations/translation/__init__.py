@@ -1,14 +1,18 @@
 """
 Интеграция перевода квантов.
-Верхний слой — TranslationService; переводчики в translators/ (deepl, ...).
+Верхний слой — TranslationService; переводчики в translators/ (deepl, ...);
+память переводов (translation_memory + LRU) — в memory.py.
 """
 
+from app.integrations.translation.memory import TranslationMemory, get_translation_memory
 from app.integrations.translation.ports import TranslationCost, TranslationResult, TranslatorPort
 from app.integrations.translation.service import TranslationService
 
 __all__ = [
     "TranslationCost",
+    "TranslationMemory",
     "TranslationResult",
     "TranslationService",
     "TranslatorPort",
+    "get_translation_memory",
 ]
@@ -0,0 +1,229 @@
+"""
+Память переводов: ключ — (translator, source_lang, target_lang, text_hash).
+
+Два уровня (общая основа с кешем эмбеддингов — app.integrations.content_cache):
+1) in-process LRU;
+2) таблица translation_memory (если передана session) — переводы, сделанные ранее
+   в любой теме и любом прогоне.
+
+Хранятся переводы отдельных фрагментов (заголовок, summary, key point, термин), поэтому
+квант переводится из памяти, только если найдены все его непустые фрагменты.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import unicodedata
+from typing import Any, Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.integrations.content_cache import ContentCache
+from app.integrations.translation.model import TranslationMemoryEntry
+
+logger = logging.getLogger(__name__)
+
+# Ограничение на размер IN (...) / VALUES в одном запросе к translation_memory
+_DB_CHUNK = 500
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_translation_text(text: str) -> str:
+    """NFC, strip, схлопывание пробельных символов — одинаковый текст с разным форматированием даёт один ключ."""
+    return _WS_RE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def translation_text_hash(text: str) -> str:
+    """SHA-256 нормализованного текста в hex — пишется в translation_memory.text_hash."""
+    return hashlib.sha256(normalize_translation_text(text).encode("utf-8")).hexdigest()
+
+
+def quantum_segments(title: str, summary: str, points: list[str]) -> list[str]:
+    """Непустые фрагменты кванта для поиска в памяти."""
+    return [s for s in (title, summary, *points) if (s or "").strip()]
+
+
+def quantum_translation_from_memory(
+    title: str,
+    summary: str,
+    points: list[str],
+    found: dict[str, str],
+) -> dict[str, Any] | None:
+    """Собрать перевод кванта из найденных фрагментов; None — если хоть одного непустого фрагмента нет."""
+    if any(s not in found for s in quantum_segments(title, summary, points)):
+        return None
+    return {
+        "title_translated": found.get(title, "") if title.strip() else "",
+        "summary_text_translated": found.get(summary, "") if summary.strip() else "",
+        "key_points_translated": [found.get(p, "") if p.strip() else "" for p in points],
+    }
+
+
+def quantum_translation_pairs(
+    title: str,
+    summary: str,
+    points: list[str],
+    translation: dict[str, Any],
+) -> dict[str, str]:
+    """
+    Пары {исходный фрагмент: перевод} для записи в память. Пустые переводы не запоминаются;
+    key points — только если переводчик вернул столько же пунктов (иначе сопоставление ненадёжно).
+    """
+    pairs: dict[str, str] = {}
+
+    def _add(src: str, dst: Any) -> None:
+        if (src or "").strip() and isinstance(dst, str) and dst.strip():
+            pairs[src] = dst
+
+    _add(title, translation.get("title_translated"))
+    _add(summary, translation.get("summary_text_translated"))
+    tr_points = translation.get("key_points_translated")
+    if isinstance(tr_points, list) and len(tr_points) == len(points):
+        for src, dst in zip(points, tr_points):
+            _add(src, dst)
+    return pairs
+
+
+class TranslationMemory(ContentCache[str]):
+    """In-process LRU переводов + пакетный поиск/запись в таблице translation_memory."""
+
+    label = "translation/memory"
+
+    def __init__(self, max_items: int = 10000) -> None:
+        super().__init__(max_items)
+
+    def get_many(
+        self, translator: str, source_lang: str, target_lang: str, text_hashes: Iterable[str]
+    ) -> dict[str, str]:
+        """Найти переводы в LRU; возвращает {text_hash: перевод} только для найденных."""
+        return self._get_many((translator, source_lang, target_lang), text_hashes)
+
+    def put_many(
+        self, translator: str, source_lang: str, target_lang: str, translations: dict[str, str]
+    ) -> None:
+        """Положить переводы {text_hash: перевод} в LRU, вытесняя самые старые при переполнении."""
+        self._put_many((translator, source_lang, target_lang), translations)
+
+    async def lookup(
+        self,
+        translator: str,
+        source_lang: str,
+        target_lang: str,
+        texts: Iterable[str],
+        *,
+        session: Any | None = None,
+    ) -> dict[str, str]:
+        """
+        Пакетный поиск переводов: сначала LRU, затем (если передана session) translation_memory
+        для оставшихся. Возвращает {исходный текст: перевод} только для найденных.
+        Ошибка БД не прерывает перевод — просто меньше попаданий.
+        """
+        by_hash: dict[str, list[str]] = {}
+        for t in texts:
+            if (t or "").strip():
+                by_hash.setdefault(translation_text_hash(t), []).append(t)
+        if not by_hash:
+            return {}
+        found = await self._lookup(
+            (translator, source_lang, target_lang),
+            by_hash,
+            session=session,
+            select_missing=lambda missing: _select_translations(
+                session, translator, source_lang, target_lang, missing
+            ),
+        )
+        return {t: value for h, value in found.items() for t in by_hash[h]}
+
+    async def store(
+        self,
+        translator: str,
+        source_lang: str,
+        target_lang: str,
+        translations: dict[str, str],
+        *,
+        session: Any | None = None,
+    ) -> None:
+        """
+        Запомнить переводы {исходный текст: перевод}: в LRU и (если передана session) в translation_memory
+        через INSERT ... ON CONFLICT DO UPDATE. Ошибка записи в БД только логируется.
+        """
+        rows: dict[str, tuple[str, str]] = {}
+        for src, dst in translations.items():
+            if (src or "").strip() and (dst or "").strip():
+                rows[translation_text_hash(src)] = (normalize_translation_text(src), dst)
+        if not rows:
+            return
+        self.put_many(translator, source_lang, target_lang, {h: dst for h, (_, dst) in rows.items()})
+        if session is None:
+            return
+        values = [
+            {
+                "translator": translator,
+                "source_lang": source_lang,
+                "target_lang": target_lang,
+                "text_hash": h,
+                "source_text": src,
+                "translated_text": dst,
+            }
+            for h, (src, dst) in rows.items()
+        ]
+        try:
+            # SAVEPOINT: сбой записи в память не должен откатывать транзакцию запроса
+            async with session.begin_nested():
+                for i in range(0, len(values), _DB_CHUNK):
+                    await session.execute(build_translation_memory_upsert_stmt(values[i : i + _DB_CHUNK]))
+        except Exception as e:
+            logger.warning("translation/memory: запись в translation_memory не удалась: %s", e)
+
+
+def build_translation_memory_upsert_stmt(values: list[dict[str, Any]]) -> Any:
+    """Многострочный INSERT ... ON CONFLICT (uq_translation_memory_key) DO UPDATE перевода."""
+    stmt = pg_insert(TranslationMemoryEntry).values(values)
+    return stmt.on_conflict_do_update(
+        constraint="uq_translation_memory_key",
+        set_={
+            "source_text": stmt.excluded.source_text,
+            "translated_text": stmt.excluded.translated_text,
+            "updated_at": func.now(),
+        },
+    )
+
+
+async def _select_translations(
+    session: Any,
+    translator: str,
+    source_lang: str,
+    target_lang: str,
+    text_hashes: list[str],
+) -> dict[str, str]:
+    """Найти в translation_memory переводы по ключу; один SELECT на пачку хешей."""
+    found: dict[str, str] = {}
+    for i in range(0, len(text_hashes), _DB_CHUNK):
+        chunk = text_hashes[i : i + _DB_CHUNK]
+        result = await session.execute(
+            select(TranslationMemoryEntry.text_hash, TranslationMemoryEntry.translated_text).where(
+                TranslationMemoryEntry.translator == translator,
+                TranslationMemoryEntry.source_lang == source_lang,
+                TranslationMemoryEntry.target_lang == target_lang,
+                TranslationMemoryEntry.text_hash.in_(chunk),
+            )
+        )
+        for text_hash, translated in result.all():
+            if text_hash and translated:
+                found[text_hash] = translated
+    return found
+
+
+_memory: TranslationMemory | None = None
+
+
+def get_translation_memory(max_items: int = 10000) -> TranslationMemory:
+    """Общая для процесса память переводов (singleton; max_items учитывается при первом вызове)."""
+    global _memory
+    if _memory is None:
+        _memory = TranslationMemory(max_items=max_items)
+    return _memory
@@ -0,0 +1,81 @@
+"""
+SQLAlchemy-модель для таблицы translation_memory (память переводов: готовые переводы фрагментов текста).
+"""
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, Text, UniqueConstraint, func, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class TranslationMemoryEntry(Base):
+    """
+    Перевод фрагмента текста: (переводчик, исходный язык, целевой язык, хеш нормализованного текста) -> перевод.
+    Переиспользуется между темами и прогонами, чтобы не платить повторно за перевод того же текста.
+    """
+
+    __tablename__ = "translation_memory"
+    __table_args__ = (
+        UniqueConstraint(
+            "translator",
+            "source_lang",
+            "target_lang",
+            "text_hash",
+            name="uq_translation_memory_key",
+        ),
+        {"comment": "Память переводов: переводы фрагментов текста по хешу нормализованного исходника"},
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        server_default=text("gen_random_uuid()"),
+        comment="Идентификатор записи",
+    )
+    translator: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False,
+        comment="Кто переводил: deepl, yandex_translator, llm, llm_terms",
+    )
+    source_lang: Mapped[str] = mapped_column(
+        String(16),
+        nullable=False,
+        comment="Код исходного языка",
+    )
+    target_lang: Mapped[str] = mapped_column(
+        String(16),
+        nullable=False,
+        comment="Код целевого языка",
+    )
+    text_hash: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        comment="SHA-256 нормализованного исходного текста",
+    )
+    source_text: Mapped[str] = mapped_column(
+        Text,
+        nullable=False,
+        comment="Исходный текст (для отладки и аудита)",
+    )
+    translated_text: Mapped[str] = mapped_column(
+        Text,
+        nullable=False,
+        comment="Перевод",
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        comment="Дата создания записи",
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="Дата последнего обновления перевода",
+    )
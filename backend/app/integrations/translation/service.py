@@ -1,6 +1,7 @@
 """
 Верхний слой перевода квантов.
 Выбирает переводчик по имени из конфига и делегирует ему перевод.
+Перед вызовом переводчика фрагменты ищутся в памяти переводов; наружу уходят только промахи.
 """
 
 from __future__ import annotations
@@ -11,6 +12,14 @@ from decimal import Decimal
 from typing import Any
 
 from app.core.config import Settings
+from app.integrations.http import HttpClientRegistry
+from app.integrations.translation.memory import (
+    TranslationMemory,
+    get_translation_memory,
+    quantum_segments,
+    quantum_translation_from_memory,
+    quantum_translation_pairs,
+)
 from app.integrations.translation.ports import TranslationCost, TranslatorPort
 from app.integrations.translation.translators.deepl import DeepLTranslator
 from app.integrations.translation.translators.yandex_translator import YandexTranslator
@@ -37,14 +46,26 @@ class TranslationService:
     Группирует кванты по исходному языку и вызывает переводчик с явными source_lang, target_lang.
     """
 
-    def __init__(self, settings: Settings, *, billing_service: BillingService | None = None) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        *,
+        billing_service: BillingService | None = None,
+        http_clients: HttpClientRegistry | None = None,
+        memory: TranslationMemory | None = None,
+    ) -> None:
         self._settings = settings
         self._billing_service = billing_service
+        self._memory = memory if memory is not None else get_translation_memory(settings.TRANSLATION_MEMORY_MAX_ITEMS)
         self._registry: dict[str, TranslatorPort] = {
-            "deepl": DeepLTranslator(api_key=settings.DEEPL_API_KEY.get_secret_value()),
+            "deepl": DeepLTranslator(
+                api_key=settings.DEEPL_API_KEY.get_secret_value(),
+                http_client=http_clients.get("deepl") if http_clients is not None else None,
+            ),
             "yandex_translator": YandexTranslator(
                 folder_id=settings.YANDEX_FOLDER_ID,
                 api_key=settings.YANDEX_API_KEY_TRANSLATE.get_secret_value(),
+                http_client=http_clients.get("yandex_translator") if http_clients is not None else None,
             ),
         }
         self._translator_name = settings.TRANSLATOR.strip() or "deepl"
@@ -60,6 +81,7 @@ class TranslationService:
         billing_session: "Any | None" = None,
         billing_theme_id: "Any | None" = None,
         titles_only: bool = False,
+        memory_session: "Any | None" = None,
     ) -> tuple[dict[int, dict[str, Any]], TranslationCost]:
         """
         Перевести поля квантов на целевой язык.
@@ -69,6 +91,10 @@ class TranslationService:
         передаются пустыми); в результате заполняется только title_translated, остальные
         поля перевода — None.
 
+        Память переводов: кванты, все непустые фрагменты которых (title, summary, key points) уже
+        переводились этим переводчиком на эту пару языков, заполняются из памяти и не тарифицируются.
+        memory_session — сессия для поиска/записи в translation_memory; без неё используется только LRU процесса.
+
         Returns:
             (translations_by_index, cost) — словарь индекс -> переводы и оценка стоимости.
         """
@@ -107,13 +133,32 @@ class TranslationService:
 
         all_by_index: dict[int, dict[str, Any]] = {}
         total_input_chars = 0
+        target_norm = _normalize_lang(target_lang)
+        # То, что реально ушло в переводчик (для extra биллинга)
+        sent_by_lang: dict[str, list[tuple[int, str, str, list[str]]]] = {}
 
         for source_lang, batch in by_lang.items():
             if not batch:
                 continue
+            found = await self._memory.lookup(
+                translator.name,
+                source_lang,
+                target_norm,
+                [seg for _, title, summary, points in batch for seg in quantum_segments(title, summary, points)],
+                session=memory_session,
+            )
+            pending: list[tuple[int, str, str, list[str]]] = []
+            for idx, title, summary, points in batch:
+                cached = quantum_translation_from_memory(title, summary, points, found)
+                if cached is not None:
+                    all_by_index[idx] = cached
+                else:
+                    pending.append((idx, title, summary, points))
+            if not pending:
+                continue
             try:
                 result = await translator.translate(
-                    items=batch,
+                    items=pending,
                     source_lang=source_lang,
                     target_lang=target_lang,
                 )
@@ -121,13 +166,20 @@ class TranslationService:
                 logger.warning(
                     "translation: ошибка перевода (source_lang=%s, batch_size=%s): %s",
                     source_lang,
-                    len(batch),
+                    len(pending),
                     e,
                 )
                 continue
+            sent_by_lang[source_lang] = pending
+            new_pairs: dict[str, str] = {}
+            for idx, title, summary, points in pending:
+                trans = result.translations_by_index.get(idx)
+                if trans:
+                    new_pairs.update(quantum_translation_pairs(title, summary, points, trans))
             for idx, trans in result.translations_by_index.items():
                 all_by_index[idx] = trans
             total_input_chars += result.cost.input_characters
+            await self._memory.store(translator.name, source_lang, target_norm, new_pairs, session=memory_session)
 
         if titles_only:
             for d in all_by_index.values():
@@ -140,7 +192,7 @@ class TranslationService:
             billing_theme_id=billing_theme_id,
             translator=translator,
             target_lang=target_lang,
-            by_lang=by_lang,
+            by_lang=sent_by_lang,
             total_input_chars=total_input_chars,
             task_type="quanta_translation",
         )
@@ -10,6 +10,7 @@ from typing import Any
 
 import httpx
 
+from app.integrations.http import borrow_client
 from app.integrations.translation.ports import TranslationCost, TranslationResult, TranslatorPort
 
 logger = logging.getLogger(__name__)
@@ -78,10 +79,17 @@ def _reassemble(
 class DeepLTranslator:
     """Переводчик через DeepL REST API. Исходный и целевой язык передаются явно."""
 
-    def __init__(self, api_key: str, base_url: str = DEEPL_API_BASE_URL, timeout_s: float = 30.0) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = DEEPL_API_BASE_URL,
+        timeout_s: float = 30.0,
+        http_client: httpx.AsyncClient | None = None,
+    ) -> None:
         self._api_key = api_key
         self._base_url = base_url.rstrip("/")
         self._timeout_s = timeout_s
+        self._http_client = http_client
 
     @property
     def name(self) -> str:
@@ -135,12 +143,13 @@ class DeepLTranslator:
                 "Authorization": f"DeepL-Auth-Key {self._api_key}",
                 "Content-Type": "application/json",
             }
-            async with httpx.AsyncClient(timeout=self._timeout_s) as client:
+            async with borrow_client(self._http_client, timeout=self._timeout_s) as client:
                 try:
                     resp = await client.post(
                         f"{self._base_url}/v2/translate",
                         json=body,
                         headers=headers,
+                        timeout=self._timeout_s,
                     )
                     resp.raise_for_status()
                     data = resp.json()
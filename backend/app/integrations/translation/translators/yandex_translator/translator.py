@@ -11,6 +11,7 @@ from typing import Any
 
 import httpx
 
+from app.integrations.http import borrow_client
 from app.integrations.translation.ports import TranslationCost, TranslationResult, TranslatorPort
 
 logger = logging.getLogger(__name__)
@@ -82,7 +83,9 @@ class YandexTranslator:
         api_key: str,
         base_url: str = "https://translate.api.cloud.yandex.net",
         timeout_s: float = 30.0,
+        http_client: httpx.AsyncClient | None = None,
     ) -> None:
+        self._http_client = http_client
         self._folder_id = (folder_id or "").strip()
         self._api_key = (api_key or "").strip()
         base = (base_url or "").rstrip("/")
@@ -162,9 +165,9 @@ class YandexTranslator:
                 len(batch),
                 batch_chars,
             )
-            async with httpx.AsyncClient(timeout=self._timeout_s) as client:
+            async with borrow_client(self._http_client, timeout=self._timeout_s) as client:
                 try:
-                    resp = await client.post(self._url, json=body, headers=headers)
+                    resp = await client.post(self._url, json=body, headers=headers, timeout=self._timeout_s)
                     resp.raise_for_status()
                     data = resp.json()
                 except httpx.HTTPStatusError as e:
@@ -1,7 +1,7 @@
 import asyncio
 import logging
 import os
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,17 +10,23 @@ from fastapi.responses import PlainTextResponse
 from app.core.config import get_settings
 from app.core.logging_config import setup_logging
 from app.integrations.email import AuthEmailService, get_email_sender
+from app.integrations.http import HttpClientRegistry
+from app.integrations.ratelimit import RateLimiterRegistry
 from app.integrations.llm import LLMService
 from app.db.session import AsyncSessionLocal
 from app.modules.billing.service import BillingService
 from app.integrations.search import SearchService
 from app.integrations.search.router import router as search_router
+from app.integrations.prompts import get_prompt_service
 from app.integrations.translation import TranslationService
 from app.modules.auth.router import router as auth_router
 from app.modules.entity.router import router as entity_router
 from app.modules.event.router import router as event_router
 from app.modules.landscape.router import router as landscape_router
 from app.modules.quanta.router import router as quanta_router
+from app.modules.search_run.jobs import RunServices
+from app.modules.search_run.router import router as search_run_router
+from app.modules.search_run.worker import build_run_worker
 from app.modules.site.router import router as site_router
 from app.modules.theme.router import router as theme_router
 from app.modules.user.router import router as user_router
@@ -32,13 +38,19 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 
-async def _run_billing_rollup_on_startup(billing_service: BillingService) -> None:
-    """До 3 попыток свернуть детальный биллинг в дневные строки; при неудаче — только лог."""
+async def _run_billing_rollup_on_startup(billing_service: BillingService, *, chunk_size: int) -> None:
+    """
+    До 3 попыток свернуть детальный биллинг в дневные строки; при неудаче — только лог.
+    Выполняется фоновой задачей: каждый чанк фиксируется отдельно, старт API не ждёт свёртки.
+    """
     for attempt in range(1, 4):
         try:
             async with AsyncSessionLocal() as session:
-                async with session.begin():
-                    await billing_service.rollup_usage_events_to_daily(session)
+                await billing_service.rollup_usage_events_to_daily(
+                    session,
+                    chunk_size=chunk_size,
+                    commit_each_chunk=True,
+                )
             return
         except Exception as e:
             logger.warning(
@@ -53,18 +65,59 @@ async def _run_billing_rollup_on_startup(billing_service: BillingService) -> Non
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Инициализация при старте: конфиг, email-сервис, LLM-сервис."""
+    """Инициализация при старте: конфиг, email-сервис, общие HTTP-клиенты, LLM-сервис, воркер фоновых запусков."""
     settings = get_settings()
     email_sender = get_email_sender(settings)
     app.state.auth_email_service = AuthEmailService(email_sender)
-    app.state.billing_service = BillingService()
-    await _run_billing_rollup_on_startup(app.state.billing_service)
-    app.state.llm_service = LLMService(settings, billing_service=app.state.billing_service)
-    app.state.search_service = SearchService(settings, billing_service=app.state.billing_service)
-    app.state.translation_service = TranslationService(settings, billing_service=app.state.billing_service)
+    app.state.billing_service = BillingService(cache_ttl_s=settings.BILLING_CACHE_TTL_S)
+    app.state.billing_rollup_task = asyncio.create_task(
+        _run_billing_rollup_on_startup(
+            app.state.billing_service,
+            chunk_size=settings.BILLING_ROLLUP_CHUNK_SIZE,
+        ),
+        name="billing-rollup",
+    )
+    app.state.http_clients = HttpClientRegistry(settings)
+    app.state.rate_limiters = RateLimiterRegistry(settings, session_factory=AsyncSessionLocal)
+    app.state.llm_service = LLMService(
+        settings,
+        billing_service=app.state.billing_service,
+        http_clients=app.state.http_clients,
+    )
+    app.state.search_service = SearchService(
+        settings,
+        billing_service=app.state.billing_service,
+        http_clients=app.state.http_clients,
+        rate_limiters=app.state.rate_limiters,
+    )
+    app.state.translation_service = TranslationService(
+        settings,
+        billing_service=app.state.billing_service,
+        http_clients=app.state.http_clients,
+    )
+    app.state.run_worker = None
+    if settings.RUN_WORKER_ENABLED:
+        app.state.run_worker = build_run_worker(
+            RunServices(
+                settings=settings,
+                llm_service=app.state.llm_service,
+                prompt_service=get_prompt_service(settings),
+                search_service=app.state.search_service,
+                translation_service=app.state.translation_service,
+            ),
+            AsyncSessionLocal,
+        )
+        app.state.run_worker.start()
 
     yield
-    # shutdown при необходимости
+    # shutdown: останавливаем воркер (прерванные запуски возвращаются в очередь) и свёртку биллинга
+    # (незафиксированный чанк откатывается), закрываем пулы соединений
+    app.state.billing_rollup_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await app.state.billing_rollup_task
+    if app.state.run_worker is not None:
+        await app.state.run_worker.stop()
+    await app.state.http_clients.aclose()
 
 
 app = FastAPI(
@@ -103,6 +156,7 @@ app.include_router(entity_router)
 app.include_router(event_router)
 app.include_router(landscape_router)
 app.include_router(billing_router)
+app.include_router(search_run_router)
 
 
 @app.get("/api", response_class=PlainTextResponse)
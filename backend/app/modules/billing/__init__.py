@@ -14,7 +14,7 @@ from app.modules.billing.model import (
     BillingTariff,
     BillingUsageEvent,
 )
-from app.modules.billing.service import BillingService, get_billing_service
+from app.modules.billing.service import BillingService, BillingUsageItem, get_billing_service
 
 __all__ = [
     "BillingDailyServicesTasks",
@@ -27,6 +27,7 @@ __all__ = [
     "BillingTariff",
     "BillingTaskType",
     "BillingUsageEvent",
+    "BillingUsageItem",
     "get_billing_service",
     "llm_tariff_service_impl",
 ]
@@ -0,0 +1,74 @@
+"""
+In-process TTL-кеш справочников биллинга (тарифы, курсы, настройки темы).
+
+Справочники меняются редко (сиды, ручные правки в БД), а читаются на каждое событие биллинга.
+Запись живёт ttl_s секунд; после правки справочника кеш сбрасывается явно
+(BillingService.invalidate_*), TTL ограничивает устаревание, если сбросить забыли.
+"""
+
+from __future__ import annotations
+
+import enum
+import time
+from collections import OrderedDict
+from typing import Callable, Final, Generic, Hashable, Literal, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+class _Missing(enum.Enum):
+    MISSING = enum.auto()
+
+
+# Маркер «записи нет» (в кеше может лежать и None — например, «тарифа нет»);
+# член enum — чтобы `value is not MISSING` сужал тип до V
+MISSING: Final = _Missing.MISSING
+
+
+class TTLCache(Generic[K, V]):
+    """Словарь с временем жизни записей и ограничением размера (вытесняются самые старые)."""
+
+    def __init__(
+        self,
+        ttl_s: float,
+        *,
+        max_items: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ttl_s = max(0.0, float(ttl_s))
+        self._max_items = max(1, int(max_items))
+        self._clock = clock
+        self._items: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl_s > 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: K) -> V | Literal[_Missing.MISSING]:
+        """Значение по ключу или MISSING, если записи нет или она устарела (кешируется и None)."""
+        item = self._items.get(key)
+        if item is None:
+            return MISSING
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._items[key]
+            return MISSING
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        if not self.enabled:
+            return
+        self._items[key] = (self._clock() + self._ttl_s, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_items:
+            self._items.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        self._items.pop(key, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
@@ -162,6 +162,12 @@ class BillingUsageEvent(Base):
             "deleted",
             "occurred_at",
         ),
+        # Свёртка выбирает самые старые несвёрнутые события по всем темам
+        Index(
+            "ix_billing_usage_not_deleted_occurred",
+            "occurred_at",
+            postgresql_where=text("deleted = false"),
+        ),
         {"comment": "Детальный журнал биллинга по темам; deleted — свёрнуто в дневную сводку."},
     )
 
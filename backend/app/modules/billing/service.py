@@ -4,18 +4,17 @@ from __future__ import annotations
 
 import logging
 import uuid
-from collections import defaultdict
-from datetime import date, datetime, timedelta, timezone
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
 from decimal import Decimal, ROUND_HALF_UP
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Sequence
 
-from sqlalchemy import and_, func, or_, select, text, update
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import and_, insert, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.modules.billing.cache import MISSING, TTLCache
 from app.modules.billing.exceptions import BillingConfigError
 from app.modules.billing.model import (
-    BillingDailyServicesTasks,
     BillingExchangeRate,
     BillingTariff,
     BillingUsageEvent,
@@ -30,36 +29,138 @@ _BILLING_ROLLUP_LAG_DAYS = 2
 # Минимум 6 знаков после запятой для денежных полей в событии
 _MONEY_QUANT = Decimal("1.000000")
 
-# UPSERT по уникальному выраженному индексу (COALESCE(service_impl, '')); constraint name не подходит.
-_DAILY_SUMMARY_UPSERT = text(
+# Время жизни кеша тарифов, курсов и настроек биллинга тем (сек), если не задано в конструкторе
+_BILLING_CACHE_TTL_S = 300.0
+
+# Событий в одном INSERT record_usage_many (15 параметров на строку — в пределах лимита драйвера)
+_RECORD_MANY_CHUNK = 1000
+
+# Сколько детальных событий сворачивается одним оператором (одна транзакция при commit_each_chunk).
+_BILLING_ROLLUP_CHUNK_SIZE = 5000
+
+# Умолчания настроек биллинга темы, если строки theme_stats нет (как в _get_theme_billing_settings).
+_DEFAULT_BILLING_TIMEZONE = "Asia/Krasnoyarsk"
+_DEFAULT_DISPLAY_CURRENCY = "RUB"
+
+# Свёртка одного чанка целиком в SQL:
+# - timezone темы — первая строка theme_stats (неизвестное имя зоны → UTC, как ZoneInfo-фолбэк);
+# - picked: самые старые несвёрнутые события с локальной датой <= «сегодня» темы − lag (SKIP LOCKED);
+# - marked: deleted = true по выбранным id, RETURNING нормализованных полей среза;
+# - grouped → UPSERT в billing_daily_summaries по уникальному выраженному индексу (COALESCE(service_impl, ''))
+#   и в billing_daily_services_tasks; суммы при конфликте прибавляются;
+# - валюта отображения среза — у первого (самого раннего) события среза в чанке;
+#   при конфликте её перезаписывает следующий чанк (EXCLUDED.display_currency_code).
+_ROLLUP_CHUNK_SQL = text(
     """
-    INSERT INTO billing_daily_summaries (
-        theme_id, summary_local_date, service_type, task_type,
-        quantity_unit_code, tariff_currency_code, service_impl,
-        sum_quantity, sum_cost_tariff_currency, sum_cost_display_currency,
-        display_currency_code
-    ) VALUES (
-        :theme_id, :summary_local_date, :service_type, :task_type,
-        :quantity_unit_code, :tariff_currency_code, :service_impl,
-        :sum_quantity, :sum_cost_tariff_currency, :sum_cost_display_currency,
-        :display_currency_code
+    WITH theme_tz AS (
+        SELECT DISTINCT ON (s.theme_id)
+            s.theme_id,
+            COALESCE(z.name, 'UTC') AS tz
+        FROM theme_stats s
+        LEFT JOIN pg_timezone_names z
+            ON z.name = COALESCE(NULLIF(btrim(s.billing_timezone), ''), :default_tz)
+        ORDER BY s.theme_id, s.id
+    ),
+    picked AS (
+        SELECT
+            e.id,
+            (e.occurred_at AT TIME ZONE COALESCE(t.tz, :default_tz))::date AS local_date
+        FROM billing_usage_events e
+        LEFT JOIN theme_tz t ON t.theme_id = e.theme_id
+        WHERE e.deleted = false
+          AND (e.occurred_at AT TIME ZONE COALESCE(t.tz, :default_tz))::date
+              <= (now() AT TIME ZONE COALESCE(t.tz, :default_tz))::date - CAST(:lag_days AS integer)
+        ORDER BY e.occurred_at, e.id
+        LIMIT :chunk_size
+        FOR UPDATE OF e SKIP LOCKED
+    ),
+    marked AS (
+        UPDATE billing_usage_events e
+        SET deleted = true
+        FROM picked p
+        WHERE e.id = p.id
+        RETURNING
+            e.theme_id,
+            p.local_date,
+            e.service_type,
+            e.task_type,
+            e.quantity_unit_code,
+            upper(e.tariff_currency_code) AS tariff_currency_code,
+            NULLIF(btrim(e.service_impl), '') AS service_impl,
+            e.quantity,
+            e.cost_tariff_currency,
+            e.cost_display_currency,
+            e.occurred_at,
+            e.id,
+            COALESCE(NULLIF(upper(left(btrim(e.display_currency_code), 3)), ''), :default_ccy)
+                AS display_currency_code
+    ),
+    grouped AS (
+        SELECT
+            theme_id,
+            local_date,
+            service_type,
+            task_type,
+            quantity_unit_code,
+            tariff_currency_code,
+            service_impl,
+            round(sum(quantity), 6) AS sum_quantity,
+            round(sum(cost_tariff_currency), 6) AS sum_cost_tariff_currency,
+            round(sum(cost_display_currency), 6) AS sum_cost_display_currency,
+            (array_agg(display_currency_code ORDER BY occurred_at, id))[1] AS display_currency_code
+        FROM marked
+        GROUP BY
+            theme_id, local_date, service_type, task_type,
+            quantity_unit_code, tariff_currency_code, service_impl
+    ),
+    summaries AS (
+        INSERT INTO billing_daily_summaries (
+            theme_id, summary_local_date, service_type, task_type,
+            quantity_unit_code, tariff_currency_code, service_impl,
+            sum_quantity, sum_cost_tariff_currency, sum_cost_display_currency,
+            display_currency_code
+        )
+        SELECT
+            theme_id, local_date, service_type, task_type,
+            quantity_unit_code, tariff_currency_code, service_impl,
+            sum_quantity, sum_cost_tariff_currency, sum_cost_display_currency,
+            display_currency_code
+        FROM grouped
+        ON CONFLICT (
+            theme_id,
+            summary_local_date,
+            service_type,
+            task_type,
+            quantity_unit_code,
+            tariff_currency_code,
+            (COALESCE(service_impl, ''))
+        ) DO UPDATE SET
+            sum_quantity = billing_daily_summaries.sum_quantity + EXCLUDED.sum_quantity,
+            sum_cost_tariff_currency = billing_daily_summaries.sum_cost_tariff_currency
+                + EXCLUDED.sum_cost_tariff_currency,
+            sum_cost_display_currency = billing_daily_summaries.sum_cost_display_currency
+                + EXCLUDED.sum_cost_display_currency,
+            display_currency_code = EXCLUDED.display_currency_code,
+            updated_at = now()
+    ),
+    tasks AS (
+        INSERT INTO billing_daily_services_tasks (
+            theme_id, summary_local_date, service_type, task_type,
+            sum_cost_display_currency, display_currency_code
+        )
+        SELECT
+            theme_id, local_date, service_type, task_type,
+            sum(sum_cost_display_currency), display_currency_code
+        FROM grouped
+        GROUP BY theme_id, local_date, service_type, task_type, display_currency_code
+        ON CONFLICT ON CONSTRAINT uq_billing_daily_services_tasks_slice DO UPDATE SET
+            sum_cost_display_currency = billing_daily_services_tasks.sum_cost_display_currency
+                + EXCLUDED.sum_cost_display_currency,
+            updated_at = now()
     )
-    ON CONFLICT (
-        theme_id,
-        summary_local_date,
-        service_type,
-        task_type,
-        quantity_unit_code,
-        tariff_currency_code,
-        (COALESCE(service_impl, ''))
-    ) DO UPDATE SET
-        sum_quantity = billing_daily_summaries.sum_quantity + EXCLUDED.sum_quantity,
-        sum_cost_tariff_currency = billing_daily_summaries.sum_cost_tariff_currency
-            + EXCLUDED.sum_cost_tariff_currency,
-        sum_cost_display_currency = billing_daily_summaries.sum_cost_display_currency
-            + EXCLUDED.sum_cost_display_currency,
-        display_currency_code = EXCLUDED.display_currency_code,
-        updated_at = now()
+    SELECT
+        (SELECT count(*) FROM marked) AS events,
+        (SELECT count(*) FROM grouped) AS slices
     """
 )
 
@@ -68,8 +169,85 @@ def _money(value: Decimal) -> Decimal:
     return value.quantize(_MONEY_QUANT, rounding=ROUND_HALF_UP)
 
 
+@dataclass(frozen=True)
+class BillingUsageItem:
+    """Одно событие для record_usage_many (поля — как аргументы record_usage)."""
+
+    theme_id: uuid.UUID
+    task_type: str
+    service_type: str
+    service_impl: str
+    quantity: Decimal
+    quantity_unit_code: str
+    occurred_at: datetime | None = None
+    extra: dict[str, Any] | None = None
+
+
+@dataclass(frozen=True)
+class _TariffSnapshot:
+    """Тариф из billing_tariffs, отвязанный от сессии (живёт в кеше между сессиями)."""
+
+    id: uuid.UUID
+    price: Decimal
+    units_per_price: Decimal
+    currency_code: str
+    valid_from: datetime
+    valid_until: datetime | None
+
+    @classmethod
+    def from_row(cls, row: BillingTariff) -> _TariffSnapshot:
+        return cls(
+            id=row.id,
+            price=Decimal(str(row.price)),
+            units_per_price=Decimal(str(row.units_per_price)),
+            currency_code=row.currency_code.upper(),
+            valid_from=row.valid_from,
+            valid_until=row.valid_until,
+        )
+
+    def covers(self, at: datetime) -> bool:
+        return self.valid_from <= at and (self.valid_until is None or self.valid_until > at)
+
+
+@dataclass(frozen=True)
+class _RateSnapshot:
+    id: uuid.UUID
+    rate: Decimal
+
+
 class BillingService:
-    """Расчёт стоимости по тарифам/курсам и вставка строки в billing_usage_events."""
+    """
+    Расчёт стоимости по тарифам/курсам и вставка строк в billing_usage_events.
+
+    Тарифы, курсы и настройки биллинга тем кешируются в процессе на cache_ttl_s секунд
+    (0 — без кеша). После изменения справочников в БД вызовите invalidate_*.
+    """
+
+    def __init__(self, *, cache_ttl_s: float = _BILLING_CACHE_TTL_S) -> None:
+        # (service_type, service_impl, unit_code) → все тарифы связки, valid_from по убыванию
+        self._tariffs: TTLCache[tuple[str, str, str], tuple[_TariffSnapshot, ...]] = TTLCache(cache_ttl_s)
+        # (from_currency, to_currency, дата) → ближайший курс на дату или раньше (None — курса нет)
+        self._rates: TTLCache[tuple[str, str, date], _RateSnapshot | None] = TTLCache(cache_ttl_s)
+        # theme_id → {"display_currency", "timezone"}
+        self._theme_settings: TTLCache[uuid.UUID, dict[str, str]] = TTLCache(cache_ttl_s)
+
+    def invalidate_tariffs(self) -> None:
+        self._tariffs.clear()
+
+    def invalidate_exchange_rates(self) -> None:
+        self._rates.clear()
+
+    def invalidate_theme_settings(self, theme_id: uuid.UUID | None = None) -> None:
+        """Сбросить настройки биллинга одной темы (или всех при theme_id=None)."""
+        if theme_id is None:
+            self._theme_settings.clear()
+        else:
+            self._theme_settings.pop(theme_id)
+
+    def invalidate_caches(self) -> None:
+        self.invalidate_tariffs()
+        self.invalidate_exchange_rates()
+        self.invalidate_theme_settings()
 
     async def record_usage(
         self,
@@ -89,38 +267,86 @@ class BillingService:
 
         При отсутствии тарифа или курса — BillingConfigError.
         """
+        values = await self._priced_event_values(
+            session,
+            BillingUsageItem(
+                theme_id=theme_id,
+                task_type=task_type,
+                service_type=service_type,
+                service_impl=service_impl,
+                quantity=quantity,
+                quantity_unit_code=quantity_unit_code,
+                occurred_at=occurred_at,
+                extra=extra,
+            ),
+        )
+        row = BillingUsageEvent(**values)
+        session.add(row)
+        await session.flush()
+        return row
+
+    async def record_usage_many(
+        self,
+        session: AsyncSession,
+        items: Sequence[BillingUsageItem],
+    ) -> list[uuid.UUID]:
+        """
+        Пакетная запись: суммы считаются как в record_usage, события вставляются одним INSERT
+        (на каждые _RECORD_MANY_CHUNK событий). Если для любого события нет тарифа или курса —
+        BillingConfigError, и ничего не вставляется.
+
+        Returns:
+            id вставленных событий в порядке items.
+        """
+        rows = [await self._priced_event_values(session, item) for item in items]
+        ids: list[uuid.UUID] = []
+        for i in range(0, len(rows), _RECORD_MANY_CHUNK):
+            result = await session.execute(
+                insert(BillingUsageEvent)
+                .values(rows[i : i + _RECORD_MANY_CHUNK])
+                .returning(BillingUsageEvent.id)
+            )
+            ids.extend(result.scalars().all())
+        return ids
+
+    async def _priced_event_values(
+        self,
+        session: AsyncSession,
+        item: BillingUsageItem,
+    ) -> dict[str, Any]:
+        """Поля строки billing_usage_events для item: тариф, курс и суммы в обеих валютах."""
+        quantity = item.quantity
         if quantity <= 0:
             raise ValueError("quantity must be positive for billing record")
-        at = occurred_at if occurred_at is not None else datetime.now(timezone.utc)
+        at = item.occurred_at if item.occurred_at is not None else datetime.now(timezone.utc)
         if at.tzinfo is None:
             at = at.replace(tzinfo=timezone.utc)
 
-        stats = await self._get_theme_billing_settings(session, theme_id)
+        stats = await self._get_theme_billing_settings(session, item.theme_id)
         display_ccy = stats["display_currency"]
         tz_name = stats["timezone"]
 
         tariff = await self._resolve_tariff(
             session,
-            service_type=service_type,
-            service_impl=service_impl,
-            unit_code=quantity_unit_code,
+            service_type=item.service_type,
+            service_impl=item.service_impl,
+            unit_code=item.quantity_unit_code,
             at=at,
         )
         if tariff is None:
             raise BillingConfigError(
-                f"No billing tariff for service_type={service_type!r} "
-                f"service_impl={service_impl!r} unit_code={quantity_unit_code!r} at {at!r}",
+                f"No billing tariff for service_type={item.service_type!r} "
+                f"service_impl={item.service_impl!r} unit_code={item.quantity_unit_code!r} at {at!r}",
             )
 
-        units_per = Decimal(str(tariff.units_per_price))
+        units_per = tariff.units_per_price
         if units_per <= 0:
             raise BillingConfigError("Invalid tariff: units_per_price must be positive")
 
-        price = Decimal(str(tariff.price))
-        tariff_ccy = tariff.currency_code.upper()
-        cost_tariff = _money((quantity / units_per) * price)
+        tariff_ccy = tariff.currency_code
+        cost_tariff = _money((quantity / units_per) * tariff.price)
 
-        rate_row: BillingExchangeRate | None = None
+        rate_row: _RateSnapshot | None = None
         if tariff_ccy == display_ccy.upper():
             cost_display = cost_tariff
         else:
@@ -135,54 +361,54 @@ class BillingService:
                 raise BillingConfigError(
                     f"No exchange rate {tariff_ccy!r} -> {display_ccy.upper()!r} on date {rate_date}",
                 )
-            rate = Decimal(str(rate_row.rate))
-            cost_display = _money(cost_tariff * rate)
-
-        impl = (service_impl or "").strip() or None
-
-        row = BillingUsageEvent(
-            theme_id=theme_id,
-            occurred_at=at,
-            service_type=service_type,
-            task_type=task_type,
-            service_impl=impl,
-            quantity=quantity,
-            quantity_unit_code=quantity_unit_code,
-            extra=extra,
-            cost_tariff_currency=cost_tariff,
-            tariff_currency_code=tariff_ccy,
-            cost_display_currency=cost_display,
-            display_currency_code=display_ccy.upper(),
-            tariff_id=tariff.id,
-            exchange_rate_id=rate_row.id if rate_row else None,
-            deleted=False,
-        )
-        session.add(row)
-        await session.flush()
-        return row
+            cost_display = _money(cost_tariff * rate_row.rate)
+
+        return {
+            "theme_id": item.theme_id,
+            "occurred_at": at,
+            "service_type": item.service_type,
+            "task_type": item.task_type,
+            "service_impl": (item.service_impl or "").strip() or None,
+            "quantity": quantity,
+            "quantity_unit_code": item.quantity_unit_code,
+            "extra": item.extra,
+            "cost_tariff_currency": cost_tariff,
+            "tariff_currency_code": tariff_ccy,
+            "cost_display_currency": cost_display,
+            "display_currency_code": display_ccy.upper(),
+            "tariff_id": tariff.id,
+            "exchange_rate_id": rate_row.id if rate_row else None,
+            "deleted": False,
+        }
 
     async def _get_theme_billing_settings(
         self,
         session: AsyncSession,
         theme_id: uuid.UUID,
     ) -> dict[str, str]:
+        cached = self._theme_settings.get(theme_id)
+        if cached is not MISSING:
+            return cached
         q = await session.execute(
             select(ThemeStats.billing_display_currency, ThemeStats.billing_timezone)
             .where(ThemeStats.theme_id == theme_id)
             .order_by(ThemeStats.id)
-            .limit(1),
+            .limit(1)
         )
         row = q.first()
         if row is None:
+            # Без кеша: строка theme_stats может появиться позже со своими настройками
             return {
-                "display_currency": "RUB",
-                "timezone": "Asia/Krasnoyarsk",
+                "display_currency": _DEFAULT_DISPLAY_CURRENCY,
+                "timezone": _DEFAULT_BILLING_TIMEZONE,
             }
         ccy, tz = row[0], row[1]
-        return {
-            "display_currency": (ccy or "RUB").strip().upper()[:3],
-            "timezone": (tz or "Asia/Krasnoyarsk").strip(),
+        settings = {
+            "display_currency": (ccy or _DEFAULT_DISPLAY_CURRENCY).strip().upper()[:3],
+            "timezone": (tz or _DEFAULT_BILLING_TIMEZONE).strip(),
         }
+        self._theme_settings.put(theme_id, settings)
+        return settings
 
     async def _resolve_tariff(
         self,
@@ -192,21 +418,24 @@ class BillingService:
         service_impl: str,
         unit_code: str,
         at: datetime,
-    ) -> BillingTariff | None:
-        stmt = (
-            select(BillingTariff)
-            .where(
-                BillingTariff.service_type == service_type,
-                BillingTariff.service_impl == service_impl,
-                BillingTariff.unit_code == unit_code,
-                BillingTariff.valid_from <= at,
-                or_(BillingTariff.valid_until.is_(None), BillingTariff.valid_until > at),
+    ) -> _TariffSnapshot | None:
+        # Кешируется вся история тарифов связки: действующий на момент at выбирается в памяти,
+        # поэтому один кеш-ключ покрывает любые даты событий, в том числе смену тарифа внутри дня.
+        key = (service_type, service_impl, unit_code)
+        tariffs = self._tariffs.get(key)
+        if tariffs is MISSING:
+            res = await session.execute(
+                select(BillingTariff)
+                .where(
+                    BillingTariff.service_type == service_type,
+                    BillingTariff.service_impl == service_impl,
+                    BillingTariff.unit_code == unit_code,
+                )
+                .order_by(BillingTariff.valid_from.desc())
             )
-            .order_by(BillingTariff.valid_from.desc())
-            .limit(1)
-        )
-        res = await session.execute(stmt)
-        return res.scalars().first()
+            tariffs = tuple(_TariffSnapshot.from_row(t) for t in res.scalars())
+            self._tariffs.put(key, tariffs)
+        return next((t for t in tariffs if t.covers(at)), None)
 
     def _local_date_for_theme(self, at_utc: datetime, tz_name: str) -> date:
         try:
@@ -226,7 +455,11 @@ class BillingService:
         rate_date: date,
         from_currency: str,
         to_currency: str,
-    ) -> BillingExchangeRate | None:
+    ) -> _RateSnapshot | None:
+        key = (from_currency, to_currency, rate_date)
+        cached = self._rates.get(key)
+        if cached is not MISSING:
+            return cached
         # Берём ближайший курс на дату или раньше:
         # сиды могут содержать не ежедневные значения.
         stmt = (
@@ -242,9 +475,18 @@ class BillingService:
             .limit(1)
         )
         res = await session.execute(stmt)
-        return res.scalars().first()
+        row = res.scalars().first()
+        rate = _RateSnapshot(id=row.id, rate=Decimal(str(row.rate))) if row is not None else None
+        self._rates.put(key, rate)
+        return rate
 
-    async def rollup_usage_events_to_daily(self, session: AsyncSession) -> int:
+    async def rollup_usage_events_to_daily(
+        self,
+        session: AsyncSession,
+        *,
+        chunk_size: int = _BILLING_ROLLUP_CHUNK_SIZE,
+        commit_each_chunk: bool = False,
+    ) -> int:
         """
         Свернуть детальные billing_usage_events в billing_daily_summaries.
 
@@ -258,158 +500,42 @@ class BillingService:
         При конфликте по ключу — суммы прибавляются (UPSERT). Обработанным строкам
         выставляется deleted=True.
 
+        Всё считается в SQL чанками по chunk_size событий (один оператор на чанк), память
+        не зависит от объёма хвоста. commit_each_chunk=True — фиксировать каждый чанк отдельно
+        (короткие транзакции; уже свёрнутое не откатывается при сбое на следующем чанке).
+
         Returns:
             Число помеченных детальных событий.
         """
-        stats_rows = (
-            await session.execute(
-                select(ThemeStats.theme_id, ThemeStats.billing_timezone, ThemeStats.billing_display_currency)
-                .order_by(ThemeStats.theme_id, ThemeStats.id),
-            )
-        ).all()
-        theme_settings: dict[uuid.UUID, tuple[str, str]] = {}
-        for tid, tz_raw, ccy_raw in stats_rows:
-            if tid not in theme_settings:
-                tz_name = (tz_raw or "").strip() or "Asia/Krasnoyarsk"
-                ccy = (ccy_raw or "RUB").strip().upper()[:3] or "RUB"
-                theme_settings[tid] = (tz_name, ccy)
-
-        ev_res = await session.execute(
-            select(BillingUsageEvent).where(BillingUsageEvent.deleted.is_(False)),
-        )
-        events = list(ev_res.scalars().all())
-        if not events:
-            return 0
-
-        from zoneinfo import ZoneInfo
-
-        def _zone(tz_name: str):
-            try:
-                return ZoneInfo(tz_name.strip())
-            except Exception:
-                return ZoneInfo("UTC")
-
-        # key -> {sums + display_ccy}; service_impl в ключе — нормализованная строка (пустая = один слот)
-        buckets: dict[
-            tuple[uuid.UUID, date, str, str, str, str, str],
-            dict[str, Any],
-        ] = defaultdict(
-            lambda: {
-                "sum_quantity": Decimal(0),
-                "sum_cost_tariff_currency": Decimal(0),
-                "sum_cost_display_currency": Decimal(0),
-                "display_currency_code": "",
-                "ids": [],
-            },
-        )
-
-        for e in events:
-            tid = e.theme_id
-            tz_name, _ = theme_settings.get(tid, ("Asia/Krasnoyarsk", "RUB"))
-            zi = _zone(tz_name)
-            local_d = e.occurred_at.astimezone(zi).date()
-            today_local = datetime.now(zi).date()
-            last_foldable = today_local - timedelta(days=_BILLING_ROLLUP_LAG_DAYS)
-            if local_d > last_foldable:
-                continue
-
-            impl_key = (e.service_impl or "").strip()
-            key = (
-                tid,
-                local_d,
-                e.service_type,
-                e.task_type,
-                e.quantity_unit_code,
-                e.tariff_currency_code.upper(),
-                impl_key,
-            )
-            b = buckets[key]
-            b["sum_quantity"] += Decimal(str(e.quantity))
-            b["sum_cost_tariff_currency"] += Decimal(str(e.cost_tariff_currency))
-            b["sum_cost_display_currency"] += Decimal(str(e.cost_display_currency))
-            if not b["display_currency_code"]:
-                b["display_currency_code"] = (e.display_currency_code or "").strip().upper()[:3] or "RUB"
-            b["ids"].append(e.id)
-
-        if not buckets:
-            return 0
-
-        task_deltas: dict[tuple[uuid.UUID, date, str, str, str], Decimal] = defaultdict(
-            lambda: Decimal(0),
-        )
-
-        for key, b in buckets.items():
-            (
-                theme_id,
-                summary_local_date,
-                service_type,
-                task_type,
-                quantity_unit_code,
-                tariff_currency_code,
-                impl_key,
-            ) = key
-            sq = _money(b["sum_quantity"])
-            sct = _money(b["sum_cost_tariff_currency"])
-            scd = _money(b["sum_cost_display_currency"])
-            dcc = b["display_currency_code"] or "RUB"
-            impl_db = impl_key if impl_key else None
-
-            await session.execute(
-                _DAILY_SUMMARY_UPSERT,
-                {
-                    "theme_id": theme_id,
-                    "summary_local_date": summary_local_date,
-                    "service_type": service_type,
-                    "task_type": task_type,
-                    "quantity_unit_code": quantity_unit_code,
-                    "tariff_currency_code": tariff_currency_code,
-                    "service_impl": impl_db,
-                    "sum_quantity": sq,
-                    "sum_cost_tariff_currency": sct,
-                    "sum_cost_display_currency": scd,
-                    "display_currency_code": dcc,
-                },
-            )
-
-            tk = (theme_id, summary_local_date, service_type, task_type, dcc)
-            task_deltas[tk] += scd
-
-        for (theme_id, summary_local_date, service_type, task_type, dcc), add_amt in task_deltas.items():
-            amt = _money(add_amt)
-            insert_stmt = pg_insert(BillingDailyServicesTasks).values(
-                theme_id=theme_id,
-                summary_local_date=summary_local_date,
-                service_type=service_type,
-                task_type=task_type,
-                sum_cost_display_currency=amt,
-                display_currency_code=dcc,
-            )
-            upsert_tasks = insert_stmt.on_conflict_do_update(
-                constraint="uq_billing_daily_services_tasks_slice",
-                set_={
-                    "sum_cost_display_currency": BillingDailyServicesTasks.sum_cost_display_currency
-                    + insert_stmt.excluded.sum_cost_display_currency,
-                    "updated_at": func.now(),
-                },
+        chunk_size = max(1, chunk_size)
+        total_events = 0
+        total_slices = 0
+        while True:
+            row = (
+                await session.execute(
+                    _ROLLUP_CHUNK_SQL,
+                    {
+                        "default_tz": _DEFAULT_BILLING_TIMEZONE,
+                        "default_ccy": _DEFAULT_DISPLAY_CURRENCY,
+                        "lag_days": _BILLING_ROLLUP_LAG_DAYS,
+                        "chunk_size": chunk_size,
+                    },
+                )
+            ).one()
+            if commit_each_chunk:
+                await session.commit()
+            total_events += int(row.events)
+            total_slices += int(row.slices)
+            if row.events < chunk_size:
+                break
+
+        if total_events:
+            logger.info(
+                "billing rollup: свернуто детальных событий=%s, срезов сводки (по чанкам)=%s",
+                total_events,
+                total_slices,
             )
-            await session.execute(upsert_tasks)
-
-        all_ids: list[uuid.UUID] = []
-        for b in buckets.values():
-            all_ids.extend(b["ids"])
-
-        await session.execute(
-            update(BillingUsageEvent)
-            .where(BillingUsageEvent.id.in_(all_ids))
-            .values(deleted=True),
-        )
-
-        logger.info(
-            "billing rollup: свернуто детальных событий=%s, уникальных срезов сводки=%s",
-            len(all_ids),
-            len(buckets),
-        )
-        return len(all_ids)
+        return total_events
 
 
 if TYPE_CHECKING:
@@ -3,21 +3,25 @@
 Обрабатывает пакеты квантов с entity_extraction_version = null;
 для каждого кванта: ИИ извлекает атомы/кластеры/аббревиатуры, резолв аббревиатур,
 нормализация атомов и кластеров, запись в БД и relations.
+Этап ИИ выполняется для нескольких квантов батча конкурентно, запись в БД — последовательно.
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
 import re
 from collections import Counter
+from dataclasses import dataclass
 from typing import Any, Optional
 
-from sqlalchemy import func, select, text as sql_text, update
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import Float, Integer, Text, column, literal_column, select, text as sql_text, update, values
+from sqlalchemy.dialects.postgresql import UUID, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import Settings, get_settings
 from app.integrations.llm import LLMService
 from app.integrations.prompts import PromptService
 from app.modules.entity.model import (
@@ -29,6 +33,7 @@ from app.modules.entity.model import (
     ClusterAtom,
     ThemeStats,
 )
+from app.modules.entity.scoring import apply_atom_score_deltas, apply_cluster_score_deltas, raise_theme_stat
 from app.modules.quanta.models import Quantum
 from app.modules.relation.model import Relation
 from app.modules.theme.model import Theme
@@ -140,12 +145,104 @@ def _is_english(lang: str | None) -> bool:
     return (lang or "").strip().lower() in ("en", "eng", "english")
 
 
+def _inserted_flag() -> Any:
+    """Колонка RETURNING: true — строка вставлена, false — уже была (ON CONFLICT DO UPDATE)."""
+    return literal_column("(xmax = 0)").label("inserted")
+
+
+def build_atoms_upsert_stmt(theme_id: Any, lemmas: list[str]) -> Any:
+    """
+    Get-or-create атомов темы одним запросом: INSERT ... ON CONFLICT (theme_id, lemma) DO UPDATE (без изменений,
+    чтобы существующие строки тоже попали в RETURNING) RETURNING id, lemma, inserted.
+    """
+    atoms_t = Atom.__table__
+    stmt = insert(atoms_t).values(
+        [{"theme_id": theme_id, "lemma": lemma, "global_cluster_df": 0, "global_score": 0.0} for lemma in lemmas]
+    )
+    return stmt.on_conflict_do_update(
+        constraint="uq_atoms_theme_id_lemma",
+        set_={"lemma": stmt.excluded.lemma},
+    ).returning(atoms_t.c.id, atoms_t.c.lemma, _inserted_flag())
+
+
+def build_clusters_upsert_stmt(theme_id: Any, rows: list[dict[str, Any]]) -> Any:
+    """
+    Get-or-create кластеров темы с приростом global_df одним запросом.
+    rows: normalized_text (уникальны), display_text, type, global_df — прирост (для нового кластера — начальное значение).
+    У существующего кластера меняется только global_df; RETURNING id, normalized_text, global_df, inserted.
+    """
+    clusters_t = Cluster.__table__
+    stmt = insert(clusters_t).values([{"theme_id": theme_id, "global_score": 0.0, **row} for row in rows])
+    return stmt.on_conflict_do_update(
+        constraint="uq_clusters_theme_id_normalized_text",
+        set_={"global_df": clusters_t.c.global_df + stmt.excluded.global_df},
+    ).returning(clusters_t.c.id, clusters_t.c.normalized_text, clusters_t.c.global_df, _inserted_flag())
+
+
+def build_atom_df_increment_stmt(deltas: dict[Any, int]) -> Any:
+    """UPDATE atoms SET global_cluster_df = global_cluster_df + v.delta FROM (VALUES (atom_id, delta), ...) v RETURNING id, df."""
+    atoms_t = Atom.__table__
+    v = values(
+        column("atom_id", UUID(as_uuid=True)),
+        column("delta", Integer),
+        name="v",
+    ).data(list(deltas.items()))
+    return (
+        update(atoms_t)
+        .where(atoms_t.c.id == v.c.atom_id)
+        .values(global_cluster_df=atoms_t.c.global_cluster_df + v.c.delta)
+        .returning(atoms_t.c.id, atoms_t.c.global_cluster_df)
+    )
+
+
+def build_atom_specificity_stmt(theme_id: Any, scores: dict[str, float]) -> Any:
+    """Проставить specificity_score атомам темы по лемме (только тем, у кого её ещё нет) — UPDATE ... FROM (VALUES ...)."""
+    atoms_t = Atom.__table__
+    v = values(
+        column("lemma", Text),
+        column("score", Float),
+        name="v",
+    ).data(list(scores.items()))
+    return (
+        update(atoms_t)
+        .where(
+            atoms_t.c.theme_id == theme_id,
+            atoms_t.c.lemma == v.c.lemma,
+            atoms_t.c.specificity_score.is_(None),
+        )
+        .values(specificity_score=v.c.score)
+        .returning(atoms_t.c.id)
+    )
+
+
+@dataclass
+class _PreparedQuantum:
+    """Результат этапа ИИ для одного кванта — всё, что нужно для записи в БД."""
+
+    quantum: Quantum
+    candidate_atoms: set[str]
+    candidate_clusters_with_count: Counter[tuple[str, ...]]
+    cluster_display_overrides: dict[tuple[str, ...], str]
+    cluster_type_by_key: dict[tuple[str, ...], str]
+    # (аббревиатура, леммы расшифровки, кластеры расшифровки) — новые для темы
+    new_abbreviations: list[tuple[str, list[str], set[tuple[str, ...]]]]
+    specificity_by_lemma: dict[str, float]
+    dbg: Optional[logging.Logger] = None
+
+
 class AtomsClustersExtractor:
     """Экстрактор атомов и кластеров из квантов (v2.0): summary_text → ИИ → atoms/clusters/abbreviations."""
 
-    def __init__(self, llm_service: LLMService, prompt_service: PromptService) -> None:
+    def __init__(
+        self,
+        llm_service: LLMService,
+        prompt_service: PromptService,
+        settings: Settings | None = None,
+    ) -> None:
         self._llm = llm_service
         self._prompt = prompt_service
+        # Сколько квантов батча одновременно проходят этап ИИ
+        self._max_concurrency = max(1, (settings or get_settings()).ENTITY_EXTRACTION_MAX_CONCURRENCY)
 
     async def process_next_batch(
         self,
@@ -157,13 +254,19 @@ class AtomsClustersExtractor:
         stop_after_first_prompt: bool = False,
     ) -> int:
         """
-        Обработать квант(ы) с entity_extraction_version = null.
+        Обработать до batch_size квантов с entity_extraction_version = null.
+
+        LLM-этап (извлечение, перевод кластеров, расшифровка аббревиатур, типы кластеров, специфичность)
+        выполняется для нескольких квантов одновременно — не больше ENTITY_EXTRACTION_MAX_CONCURRENCY; чтения из БД на этом
+        этапе и запись результатов кванта идут под блокировкой сессии (LLMService.session_lock), запись —
+        по одному кванту в SAVEPOINT, чтобы ошибка одного кванта не откатывала остальные.
         stop_after_first_prompt: для отладки — после первого ответа ИИ логировать и выйти, в БД ничего не писать.
         """
         stmt = (
             select(Quantum)
             .where(Quantum.entity_extraction_version.is_(None))
             .order_by(Quantum.created_at)
+            .limit(max(1, batch_size))
             .with_for_update(skip_locked=True)
         )
         if theme_id is not None:
@@ -173,21 +276,37 @@ class AtomsClustersExtractor:
         if not quanta:
             return 0
 
-        for q in quanta:
+        primary_lang_by_theme: dict[Any, str] = {}
+        for tid in {q.theme_id for q in quanta}:
+            primary_lang_by_theme[tid] = _theme_primary_language(await session.get(Theme, tid))
+
+        lock = self._llm.session_lock(session)
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def _run(q: Quantum) -> None:
             try:
-                await self._process_one_quantum(
-                    session,
-                    q,
-                    debug_log=debug_log,
-                    stop_after_first_prompt=stop_after_first_prompt,
-                )
+                async with semaphore:
+                    prepared = await self._prepare_quantum(
+                        session,
+                        q,
+                        lock=lock,
+                        primary_lang=primary_lang_by_theme.get(q.theme_id, "en"),
+                        debug_log=debug_log,
+                        stop_after_first_prompt=stop_after_first_prompt,
+                    )
+                if prepared is None:
+                    return
+                async with lock:
+                    async with session.begin_nested():
+                        await self._write_quantum(session, prepared)
             except Exception as e:
                 logger.exception(
                     "atoms_clusters_extractor: failed for quantum_id=%s: %s",
                     q.id,
                     e,
                 )
-                continue
+
+        await asyncio.gather(*(_run(q) for q in quanta))
 
         if not stop_after_first_prompt:
             await session.execute(
@@ -196,38 +315,29 @@ class AtomsClustersExtractor:
                 .values(entity_extraction_version=ENTITY_EXTRACTION_VERSION_V2)
             )
             await session.flush()
-
-            # После обработки батча пересчитываем global_score для атомов и кластеров по затронутым темам.
-            theme_ids = {q.theme_id for q in quanta if q.theme_id}
-            if theme_id is not None:
-                theme_ids = {theme_id}
-            for tid in theme_ids:
-                await self._recalculate_atom_scores_for_theme(session, tid)
-                await self._recalculate_cluster_scores_for_theme(session, tid)
-            await session.flush()
         return len(quanta)
 
-    async def _process_one_quantum(
+    async def _prepare_quantum(
         self,
         session: AsyncSession,
         quantum: Quantum,
         *,
+        lock: asyncio.Lock,
+        primary_lang: str,
         debug_log: bool = False,
         stop_after_first_prompt: bool = False,
-    ) -> None:
+    ) -> Optional[_PreparedQuantum]:
+        """
+        LLM-этап для одного кванта: всё, что требует вызовов ИИ, без записи в БД.
+        Чтения из БД — только под lock (сессия общая для квантов батча); во время вызова LLM lock не держим.
+        None — писать нечего (пустой summary/ответ, невалидный JSON, отладочная остановка).
+        """
         theme_id = quantum.theme_id
         summary = (quantum.summary_text or "").strip()
         dbg = _get_entity_debug_logger() if debug_log else None
-        atoms_added: list[str] = []
-        clusters_added: list[tuple[str, str]] = []  # (normalized_text, type)
-        abbreviations_added: list[str] = []
 
         if not summary:
-            await session.execute(
-                update(Quantum).where(Quantum.id == quantum.id).values(entity_extraction_version=ENTITY_EXTRACTION_VERSION_V2)
-            )
-            await session.flush()
-            return
+            return None
 
         if dbg:
             dbg.info(
@@ -254,21 +364,17 @@ class AtomsClustersExtractor:
         if stop_after_first_prompt:
             if dbg:
                 dbg.info("ENTITY EXTRACT (debug): остановка после первого промпта, в БД не пишем.")
-            return
+            return None
         if not raw:
             logger.warning("atoms_clusters_extractor: empty LLM response for quantum_id=%s", quantum.id)
-            await session.execute(
-                update(Quantum).where(Quantum.id == quantum.id).values(entity_extraction_version=ENTITY_EXTRACTION_VERSION_V2)
-            )
-            await session.flush()
-            return
+            return None
 
         text_for_json = _strip_json_markdown(raw)
         try:
             data = json.loads(text_for_json)
         except json.JSONDecodeError as e:
             logger.warning("atoms_clusters_extractor: invalid JSON quantum_id=%s: %s", quantum.id, e)
-            return
+            return None
 
         # clusters: список строк (терминов), abbreviations: список акронимов
         clusters_raw = data.get("clusters") or []
@@ -287,8 +393,6 @@ class AtomsClustersExtractor:
 
         q_lang = (quantum.language or "").strip() or None
         is_english = _is_english(q_lang)
-        theme = await session.get(Theme, theme_id)
-        primary_lang = _theme_primary_language(theme)
 
         # 2) Если язык не английский — сразу переводим кластеры на английский
         # Атомы отдельно не переводим, будем выделять их уже из английских кластеров.
@@ -351,46 +455,26 @@ class AtomsClustersExtractor:
         if dbg and candidate_atoms:
             dbg.info("ENTITY ATOMS (normalized, no prepositions): %s", sorted(candidate_atoms))
 
-        # 4) Аббревиатуры (только для английского)
+        # 4) Аббревиатуры (только для английского): известные теме — из БД, новые — расшифровка ИИ
+        # (запись новых аббревиатур — на этапе записи кванта)
+        abbr_list = list(dict.fromkeys(
+            a.strip() for a in abbreviations_raw if isinstance(a, str) and a.strip()
+        ))
+        known_abbreviations: dict[str, tuple[list[str], list[tuple[str, ...]]]] = {}
+        if abbr_list:
+            async with lock:
+                known_abbreviations = await self._load_known_abbreviations(session, theme_id, abbr_list)
         n_atoms = len(atoms_list)
         start_atom_number = n_atoms + 1
         abbr_to_expansion: dict[str, list[str]] = {}
-        for abbr in abbreviations_raw:
-            if not isinstance(abbr, str) or not (abbr or "").strip():
-                continue
-            abbr_clean = (abbr or "").strip()
-            # Есть ли в БД?
-            existing_abbr = await session.execute(
-                select(Abbreviation).where(
-                    Abbreviation.theme_id == theme_id,
-                    Abbreviation.abbreviation == abbr_clean,
-                )
-            )
-            row = existing_abbr.scalar_one_or_none()
-            if row:
-                # Подгрузить атомы и кластеры этой аббревиатуры
-                aa = await session.execute(select(AbbreviationAtom).where(AbbreviationAtom.abbreviation_id == row.id))
-                expansion_lemmas: list[str] = []
-                for link in aa.scalars().all():
-                    atom = await session.get(Atom, link.atom_id)
-                    if atom and atom.lemma:
-                        candidate_atoms.add(atom.lemma)
-                        expansion_lemmas.append(atom.lemma)
-                ac = await session.execute(select(AbbreviationCluster).where(AbbreviationCluster.abbreviation_id == row.id))
-                for link in ac.scalars().all():
-                    cluster = await session.get(Cluster, link.cluster_id)
-                    if cluster:
-                        ca_list = await session.execute(
-                            select(ClusterAtom).where(ClusterAtom.cluster_id == cluster.id).order_by(ClusterAtom.position)
-                        )
-                        atom_ids = [r.atom_id for r in ca_list.scalars().all()]
-                        lemmas = []
-                        for aid in atom_ids:
-                            a = await session.get(Atom, aid)
-                            if a and a.lemma:
-                                lemmas.append(a.lemma)
-                        if lemmas:
-                            candidate_clusters_with_count[tuple(lemmas)] += 1
+        new_abbreviations: list[tuple[str, list[str], set[tuple[str, ...]]]] = []
+        for abbr_clean in abbr_list:
+            known = known_abbreviations.get(abbr_clean)
+            if known is not None:
+                expansion_lemmas, cluster_keys = known
+                candidate_atoms.update(expansion_lemmas)
+                for key in cluster_keys:
+                    candidate_clusters_with_count[key] += 1
                 abbr_lemma = _normalize_lemma(abbr_clean)
                 if abbr_lemma and expansion_lemmas:
                     abbr_to_expansion[abbr_lemma] = expansion_lemmas
@@ -426,14 +510,13 @@ class AtomsClustersExtractor:
             if not abbr_atoms:
                 continue
 
-            for lemma in abbr_atoms:
-                await self._get_or_create_atom(session, theme_id, lemma, atoms_added=atoms_added if dbg else None)
             start_atom_number += len(abbr_atoms)
             candidate_atoms.update(abbr_atoms)
             abbr_lemma = _normalize_lemma(abbr_clean)
             if abbr_lemma and abbr_atoms:
                 abbr_to_expansion[abbr_lemma] = abbr_atoms
 
+            abbr_cluster_keys: set[tuple[str, ...]] = set()
             for c in abbr_clusters_raw:
                 if not isinstance(c, list):
                     continue
@@ -445,40 +528,8 @@ class AtomsClustersExtractor:
                             lemmas_here.append(abbr_atoms[idx])
                 if lemmas_here:
                     candidate_clusters_with_count[tuple(lemmas_here)] += 1
-
-            new_abbr = Abbreviation(theme_id=theme_id, abbreviation=abbr_clean)
-            session.add(new_abbr)
-            await session.flush()
-            if dbg:
-                abbreviations_added.append(abbr_clean)
-            for lemma in abbr_atoms:
-                aid = (await session.execute(select(Atom).where(Atom.theme_id == theme_id, Atom.lemma == lemma))).scalar_one().id
-                session.add(AbbreviationAtom(abbreviation_id=new_abbr.id, atom_id=aid))
-            abbr_cluster_keys = set()
-            for c in abbr_clusters_raw:
-                if not isinstance(c, list):
-                    continue
-                lemmas_here = []
-                for num in c:
-                    if isinstance(num, (int, float)):
-                        idx = int(num) - start_used
-                        if 0 <= idx < len(abbr_atoms):
-                            lemmas_here.append(abbr_atoms[idx])
-                if lemmas_here:
                     abbr_cluster_keys.add(tuple(lemmas_here))
-            for key in abbr_cluster_keys:
-                cluster_entity = await self._get_or_create_cluster_for_quantum(
-                    session,
-                    theme_id,
-                    list(key),
-                    quantum,
-                    count=1,
-                    clusters_added=clusters_added if dbg else None,
-                    dbg=dbg,
-                )
-                if cluster_entity:
-                    session.add(AbbreviationCluster(abbreviation_id=new_abbr.id, cluster_id=cluster_entity.id))
-            await session.flush()
+            new_abbreviations.append((abbr_clean, abbr_atoms, abbr_cluster_keys))
 
         # 5) После обработки аббревиатур: заменить аббревиатуры в кластерах на расшифровку
         if abbr_to_expansion:
@@ -535,17 +586,22 @@ class AtomsClustersExtractor:
                 t = types[i] if i < len(types) else "other"
                 cluster_type_by_key[key] = t if t in VALID_CLUSTER_TYPES else "other"
 
-        # 7) Уникальные атомы: получить/создать в БД; для новых — оценка специфичности
+        # 7) Оценка специфичности атомов, у которых её ещё нет (новых для темы)
+        specificity_by_lemma: dict[str, float] = {}
         unique_atoms = sorted(candidate_atoms)
-        lemma_to_atom_id: dict[str, Any] = {}
-        new_lemmas: list[str] = []
-        for lemma in unique_atoms:
-            atom_id = await self._get_or_create_atom(session, theme_id, lemma, atoms_added=atoms_added if dbg else None)
-            lemma_to_atom_id[lemma] = atom_id
-            existing = await session.execute(select(Atom).where(Atom.id == atom_id))
-            a = existing.scalar_one()
-            if a.specificity_score is None:
-                new_lemmas.append(lemma)
+        if unique_atoms:
+            async with lock:
+                scored = await session.execute(
+                    select(Atom.lemma).where(
+                        Atom.theme_id == theme_id,
+                        Atom.lemma.in_(unique_atoms),
+                        Atom.specificity_score.is_not(None),
+                    )
+                )
+                scored_lemmas = set(scored.scalars().all())
+            new_lemmas = [lemma for lemma in unique_atoms if lemma not in scored_lemmas]
+        else:
+            new_lemmas = []
 
         if new_lemmas:
             spec_vars = {"atoms_json": json.dumps(new_lemmas, ensure_ascii=False)}
@@ -570,93 +626,254 @@ class AtomsClustersExtractor:
                         if i < len(scores) and isinstance(scores[i], (int, float)):
                             score = float(scores[i])
                             if 0 <= score <= 1:
-                                await session.execute(
-                                    update(Atom)
-                                    .where(Atom.theme_id == theme_id, Atom.lemma == lemma)
-                                    .values(specificity_score=score)
-                                )
-                except (json.JSONDecodeError, TypeError):
+                                specificity_by_lemma[lemma] = score
+                except (json.JSONDecodeError, TypeError, AttributeError):
                     pass
-        await session.flush()
 
-        # 8) Уникальные кластеры: получить/создать кластер, обновить global_df/global_score
+        return _PreparedQuantum(
+            quantum=quantum,
+            candidate_atoms=candidate_atoms,
+            candidate_clusters_with_count=candidate_clusters_with_count,
+            cluster_display_overrides=cluster_display_overrides,
+            cluster_type_by_key=cluster_type_by_key,
+            new_abbreviations=new_abbreviations,
+            specificity_by_lemma=specificity_by_lemma,
+            dbg=dbg,
+        )
+
+    async def _load_known_abbreviations(
+        self,
+        session: AsyncSession,
+        theme_id: Any,
+        abbreviations: list[str],
+    ) -> dict[str, tuple[list[str], list[tuple[str, ...]]]]:
+        """
+        Аббревиатуры, уже известные теме: abbreviation -> (леммы расшифровки, кластеры как кортежи лемм).
+        Три запроса на весь список: аббревиатуры, их атомы, их кластеры с составом.
+        """
+        res = await session.execute(
+            select(Abbreviation.id, Abbreviation.abbreviation).where(
+                Abbreviation.theme_id == theme_id,
+                Abbreviation.abbreviation.in_(abbreviations),
+            )
+        )
+        name_by_id: dict[Any, str] = {}
+        for abbr_id, name in res.all():
+            # При дублях в БД берём первую запись, как scalar_one_or_none в прежней версии ожидал одну
+            if name not in name_by_id.values():
+                name_by_id[abbr_id] = name
+        if not name_by_id:
+            return {}
+
+        expansion_by_id: dict[Any, list[str]] = {abbr_id: [] for abbr_id in name_by_id}
+        res = await session.execute(
+            select(AbbreviationAtom.abbreviation_id, Atom.lemma)
+            .join(Atom, Atom.id == AbbreviationAtom.atom_id)
+            .where(AbbreviationAtom.abbreviation_id.in_(list(name_by_id)))
+        )
+        for abbr_id, lemma in res.all():
+            if lemma:
+                expansion_by_id[abbr_id].append(lemma)
+
+        clusters_by_id: dict[Any, dict[Any, list[str]]] = {abbr_id: {} for abbr_id in name_by_id}
+        res = await session.execute(
+            select(AbbreviationCluster.abbreviation_id, ClusterAtom.cluster_id, Atom.lemma)
+            .join(ClusterAtom, ClusterAtom.cluster_id == AbbreviationCluster.cluster_id)
+            .join(Atom, Atom.id == ClusterAtom.atom_id)
+            .where(AbbreviationCluster.abbreviation_id.in_(list(name_by_id)))
+            .order_by(AbbreviationCluster.abbreviation_id, ClusterAtom.cluster_id, ClusterAtom.position)
+        )
+        for abbr_id, cluster_id, lemma in res.all():
+            if lemma:
+                clusters_by_id[abbr_id].setdefault(cluster_id, []).append(lemma)
+
+        return {
+            name: (expansion_by_id[abbr_id], [tuple(lemmas) for lemmas in clusters_by_id[abbr_id].values()])
+            for abbr_id, name in name_by_id.items()
+        }
+
+    async def _write_quantum(self, session: AsyncSession, prepared: _PreparedQuantum) -> None:
+        """
+        Этап записи для одного кванта: аббревиатуры, атомы, кластеры, relations, df. Вызывать под lock сессии.
+        Число запросов не зависит от числа атомов и кластеров: get-or-create — INSERT ... ON CONFLICT ... RETURNING,
+        приращения счётчиков — UPDATE ... FROM (VALUES ...).
+        """
+        quantum = prepared.quantum
+        theme_id = quantum.theme_id
+        dbg = prepared.dbg
+        candidate_clusters_with_count = prepared.candidate_clusters_with_count
+
+        # 4) Новые аббревиатуры (кроме записанных параллельно другим квантом батча)
+        created_abbreviations: dict[str, Any] = {}
+        if prepared.new_abbreviations:
+            names = [name for name, _, _ in prepared.new_abbreviations]
+            res = await session.execute(
+                select(Abbreviation.abbreviation).where(
+                    Abbreviation.theme_id == theme_id,
+                    Abbreviation.abbreviation.in_(names),
+                )
+            )
+            already = set(res.scalars().all())
+            to_create = [name for name in names if name not in already]
+            if to_create:
+                res = await session.execute(
+                    insert(Abbreviation.__table__)
+                    .values([{"theme_id": theme_id, "abbreviation": name} for name in to_create])
+                    .returning(Abbreviation.__table__.c.id, Abbreviation.__table__.c.abbreviation)
+                )
+                created_abbreviations = {name: abbr_id for abbr_id, name in res.all()}
+        new_abbreviations = [entry for entry in prepared.new_abbreviations if entry[0] in created_abbreviations]
+
+        # Кластеры кванта (по normalized_text) с приростом df; кластер расшифровки новой аббревиатуры — ещё +1
+        cluster_rows: dict[str, dict[str, Any]] = {}
+        cluster_lemmas: dict[str, tuple[str, ...]] = {}
+
+        def _add_cluster(key: tuple[str, ...], count: int) -> None:
+            normalized_text = " ".join(key)
+            if not normalized_text:
+                return
+            row = cluster_rows.get(normalized_text)
+            if row is not None:
+                row["global_df"] += count
+                return
+            ct = (prepared.cluster_type_by_key.get(key) or "other").strip().lower()
+            cluster_rows[normalized_text] = {
+                "normalized_text": normalized_text,
+                "display_text": prepared.cluster_display_overrides.get(key) or normalized_text,
+                "type": ct if ct in VALID_CLUSTER_TYPES else "other",
+                "global_df": count,
+            }
+            cluster_lemmas[normalized_text] = key
+
+        for _, _, abbr_cluster_keys in new_abbreviations:
+            for key in abbr_cluster_keys:
+                _add_cluster(key, 1)
         for cluster_key, count in candidate_clusters_with_count.items():
-            await self._get_or_create_cluster_for_quantum(
+            _add_cluster(cluster_key, count)
+
+        # 7) Атомы: get-or-create одним запросом; специфичность — только тем, у кого её ещё нет
+        all_lemmas = set(prepared.candidate_atoms)
+        for _, abbr_atoms, _ in new_abbreviations:
+            all_lemmas.update(abbr_atoms)
+        for key in cluster_lemmas.values():
+            all_lemmas.update(key)
+        lemma_to_atom_id: dict[str, Any] = {}
+        atoms_added: list[str] = []
+        if all_lemmas:
+            res = await session.execute(build_atoms_upsert_stmt(theme_id, sorted(all_lemmas)))
+            for atom_id, lemma, inserted in res.all():
+                lemma_to_atom_id[lemma] = atom_id
+                if inserted:
+                    atoms_added.append(lemma)
+        specificity_atom_ids: list[Any] = []
+        if prepared.specificity_by_lemma:
+            res = await session.execute(build_atom_specificity_stmt(theme_id, prepared.specificity_by_lemma))
+            specificity_atom_ids = list(res.scalars().all())
+
+        if new_abbreviations:
+            abbr_atom_rows = [
+                {"abbreviation_id": created_abbreviations[name], "atom_id": lemma_to_atom_id[lemma]}
+                for name, abbr_atoms, _ in new_abbreviations
+                for lemma in dict.fromkeys(abbr_atoms)
+                if lemma in lemma_to_atom_id
+            ]
+            if abbr_atom_rows:
+                await session.execute(insert(AbbreviationAtom.__table__).values(abbr_atom_rows))
+
+        # 8) Кластеры: get-or-create с приростом global_df одним запросом, состав новых кластеров
+        cluster_id_by_text: dict[str, Any] = {}
+        clusters_added: list[tuple[str, str]] = []  # (normalized_text, type)
+        max_new_cluster_df = 0
+        if cluster_rows:
+            res = await session.execute(build_clusters_upsert_stmt(theme_id, list(cluster_rows.values())))
+            inserted_texts: list[str] = []
+            for cluster_id, normalized_text, global_df, inserted in res.all():
+                cluster_id_by_text[normalized_text] = cluster_id
+                max_new_cluster_df = max(max_new_cluster_df, global_df or 0)
+                if inserted:
+                    inserted_texts.append(normalized_text)
+                    clusters_added.append((normalized_text, cluster_rows[normalized_text]["type"]))
+            cluster_atom_rows = [
+                {"cluster_id": cluster_id_by_text[t], "atom_id": lemma_to_atom_id[lemma], "position": pos}
+                for t in inserted_texts
+                for pos, lemma in enumerate(cluster_lemmas[t])
+                if lemma in lemma_to_atom_id
+            ]
+            if cluster_atom_rows:
+                await session.execute(insert(ClusterAtom.__table__).values(cluster_atom_rows).on_conflict_do_nothing())
+
+        if new_abbreviations:
+            abbr_cluster_rows = [
+                {"abbreviation_id": created_abbreviations[name], "cluster_id": cluster_id_by_text[" ".join(key)]}
+                for name, _, abbr_cluster_keys in new_abbreviations
+                for key in abbr_cluster_keys
+                if " ".join(key) in cluster_id_by_text
+            ]
+            if abbr_cluster_rows:
+                await session.execute(insert(AbbreviationCluster.__table__).values(abbr_cluster_rows))
+
+        # Оценки кластеров: только изменённые (и с новой специфичностью атомов), остальные — масштабом при росте максимума
+        stats = await self._get_or_create_theme_stats(session, theme_id)
+        if cluster_id_by_text or specificity_atom_ids:
+            old_max_cdf, max_cdf = await raise_theme_stat(session, stats, "max_cluster_df", max_new_cluster_df)
+            await apply_cluster_score_deltas(
                 session,
                 theme_id,
-                list(cluster_key),
-                quantum,
-                count=count,
-                clusters_added=clusters_added if dbg else None,
-                dbg=dbg,
-                display_text_override=cluster_display_overrides.get(cluster_key),
-                cluster_type=cluster_type_by_key.get(cluster_key),
+                old_max=old_max_cdf,
+                new_max=max_cdf,
+                cluster_ids=cluster_id_by_text.values(),
+                specificity_atom_ids=specificity_atom_ids,
             )
-        await session.flush()
 
         # 9) Relations: кластер → квант (mentions) — по одному разу на уникальный кластер в этом кванте
-        for cluster_key in candidate_clusters_with_count:
-            cluster_entity = await session.execute(
-                select(Cluster).where(
-                    Cluster.theme_id == theme_id,
-                    Cluster.normalized_text == " ".join(cluster_key),
+        if cluster_id_by_text:
+            await session.execute(
+                insert(Relation)
+                .values(
+                    [
+                        {
+                            "theme_id": theme_id,
+                            "subject_type": "cluster",
+                            "subject_id": cluster_id,
+                            "object_type": "quantum",
+                            "object_id": quantum.id,
+                            "relation_type": "mentions",
+                            "direction": "forward",
+                            "status": "active",
+                            "is_user_created": False,
+                        }
+                        for cluster_id in dict.fromkeys(cluster_id_by_text.values())
+                    ]
                 )
-            )
-            c = cluster_entity.scalar_one_or_none()
-            if c:
-                await session.execute(
-                    insert(Relation)
-                    .values(
-                        theme_id=theme_id,
-                        subject_type="cluster",
-                        subject_id=c.id,
-                        object_type="quantum",
-                        object_id=quantum.id,
-                        relation_type="mentions",
-                        direction="forward",
-                        status="active",
-                        is_user_created=False,
-                    )
-                    .on_conflict_do_nothing(
-                        index_elements=[
-                            "theme_id", "subject_type", "subject_id",
-                            "relation_type", "object_type", "object_id",
-                        ],
-                        index_where=sql_text("deleted_at IS NULL AND status = 'active'"),
-                    )
+                .on_conflict_do_nothing(
+                    index_elements=[
+                        "theme_id", "subject_type", "subject_id",
+                        "relation_type", "object_type", "object_id",
+                    ],
+                    index_where=sql_text("deleted_at IS NULL AND status = 'active'"),
                 )
-        await session.flush()
+            )
 
         # 10) Атомы: увеличить global_cluster_df на число вхождений в кластеры (с учётом кратности кластеров)
-        atom_contrib: Counter[str] = Counter()
+        atom_contrib: Counter[Any] = Counter()
         for cluster_key, cnt in candidate_clusters_with_count.items():
             for lemma in cluster_key:
-                atom_contrib[lemma] += cnt
-        stats = await self._get_or_create_theme_stats(session, theme_id)
-        for lemma, delta in atom_contrib.items():
-            atom_id = lemma_to_atom_id.get(lemma)
-            if not atom_id:
-                continue
-            existing = await session.execute(select(Atom).where(Atom.id == atom_id))
-            atom = existing.scalar_one()
-            new_df = (atom.global_cluster_df or 0) + delta
-            await session.execute(update(Atom).where(Atom.id == atom_id).values(global_cluster_df=new_df))
-            if (stats.max_atom_cluster_df or 0) < new_df:
-                await session.execute(
-                    update(ThemeStats).where(ThemeStats.id == stats.id).values(max_atom_cluster_df=new_df)
-                )
-                stats.max_atom_cluster_df = new_df
-        await session.flush()
-        max_atom_df = stats.max_atom_cluster_df or 1
-        for lemma in atom_contrib:
-            atom_id = lemma_to_atom_id.get(lemma)
-            if not atom_id:
-                continue
-            existing = await session.execute(select(Atom).where(Atom.id == atom_id))
-            atom = existing.scalar_one()
-            spec = atom.specificity_score if atom.specificity_score is not None else 1.0
-            new_score = spec * (atom.global_cluster_df or 0) / max_atom_df
-            await session.execute(update(Atom).where(Atom.id == atom_id).values(global_score=new_score))
+                atom_id = lemma_to_atom_id.get(lemma)
+                if atom_id:
+                    atom_contrib[atom_id] += cnt
+        if atom_contrib or specificity_atom_ids:
+            max_new_atom_df = 0
+            if atom_contrib:
+                res = await session.execute(build_atom_df_increment_stmt(atom_contrib))
+                max_new_atom_df = max((df or 0 for _, df in res.all()), default=0)
+            old_max_adf, max_adf = await raise_theme_stat(session, stats, "max_atom_cluster_df", max_new_atom_df)
+            await apply_atom_score_deltas(
+                session,
+                theme_id,
+                old_max=old_max_adf,
+                new_max=max_adf,
+                atom_ids=set(atom_contrib) | set(specificity_atom_ids),
+            )
         await session.flush()
 
         if dbg:
@@ -664,7 +881,7 @@ class AtomsClustersExtractor:
                 "ENTITY DB: atoms_added=%s clusters_added=%s abbreviations_added=%s",
                 atoms_added,
                 clusters_added,
-                abbreviations_added,
+                list(created_abbreviations),
             )
             dbg.info("========== END ENTITY EXTRACT quantum_id=%s ==========", quantum.id)
 
@@ -705,27 +922,6 @@ class AtomsClustersExtractor:
             logger.warning("atoms_clusters_extractor: translate failed term=%r: %s", t[:50], e)
             return None
 
-    async def _get_or_create_atom(
-        self,
-        session: AsyncSession,
-        theme_id: Any,
-        lemma: str,
-        *,
-        atoms_added: Optional[list[str]] = None,
-    ) -> Any:
-        existing = await session.execute(
-            select(Atom).where(Atom.theme_id == theme_id, Atom.lemma == lemma)
-        )
-        row = existing.scalar_one_or_none()
-        if row:
-            return row.id
-        a = Atom(theme_id=theme_id, lemma=lemma, global_cluster_df=0, global_score=0.0)
-        session.add(a)
-        await session.flush()
-        if atoms_added is not None:
-            atoms_added.append(lemma)
-        return a.id
-
     async def _get_or_create_theme_stats(self, session: AsyncSession, theme_id: Any) -> ThemeStats:
         existing = await session.execute(
             select(ThemeStats).where(ThemeStats.theme_id == theme_id).order_by(ThemeStats.id).limit(1)
@@ -737,131 +933,3 @@ class AtomsClustersExtractor:
         session.add(st)
         await session.flush()
         return st
-
-    async def _get_or_create_cluster_for_quantum(
-        self,
-        session: AsyncSession,
-        theme_id: Any,
-        lemmas: list[str],
-        quantum: Quantum,
-        *,
-        count: int = 1,
-        clusters_added: Optional[list[tuple[str, str]]] = None,
-        dbg: Optional[logging.Logger] = None,
-        display_text_override: Optional[str] = None,
-        cluster_type: Optional[str] = None,
-    ) -> Optional[Cluster]:
-        cluster_translation_needed = False
-        if not lemmas:
-            return None
-        normalized_text = " ".join(lemmas)
-        existing = await session.execute(
-            select(Cluster).where(
-                Cluster.theme_id == theme_id,
-                Cluster.normalized_text == normalized_text,
-            )
-        )
-        stats = await self._get_or_create_theme_stats(session, theme_id)
-        c = existing.scalar_one_or_none()
-        if c:
-            new_df = (c.global_df or 0) + count
-            await session.execute(update(Cluster).where(Cluster.id == c.id).values(global_df=new_df))
-            max_cdf = stats.max_cluster_df or 0
-            if max_cdf < new_df:
-                await session.execute(
-                    update(ThemeStats).where(ThemeStats.id == stats.id).values(max_cluster_df=new_df)
-                )
-                max_cdf = new_df
-            await session.flush()
-            new_score = new_df / (max_cdf or 1)
-            await session.execute(update(Cluster).where(Cluster.id == c.id).values(global_score=new_score))
-            return c
-
-        # Новый кластер: тип приходит батчем (если не пришёл — other)
-        ct = (cluster_type or "").strip().lower() if cluster_type else "other"
-        if ct not in VALID_CLUSTER_TYPES:
-            ct = "other"
-
-        theme = await session.get(Theme, theme_id)
-        primary_lang = _theme_primary_language(theme)
-        display_text = normalized_text
-        if display_text_override:
-            display_text = display_text_override
-        elif cluster_translation_needed and primary_lang and primary_lang.lower() != "en":
-            tr = await self._translate(
-                session,
-                theme_id=theme_id,
-                term=normalized_text,
-                source_language="en",
-                target_language=primary_lang,
-                dbg=dbg,
-            )
-            if tr:
-                display_text = tr
-
-        if clusters_added is not None:
-            clusters_added.append((normalized_text, ct))
-        new_cluster = Cluster(
-            theme_id=theme_id,
-            normalized_text=normalized_text,
-            display_text=display_text,
-            type=ct,
-            global_df=count,
-            global_score=0.0,
-        )
-        session.add(new_cluster)
-        await session.flush()
-        max_cdf = stats.max_cluster_df or 0
-        if max_cdf < count:
-            await session.execute(
-                update(ThemeStats).where(ThemeStats.id == stats.id).values(max_cluster_df=count)
-            )
-        await session.flush()
-        max_cdf = max(stats.max_cluster_df or 1, count)
-        new_score = count / max_cdf
-        await session.execute(update(Cluster).where(Cluster.id == new_cluster.id).values(global_score=new_score))
-
-        # cluster_atoms
-        for pos, lemma in enumerate(lemmas):
-            atom_id = await self._get_or_create_atom(session, theme_id, lemma)
-            session.add(
-                ClusterAtom(cluster_id=new_cluster.id, atom_id=atom_id, position=pos)
-            )
-        await session.flush()
-        return new_cluster
-
-    async def _recalculate_atom_scores_for_theme(self, session: AsyncSession, theme_id: Any) -> None:
-        stats = await self._get_or_create_theme_stats(session, theme_id)
-        max_df = stats.max_atom_cluster_df or 1
-        result = await session.execute(select(Atom).where(Atom.theme_id == theme_id))
-        atoms = list(result.scalars().all())
-        for a in atoms:
-            spec = a.specificity_score if a.specificity_score is not None else 1.0
-            df = a.global_cluster_df or 0
-            score = spec * df / max_df
-            await session.execute(update(Atom).where(Atom.id == a.id).values(global_score=score))
-
-    async def _recalculate_cluster_scores_for_theme(self, session: AsyncSession, theme_id: Any) -> None:
-        stats = await self._get_or_create_theme_stats(session, theme_id)
-        max_df = stats.max_cluster_df or 1
-
-        # max specificity_score по атомам в каждом кластере
-        res = await session.execute(
-            select(
-                ClusterAtom.cluster_id,
-                func.max(func.coalesce(Atom.specificity_score, 1.0)),
-            )
-            .join(Atom, Atom.id == ClusterAtom.atom_id)
-            .join(Cluster, Cluster.id == ClusterAtom.cluster_id)
-            .where(Cluster.theme_id == theme_id)
-            .group_by(ClusterAtom.cluster_id)
-        )
-        max_spec_by_cluster: dict[Any, float] = {cid: float(ms or 1.0) for cid, ms in res.all()}
-
-        result = await session.execute(select(Cluster).where(Cluster.theme_id == theme_id))
-        clusters = list(result.scalars().all())
-        for c in clusters:
-            df = c.global_df or 0
-            max_spec = max_spec_by_cluster.get(c.id, 1.0)
-            score = (df / max_df) * max_spec
-            await session.execute(update(Cluster).where(Cluster.id == c.id).values(global_score=score))
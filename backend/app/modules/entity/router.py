@@ -119,7 +119,10 @@ async def extract_theme_entities(
         stop_after_first_prompt,
         tid,
     )
-    extractor = AtomsClustersExtractor(llm_service=llm_service, prompt_service=prompt_service)
+    extractor = AtomsClustersExtractor(
+        llm_service=llm_service,
+        prompt_service=prompt_service,
+    )
     n = await extractor.process_next_batch(
         db,
         theme_id=tid,
@@ -0,0 +1,145 @@
+"""
+Инкрементальный пересчёт global_score атомов и кластеров темы.
+
+Формулы (нормировка — по максимумам из theme_stats, это бегущие агрегаты):
+- атом:    global_score = coalesce(specificity_score, 1) * global_cluster_df / max_atom_cluster_df;
+- кластер: global_score = global_df / max_cluster_df * max(coalesce(specificity_score, 1) по атомам кластера).
+
+После записи кванта пересчитываются только затронутые строки. Если максимум в theme_stats вырос
+с M до M', оценки остальных строк темы меняются в замкнутой форме: score * M / M' (один UPDATE).
+Полная перестройка (rebuild_theme_scores) — только как явная операция обслуживания
+(python -m app.scripts.rebuild_entity_scores).
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+from sqlalchemy import Float, cast, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.modules.entity.model import Atom, Cluster, ClusterAtom, ThemeStats
+
+_atoms = Atom.__table__
+_clusters = Cluster.__table__
+_cluster_atoms = ClusterAtom.__table__
+_stats = ThemeStats.__table__
+
+
+async def raise_theme_stat(session: AsyncSession, stats: ThemeStats, field: str, value: int) -> tuple[int, int]:
+    """
+    theme_stats.<field> = GREATEST(<field>, value) одним UPDATE.
+    Возвращает (прежнее, новое) значение; stats обновляется без повторной записи при flush.
+    """
+    old_value = int(getattr(stats, field) or 0)
+    col = _stats.c[field]
+    res = await session.execute(
+        update(_stats).where(_stats.c.id == stats.id).values({field: func.greatest(col, value)}).returning(col)
+    )
+    new_value = int(res.scalar_one() or 0)
+    set_committed_value(stats, field, new_value)
+    return old_value, new_value
+
+
+def _cluster_score_expr(max_cluster_df: int) -> Any:
+    """global_df / max_cluster_df * max(coalesce(specificity_score, 1)) по атомам кластера."""
+    max_spec = (
+        select(func.max(func.coalesce(_atoms.c.specificity_score, 1.0)))
+        .select_from(_cluster_atoms.join(_atoms, _atoms.c.id == _cluster_atoms.c.atom_id))
+        .where(_cluster_atoms.c.cluster_id == _clusters.c.id)
+        .scalar_subquery()
+    )
+    return cast(_clusters.c.global_df, Float) / float(max(max_cluster_df, 1)) * func.coalesce(max_spec, 1.0)
+
+
+def _atom_score_expr(max_atom_df: int) -> Any:
+    """coalesce(specificity_score, 1) * global_cluster_df / max_atom_cluster_df."""
+    return func.coalesce(_atoms.c.specificity_score, 1.0) * _atoms.c.global_cluster_df / float(max(max_atom_df, 1))
+
+
+def build_rescale_stmt(table: Any, theme_id: Any, old_max: int, new_max: int) -> Any:
+    """Максимум-нормировщик вырос с old_max до new_max: score *= old_max / new_max для всех строк темы."""
+    return (
+        update(table)
+        .where(table.c.theme_id == theme_id, table.c.global_score != 0.0)
+        .values(global_score=table.c.global_score * (old_max / new_max))
+    )
+
+
+async def apply_cluster_score_deltas(
+    session: AsyncSession,
+    theme_id: Any,
+    *,
+    old_max: int,
+    new_max: int,
+    cluster_ids: Iterable[Any],
+    specificity_atom_ids: Iterable[Any] = (),
+) -> None:
+    """
+    Обновить оценки кластеров темы: при росте max_cluster_df — масштабирование остальных,
+    затем точный пересчёт изменённых кластеров и кластеров, где у атома появилась специфичность.
+    """
+    if new_max > old_max > 0:
+        await session.execute(build_rescale_stmt(_clusters, theme_id, old_max, new_max))
+    cluster_ids = list(cluster_ids)
+    specificity_atom_ids = list(specificity_atom_ids)
+    if not cluster_ids and not specificity_atom_ids:
+        return
+    affected = _clusters.c.id.in_(cluster_ids) if cluster_ids else None
+    if specificity_atom_ids:
+        via_atoms = _clusters.c.id.in_(
+            select(_cluster_atoms.c.cluster_id).where(_cluster_atoms.c.atom_id.in_(specificity_atom_ids))
+        )
+        affected = via_atoms if affected is None else (affected | via_atoms)
+    await session.execute(
+        update(_clusters)
+        .where(_clusters.c.theme_id == theme_id, affected)
+        .values(global_score=_cluster_score_expr(new_max))
+    )
+
+
+async def apply_atom_score_deltas(
+    session: AsyncSession,
+    theme_id: Any,
+    *,
+    old_max: int,
+    new_max: int,
+    atom_ids: Iterable[Any],
+) -> None:
+    """Обновить оценки атомов темы: при росте max_atom_cluster_df — масштабирование остальных, затем изменённые атомы."""
+    if new_max > old_max > 0:
+        await session.execute(build_rescale_stmt(_atoms, theme_id, old_max, new_max))
+    atom_ids = list(atom_ids)
+    if atom_ids:
+        await session.execute(
+            update(_atoms)
+            .where(_atoms.c.theme_id == theme_id, _atoms.c.id.in_(atom_ids))
+            .values(global_score=_atom_score_expr(new_max))
+        )
+
+
+async def rebuild_theme_scores(session: AsyncSession, theme_id: Any) -> None:
+    """
+    Полная перестройка (обслуживание): максимумы theme_stats берутся заново из atoms/clusters,
+    global_score всех атомов и кластеров темы пересчитывается двумя UPDATE.
+    """
+    max_atom_df = (
+        await session.execute(select(func.coalesce(func.max(_atoms.c.global_cluster_df), 0)).where(_atoms.c.theme_id == theme_id))
+    ).scalar_one()
+    max_cluster_df = (
+        await session.execute(select(func.coalesce(func.max(_clusters.c.global_df), 0)).where(_clusters.c.theme_id == theme_id))
+    ).scalar_one()
+    await session.execute(
+        update(_stats)
+        .where(_stats.c.theme_id == theme_id)
+        .values(max_atom_cluster_df=int(max_atom_df), max_cluster_df=int(max_cluster_df))
+    )
+    await session.execute(
+        update(_atoms).where(_atoms.c.theme_id == theme_id).values(global_score=_atom_score_expr(int(max_atom_df)))
+    )
+    await session.execute(
+        update(_clusters)
+        .where(_clusters.c.theme_id == theme_id)
+        .values(global_score=_cluster_score_expr(int(max_cluster_df)))
+    )
@@ -3,12 +3,14 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
 import re
 from collections import Counter, defaultdict
 from dataclasses import dataclass
-from typing import Any, Iterable
+from typing import Any, Awaitable, Callable, Iterable
 
+from pydantic import ValidationError
 from sqlalchemy import Select, func, select, text, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -106,6 +108,23 @@ def _theme_primary_language(theme: Theme | None) -> str:
     return "en"
 
 
+# Ошибки разбора ответа LLM, после которых повтор того же запроса имеет смысл
+_RETRYABLE_EXTRACTION_ERRORS = (json.JSONDecodeError, ValidationError)
+
+
+@dataclass
+class _RetryBudget:
+    """Общий на батч запас повторных попыток извлечения (делят все кванты и экстракторы)."""
+
+    remaining: int
+
+    def take(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
 @dataclass(frozen=True)
 class _EntityGroupKey:
     theme_id: Any
@@ -142,7 +161,12 @@ class _PhenomenonGroup:
 
 
 class EntitiesExtractionService:
-    """Сервис батчевого извлечения сущностей из квантов (MVP: только tech)."""
+    """
+    Сервис батчевого извлечения сущностей из квантов (tech, персоны, явления).
+
+    Вызовы ИИ по квантам батча идут конкурентно (ENTITY_EXTRACTION_MAX_CONCURRENCY),
+    поэтому BATCH_SIZE_FOR_ENTITIES_EXTRACTION напрямую задаёт пропускную способность.
+    """
 
     def __init__(
         self,
@@ -153,6 +177,8 @@ class EntitiesExtractionService:
         self._settings = settings or get_settings()
         self._batch_size = self._settings.BATCH_SIZE_FOR_ENTITIES_EXTRACTION
         self._version = self._settings.ENTITY_EXTRACTION_VERSION
+        self._max_concurrency = max(1, self._settings.ENTITY_EXTRACTION_MAX_CONCURRENCY)
+        self._retry_budget = max(0, self._settings.ENTITY_EXTRACTION_RETRY_BUDGET)
         self._extractor = TechEntitiesExtractor(llm_service, prompt_service)
         self._phenomenon_extractor = PhenomenonEntitiesExtractor(llm_service, prompt_service)
         self._llm_service = llm_service
@@ -214,44 +240,55 @@ class EntitiesExtractionService:
 
         logger.info("entities_extraction: fetched quanta batch size=%s", len(quanta))
 
+        # Tech и явления по всему батчу — одновременно, под общим семафором и общим запасом повторов;
+        # результаты применяются к БД одним проходом после сбора.
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        retry_budget = _RetryBudget(self._retry_budget)
+        tech_results, phenomenon_results = await asyncio.gather(
+            self._extract_concurrently(
+                session,
+                quanta,
+                self._extractor.extract_for_text,
+                kind="tech",
+                semaphore=semaphore,
+                retry_budget=retry_budget,
+            ),
+            self._extract_concurrently(
+                session,
+                quanta,
+                self._phenomenon_extractor.extract_for_text,
+                kind="phenomenon",
+                semaphore=semaphore,
+                retry_budget=retry_budget,
+            ),
+        )
+
         per_quantum_entities: dict[Any, list[TechEntityCandidate]] = {}
-        for q in quanta:
-            source_text = self._build_text_for_quantum(q)
-            logger.info(
-                "++++++++++ entities_extraction: sending quantum_id=%s to LLM (len=%s)",
-                getattr(q, "id", None),
-                len(source_text),
-            )
-            try:
-                result = await self._extractor.extract_for_text(
-                    source_text,
-                    billing_session=session,
-                    billing_theme_id=q.theme_id,
-                )
-            except Exception as e:
-                logger.warning(
-                    "entities_extraction: LLM extraction failed for quantum_id=%s: %s",
-                    getattr(q, "id", None),
-                    e,
-                )
-                continue
+        for quantum_id, result in tech_results.items():
             logger.info(
                 "++++++++++ entities_extraction: LLM returned %s entities for quantum_id=%s",
                 len(result.entities),
-                getattr(q, "id", None),
+                quantum_id,
             )
-            if not result.entities:
-                continue
-            per_quantum_entities[q.id] = list(result.entities)
-
-        if not per_quantum_entities:
+            if result.entities:
+                per_quantum_entities[quantum_id] = list(result.entities)
+        per_quantum_phenomena: dict[Any, list[Any]] = {
+            quantum_id: list(result.phenomena)
+            for quantum_id, result in phenomenon_results.items()
+            if result.phenomena
+        }
+
+        # Явления извлекаются параллельно с tech и уже оплачены: батч без tech, но с явлениями,
+        # применяется и помечается как обработанный
+        if not per_quantum_entities and not per_quantum_phenomena:
             logger.info(
                 "entities_extraction: no entities extracted for batch (quanta=%s)",
                 len(quanta),
             )
             return 0
 
-        await self._apply_extraction_results(session, quanta, per_quantum_entities)
+        if per_quantum_entities:
+            await self._apply_extraction_results(session, quanta, per_quantum_entities)
 
         person_candidates = collect_candidates(quanta)
         if person_candidates:
@@ -263,7 +300,6 @@ class EntitiesExtractionService:
                     len(person_groups),
                 )
 
-        per_quantum_phenomena = await self._extract_phenomena_for_quanta(session, quanta)
         logger.info(
             "entities_extraction: phenomenon extraction done, quanta_with_phenomena=%s",
             len(per_quantum_phenomena),
@@ -483,34 +519,65 @@ class EntitiesExtractionService:
         )
         await session.execute(stmt)
 
-    async def _extract_phenomena_for_quanta(
+    async def _extract_concurrently(
         self,
         session: AsyncSession,
         quanta: list[Quantum],
-    ) -> dict[Any, list[Any]]:
-        """Извлечь явления из каждого кванта через LLM. Возвращает quantum_id -> list[PhenomenonCandidate]."""
-        quanta_by_id = {q.id: q for q in quanta}
-        per_quantum: dict[Any, list[Any]] = {}
-        for q in quanta:
-            text = self._build_text_for_quantum(q)
-            if not text.strip():
-                continue
-            try:
-                result = await self._phenomenon_extractor.extract_for_text(
-                    text,
-                    billing_session=session,
-                    billing_theme_id=q.theme_id,
-                )
-            except Exception as e:
-                logger.warning(
-                    "entities_extraction: phenomenon extraction failed for quantum_id=%s: %s",
-                    q.id,
-                    e,
-                )
-                continue
-            if result.phenomena:
-                per_quantum[q.id] = list(result.phenomena)
-        return per_quantum
+        extract: Callable[..., Awaitable[Any]],
+        *,
+        kind: str,
+        semaphore: asyncio.Semaphore,
+        retry_budget: _RetryBudget,
+    ) -> dict[Any, Any]:
+        """
+        Вызвать экстрактор для каждого кванта конкурентно (не больше семафора одновременно).
+
+        Ошибку разбора ответа (невалидный JSON, не та схема) повторяем, пока есть общий на батч запас
+        повторов; прочие ошибки (сеть, провайдер — их повторяет LLMService) и исчерпанный запас —
+        квант пропускается.
+        Биллинг пишется в общую сессию под блокировкой LLMService. Возвращает quantum_id -> результат.
+        """
+
+        async def _one(q: Quantum) -> Any | None:
+            source_text = self._build_text_for_quantum(q)
+            if not source_text.strip():
+                return None
+            attempt = 1
+            while True:
+                try:
+                    async with semaphore:
+                        logger.info(
+                            "++++++++++ entities_extraction: sending quantum_id=%s to LLM (%s, len=%s, attempt=%s)",
+                            q.id,
+                            kind,
+                            len(source_text),
+                            attempt,
+                        )
+                        return await extract(
+                            source_text,
+                            billing_session=session,
+                            billing_theme_id=q.theme_id,
+                        )
+                except Exception as e:
+                    if not isinstance(e, _RETRYABLE_EXTRACTION_ERRORS) or not retry_budget.take():
+                        logger.warning(
+                            "entities_extraction: %s extraction failed for quantum_id=%s: %s",
+                            kind,
+                            q.id,
+                            e,
+                        )
+                        return None
+                    logger.info(
+                        "entities_extraction: %s extraction retry for quantum_id=%s (budget left=%s): %s",
+                        kind,
+                        q.id,
+                        retry_budget.remaining,
+                        e,
+                    )
+                    attempt += 1
+
+        results = await asyncio.gather(*(_one(q) for q in quanta))
+        return {q.id: r for q, r in zip(quanta, results, strict=True) if r is not None}
 
     async def _apply_phenomenon_results(
         self,
@@ -73,16 +73,11 @@ async def extract_theme_events(
         prompt_service=prompt_service,
     )
 
-    batches_done = 0
-    processed_quanta = 0
-    created_events = 0
-    while batches_done < MAX_EXTRACT_BATCHES:
-        n_quanta, n_events = await service.process_next_batch(db, theme_id=tid)
-        if n_quanta == 0:
-            break
-        processed_quanta += n_quanta
-        created_events += n_events
-        batches_done += 1
+    processed_quanta, created_events = await service.process_batches(
+        db,
+        theme_id=tid,
+        max_batches=MAX_EXTRACT_BATCHES,
+    )
 
     return EventExtractResponse(processed_quanta=processed_quanta, created_events=created_events)
 
@@ -6,7 +6,7 @@ import json
 import logging
 import uuid
 from dataclasses import dataclass
-from typing import Any, Iterable
+from typing import Any, Awaitable, Callable, Iterable
 import os
 
 from sqlalchemy import Select, func, select, text, update
@@ -25,6 +25,7 @@ from app.modules.relation.model import Relation
 logger = logging.getLogger(__name__)
 
 PROMPT_NAME_EXTRACT_EVENTS = "event.extract_events_from_quantum_mvp.v1"
+PROMPT_NAME_EXTRACT_EVENTS_PACKED = "event.extract_events_from_quanta_packed_mvp.v1"
 _DEBUG_LOG_PATH = "logs/events_llm_debug.log"
 
 
@@ -71,6 +72,19 @@ class _ExtractedEvent:
     attributes: tuple[_ExtractedAttribute, ...]
 
 
+# (квант, текст title+summary, сущности кванта для промпта)
+_QuantumItem = tuple[Quantum, str, list[dict[str, str]]]
+
+
+def _event_packs(items: list[_QuantumItem], size: int) -> list[list[_QuantumItem]]:
+    """Разбить кванты на пакеты по size, не смешивая темы (биллинг пакета — на одну тему)."""
+    by_theme: dict[Any, list[_QuantumItem]] = {}
+    for item in items:
+        by_theme.setdefault(item[0].theme_id, []).append(item)
+    size = max(1, size)
+    return [group[i : i + size] for group in by_theme.values() for i in range(0, len(group), size)]
+
+
 class EventExtractionService:
     """Сервис батчевого извлечения событий из квантов."""
 
@@ -83,9 +97,36 @@ class EventExtractionService:
         self._settings = settings or get_settings()
         self._batch_size = self._settings.BATCH_SIZE_FOR_EVENTS_EXTRACTION
         self._version = self._settings.EVENT_EXTRACTION_VERSION
+        self._quanta_per_prompt = max(1, self._settings.EVENT_EXTRACTION_QUANTA_PER_PROMPT)
         self._llm_service = llm_service
         self._prompt_service = prompt_service
 
+    async def process_batches(
+        self,
+        session: AsyncSession,
+        *,
+        theme_id: Any | None = None,
+        max_batches: int,
+        on_batch: Callable[[int, int], Awaitable[None]] | None = None,
+    ) -> tuple[int, int]:
+        """
+        Обрабатывать батчи, пока есть необработанные кванты (не больше max_batches).
+
+        on_batch(processed_quanta, created_events) — нарастающие итоги после каждого батча
+        (фоновый запуск фиксирует в нём транзакцию и прогресс). Возвращает итоговые (processed_quanta, created_events).
+        """
+        processed_quanta = 0
+        created_events = 0
+        for _ in range(max_batches):
+            n_quanta, n_events = await self.process_next_batch(session, theme_id=theme_id)
+            if n_quanta == 0:
+                break
+            processed_quanta += n_quanta
+            created_events += n_events
+            if on_batch is not None:
+                await on_batch(processed_quanta, created_events)
+        return (processed_quanta, created_events)
+
     async def process_next_batch(
         self,
         session: AsyncSession,
@@ -110,12 +151,26 @@ class EventExtractionService:
         processed_quantum_ids: set[Any] = set()
         created_events_total = 0
 
+        # Каталог сюжетов одинаков для всех квантов батча — сериализуем один раз
+        plots_json = json.dumps(
+            [
+                {
+                    "code": code,
+                    "name": (p.name or "").strip(),
+                    "description": (p.description or "").strip() if p.description else None,
+                    "schema": p.schema or {},
+                }
+                for code, p in plots_by_code.items()
+            ],
+            ensure_ascii=False,
+        )
+
+        items: list[_QuantumItem] = []
         for q in quanta:
             quantum_text = self._build_text_for_quantum(q)
             if not quantum_text.strip():
                 processed_quantum_ids.add(q.id)
                 continue
-
             ent_rows = entities_by_quantum.get(q.id, [])
             entities_json = [
                 {
@@ -126,70 +181,36 @@ class EventExtractionService:
                 for c in ent_rows
                 if getattr(c, "id", None) is not None and (c.normalized_text or "").strip()
             ]
-
-            plots_json = [
-                {
-                    "code": code,
-                    "name": (p.name or "").strip(),
-                    "description": (p.description or "").strip() if p.description else None,
-                    "schema": p.schema or {},
-                }
-                for code, p in plots_by_code.items()
-            ]
-
-            vars = {
-                "quantum_text": quantum_text,
-                "entities_json": json.dumps(entities_json, ensure_ascii=False),
-                "plots_json": json.dumps(plots_json, ensure_ascii=False),
-            }
-
-            rendered = await self._prompt_service.render(PROMPT_NAME_EXTRACT_EVENTS, vars)
-            prompt_text = rendered.text or ""
-            logger.info(
-                "++++++++++ events_extraction: sending quantum_id=%s to LLM (prompt_chars=%s)",
-                q.id,
-                len(prompt_text),
-            )
-            try:
-                _debug_logger.info(
-                    "quantum_id=%s theme_id=%s\nPROMPT (chars=%s):\n%s",
-                    q.id,
-                    q.theme_id,
-                    len(prompt_text),
-                    prompt_text,
-                )
-            except Exception:
-                # не критично для основного потока
-                pass
-
-            try:
-                response = await self._llm_service.generate_text(
-                    messages=[{"role": "system", "content": prompt_text}],  # type: ignore[arg-type]
-                    task=PROMPT_NAME_EXTRACT_EVENTS,
-                    response_format=rendered.response_format,
-                    billing_session=session,
-                    billing_theme_id=q.theme_id,
-                )
-            except Exception as e:
-                logger.warning(
-                    "events_extraction: LLM extraction failed for quantum_id=%s: %s",
-                    q.id,
-                    e,
-                )
-                processed_quantum_ids.add(q.id)
-                continue
-
-            response_text = (getattr(response, "text", None) or "")
-            try:
-                _debug_logger.info(
-                    "quantum_id=%s LLM RAW RESPONSE:\n%s",
-                    q.id,
-                    response_text,
+            items.append((q, quantum_text, entities_json))
+
+        # Пакетами по EVENT_EXTRACTION_QUANTA_PER_PROMPT квантов одной темы на промпт;
+        # не разобранные из пакетного ответа кванты повторяются по одному.
+        raw_events_by_quantum: dict[Any, list[dict[str, Any]]] = {}
+        for pack in _event_packs(items, self._quanta_per_prompt):
+            fallback = pack
+            if len(pack) > 1:
+                packed = await self._extract_events_packed(session, pack, plots_json=plots_json)
+                raw_events_by_quantum.update(packed)
+                fallback = [item for item in pack if item[0].id not in packed]
+                if fallback:
+                    logger.warning(
+                        "events_extraction: packed response missing %s of %s quanta, falling back to single prompts",
+                        len(fallback),
+                        len(pack),
+                    )
+            for q, quantum_text, entities_json in fallback:
+                events = await self._extract_events_single(
+                    session,
+                    q,
+                    quantum_text=quantum_text,
+                    entities_json=entities_json,
+                    plots_json=plots_json,
                 )
-            except Exception:
-                pass
+                if events is not None:
+                    raw_events_by_quantum[q.id] = events
 
-            extracted = self._parse_llm_events(response_text=response_text)
+        for q, _quantum_text, entities_json in items:
+            extracted = raw_events_by_quantum.get(q.id, [])
             logger.info(
                 "++++++++++ events_extraction: LLM returned %s events for quantum_id=%s",
                 len(extracted),
@@ -228,6 +249,125 @@ class EventExtractionService:
 
         return (len(processed_quantum_ids), created_events_total)
 
+    async def _extract_events_single(
+        self,
+        session: AsyncSession,
+        q: Quantum,
+        *,
+        quantum_text: str,
+        entities_json: list[dict[str, str]],
+        plots_json: str,
+    ) -> list[dict[str, Any]] | None:
+        """Извлечь события из одного кванта. None — ошибка вызова LLM."""
+        vars = {
+            "quantum_text": quantum_text,
+            "entities_json": json.dumps(entities_json, ensure_ascii=False),
+            "plots_json": plots_json,
+        }
+        response_text = await self._call_llm(
+            session,
+            prompt_name=PROMPT_NAME_EXTRACT_EVENTS,
+            vars=vars,
+            theme_id=q.theme_id,
+            label=f"quantum_id={q.id}",
+        )
+        if response_text is None:
+            return None
+        return self._parse_llm_events(response_text=response_text)
+
+    async def _extract_events_packed(
+        self,
+        session: AsyncSession,
+        pack: list[_QuantumItem],
+        *,
+        plots_json: str,
+    ) -> dict[Any, list[dict[str, Any]]]:
+        """
+        Извлечь события из нескольких квантов одной темы одним промптом.
+
+        Кванты получают в промпте короткие ключи Q1..Qn (по позиции в пакете), ответ разбирается
+        обратно по ним. Возвращает quantum_id -> события только для разобранных квантов;
+        при ошибке LLM или невалидном ответе — пустой словарь (вызывающий откатится на одиночные промпты).
+        """
+        keys = {f"Q{i}": q for i, (q, _text, _ents) in enumerate(pack, start=1)}
+        quanta_json = [
+            {"quantum_id": key, "text": text, "entities": ents}
+            for key, (_q, text, ents) in zip(keys, pack, strict=True)
+        ]
+        vars = {
+            "quanta_json": json.dumps(quanta_json, ensure_ascii=False),
+            "plots_json": plots_json,
+        }
+        response_text = await self._call_llm(
+            session,
+            prompt_name=PROMPT_NAME_EXTRACT_EVENTS_PACKED,
+            vars=vars,
+            theme_id=pack[0][0].theme_id,
+            label=f"quantum_ids={[str(q.id) for q in keys.values()]}",
+        )
+        if response_text is None:
+            return {}
+        by_key = self._parse_llm_packed_events(response_text=response_text, keys=set(keys))
+        if by_key is None:
+            return {}
+        return {keys[key].id: events for key, events in by_key.items()}
+
+    async def _call_llm(
+        self,
+        session: AsyncSession,
+        *,
+        prompt_name: str,
+        vars: dict[str, Any],
+        theme_id: Any,
+        label: str,
+    ) -> str | None:
+        """Отрендерить промпт и вызвать LLM (с биллингом на тему). None — ошибка вызова."""
+        rendered = await self._prompt_service.render(prompt_name, vars)
+        prompt_text = rendered.text or ""
+        logger.info(
+            "++++++++++ events_extraction: sending %s to LLM (prompt_chars=%s)",
+            label,
+            len(prompt_text),
+        )
+        try:
+            _debug_logger.info(
+                "%s theme_id=%s\nPROMPT (chars=%s):\n%s",
+                label,
+                theme_id,
+                len(prompt_text),
+                prompt_text,
+            )
+        except Exception:
+            # не критично для основного потока
+            pass
+
+        try:
+            response = await self._llm_service.generate_text(
+                messages=[{"role": "system", "content": prompt_text}],  # type: ignore[arg-type]
+                task=prompt_name,
+                response_format=rendered.response_format,
+                billing_session=session,
+                billing_theme_id=theme_id,
+            )
+        except Exception as e:
+            logger.warning(
+                "events_extraction: LLM extraction failed for %s: %s",
+                label,
+                e,
+            )
+            return None
+
+        response_text = (getattr(response, "text", None) or "")
+        try:
+            _debug_logger.info(
+                "%s LLM RAW RESPONSE:\n%s",
+                label,
+                response_text,
+            )
+        except Exception:
+            pass
+        return response_text
+
     async def _fetch_quanta_batch(
         self,
         session: AsyncSession,
@@ -304,10 +444,11 @@ class EventExtractionService:
         return by_quantum
 
     @staticmethod
-    def _parse_llm_events(*, response_text: str) -> list[dict[str, Any]]:
+    def _load_llm_json(response_text: str) -> Any | None:
+        """JSON из ответа LLM (с учётом markdown-обёртки). None — пустой или невалидный ответ."""
         txt = (response_text or "").strip()
         if not txt:
-            return []
+            return None
         # Удаляем markdown-обёртку ```json ... ``` если модель её добавила
         if txt.startswith("```"):
             # обрезаем первый блок ```...``` до первой новой строки
@@ -318,10 +459,13 @@ class EventExtractionService:
                 txt = txt[: -3]
             txt = txt.strip()
         try:
-            payload = json.loads(txt)
+            return json.loads(txt)
         except Exception:
             logger.warning("events_extraction: invalid JSON from LLM; preview=%r", txt[:500])
-            return []
+            return None
+
+    @staticmethod
+    def _events_from_payload(payload: Any) -> list[dict[str, Any]]:
         if not isinstance(payload, dict):
             return []
         events_val = payload.get("events")
@@ -331,6 +475,38 @@ class EventExtractionService:
             return []
         return [e for e in events_val if isinstance(e, dict)]
 
+    @classmethod
+    def _parse_llm_events(cls, *, response_text: str) -> list[dict[str, Any]]:
+        return cls._events_from_payload(cls._load_llm_json(response_text))
+
+    @classmethod
+    def _parse_llm_packed_events(
+        cls,
+        *,
+        response_text: str,
+        keys: set[str],
+    ) -> dict[str, list[dict[str, Any]]] | None:
+        """
+        Разобрать пакетный ответ {"quanta": [{"quantum_id": "Q1", "events": [...]}, ...]}.
+
+        Возвращает ключ кванта -> события (только для известных ключей);
+        None — ответ не JSON или не той структуры.
+        """
+        payload = cls._load_llm_json(response_text)
+        if not isinstance(payload, dict):
+            return None
+        quanta_val = payload.get("quanta")
+        if not isinstance(quanta_val, list):
+            return None
+        by_key: dict[str, list[dict[str, Any]]] = {}
+        for item in quanta_val:
+            if not isinstance(item, dict):
+                continue
+            key = str(item.get("quantum_id") or "").strip()
+            if key in keys and key not in by_key:
+                by_key[key] = cls._events_from_payload(item)
+        return by_key
+
     def _validate_and_dedup(
         self,
         raw_events: list[dict[str, Any]],
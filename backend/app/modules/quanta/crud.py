@@ -17,6 +17,9 @@ from app.modules.quanta.models import Quantum, QuantumEntityKind, RejectedQuanta
 
 _WS_RE = re.compile(r"\s+")
 
+# Строк в одном многострочном INSERT (≈30 параметров на строку, лимит asyncpg — 32767)
+BULK_UPSERT_CHUNK_SIZE = 500
+
 
 def _norm_text(value: str) -> str:
     """Нормализация для fingerprint: lower/trim/collapse whitespace."""
@@ -86,10 +89,11 @@ def build_dedup_key(
 
 def build_upsert_stmt(
     *,
-    values: dict[str, Any],
+    values: dict[str, Any] | list[dict[str, Any]],
 ) -> sa.sql.dml.Insert:
     """
     Собрать Postgres INSERT ... ON CONFLICT для (theme_id, dedup_key).
+    values — одна строка или список строк (многострочный INSERT, ключи в пачке не должны повторяться).
 
     Политика обновления: максимально безопасная.
     - Обновляем только "пустые" или NULL поля в существующей записи.
@@ -97,7 +101,7 @@ def build_upsert_stmt(
     - attrs заполняем только если в существующей записи {}.
     """
     excluded = sa.table("excluded")  # маркер для mypy; реальные excluded берём ниже
-    stmt = pg_insert(Quantum).values(**values)
+    stmt = pg_insert(Quantum).values(values)
     excluded = stmt.excluded  # type: ignore[attr-defined]
 
     def fill_if_null(col: sa.ColumnElement, new_val: sa.ColumnElement) -> sa.ColumnElement:
@@ -157,8 +161,7 @@ def build_upsert_stmt(
     )
 
 
-async def create_quantum(
-    session: AsyncSession,
+def build_quantum_values(
     *,
     theme_id: uuid.UUID,
     run_id: uuid.UUID | None,
@@ -189,10 +192,10 @@ async def create_quantum(
     title_translated: str | None = None,
     summary_text_translated: str | None = None,
     key_points_translated: list[str] | None = None,
-) -> Quantum:
+) -> dict[str, Any]:
     """
-    Создать квант с дедупликацией по (theme_id, dedup_key).
-    При конфликте заполняет только пустые/NULL поля и возвращает мастер-запись.
+    Значения строки theme_quanta для upsert: fingerprint и dedup_key вычисляются, если не заданы.
+    У всех строк одинаковый набор ключей — их можно передать в многострочный INSERT.
     """
     if fingerprint is None or not str(fingerprint).strip():
         fingerprint = build_fingerprint(
@@ -208,7 +211,7 @@ async def create_quantum(
             fingerprint=fingerprint,
         )
 
-    values = {
+    return {
         "theme_id": theme_id,
         "run_id": run_id,
         "entity_kind": entity_kind,
@@ -240,6 +243,75 @@ async def create_quantum(
         "key_points_translated": key_points_translated,
     }
 
+
+async def create_quantum(
+    session: AsyncSession,
+    *,
+    theme_id: uuid.UUID,
+    run_id: uuid.UUID | None,
+    entity_kind: str,
+    title: str,
+    summary_text: str,
+    key_points: list[str] | None,
+    language: str | None,
+    date_at: datetime | None,
+    verification_url: str,
+    canonical_url: str | None,
+    dedup_key: str | None,
+    fingerprint: str | None,
+    identifiers: list[dict[str, Any]] | None,
+    matched_terms: list[str] | None,
+    matched_term_ids: list[str] | None,
+    retriever_query: str | None,
+    rank_score: float | None,
+    opinion_score: list[dict[str, Any]] | None = None,
+    total_score: float | None = None,
+    source_system: str,
+    site_id: uuid.UUID | None,
+    retriever_name: str,
+    retriever_version: str | None,
+    attrs: dict[str, Any] | None,
+    raw_payload_ref: uuid.UUID | None,
+    content_ref: str | None,
+    title_translated: str | None = None,
+    summary_text_translated: str | None = None,
+    key_points_translated: list[str] | None = None,
+) -> Quantum:
+    """
+    Создать квант с дедупликацией по (theme_id, dedup_key).
+    При конфликте заполняет только пустые/NULL поля и возвращает мастер-запись.
+    """
+    values = build_quantum_values(
+        theme_id=theme_id,
+        run_id=run_id,
+        entity_kind=entity_kind,
+        title=title,
+        summary_text=summary_text,
+        key_points=key_points,
+        language=language,
+        date_at=date_at,
+        verification_url=verification_url,
+        canonical_url=canonical_url,
+        dedup_key=dedup_key,
+        fingerprint=fingerprint,
+        identifiers=identifiers,
+        matched_terms=matched_terms,
+        matched_term_ids=matched_term_ids,
+        retriever_query=retriever_query,
+        rank_score=rank_score,
+        opinion_score=opinion_score,
+        total_score=total_score,
+        source_system=source_system,
+        site_id=site_id,
+        retriever_name=retriever_name,
+        retriever_version=retriever_version,
+        attrs=attrs,
+        raw_payload_ref=raw_payload_ref,
+        content_ref=content_ref,
+        title_translated=title_translated,
+        summary_text_translated=summary_text_translated,
+        key_points_translated=key_points_translated,
+    )
     stmt = build_upsert_stmt(values=values).returning(Quantum.id)
     result = await session.execute(stmt)
     quantum_id = result.scalar_one()
@@ -248,6 +320,63 @@ async def create_quantum(
     return row
 
 
+def _split_upsert_rounds(rows: list[dict[str, Any]]) -> list[list[int]]:
+    """
+    Разложить индексы строк по раундам так, чтобы в одном раунде (theme_id, dedup_key) не повторялся:
+    Postgres не даёт ON CONFLICT DO UPDATE затронуть одну строку дважды в одном INSERT.
+    Повторы уходят в следующие раунды — как при поштучной вставке, они дозаполняют пустые поля.
+    """
+    rounds: list[list[int]] = []
+    occurrences: dict[tuple[Any, str], int] = {}
+    for i, row in enumerate(rows):
+        key = (row["theme_id"], row["dedup_key"])
+        n = occurrences.get(key, 0)
+        occurrences[key] = n + 1
+        if n == len(rounds):
+            rounds.append([])
+        rounds[n].append(i)
+    return rounds
+
+
+async def bulk_upsert_quanta(
+    session: AsyncSession,
+    rows: list[dict[str, Any]],
+    *,
+    chunk_size: int = BULK_UPSERT_CHUNK_SIZE,
+) -> list[Quantum]:
+    """
+    Пакетный upsert квантов: многострочный INSERT ... ON CONFLICT (theme_id, dedup_key)
+    с той же политикой заполнения, что и build_upsert_stmt; по chunk_size строк на запрос.
+    rows — значения из build_quantum_values.
+    Возвращает Quantum в порядке rows (дубликаты внутри пачки — одна и та же запись).
+    """
+    if not rows:
+        return []
+    chunk_size = max(1, int(chunk_size))
+    ids_by_key: dict[tuple[Any, str], uuid.UUID] = {}
+    for round_indices in _split_upsert_rounds(rows):
+        for start in range(0, len(round_indices), chunk_size):
+            chunk = [rows[i] for i in round_indices[start : start + chunk_size]]
+            stmt = build_upsert_stmt(values=chunk).returning(
+                Quantum.id, Quantum.theme_id, Quantum.dedup_key
+            )
+            result = await session.execute(stmt)
+            for quantum_id, theme_id, dedup_key in result.all():
+                ids_by_key[(theme_id, dedup_key)] = quantum_id
+
+    unique_ids = list(dict.fromkeys(ids_by_key.values()))
+    by_id: dict[uuid.UUID, Quantum] = {}
+    for start in range(0, len(unique_ids), chunk_size):
+        res = await session.execute(
+            sa.select(Quantum)
+            .where(Quantum.id.in_(unique_ids[start : start + chunk_size]))
+            .execution_options(populate_existing=True)
+        )
+        for row in res.scalars().all():
+            by_id[row.id] = row
+    return [by_id[ids_by_key[(r["theme_id"], r["dedup_key"])]] for r in rows]
+
+
 async def get_quantum(
     session: AsyncSession,
     *,
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import uuid
@@ -12,16 +13,35 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.integrations.llm.service import LLMService
 from app.integrations.prompts import PromptService
-from app.modules.quanta.crud import create_quantum
+from app.integrations.translation.memory import (
+    TranslationMemory,
+    quantum_segments,
+    quantum_translation_from_memory,
+    quantum_translation_pairs,
+)
+from app.modules.quanta.crud import build_quantum_values, bulk_upsert_quanta, create_quantum
 from app.modules.quanta.models import Quantum
 from app.modules.quanta.schemas import QuantumCreate
 
-BATCH_SIZE = 5
+# Пакеты перевода (LLM): макс. квантов и оценочных токенов входа в пакете, параллельных вызовов
+TRANSLATE_BATCH_MAX_ITEMS = 20
+TRANSLATE_BATCH_MAX_TOKENS = 2500
+TRANSLATE_MAX_CONCURRENCY = 4
 QUANTA_TRANSLATE_PROMPT = "quanta.translate_fields.v1"
+# Имя переводчика в ключе памяти переводов (translation_memory) для перевода квантов через LLM
+QUANTA_TRANSLATE_MEMORY_TRANSLATOR = "llm"
 QUANTA_RELEVANCE_SCORE_PROMPT = "quanta.relevance_score.v1"
 # Лимит токенов ответа на один батч перевода (чтобы не ждать бесконечно)
 TRANSLATE_MAX_TOKENS = 8192
 RELEVANCE_SCORE_MAX_TOKENS = 4096
+# Оценка релевантности пачками: заголовков и оценочных токенов в одной пачке, параллельных вызовов LLM,
+# повторов неудавшейся пачки (ответ ~8 токенов на заголовок должен уместиться в RELEVANCE_SCORE_MAX_TOKENS)
+RELEVANCE_SCORE_BATCH_MAX_ITEMS = 100
+RELEVANCE_SCORE_BATCH_MAX_TOKENS = 6000
+RELEVANCE_SCORE_MAX_CONCURRENCY = 4
+RELEVANCE_SCORE_CHUNK_RETRIES = 1
+# Служебные ключи attrs, нужные только в рамках запроса (привязка эмбеддинга к кванту), — в БД не пишутся
+_TRANSIENT_ATTRS = frozenset({"creation_id"})
 
 
 class _FakeQuantumForTranslate:
@@ -56,20 +76,65 @@ def _uuid_or_none(s: str | None) -> uuid.UUID | None:
         return None
 
 
-async def save_quanta_from_search(
+def _search_item_values(
+    q: QuantumCreate,
+    *,
+    theme_id: uuid.UUID,
+    run_id: uuid.UUID | None,
+    translation: dict[str, Any] | None,
+    relevance: dict[str, Any] | None,
+) -> dict[str, Any]:
+    """Значения строки theme_quanta для кванта из поиска (с переводами и оценкой релевантности)."""
+    identifiers_dict = [x.model_dump() for x in q.identifiers] if q.identifiers else []
+    opinion_score = relevance.get("opinion_score") if isinstance(relevance, dict) else None
+    total_score = relevance.get("total_score") if isinstance(relevance, dict) else None
+    if opinion_score is not None and not isinstance(opinion_score, list):
+        opinion_score = None
+    t = translation
+    return build_quantum_values(
+        theme_id=theme_id,
+        run_id=run_id or _uuid_or_none(q.run_id),
+        entity_kind=q.entity_kind,
+        title=q.title,
+        summary_text=q.summary_text,
+        key_points=q.key_points or [],
+        language=q.language,
+        date_at=q.date_at,
+        verification_url=q.verification_url,
+        canonical_url=q.canonical_url,
+        dedup_key=q.dedup_key,
+        fingerprint=q.fingerprint,
+        identifiers=identifiers_dict,
+        matched_terms=q.matched_terms or [],
+        matched_term_ids=q.matched_term_ids or [],
+        retriever_query=q.retriever_query,
+        rank_score=q.rank_score,
+        opinion_score=opinion_score,
+        total_score=total_score if isinstance(total_score, (int, float)) else None,
+        source_system=q.source_system,
+        site_id=_uuid_or_none(q.site_id),
+        retriever_name=q.retriever_name,
+        retriever_version=q.retriever_version,
+        attrs={k: v for k, v in (q.attrs or {}).items() if k not in _TRANSIENT_ATTRS},
+        raw_payload_ref=_uuid_or_none(q.raw_payload_ref),
+        content_ref=q.content_ref,
+        title_translated=t.get("title_translated") if t else None,
+        summary_text_translated=t.get("summary_text_translated") if t else None,
+        key_points_translated=t.get("key_points_translated") if t else None,
+    )
+
+
+async def save_quanta_from_search_mapped(
     session: AsyncSession,
     items: list[QuantumCreate],
     run_id: uuid.UUID | None = None,
     translations_by_index: dict[int, dict[str, Any]] | None = None,
     relevance_by_index: dict[int, dict[str, Any]] | None = None,
-) -> list[Quantum]:
+) -> tuple[list[Quantum], dict[str, Quantum]]:
     """
-    Сохранить кванты, полученные поиском, в БД (upsert по theme_id + dedup_key).
-    Если передан translations_by_index (индекс в items -> переводы), заполняются
-    title_translated, summary_text_translated, key_points_translated.
-    Если передан relevance_by_index (индекс -> {opinion_score, total_score}), заполняются
-    opinion_score и total_score.
-    Возвращает список созданных/обновлённых Quantum в том же порядке, что и items (пропуски не возвращаются).
+    Как save_quanta_from_search, но дополнительно возвращает creation_id -> Quantum.
+    creation_id берётся из входных attrs (его присваивает SearchExecutor); в attrs записи в БД
+    он не сохраняется, поэтому отдельная чистка attrs после привязки эмбеддингов не нужна.
     """
     logger = logging.getLogger(__name__)
     n_with_translation = sum(1 for i in range(len(items)) if (translations_by_index or {}).get(i))
@@ -78,54 +143,54 @@ async def save_quanta_from_search(
         len(items),
         n_with_translation,
     )
-    created: list[Quantum] = []
     trans = translations_by_index or {}
     rel_by_idx = relevance_by_index or {}
+    rows: list[dict[str, Any]] = []
+    creation_ids: list[str | None] = []
     for i, q in enumerate(items):
         theme_id = _uuid_or_none(q.theme_id)
         if not theme_id:
             continue
-        identifiers_dict = [x.model_dump() for x in q.identifiers] if q.identifiers else []
-        t = trans.get(i)
-        rel = rel_by_idx.get(i)
-        opinion_score = rel.get("opinion_score") if isinstance(rel, dict) else None
-        total_score = rel.get("total_score") if isinstance(rel, dict) else None
-        if opinion_score is not None and not isinstance(opinion_score, list):
-            opinion_score = None
-        row = await create_quantum(
-            session,
-            theme_id=theme_id,
-            run_id=run_id or _uuid_or_none(q.run_id),
-            entity_kind=q.entity_kind,
-            title=q.title,
-            summary_text=q.summary_text,
-            key_points=q.key_points or [],
-            language=q.language,
-            date_at=q.date_at,
-            verification_url=q.verification_url,
-            canonical_url=q.canonical_url,
-            dedup_key=q.dedup_key,
-            fingerprint=q.fingerprint,
-            identifiers=identifiers_dict,
-            matched_terms=q.matched_terms or [],
-            matched_term_ids=q.matched_term_ids or [],
-            retriever_query=q.retriever_query,
-            rank_score=q.rank_score,
-            opinion_score=opinion_score,
-            total_score=total_score if isinstance(total_score, (int, float)) else None,
-            source_system=q.source_system,
-            site_id=_uuid_or_none(q.site_id),
-            retriever_name=q.retriever_name,
-            retriever_version=q.retriever_version,
-            attrs=q.attrs or {},
-            raw_payload_ref=_uuid_or_none(q.raw_payload_ref),
-            content_ref=q.content_ref,
-            title_translated=t.get("title_translated") if t else None,
-            summary_text_translated=t.get("summary_text_translated") if t else None,
-            key_points_translated=t.get("key_points_translated") if t else None,
+        rows.append(
+            _search_item_values(
+                q,
+                theme_id=theme_id,
+                run_id=run_id,
+                translation=trans.get(i),
+                relevance=rel_by_idx.get(i),
+            )
         )
-        created.append(row)
+        creation_ids.append((q.attrs or {}).get("creation_id"))
+
+    created = await bulk_upsert_quanta(session, rows)
+    by_creation_id = {cid: row for cid, row in zip(creation_ids, created) if cid}
     logger.info("search/save_quanta: записано квантов=%s", len(created))
+    return created, by_creation_id
+
+
+async def save_quanta_from_search(
+    session: AsyncSession,
+    items: list[QuantumCreate],
+    run_id: uuid.UUID | None = None,
+    translations_by_index: dict[int, dict[str, Any]] | None = None,
+    relevance_by_index: dict[int, dict[str, Any]] | None = None,
+) -> list[Quantum]:
+    """
+    Сохранить кванты, полученные поиском, в БД (upsert по theme_id + dedup_key).
+    Все кванты уходят пакетным INSERT ... ON CONFLICT (bulk_upsert_quanta), а не по одному.
+    Если передан translations_by_index (индекс в items -> переводы), заполняются
+    title_translated, summary_text_translated, key_points_translated.
+    Если передан relevance_by_index (индекс -> {opinion_score, total_score}), заполняются
+    opinion_score и total_score.
+    Возвращает список созданных/обновлённых Quantum в том же порядке, что и items (пропуски не возвращаются).
+    """
+    created, _ = await save_quanta_from_search_mapped(
+        session,
+        items,
+        run_id=run_id,
+        translations_by_index=translations_by_index,
+        relevance_by_index=relevance_by_index,
+    )
     return created
 
 
@@ -207,20 +272,109 @@ class _LangOnly:
         self.language = language
 
 
+def _translate_payload(q: _QuantumLike, titles_only: bool) -> dict[str, Any]:
+    """Элемент массива items для промпта перевода."""
+    if titles_only:
+        return {"id": str(q.id), "title": q.title or "", "summary_text": "", "key_points": []}
+    return {
+        "id": str(q.id),
+        "title": q.title or "",
+        "summary_text": q.summary_text or "",
+        "key_points": list(q.key_points) if q.key_points else [],
+    }
+
+
+def _estimate_payload_tokens(payload: dict[str, Any]) -> int:
+    """Оценка токенов элемента пакета перевода (~4 символа на токен по JSON-представлению)."""
+    return max(1, (len(json.dumps(payload, ensure_ascii=False)) + 3) // 4)
+
+
+def _translate_batches(
+    payloads: list[dict[str, Any]],
+    max_items: int,
+    max_tokens: int,
+) -> list[list[dict[str, Any]]]:
+    """
+    Разбить элементы на пакеты перевода: не больше max_items элементов и max_tokens оценочных
+    токенов на пакет (ответ с переводом примерно того же объёма должен уложиться в TRANSLATE_MAX_TOKENS).
+    Элемент больше max_tokens идёт отдельным пакетом.
+    """
+    max_items = max(1, max_items)
+    batches: list[list[dict[str, Any]]] = []
+    current: list[dict[str, Any]] = []
+    current_tokens = 0
+    for payload in payloads:
+        tokens = _estimate_payload_tokens(payload)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(payload)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
 def get_translate_batch_count(
     items: list[QuantumCreate],
     primary_language: str,
     limit: int = 0,
+    *,
+    titles_only: bool = False,
+    batch_max_items: int = TRANSLATE_BATCH_MAX_ITEMS,
+    batch_max_tokens: int = TRANSLATE_BATCH_MAX_TOKENS,
 ) -> int:
-    """Число батчей для перевода (для расчёта таймаута). Батчи по BATCH_SIZE квантов. limit: 0 = все."""
-    to_translate_count = sum(
-        1 for q in items if _needs_translation(_LangOnly(q.language), primary_language)
-    )
+    """Число пакетов перевода (для расчёта таймаута) — то же разбиение, что в translate_quanta_fields. limit: 0 = все."""
+    to_translate = [
+        _FakeQuantumForTranslate(i, q)
+        for i, q in enumerate(items)
+        if _needs_translation(_LangOnly(q.language), primary_language)
+    ]
     if limit > 0:
-        to_translate_count = min(to_translate_count, limit)
-    if to_translate_count <= 0:
+        to_translate = to_translate[:limit]
+    if not to_translate:
         return 0
-    return (to_translate_count + BATCH_SIZE - 1) // BATCH_SIZE
+    payloads = [_translate_payload(q, titles_only) for q in to_translate]
+    return len(_translate_batches(payloads, batch_max_items, batch_max_tokens))
+
+
+def _parse_translations(text: str, titles_only: bool) -> list[dict[str, Any]] | None:
+    """Разобрать ответ {"translations": [...]} (допускается обёртка ```); None — не JSON."""
+    text = (text or "").strip()
+    if text.startswith("```"):
+        lines = text.splitlines()
+        if lines[0].strip().startswith("```"):
+            lines = lines[1:]
+        if lines and lines[-1].strip() == "```":
+            lines = lines[:-1]
+        text = "\n".join(lines)
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+    translations = data.get("translations") if isinstance(data, dict) else None
+    if not isinstance(translations, list):
+        return []
+    rows: list[dict[str, Any]] = []
+    for t in translations:
+        if not isinstance(t, dict):
+            continue
+        tid = t.get("id")
+        if tid is None:
+            continue
+        row = {
+            "id": str(tid),
+            "title_translated": t.get("title_translated") if isinstance(t.get("title_translated"), str) else "",
+            "summary_text_translated": t.get("summary_text_translated") if isinstance(t.get("summary_text_translated"), str) else "",
+            "key_points_translated": t.get("key_points_translated") if isinstance(t.get("key_points_translated"), list) else [],
+        }
+        if titles_only:
+            row["summary_text_translated"] = None
+            row["key_points_translated"] = None
+        rows.append(row)
+    return rows
 
 
 async def translate_quanta_fields(
@@ -233,6 +387,10 @@ async def translate_quanta_fields(
     billing_session: AsyncSession | None = None,
     billing_theme_id: uuid.UUID | None = None,
     titles_only: bool = False,
+    batch_max_items: int = TRANSLATE_BATCH_MAX_ITEMS,
+    batch_max_tokens: int = TRANSLATE_BATCH_MAX_TOKENS,
+    max_concurrency: int = TRANSLATE_MAX_CONCURRENCY,
+    timeout_s: float | None = None,
 ) -> list[dict[str, Any]]:
     """
     Перевести поля квантов на основной язык темы.
@@ -240,7 +398,13 @@ async def translate_quanta_fields(
     Основной язык темы — theme.languages[0]; передаётся в primary_language.
     В пакет попадают только кванты, у которых язык не совпадает с основным.
     limit: 0 = все, >0 = только первые N квантов для перевода (для отладки).
-    Батчи по BATCH_SIZE квантов, один вызов LLM на батч.
+    Пакеты формируются по оценке токенов (batch_max_tokens) и числу квантов (batch_max_items),
+    один вызов LLM на пакет; пакеты выполняются конкурентно, не больше max_concurrency одновременно.
+
+    timeout_s: общий лимит времени. По его истечении незавершённые пакеты отменяются,
+    а переводы уже завершённых пакетов возвращаются (частичный результат вместо потери всего).
+    Биллинг вызова LLM, уже получившего ответ, отменой не прерывается (LLMService дописывает его
+    на billing_session до отмены), поэтому по возврату сессия свободна.
 
     При titles_only=True в запрос к LLM уходят только заголовки (остальные поля пустые);
     в ответе сохраняются только title_translated, summary_text_translated и key_points_translated — None.
@@ -255,88 +419,68 @@ async def translate_quanta_fields(
     if not to_translate:
         return []
 
-    result: list[dict[str, Any]] = []
-    for i in range(0, len(to_translate), BATCH_SIZE):
-        batch = to_translate[i : i + BATCH_SIZE]
-        items = []
-        for q in batch:
-            if titles_only:
-                items.append({
-                    "id": str(q.id),
-                    "title": q.title or "",
-                    "summary_text": "",
-                    "key_points": [],
-                })
-            else:
-                items.append({
-                    "id": str(q.id),
-                    "title": q.title or "",
-                    "summary_text": q.summary_text or "",
-                    "key_points": list(q.key_points) if q.key_points else [],
-                })
-        items_json = json.dumps(items, ensure_ascii=False)
-
-        try:
-            response = await llm_service.generate_from_prompt(
-                QUANTA_TRANSLATE_PROMPT,
-                {"target_language": primary_language, "items": items_json},
-                prompt_service,
-                generation={"max_tokens": TRANSLATE_MAX_TOKENS},
-                task="quanta_translate_fields",
-                billing_session=billing_session,
-                billing_theme_id=billing_theme_id,
-            )
-        except Exception as e:
-            logger.warning("translate_quanta_fields: LLM batch failed (batch size=%s): %s", len(batch), e)
-            continue
+    batches = _translate_batches(
+        [_translate_payload(q, titles_only) for q in to_translate],
+        batch_max_items,
+        batch_max_tokens,
+    )
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
 
-        text = (response.text or "").strip()
-        raw_preview_lines = (response.text or "").splitlines()[:30]
-        raw_preview = "\n".join(raw_preview_lines)
-        if not text:
+    async def _translate_batch(batch: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        items_json = json.dumps(batch, ensure_ascii=False)
+        async with semaphore:
+            try:
+                response = await llm_service.generate_from_prompt(
+                    QUANTA_TRANSLATE_PROMPT,
+                    {"target_language": primary_language, "items": items_json},
+                    prompt_service,
+                    generation={"max_tokens": TRANSLATE_MAX_TOKENS},
+                    task="quanta_translate_fields",
+                    billing_session=billing_session,
+                    billing_theme_id=billing_theme_id,
+                )
+            except Exception as e:
+                logger.warning("translate_quanta_fields: LLM batch failed (batch size=%s): %s", len(batch), e)
+                return []
+
+        raw_preview = "\n".join((response.text or "").splitlines()[:30])
+        if not (response.text or "").strip():
             logger.warning(
                 "translate_quanta_fields: пустой ответ от LLM (первые 30 строк сырого ответа):\n%s",
                 raw_preview or "(пусто)",
             )
-            continue
-        # Убираем обёртку markdown (```json ... ```), если есть
-        if text.startswith("```"):
-            lines = text.splitlines()
-            if lines[0].strip().startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]
-            text = "\n".join(lines)
-        try:
-            data = json.loads(text)
-        except json.JSONDecodeError as e:
+            return []
+        rows = _parse_translations(response.text or "", titles_only)
+        if rows is None:
             logger.warning(
-                "translate_quanta_fields: invalid JSON from LLM: %s; первые 30 строк ответа:\n%s",
-                e,
+                "translate_quanta_fields: invalid JSON from LLM; первые 30 строк ответа:\n%s",
                 raw_preview,
             )
-            continue
+            return []
+        return rows
 
-        translations = data.get("translations")
-        if not isinstance(translations, list):
-            continue
-        for t in translations:
-            if not isinstance(t, dict):
-                continue
-            tid = t.get("id")
-            if tid is None:
-                continue
-            row = {
-                "id": str(tid),
-                "title_translated": t.get("title_translated") if isinstance(t.get("title_translated"), str) else "",
-                "summary_text_translated": t.get("summary_text_translated") if isinstance(t.get("summary_text_translated"), str) else "",
-                "key_points_translated": t.get("key_points_translated") if isinstance(t.get("key_points_translated"), list) else [],
-            }
-            if titles_only:
-                row["summary_text_translated"] = None
-                row["key_points_translated"] = None
-            result.append(row)
+    tasks = [asyncio.create_task(_translate_batch(batch)) for batch in batches]
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=timeout_s)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    if pending:
+        logger.warning(
+            "translate_quanta_fields: не уложились в %s с — отменено пакетов=%s из %s, возвращаем завершённые",
+            timeout_s,
+            len(pending),
+            len(tasks),
+        )
 
+    # Результаты в порядке пакетов (а не завершения) — детерминированный порядок переводов
+    result: list[dict[str, Any]] = []
+    for task in tasks:
+        if task.cancelled() or task.exception() is not None:
+            continue
+        result.extend(task.result())
     return result
 
 
@@ -350,33 +494,102 @@ async def translate_quanta_create_items(
     billing_session: AsyncSession | None = None,
     billing_theme_id: uuid.UUID | None = None,
     titles_only: bool = False,
+    batch_max_items: int = TRANSLATE_BATCH_MAX_ITEMS,
+    batch_max_tokens: int = TRANSLATE_BATCH_MAX_TOKENS,
+    max_concurrency: int = TRANSLATE_MAX_CONCURRENCY,
+    timeout_s: float | None = None,
+    memory: TranslationMemory | None = None,
+    memory_session: AsyncSession | None = None,
 ) -> dict[int, dict[str, Any]]:
     """
     Перевести поля квантов (до сохранения в БД).
     Использует индекс в items как временный id для сопоставления с ответом LLM.
     limit: 0 = все, >0 = только первые N квантов, требующих перевода.
-    titles_only: см. translate_quanta_fields.
+    titles_only, пакеты, max_concurrency, timeout_s: см. translate_quanta_fields.
+
+    memory / memory_session: память переводов — кванты, все фрагменты которых уже переводились
+    на этот язык, берутся из памяти и в LLM не уходят; новые переводы запоминаются.
+    Без memory_session используется только LRU процесса.
 
     Возвращает словарь индекс -> {title_translated, summary_text_translated, key_points_translated}.
     """
     if not items:
         return {}
-    fake_list = [_FakeQuantumForTranslate(i, q) for i, q in enumerate(items)]
+    candidates = [
+        i for i, q in enumerate(items) if _needs_translation(_LangOnly(q.language), primary_language)
+    ]
+    if limit > 0:
+        candidates = candidates[:limit]
+    if not candidates:
+        return {}
+
+    target = (primary_language or "").strip().lower()
+
+    def _source_lang(q: QuantumCreate) -> str:
+        return (q.language or "").strip().lower() or "auto"
+
+    def _segments(q: QuantumCreate) -> tuple[str, str, list[str]]:
+        if titles_only:
+            return q.title or "", "", []
+        return q.title or "", q.summary_text or "", list(q.key_points) if q.key_points else []
+
+    by_index: dict[int, dict[str, Any]] = {}
+    to_llm = candidates
+    if memory is not None:
+        by_lang: dict[str, list[int]] = {}
+        for i in candidates:
+            by_lang.setdefault(_source_lang(items[i]), []).append(i)
+        to_llm = []
+        for source_lang, indices in by_lang.items():
+            found = await memory.lookup(
+                QUANTA_TRANSLATE_MEMORY_TRANSLATOR,
+                source_lang,
+                target,
+                [seg for i in indices for seg in quantum_segments(*_segments(items[i]))],
+                session=memory_session,
+            )
+            for i in indices:
+                cached = quantum_translation_from_memory(*_segments(items[i]), found)
+                if cached is None:
+                    to_llm.append(i)
+                    continue
+                if titles_only:
+                    cached["summary_text_translated"] = None
+                    cached["key_points_translated"] = None
+                by_index[i] = {"id": str(i), **cached}
+        to_llm.sort()
+        if not to_llm:
+            return by_index
+
+    fake_list = [_FakeQuantumForTranslate(i, items[i]) for i in to_llm]
     translations = await translate_quanta_fields(
         fake_list,
         primary_language,
         llm_service,
         prompt_service,
-        limit=limit,
         billing_session=billing_session,
         billing_theme_id=billing_theme_id,
         titles_only=titles_only,
+        batch_max_items=batch_max_items,
+        batch_max_tokens=batch_max_tokens,
+        max_concurrency=max_concurrency,
+        timeout_s=timeout_s,
     )
-    by_index: dict[int, dict[str, Any]] = {}
+    requested = set(to_llm)
+    new_pairs: dict[str, dict[str, str]] = {}
     for t in translations:
         tid = t.get("id")
-        if tid is not None and str(tid).isdigit():
-            by_index[int(tid)] = t
+        if tid is None or not str(tid).isdigit() or int(tid) not in requested:
+            continue
+        i = int(tid)
+        by_index[i] = t
+        if memory is not None:
+            new_pairs.setdefault(_source_lang(items[i]), {}).update(
+                quantum_translation_pairs(*_segments(items[i]), t)
+            )
+    if memory is not None:
+        for source_lang, pairs in new_pairs.items():
+            await memory.store(QUANTA_TRANSLATE_MEMORY_TRANSLATOR, source_lang, target, pairs, session=memory_session)
     return by_index
 
 
@@ -393,6 +606,55 @@ def _clamp_score(value: Any) -> float | None:
         return None
 
 
+def _relevance_batches(items: list[QuantumCreate], max_items: int, max_tokens: int) -> list[list[int]]:
+    """
+    Разбить индексы квантов на пачки для оценки релевантности: не больше max_items заголовков
+    и max_tokens оценочных токенов (~4 символа на токен) в списке заголовков одной пачки.
+    """
+    max_items = max(1, max_items)
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for i, q in enumerate(items):
+        tokens = max(1, (len((q.title or "").strip()) + 8 + 3) // 4)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_relevance_scores(text: str) -> dict[str, float] | None:
+    """Разобрать ответ модели {"1": 0.5, ...} (допускается обёртка ```); None — не JSON."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    if text.startswith("```"):
+        lines = text.splitlines()
+        if lines[0].strip().startswith("```"):
+            lines = lines[1:]
+        if lines and lines[-1].strip() == "```":
+            lines = lines[:-1]
+        text = "\n".join(lines)
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    parsed: dict[str, float] = {}
+    for k, v in (data if isinstance(data, dict) else {}).items():
+        key = str(k).strip()
+        if not key.isdigit():
+            continue
+        s = _clamp_score(v)
+        if s is not None:
+            parsed[key] = s
+    return parsed
+
+
 async def score_quanta_relevance(
     theme_description: str,
     items: list[QuantumCreate],
@@ -402,12 +664,21 @@ async def score_quanta_relevance(
     *,
     billing_session: AsyncSession | None = None,
     billing_theme_id: uuid.UUID | None = None,
+    batch_max_items: int = RELEVANCE_SCORE_BATCH_MAX_ITEMS,
+    batch_max_tokens: int = RELEVANCE_SCORE_BATCH_MAX_TOKENS,
+    max_concurrency: int = RELEVANCE_SCORE_MAX_CONCURRENCY,
+    chunk_retries: int = RELEVANCE_SCORE_CHUNK_RETRIES,
 ) -> list[dict[str, Any]]:
     """
     Оценка релевантности квантов теме от нескольких моделей ИИ.
 
     В запрос к ИИ передаются только описание темы и нумерованный список заголовков (title).
-    Ответ модели — JSON вида {"1": 0.5, "2": 0.1, ...}. Номер соответствует индексу кванта (1-based).
+    Ответ модели — JSON вида {"1": 0.5, "2": 0.1, ...}. Номер соответствует позиции заголовка в пачке (1-based).
+
+    Заголовки режутся на пачки (batch_max_items заголовков, batch_max_tokens оценочных токенов),
+    чтобы ответ укладывался в RELEVANCE_SCORE_MAX_TOKENS. Пачки всех моделей выполняются
+    конкурентно (не больше max_concurrency вызовов), оценки сводятся обратно по глобальному индексу.
+    Пачка, вызов которой упал или вернул не JSON, повторяется отдельно до chunk_retries раз.
 
     Возвращает список той же длины, что и items: для каждого кванта
     {"opinion_score": [{"model": str, "score": float}, ...], "total_score": float}.
@@ -417,62 +688,81 @@ async def score_quanta_relevance(
     if not items or not model_names:
         return [{"opinion_score": [], "total_score": None} for _ in items] if items else []
 
-    titles_list = "\n".join(f"{i}. { (q.title or '').strip() or '(без заголовка)' }" for i, q in enumerate(items, 1))
-    vars_for_prompt = {
-        "theme_description": (theme_description or "").strip() or "(описание темы не задано)",
-        "titles_list": titles_list,
-    }
+    theme_text = (theme_description or "").strip() or "(описание темы не задано)"
+    batches = _relevance_batches(items, batch_max_items, batch_max_tokens)
+    model_keys = list(dict.fromkeys((m or "").strip().lower() for m in model_names if (m or "").strip()))
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
 
-    # По каждой модели — один вызов, ответ {"1": 0.5, "2": 0.1, ...}
-    scores_by_model: list[tuple[str, dict[str, float]]] = []  # (model_name, {index_str -> score})
-    for model_name in model_names:
-        model_key = (model_name or "").strip().lower()
-        if not model_key:
-            continue
-        try:
-            response = await llm_service.generate_from_prompt(
-                QUANTA_RELEVANCE_SCORE_PROMPT,
-                vars_for_prompt,
-                prompt_service,
-                provider=model_key,
-                generation={"max_tokens": RELEVANCE_SCORE_MAX_TOKENS},
-                task="quanta_relevance_score",
-                billing_session=billing_session,
-                billing_theme_id=billing_theme_id,
-            )
-        except Exception as e:
-            logger.warning(
-                "score_quanta_relevance: вызов модели %s не удался: %s",
-                model_key,
-                e,
-            )
-            continue
+    async def _score_batch(model_key: str, indices: list[int]) -> dict[int, float] | None:
+        """Оценки одной пачки от одной модели: глобальный индекс -> score; None — пачка не удалась."""
+        titles_list = "\n".join(
+            f"{pos}. { (items[i].title or '').strip() or '(без заголовка)' }"
+            for pos, i in enumerate(indices, 1)
+        )
+        vars_for_prompt = {"theme_description": theme_text, "titles_list": titles_list}
+        attempts = 1 + max(0, chunk_retries)
+        for attempt in range(1, attempts + 1):
+            async with semaphore:
+                try:
+                    response = await llm_service.generate_from_prompt(
+                        QUANTA_RELEVANCE_SCORE_PROMPT,
+                        vars_for_prompt,
+                        prompt_service,
+                        provider=model_key,
+                        generation={"max_tokens": RELEVANCE_SCORE_MAX_TOKENS},
+                        task="quanta_relevance_score",
+                        billing_session=billing_session,
+                        billing_theme_id=billing_theme_id,
+                    )
+                except Exception as e:
+                    logger.warning(
+                        "score_quanta_relevance: вызов модели %s не удался (пачка %s шт., попытка %s/%s): %s",
+                        model_key,
+                        len(indices),
+                        attempt,
+                        attempts,
+                        e,
+                    )
+                    continue
+            parsed = _parse_relevance_scores(response.text or "")
+            if parsed is None:
+                logger.warning(
+                    "score_quanta_relevance: модель %s вернула не JSON (пачка %s шт., попытка %s/%s)",
+                    model_key,
+                    len(indices),
+                    attempt,
+                    attempts,
+                )
+                continue
+            return {
+                indices[int(pos) - 1]: score
+                for pos, score in parsed.items()
+                if 1 <= int(pos) <= len(indices)
+            }
+        return None
 
-        text = (response.text or "").strip()
-        if not text:
-            continue
-        if text.startswith("```"):
-            lines = text.splitlines()
-            if lines[0].strip().startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]
-            text = "\n".join(lines)
-        try:
-            data = json.loads(text)
-        except json.JSONDecodeError as e:
-            logger.warning("score_quanta_relevance: модель %s вернула не JSON: %s", model_key, e)
-            continue
+    jobs = [(model_key, indices) for model_key in model_keys for indices in batches]
+    batch_results = await asyncio.gather(*(_score_batch(m, idx) for m, idx in jobs))
 
-        parsed: dict[str, float] = {}
-        for k, v in (data if isinstance(data, dict) else {}).items():
-            key = str(k).strip()
-            if not key.isdigit():
-                continue
-            s = _clamp_score(v)
-            if s is not None:
-                parsed[key] = s
-        scores_by_model.append((model_key, parsed))
+    # Сводим оценки пачек по моделям: model_key -> {глобальный индекс -> score}
+    scores_by_model: list[tuple[str, dict[str, float]]] = []  # (model_name, {index_str (1-based) -> score})
+    merged: dict[str, dict[str, float]] = {}
+    for (model_key, _), batch_scores in zip(jobs, batch_results):
+        if batch_scores is None:
+            continue
+        target = merged.setdefault(model_key, {})
+        for i, score in batch_scores.items():
+            target[str(i + 1)] = score
+    for model_key in model_keys:
+        if model_key in merged:
+            scores_by_model.append((model_key, merged[model_key]))
+    failed = sum(1 for r in batch_results if r is None)
+    if failed:
+        logger.warning(
+            "score_quanta_relevance: не удалось оценить пачек=%s из %s (кванты без оценки этих моделей)",
+            failed,
+            len(jobs),
+        )
 
     # Собираем opinion_score и total_score для каждого кванта (по индексу 0..len(items)-1)
     result: list[dict[str, Any]] = []
@@ -0,0 +1,24 @@
+"""Стабильные коды запусков обработки темы (search_runs.run_type / status)."""
+
+from enum import StrEnum
+
+
+class SearchRunType(StrEnum):
+    """Типы фоновых запусков, которые выполняет воркер (см. app.modules.search_run.jobs)."""
+
+    SEARCH_COLLECT = "search_collect"
+    ENTITY_EXTRACTION = "entity_extraction"
+    EVENT_EXTRACTION = "event_extraction"
+    LANDSCAPE_BUILD = "landscape_build"
+
+
+class SearchRunStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELED = "canceled"
+
+
+# Статусы, при которых запуск ещё не завершён (повторная постановка того же запуска не создаёт новый)
+ACTIVE_RUN_STATUSES = (SearchRunStatus.QUEUED.value, SearchRunStatus.RUNNING.value)
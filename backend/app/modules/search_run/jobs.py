@@ -0,0 +1,166 @@
+"""
+Обработчики фоновых запусков по run_type: сбор квантов, извлечение сущностей и событий, ландшафт.
+
+Обработчик получает RunContext (сессия работы, сервисы, параметры запуска) и возвращает stats запуска.
+Промежуточные commit делают сами обработчики (по батчам) — сделанная работа не теряется при сбое.
+"""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import Settings
+from app.integrations.llm import LLMService
+from app.integrations.prompts import PromptService
+from app.integrations.search.schemas import ThemeSearchCollectRequest
+from app.integrations.search.service import SearchService
+from app.integrations.search.theme_collect import collect_and_save_for_theme
+from app.integrations.translation import TranslationService
+from app.modules.entity.extractors.atoms_clusters_extractor import AtomsClustersExtractor
+from app.modules.event.service import EventExtractionService
+from app.modules.landscape.builder import LandscapeBuilder
+from app.modules.search_run.constants import SearchRunType
+
+# Верхняя граница батчей за один запуск извлечения (как у синхронных эндпоинтов)
+MAX_EXTRACT_BATCHES = 50
+
+
+class RunParamsError(ValueError):
+    """Параметры запуска не подходят для его run_type."""
+
+
+@dataclass(frozen=True)
+class RunServices:
+    """Сервисы приложения, нужные обработчикам (те же, что в app.state)."""
+
+    settings: Settings
+    llm_service: LLMService
+    prompt_service: PromptService
+    search_service: SearchService
+    translation_service: TranslationService
+
+
+@dataclass
+class RunContext:
+    run_id: uuid.UUID
+    theme_id: uuid.UUID
+    params: dict[str, Any]
+    trigger_context: dict[str, Any]
+    session: AsyncSession
+    services: RunServices
+    # Записать прогресс запуска (отдельной транзакцией, видно в GET /runs/{id} сразу)
+    report_progress: Callable[[dict[str, Any]], Awaitable[None]]
+
+
+RunHandler = Callable[[RunContext], Awaitable[dict[str, Any]]]
+
+
+def _collect_request(theme_id: uuid.UUID, params: dict[str, Any]) -> ThemeSearchCollectRequest:
+    try:
+        return ThemeSearchCollectRequest(**{**params, "theme_id": theme_id})
+    except ValidationError as e:
+        raise RunParamsError(str(e)) from e
+
+
+def validate_run_params(run_type: str, theme_id: uuid.UUID, params: dict[str, Any]) -> dict[str, Any]:
+    """Проверить и нормализовать параметры запуска (JSON для search_runs.params)."""
+    if run_type not in RUN_HANDLERS:
+        raise RunParamsError(f"Неизвестный тип запуска: {run_type}")
+    if run_type == SearchRunType.SEARCH_COLLECT:
+        request = _collect_request(theme_id, params)
+        return request.model_dump(mode="json", exclude={"theme_id"}, exclude_none=True)
+    if run_type in (SearchRunType.ENTITY_EXTRACTION, SearchRunType.EVENT_EXTRACTION):
+        max_batches = params.get("max_batches", MAX_EXTRACT_BATCHES)
+        if not isinstance(max_batches, int) or max_batches < 1:
+            raise RunParamsError("max_batches должен быть положительным целым")
+        return {"max_batches": max_batches}
+    return {}
+
+
+async def _run_search_collect(ctx: RunContext) -> dict[str, Any]:
+    request = _collect_request(ctx.theme_id, ctx.params)
+    if not request.run_id:
+        # Кванты, собранные запуском, ссылаются на него (theme_quanta.run_id)
+        request.run_id = str(ctx.run_id)
+    services = ctx.services
+    result = await collect_and_save_for_theme(
+        ctx.session,
+        request,
+        search_service=services.search_service,
+        translation_service=services.translation_service,
+        llm_service=services.llm_service,
+        prompt_service=services.prompt_service,
+    )
+    return {
+        "total_found": result.total_found,
+        "total_returned": result.total_returned,
+        "warnings": list(result.warnings or []),
+    }
+
+
+async def _run_entity_extraction(ctx: RunContext) -> dict[str, Any]:
+    settings = ctx.services.settings
+    extractor = AtomsClustersExtractor(
+        llm_service=ctx.services.llm_service,
+        prompt_service=ctx.services.prompt_service,
+        settings=settings,
+    )
+    processed_quanta = 0
+    for _ in range(ctx.params.get("max_batches", MAX_EXTRACT_BATCHES)):
+        n = await extractor.process_next_batch(
+            ctx.session,
+            theme_id=ctx.theme_id,
+            batch_size=settings.BATCH_SIZE_FOR_ENTITIES_EXTRACTION,
+        )
+        if n == 0:
+            break
+        await ctx.session.commit()
+        processed_quanta += n
+        await ctx.report_progress({"processed_quanta": processed_quanta})
+    return {"processed_quanta": processed_quanta}
+
+
+async def _run_event_extraction(ctx: RunContext) -> dict[str, Any]:
+    service = EventExtractionService(
+        llm_service=ctx.services.llm_service,
+        prompt_service=ctx.services.prompt_service,
+        settings=ctx.services.settings,
+    )
+
+    async def on_batch(processed_quanta: int, created_events: int) -> None:
+        await ctx.session.commit()
+        await ctx.report_progress({"processed_quanta": processed_quanta, "created_events": created_events})
+
+    processed_quanta, created_events = await service.process_batches(
+        ctx.session,
+        theme_id=ctx.theme_id,
+        max_batches=ctx.params.get("max_batches", MAX_EXTRACT_BATCHES),
+        on_batch=on_batch,
+    )
+    return {"processed_quanta": processed_quanta, "created_events": created_events}
+
+
+async def _run_landscape_build(ctx: RunContext) -> dict[str, Any]:
+    user_id = ctx.trigger_context.get("user_id")
+    if not user_id:
+        raise RunParamsError("landscape_build: в trigger_context нет user_id")
+    builder = LandscapeBuilder(
+        llm_service=ctx.services.llm_service,
+        prompt_service=ctx.services.prompt_service,
+        settings=ctx.services.settings,
+    )
+    row = await builder.build(ctx.session, theme_id=ctx.theme_id, user_id=uuid.UUID(str(user_id)))
+    return {"landscape_id": str(row.id)}
+
+
+RUN_HANDLERS: dict[str, RunHandler] = {
+    SearchRunType.SEARCH_COLLECT.value: _run_search_collect,
+    SearchRunType.ENTITY_EXTRACTION.value: _run_entity_extraction,
+    SearchRunType.EVENT_EXTRACTION.value: _run_event_extraction,
+    SearchRunType.LANDSCAPE_BUILD.value: _run_landscape_build,
+}
@@ -36,6 +36,11 @@ class SearchRun(Base):
                 "status IN ('queued', 'running') AND deleted_at IS NULL"
             ),
         ),
+        Index(
+            "ix_search_runs_queued",
+            "queued_at",
+            postgresql_where=text("status = 'queued' AND deleted_at IS NULL"),
+        ),
         Index(
             "uq_search_runs_idempotency_key",
             "idempotency_key",
@@ -0,0 +1,136 @@
+"""API фоновых запусков: постановка в очередь и статус/прогресс (выполняет RunWorker)."""
+
+from __future__ import annotations
+
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_db
+from app.modules.auth.router import get_current_user
+from app.modules.search_run.jobs import RunParamsError, validate_run_params
+from app.modules.search_run.model import SearchRun
+from app.modules.search_run.schemas import SearchRunCreate, SearchRunOut
+from app.modules.search_run.service import enqueue_run
+from app.modules.theme.service import get_theme_with_queries
+from app.modules.user.model import User
+
+router = APIRouter(prefix="/api/v1", tags=["runs"])
+
+
+async def _ensure_theme_access(
+    db: AsyncSession,
+    *,
+    theme_id: uuid.UUID,
+    user_id: uuid.UUID,
+) -> None:
+    """Проверяет, что тема существует и принадлежит пользователю."""
+    theme, _ = await get_theme_with_queries(db, theme_id, user_id)
+    if not theme:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Тема не найдена или недоступна",
+        )
+
+
+def _parse_uuid(value: str, name: str) -> uuid.UUID:
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неверный формат {name} (ожидается UUID)",
+        )
+
+
+def _run_to_out(run: SearchRun) -> SearchRunOut:
+    return SearchRunOut(
+        id=run.id,
+        theme_id=run.theme_id,
+        run_type=run.run_type,
+        status=run.status,
+        params=run.params or {},
+        progress=run.progress or {},
+        stats=run.stats or {},
+        error_message=run.error_message,
+        attempt=run.attempt,
+        queued_at=run.queued_at,
+        started_at=run.started_at,
+        finished_at=run.finished_at,
+    )
+
+
+@router.post(
+    "/themes/{theme_id}/runs",
+    response_model=SearchRunOut,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_theme_run(
+    theme_id: str,
+    body: SearchRunCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> SearchRunOut:
+    """
+    Поставить в очередь фоновый запуск по теме (сбор квантов, извлечение сущностей/событий, ландшафт).
+
+    Ответ сразу — запуск в статусе queued; статус и прогресс — GET /api/v1/runs/{run_id}.
+    Если такой же запуск по теме ещё не завершён, возвращается он.
+    """
+    tid = _parse_uuid(theme_id, "theme_id")
+    await _ensure_theme_access(db, theme_id=tid, user_id=current_user.id)
+    try:
+        params = validate_run_params(body.run_type.value, tid, body.params)
+    except RunParamsError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    run = await enqueue_run(
+        db,
+        theme_id=tid,
+        run_type=body.run_type.value,
+        params=params,
+        triggered_by="user",
+        trigger_context={"user_id": str(current_user.id)},
+    )
+    return _run_to_out(run)
+
+
+@router.get(
+    "/themes/{theme_id}/runs",
+    response_model=list[SearchRunOut],
+)
+async def list_theme_runs(
+    theme_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> list[SearchRunOut]:
+    """Последние запуски по теме (новые сверху)."""
+    tid = _parse_uuid(theme_id, "theme_id")
+    await _ensure_theme_access(db, theme_id=tid, user_id=current_user.id)
+    result = await db.execute(
+        select(SearchRun)
+        .where(SearchRun.theme_id == tid, SearchRun.deleted_at.is_(None))
+        .order_by(SearchRun.queued_at.desc())
+        .limit(limit)
+    )
+    return [_run_to_out(r) for r in result.scalars().all()]
+
+
+@router.get(
+    "/runs/{run_id}",
+    response_model=SearchRunOut,
+)
+async def get_run(
+    run_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> SearchRunOut:
+    """Статус, прогресс и итог запуска."""
+    rid = _parse_uuid(run_id, "run_id")
+    run = await db.get(SearchRun, rid)
+    if run is None or run.deleted_at is not None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Запуск не найден")
+    await _ensure_theme_access(db, theme_id=run.theme_id, user_id=current_user.id)
+    return _run_to_out(run)
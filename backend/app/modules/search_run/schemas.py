@@ -0,0 +1,35 @@
+"""Схемы API фоновых запусков обработки темы (search_runs)."""
+
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+from app.modules.search_run.constants import SearchRunType
+
+
+class SearchRunCreate(BaseModel):
+    run_type: SearchRunType = Field(..., description="Тип запуска: search_collect / entity_extraction / event_extraction / landscape_build")
+    params: dict[str, Any] = Field(
+        default_factory=dict,
+        description=(
+            "Параметры: для search_collect — published_from, published_to, target_links, run_id; "
+            "для извлечения — max_batches"
+        ),
+    )
+
+
+class SearchRunOut(BaseModel):
+    id: UUID
+    theme_id: UUID
+    run_type: str
+    status: str = Field(..., description="queued / running / done / failed / canceled")
+    params: dict[str, Any]
+    progress: dict[str, Any] = Field(..., description="Текущий прогресс (обновляется по мере выполнения)")
+    stats: dict[str, Any] = Field(..., description="Итог запуска (после done)")
+    error_message: str | None = None
+    attempt: int
+    queued_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
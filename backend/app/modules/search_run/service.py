@@ -0,0 +1,184 @@
+"""
+Очередь фоновых запусков поверх search_runs: постановка, захват воркером, прогресс, завершение.
+
+Захват — UPDATE ... WHERE id = (SELECT ... FOR UPDATE SKIP LOCKED), поэтому воркеров может быть
+несколько (в процессе API и отдельными процессами), каждый запуск достаётся ровно одному.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import timedelta
+from typing import Any, Iterable
+
+from sqlalchemy import Update, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.modules.search_run.constants import ACTIVE_RUN_STATUSES, SearchRunStatus
+from app.modules.search_run.model import SearchRun
+
+
+async def enqueue_run(
+    session: AsyncSession,
+    *,
+    theme_id: uuid.UUID,
+    run_type: str,
+    params: dict[str, Any],
+    triggered_by: str = "system",
+    trigger_context: dict[str, Any] | None = None,
+) -> SearchRun:
+    """
+    Поставить запуск в очередь.
+
+    Если по теме уже есть незавершённый запуск того же типа с теми же параметрами — возвращается он
+    (повторное нажатие кнопки не ставит работу дважды).
+    """
+    existing = await session.execute(
+        select(SearchRun)
+        .where(
+            SearchRun.theme_id == theme_id,
+            SearchRun.run_type == run_type,
+            SearchRun.status.in_(ACTIVE_RUN_STATUSES),
+            SearchRun.deleted_at.is_(None),
+            SearchRun.params == params,
+        )
+        .order_by(SearchRun.queued_at)
+        .limit(1)
+    )
+    run = existing.scalar_one_or_none()
+    if run is not None:
+        return run
+    run = SearchRun(
+        theme_id=theme_id,
+        run_type=run_type,
+        status=SearchRunStatus.QUEUED.value,
+        params=params,
+        triggered_by=triggered_by,
+        trigger_context=trigger_context or {},
+    )
+    session.add(run)
+    await session.flush()
+    await session.refresh(run)
+    return run
+
+
+def build_claim_stmt(run_types: Iterable[str]) -> Update:
+    """UPDATE самого старого queued-запуска из run_types в running (SKIP LOCKED), RETURNING запуск."""
+    next_id = (
+        select(SearchRun.id)
+        .where(
+            SearchRun.status == SearchRunStatus.QUEUED.value,
+            SearchRun.deleted_at.is_(None),
+            SearchRun.run_type.in_(list(run_types)),
+        )
+        .order_by(SearchRun.queued_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    return (
+        update(SearchRun)
+        .where(SearchRun.id == next_id)
+        .values(status=SearchRunStatus.RUNNING.value, started_at=func.now(), finished_at=None)
+        .returning(SearchRun)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def claim_next_run(session: AsyncSession, run_types: Iterable[str]) -> SearchRun | None:
+    """Забрать самый старый queued-запуск из run_types и перевести его в running (None — очередь пуста)."""
+    result = await session.execute(build_claim_stmt(run_types))
+    return result.scalar_one_or_none()
+
+
+async def touch_run(
+    session: AsyncSession,
+    run_id: uuid.UUID,
+    *,
+    progress: dict[str, Any] | None = None,
+) -> None:
+    """Отметить, что запуск жив (updated_at); при переданном progress — заменить прогресс."""
+    values: dict[str, Any] = {"updated_at": func.now()}
+    if progress is not None:
+        values["progress"] = progress
+    await session.execute(
+        update(SearchRun)
+        .where(SearchRun.id == run_id, SearchRun.status == SearchRunStatus.RUNNING.value)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def finish_run(session: AsyncSession, run_id: uuid.UUID, *, stats: dict[str, Any]) -> None:
+    await session.execute(
+        update(SearchRun)
+        .where(SearchRun.id == run_id)
+        .values(status=SearchRunStatus.DONE.value, finished_at=func.now(), stats=stats)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def fail_run(
+    session: AsyncSession,
+    run_id: uuid.UUID,
+    *,
+    error_message: str,
+    error_details: dict[str, Any] | None = None,
+) -> None:
+    await session.execute(
+        update(SearchRun)
+        .where(SearchRun.id == run_id)
+        .values(
+            status=SearchRunStatus.FAILED.value,
+            finished_at=func.now(),
+            error_message=error_message,
+            error_details=error_details or {},
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def requeue_run(session: AsyncSession, run_id: uuid.UUID) -> None:
+    """Вернуть прерванный (остановка воркера) запуск в очередь без увеличения attempt."""
+    await session.execute(
+        update(SearchRun)
+        .where(SearchRun.id == run_id, SearchRun.status == SearchRunStatus.RUNNING.value)
+        .values(status=SearchRunStatus.QUEUED.value, started_at=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def requeue_stale_runs(
+    session: AsyncSession,
+    *,
+    stale_after_s: int,
+    max_attempts: int,
+) -> int:
+    """
+    Running-запуски без heartbeat дольше stale_after_s (воркер упал) — снова в очередь с attempt + 1;
+    исчерпавшие max_attempts помечаются failed. Возвращает число затронутых запусков.
+    """
+    stale = (
+        SearchRun.status == SearchRunStatus.RUNNING.value,
+        SearchRun.deleted_at.is_(None),
+        SearchRun.updated_at < func.now() - timedelta(seconds=stale_after_s),
+    )
+    requeued = await session.execute(
+        update(SearchRun)
+        .where(*stale, SearchRun.attempt < max_attempts)
+        .values(status=SearchRunStatus.QUEUED.value, started_at=None, attempt=SearchRun.attempt + 1)
+        .returning(SearchRun.id)
+        .execution_options(synchronize_session=False)
+    )
+    failed = await session.execute(
+        update(SearchRun)
+        .where(*stale, SearchRun.attempt >= max_attempts)
+        .values(
+            status=SearchRunStatus.FAILED.value,
+            finished_at=func.now(),
+            error_message="Запуск прерван: воркер перестал отвечать",
+        )
+        .returning(SearchRun.id)
+        .execution_options(synchronize_session=False)
+    )
+    return len(requeued.all()) + len(failed.all())
@@ -0,0 +1,185 @@
+"""
+Воркер фоновых запусков: забирает queued-запуски из search_runs и выполняет их обработчики.
+
+Запускается в lifespan приложения (RUN_WORKER_ENABLED) или отдельным процессом
+(python -m app.scripts.run_worker); несколько воркеров делят очередь через SKIP LOCKED.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import traceback
+import uuid
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.modules.search_run.jobs import RUN_HANDLERS, RunContext, RunServices
+from app.modules.search_run.model import SearchRun
+from app.modules.search_run.service import (
+    claim_next_run,
+    fail_run,
+    finish_run,
+    requeue_run,
+    requeue_stale_runs,
+    touch_run,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def build_run_worker(services: RunServices, session_factory: async_sessionmaker[AsyncSession]) -> RunWorker:
+    """Воркер с параметрами из настроек (RUN_WORKER_*, RUN_STALE_AFTER_S, RUN_MAX_ATTEMPTS)."""
+    settings = services.settings
+    return RunWorker(
+        services,
+        session_factory,
+        concurrency=settings.RUN_WORKER_CONCURRENCY,
+        poll_interval_s=settings.RUN_WORKER_POLL_INTERVAL_S,
+        stale_after_s=settings.RUN_STALE_AFTER_S,
+        max_attempts=settings.RUN_MAX_ATTEMPTS,
+    )
+
+
+class RunWorker:
+    """Пул из concurrency параллельных запусков; каждый запуск — в своей сессии БД."""
+
+    def __init__(
+        self,
+        services: RunServices,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        concurrency: int,
+        poll_interval_s: float,
+        stale_after_s: int,
+        max_attempts: int,
+    ) -> None:
+        self._services = services
+        self._session_factory = session_factory
+        self._concurrency = max(1, concurrency)
+        self._poll_interval_s = max(0.1, poll_interval_s)
+        self._stale_after_s = max(30, stale_after_s)
+        self._max_attempts = max(1, max_attempts)
+        self._running: set[asyncio.Task[None]] = set()
+        self._loop_task: asyncio.Task[None] | None = None
+        self._wakeup = asyncio.Event()
+
+    def start(self) -> None:
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self.run_forever(), name="run-worker")
+
+    async def stop(self) -> None:
+        """Остановить цикл и прервать выполняющиеся запуски (они возвращаются в очередь)."""
+        tasks = [t for t in (self._loop_task, *self._running) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+
+    async def run_forever(self) -> None:
+        logger.info("run_worker: started (concurrency=%s)", self._concurrency)
+        last_stale_check = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if loop.time() - last_stale_check >= self._stale_after_s / 3:
+                    last_stale_check = loop.time()
+                    await self._requeue_stale()
+                claimed = await self._fill_slots()
+            except Exception as e:
+                logger.warning("run_worker: queue polling failed: %s", e)
+                claimed = 0
+            if claimed == 0:
+                self._wakeup.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval_s)
+
+    async def _requeue_stale(self) -> None:
+        async with self._session_factory() as session:
+            async with session.begin():
+                n = await requeue_stale_runs(
+                    session,
+                    stale_after_s=self._stale_after_s,
+                    max_attempts=self._max_attempts,
+                )
+        if n:
+            logger.warning("run_worker: requeued/failed %s stale run(s)", n)
+
+    async def _fill_slots(self) -> int:
+        claimed = 0
+        while len(self._running) < self._concurrency:
+            async with self._session_factory() as session:
+                async with session.begin():
+                    run = await claim_next_run(session, RUN_HANDLERS.keys())
+            if run is None:
+                break
+            claimed += 1
+            task = asyncio.create_task(self._execute(run), name=f"run-{run.id}")
+            self._running.add(task)
+            task.add_done_callback(self._on_done)
+        return claimed
+
+    def _on_done(self, task: asyncio.Task[None]) -> None:
+        self._running.discard(task)
+        # Освободился слот — сразу проверить очередь, не дожидаясь poll_interval
+        self._wakeup.set()
+
+    async def _write(self, fn: Any, run_id: uuid.UUID, **kwargs: Any) -> None:
+        """Изменение статуса/прогресса запуска отдельной короткой транзакцией."""
+        async with self._session_factory() as session:
+            async with session.begin():
+                await fn(session, run_id, **kwargs)
+
+    async def _heartbeat(self, run_id: uuid.UUID) -> None:
+        while True:
+            await asyncio.sleep(self._stale_after_s / 3)
+            try:
+                await self._write(touch_run, run_id)
+            except Exception as e:
+                logger.warning("run_worker: heartbeat failed for run_id=%s: %s", run_id, e)
+
+    async def _execute(self, run: SearchRun) -> None:
+        handler = RUN_HANDLERS[run.run_type]
+        logger.info("run_worker: run_id=%s run_type=%s theme_id=%s started", run.id, run.run_type, run.theme_id)
+
+        async def report_progress(progress: dict[str, Any]) -> None:
+            await self._write(touch_run, run.id, progress=progress)
+
+        heartbeat = asyncio.create_task(self._heartbeat(run.id))
+        try:
+            async with self._session_factory() as session:
+                ctx = RunContext(
+                    run_id=run.id,
+                    theme_id=run.theme_id,
+                    params=dict(run.params or {}),
+                    trigger_context=dict(run.trigger_context or {}),
+                    session=session,
+                    services=self._services,
+                    report_progress=report_progress,
+                )
+                try:
+                    stats = await handler(ctx)
+                    await session.commit()
+                except BaseException:
+                    await session.rollback()
+                    raise
+        except asyncio.CancelledError:
+            logger.warning("run_worker: run_id=%s interrupted, returning to queue", run.id)
+            with contextlib.suppress(Exception):
+                await asyncio.shield(self._write(requeue_run, run.id))
+            raise
+        except Exception as e:
+            logger.exception("run_worker: run_id=%s run_type=%s failed", run.id, run.run_type)
+            await self._write(
+                fail_run,
+                run.id,
+                error_message=str(e) or type(e).__name__,
+                error_details={"type": type(e).__name__, "traceback": traceback.format_exc()},
+            )
+            return
+        finally:
+            heartbeat.cancel()
+        await self._write(finish_run, run.id, stats=stats)
+        logger.info("run_worker: run_id=%s done stats=%s", run.id, stats)
@@ -9,9 +9,11 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
 from app.db.session import get_db
 from app.integrations.llm import LLMService, get_llm_service, llm_cost_for_api
 from app.integrations.prompts import PromptService, get_prompt_service
+from app.integrations.translation import get_translation_memory
 from app.modules.auth.router import get_current_user
 from app.modules.theme.schemas import (
     TermDTO,
@@ -60,6 +62,8 @@ DETAIL_TRUNCATE = 300
 CONTEXT_MAX_LEN = 600
 
 TERMS_TRANSLATE_PROMPT = "terms.translate"
+# Имя переводчика в ключе памяти переводов (translation_memory) для терминов; ключ — текст + контекст
+TERMS_TRANSLATE_MEMORY_TRANSLATOR = "llm_terms"
 TERMS_MAX = 50
 TEXT_MAX_LEN = 120
 TRANSLATION_DETAIL_TRUNCATE = 300
@@ -372,11 +376,14 @@ async def prepare_theme_keywords(
 @router.post("/terms/translate", response_model=TermsTranslateResponse)
 async def translate_terms(
     body: TermsTranslateRequest,
+    db: AsyncSession = Depends(get_db),
     llm_service: LLMService = Depends(get_llm_service),
     prompt_service: PromptService = Depends(get_prompt_service),
 ) -> TermsTranslateResponse:
     """
     Перевод терминов (ключевых слов) через LLM с поддержкой id, text, context.
+    Термины, уже переведённые с тем же контекстом на эту пару языков, берутся из памяти переводов;
+    в LLM уходят только остальные. Если переведено всё — LLM не вызывается (usage нулевой).
     """
     terms = body.terms
 
@@ -415,13 +422,39 @@ async def translate_terms(
             ctx = ctx[:CONTEXT_MAX_LEN]
         normalized_terms.append({"id": t.id.strip(), "text": t.text.strip(), "context": ctx})
 
+    source_lang = body.source_language.strip().lower()
+    target_lang = body.target_language.strip().lower()
+    memory = get_translation_memory(get_settings().TRANSLATION_MEMORY_MAX_ITEMS)
+    memory_keys = {t["id"]: f'{t["text"]}\n{t["context"]}' for t in normalized_terms}
+    found = await memory.lookup(
+        TERMS_TRANSLATE_MEMORY_TRANSLATOR,
+        source_lang,
+        target_lang,
+        memory_keys.values(),
+        session=db,
+    )
+    translations_by_id: dict[str, TermTranslationOut] = {
+        iid: TermTranslationOut(id=iid, translation=found[key])
+        for iid, key in memory_keys.items()
+        if key in found
+    }
+    pending_terms = [t for t in normalized_terms if t["id"] not in translations_by_id]
+    if not pending_terms:
+        logger.info("terms_translate: все %s терминов из памяти переводов", len(normalized_terms))
+        return TermsTranslateResponse(
+            translations=[translations_by_id[t["id"]] for t in normalized_terms],
+            llm=TermsTranslateLLMMeta(
+                usage={"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "source": "translation_memory"},
+            ),
+        )
+
     try:
         response = await llm_service.generate_from_prompt(
             prompt_name=TERMS_TRANSLATE_PROMPT,
             vars={
                 "source_language": body.source_language,
                 "target_language": body.target_language,
-                "terms": json.dumps(normalized_terms, ensure_ascii=False),
+                "terms": json.dumps(pending_terms, ensure_ascii=False),
             },
             prompt_service=prompt_service,
             task="terms_translate",
@@ -477,9 +510,8 @@ async def translate_terms(
             detail="translations должен быть массивом объектов.",
         )
 
-    input_ids = [t["id"] for t in normalized_terms]
+    input_ids = [t["id"] for t in pending_terms]
     received_ids = set()
-    translations_by_id: dict[str, TermTranslationOut] = {}
 
     for item in raw_translations:
         if not isinstance(item, dict):
@@ -521,14 +553,24 @@ async def translate_terms(
             detail=f"LLM вернул лишние id: {extra_ids}",
         )
 
-    ordered_translations = [translations_by_id[iid] for iid in input_ids]
+    await memory.store(
+        TERMS_TRANSLATE_MEMORY_TRANSLATOR,
+        source_lang,
+        target_lang,
+        {memory_keys[iid]: translations_by_id[iid].translation for iid in input_ids},
+        session=db,
+    )
+    ordered_translations = [translations_by_id[t["id"]] for t in normalized_terms]
 
+    warnings = list(response.warnings or [])
+    if len(pending_terms) < len(normalized_terms):
+        warnings.append(f"translation_memory_hits_{len(normalized_terms) - len(pending_terms)}")
     llm_meta = TermsTranslateLLMMeta(
         provider=response.provider,
         model=response.model,
         usage=response.usage.model_dump(mode="json"),
         cost=llm_cost_for_api(response),
-        warnings=response.warnings or [],
+        warnings=warnings,
     )
 
     logger.info(
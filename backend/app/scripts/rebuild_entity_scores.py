@@ -0,0 +1,38 @@
+"""Rebuild atom/cluster global_score for themes from scratch (maintenance).
+
+Extraction keeps scores up to date incrementally (app.modules.entity.scoring); run this only
+after manual data fixes or to wash out accumulated rounding from rescaling.
+
+Usage (from backend/):
+    python -m app.scripts.rebuild_entity_scores                 # all themes with atoms/clusters
+    python -m app.scripts.rebuild_entity_scores <theme_id> ...  # selected themes
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import uuid
+
+from sqlalchemy import select, union
+
+from app.db.session import AsyncSessionLocal
+from app.modules.entity.model import Atom, Cluster
+from app.modules.entity.scoring import rebuild_theme_scores
+
+
+async def main(theme_ids: list[uuid.UUID]) -> None:
+    async with AsyncSessionLocal() as session:
+        if not theme_ids:
+            async with session.begin():
+                rows = await session.execute(union(select(Atom.theme_id), select(Cluster.theme_id)))
+                theme_ids = [row[0] for row in rows.all()]
+        for theme_id in theme_ids:
+            async with session.begin():
+                await rebuild_theme_scores(session, theme_id)
+            print(f"Rebuilt entity scores for theme {theme_id}")
+    print(f"Done: {len(theme_ids)} theme(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main([uuid.UUID(arg) for arg in sys.argv[1:]]))
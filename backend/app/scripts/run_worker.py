@@ -0,0 +1,61 @@
+"""Run a standalone background run worker (search_runs queue) outside the API process.
+
+Start as many of these as needed; they share the queue via SELECT ... FOR UPDATE SKIP LOCKED.
+Set RUN_WORKER_ENABLED=false for the API to keep LLM work out of the web processes entirely.
+
+Usage (from backend/):
+    python -m app.scripts.run_worker
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.integrations.http import HttpClientRegistry
+from app.integrations.ratelimit import RateLimiterRegistry
+from app.integrations.llm import LLMService
+from app.integrations.prompts import get_prompt_service
+from app.integrations.search import SearchService
+from app.integrations.translation import TranslationService
+from app.modules.billing.service import BillingService
+from app.modules.search_run.jobs import RunServices
+from app.modules.search_run.worker import build_run_worker
+
+import app.main  # noqa: F401  (registers all ORM models and sets up logging)
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    settings = get_settings()
+    billing_service = BillingService(cache_ttl_s=settings.BILLING_CACHE_TTL_S)
+    http_clients = HttpClientRegistry(settings)
+    rate_limiters = RateLimiterRegistry(settings, session_factory=AsyncSessionLocal)
+    services = RunServices(
+        settings=settings,
+        llm_service=LLMService(settings, billing_service=billing_service, http_clients=http_clients),
+        prompt_service=get_prompt_service(settings),
+        search_service=SearchService(
+            settings,
+            billing_service=billing_service,
+            http_clients=http_clients,
+            rate_limiters=rate_limiters,
+        ),
+        translation_service=TranslationService(settings, billing_service=billing_service, http_clients=http_clients),
+    )
+    worker = build_run_worker(services, AsyncSessionLocal)
+    try:
+        await worker.run_forever()
+    finally:
+        await worker.stop()
+        await http_clients.aclose()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("run_worker: stopped")
@@ -0,0 +1,111 @@
+"""
+Запись атомов и кластеров — set-based SQL: get-or-create одним INSERT ... ON CONFLICT ... RETURNING,
+приращение df одним UPDATE ... FROM (VALUES ...), независимо от числа атомов;
+инкрементальные оценки — масштабирование в замкнутой форме при росте максимума темы;
+батч выбирается по batch_size, этап ИИ идёт не больше ENTITY_EXTRACTION_MAX_CONCURRENCY квантов сразу.
+"""
+import asyncio
+import contextlib
+import copy
+import uuid
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import get_settings
+from app.modules.entity.extractors.atoms_clusters_extractor import (
+    AtomsClustersExtractor,
+    build_atom_df_increment_stmt,
+    build_atoms_upsert_stmt,
+    build_clusters_upsert_stmt,
+)
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_atoms_and_clusters_upsert_return_existing_rows() -> None:
+    tid = uuid.uuid4()
+    sql = _sql(build_atoms_upsert_stmt(tid, ["solid", "state", "battery"]))
+    assert sql.count("ON CONFLICT ON CONSTRAINT uq_atoms_theme_id_lemma DO UPDATE") == 1
+    assert "lemma_m2" in sql and "RETURNING atoms.id, atoms.lemma" in sql
+
+    sql = _sql(
+        build_clusters_upsert_stmt(
+            tid,
+            [
+                {"normalized_text": "solid state", "display_text": "solid state", "type": "tech", "global_df": 2},
+                {"normalized_text": "battery", "display_text": "battery", "type": "other", "global_df": 1},
+            ],
+        )
+    )
+    assert "global_df = (clusters.global_df + excluded.global_df)" in sql
+    assert "RETURNING clusters.id" in sql
+
+
+def test_atom_df_increment_is_single_update_from_values() -> None:
+    sql = _sql(build_atom_df_increment_stmt({uuid.uuid4(): 2, uuid.uuid4(): 1, uuid.uuid4(): 5}))
+    assert sql.startswith("UPDATE atoms SET global_cluster_df=(atoms.global_cluster_df + v.delta) FROM (VALUES")
+    assert sql.count("::UUID") == 3
+
+
+def test_rescale_when_theme_max_grows_is_closed_form() -> None:
+    from app.modules.entity.model import Atom
+    from app.modules.entity.scoring import build_rescale_stmt
+
+    compiled = build_rescale_stmt(Atom.__table__, uuid.uuid4(), 3, 4).compile(dialect=postgresql.dialect())
+    assert str(compiled).startswith("UPDATE atoms SET global_score=(atoms.global_score * ")
+    assert 0.75 in compiled.params.values()
+
+
+class _Session:
+    """Сессия-заглушка: SELECT батча отдаёт кванты, остальные запросы только запоминаются."""
+
+    def __init__(self, quanta: list) -> None:
+        self.quanta = quanta
+        self.statements: list = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: self.quanta))
+
+    async def get(self, model, key):
+        return None
+
+    @contextlib.asynccontextmanager
+    async def begin_nested(self):
+        yield
+
+    async def flush(self) -> None:
+        pass
+
+
+async def test_batch_respects_batch_size_and_concurrency_setting(monkeypatch) -> None:
+    settings = copy.copy(get_settings())
+    settings.ENTITY_EXTRACTION_MAX_CONCURRENCY = 2
+    llm = SimpleNamespace(session_lock=lambda session: asyncio.Lock())
+    extractor = AtomsClustersExtractor(llm, None, settings)  # type: ignore[arg-type]
+    quanta = [SimpleNamespace(id=uuid.uuid4(), theme_id=uuid.uuid4()) for _ in range(5)]
+    state = {"active": 0, "peak": 0}
+    written: list = []
+
+    async def prepare(session, q, **kw):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return q
+
+    async def write(session, prepared):
+        written.append(prepared.id)
+
+    monkeypatch.setattr(extractor, "_prepare_quantum", prepare)
+    monkeypatch.setattr(extractor, "_write_quantum", write)
+    session = _Session(quanta)
+
+    assert await extractor.process_next_batch(session, batch_size=5) == 5  # type: ignore[arg-type]
+    select_sql = session.statements[0].compile(dialect=postgresql.dialect())
+    assert "LIMIT" in str(select_sql) and 5 in select_sql.params.values()
+    assert "FOR UPDATE SKIP LOCKED" in str(select_sql)
+    assert state["peak"] == 2 and sorted(written) == sorted(q.id for q in quanta)
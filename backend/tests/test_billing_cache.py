@@ -0,0 +1,144 @@
+"""
+Кеш справочников биллинга: тарифы, курсы и настройки темы читаются из БД один раз на TTL,
+record_usage_many вставляет пачку событий одним INSERT.
+"""
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any
+
+from sqlalchemy.dialects import postgresql
+
+from app.modules.billing.cache import MISSING, TTLCache
+from app.modules.billing.service import BillingService, BillingUsageItem
+from app.modules.entity.model import ThemeStats
+
+_T0 = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def _insert_rows(stmt: Any) -> list[dict[str, Any]]:
+    """Строки многострочного INSERT из параметров, скомпилированных для PostgreSQL (<column>_m<i>)."""
+    params = stmt.compile(dialect=postgresql.dialect()).params
+    n = sum(1 for key in params if key.startswith("theme_id_m"))
+    columns = {key.rsplit("_m", 1)[0] for key in params}
+    return [{c: params[f"{c}_m{i}"] for c in columns} for i in range(n)]
+
+
+class _Result:
+    def __init__(self, rows: list[Any]) -> None:
+        self._rows = rows
+
+    def first(self) -> Any:
+        return self._rows[0] if self._rows else None
+
+    def scalars(self) -> "_Result":
+        return self
+
+    def all(self) -> list[Any]:
+        return self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class _FakeSession:
+    """Отвечает на SELECT'ы BillingService по имени таблицы и запоминает все запросы."""
+
+    def __init__(self) -> None:
+        self.statements: list[Any] = []
+        self.tariffs = [
+            SimpleNamespace(
+                id=uuid.uuid4(),
+                price=Decimal("2"),
+                units_per_price=Decimal("1000"),
+                currency_code="usd",
+                valid_from=_T0,
+                valid_until=None,
+            ),
+            SimpleNamespace(
+                id=uuid.uuid4(),
+                price=Decimal("1"),
+                units_per_price=Decimal("1000"),
+                currency_code="usd",
+                valid_from=_T0 - timedelta(days=30),
+                valid_until=_T0,
+            ),
+        ]
+        self.rate = SimpleNamespace(id=uuid.uuid4(), rate=Decimal("90"))
+
+    async def execute(self, stmt: Any, *args: Any) -> _Result:
+        self.statements.append(stmt)
+        if getattr(stmt, "is_insert", False):
+            return _Result([uuid.uuid4() for _ in _insert_rows(stmt)])
+        table = stmt.get_final_froms()[0].name
+        if table == ThemeStats.__tablename__:
+            return _Result([("rub", "UTC")])
+        if table == "billing_tariffs":
+            return _Result(self.tariffs)
+        return _Result([self.rate])
+
+
+def test_ttl_cache_expires_entries_and_keeps_none() -> None:
+    now = [0.0]
+    cache: TTLCache[str, Any] = TTLCache(10, clock=lambda: now[0])
+    cache.put("no-rate", None)
+    assert cache.get("no-rate") is None
+    assert cache.get("other") is MISSING
+    now[0] = 10.0
+    assert cache.get("no-rate") is MISSING
+    assert len(cache) == 0
+
+    disabled: TTLCache[str, int] = TTLCache(0)
+    disabled.put("k", 1)
+    assert disabled.get("k") is MISSING
+
+
+async def test_tariff_history_cached_once_and_invalidated_explicitly() -> None:
+    billing = BillingService(cache_ttl_s=60)
+    session: Any = _FakeSession()  # заглушка вместо AsyncSession
+    key = {"service_type": "llm", "service_impl": "deepseek_chat_in", "unit_code": "input_tokens"}
+
+    current = await billing._resolve_tariff(session, **key, at=_T0 + timedelta(days=1))
+    previous = await billing._resolve_tariff(session, **key, at=_T0 - timedelta(days=1))
+    assert current is not None and current.price == Decimal("2")
+    assert previous is not None and previous.price == Decimal("1")
+    assert await billing._resolve_tariff(session, **key, at=_T0 - timedelta(days=60)) is None
+    assert len(session.statements) == 1
+
+    billing.invalidate_tariffs()
+    await billing._resolve_tariff(session, **key, at=_T0)
+    assert len(session.statements) == 2
+
+
+async def test_record_usage_many_prices_items_and_inserts_once() -> None:
+    billing = BillingService(cache_ttl_s=60)
+    session: Any = _FakeSession()  # заглушка вместо AsyncSession
+    theme_id = uuid.uuid4()
+    items = [
+        BillingUsageItem(
+            theme_id=theme_id,
+            task_type="translate",
+            service_type="llm",
+            service_impl=f"deepseek_chat_{leg}",
+            quantity=Decimal(500),
+            quantity_unit_code=unit,
+            occurred_at=_T0 + timedelta(hours=1),
+        )
+        for leg, unit in (("in", "input_tokens"), ("out", "output_tokens"))
+    ]
+
+    ids = await billing.record_usage_many(session, items)
+
+    assert len(ids) == 2
+    inserts = [s for s in session.statements if getattr(s, "is_insert", False)]
+    assert len(inserts) == 1
+    rows = _insert_rows(inserts[0])
+    # 500 / 1000 * 2 USD = 1 USD → 90 RUB по курсу на дату события
+    assert [r["cost_tariff_currency"] for r in rows] == [Decimal("1.000000")] * 2
+    assert [r["cost_display_currency"] for r in rows] == [Decimal("90.000000")] * 2
+    assert {r["display_currency_code"] for r in rows} == {"RUB"}
+    # Настройки темы, тарифы (по одной связке на leg) и курс — из БД по одному разу
+    selects = [s for s in session.statements if not getattr(s, "is_insert", False)]
+    assert len(selects) == 1 + 2 + 1
+    assert billing._rates.get(("USD", "RUB", date(2026, 3, 1))) is not MISSING
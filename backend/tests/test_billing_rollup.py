@@ -0,0 +1,58 @@
+"""
+Свёртка billing_usage_events: один SQL-оператор на чанк, чанки повторяются, пока чанк не вернётся
+неполным; commit_each_chunk фиксирует каждый чанк отдельно.
+"""
+from types import SimpleNamespace
+from typing import Any
+
+from sqlalchemy.dialects import postgresql
+
+from app.modules.billing.service import _ROLLUP_CHUNK_SQL, BillingService
+
+
+def test_rollup_chunk_sql_compiles_with_expected_binds() -> None:
+    compiled = _ROLLUP_CHUNK_SQL.compile(dialect=postgresql.dialect())
+    sql = " ".join(str(compiled).split())
+
+    assert set(compiled.binds) == {"default_tz", "default_ccy", "lag_days", "chunk_size"}
+    assert "ORDER BY e.occurred_at, e.id LIMIT %(chunk_size)s FOR UPDATE OF e SKIP LOCKED" in sql
+    assert "LEFT JOIN pg_timezone_names z" in sql
+    # Валюта отображения среза — у самого раннего события, а не минимальная по алфавиту
+    assert "(array_agg(display_currency_code ORDER BY occurred_at, id))[1]" in sql
+    assert "(COALESCE(service_impl, ''))" in sql
+
+
+class _Session:
+    """Сессия-заглушка: каждый execute «сворачивает» очередной чанк из заданных размеров."""
+
+    def __init__(self, chunks: list[int]) -> None:
+        self.chunks = chunks
+        self.params: list[dict[str, Any]] = []
+        self.commits = 0
+
+    async def execute(self, stmt: Any, params: dict[str, Any]) -> Any:
+        self.params.append(params)
+        events = self.chunks.pop(0)
+        return SimpleNamespace(one=lambda: SimpleNamespace(events=events, slices=min(events, 1)))
+
+    async def commit(self) -> None:
+        self.commits += 1
+
+
+async def test_rollup_repeats_chunks_until_short_one_and_commits_each() -> None:
+    session = _Session([3, 3, 1])
+    total = await BillingService().rollup_usage_events_to_daily(
+        session,  # type: ignore[arg-type]
+        chunk_size=3,
+        commit_each_chunk=True,
+    )
+    assert total == 7 and session.chunks == [] and session.commits == 3
+    assert [p["chunk_size"] for p in session.params] == [3, 3, 3]
+    assert session.params[0]["default_tz"] == "Asia/Krasnoyarsk" and session.params[0]["default_ccy"] == "RUB"
+
+
+async def test_rollup_full_last_chunk_needs_one_empty_chunk() -> None:
+    session = _Session([2, 2, 0])
+    total = await BillingService().rollup_usage_events_to_daily(session, chunk_size=2)  # type: ignore[arg-type]
+    # Полный чанк не значит «хвост кончился»: следующий пустой чанк завершает свёртку; без commit_each_chunk — без commit
+    assert total == 4 and session.chunks == [] and session.commits == 0
@@ -0,0 +1,147 @@
+"""
+Свёртка биллинга на реальной БД: срез, разрезанный границей чанков, суммируется целиком;
+локальная дата — по timezone темы (неизвестная зона → UTC, нет theme_stats → умолчание);
+валюта отображения среза — у самого раннего события.
+
+Нужны применённые миграции. Всё выполняется в одной транзакции и откатывается в конце;
+события датированы 2000 годом, чтобы оказаться первыми в очереди свёртки.
+
+Запуск из backend/: TEST_DATABASE_URL=... pytest tests/test_billing_rollup_db.py -v
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+load_dotenv(Path(__file__).resolve().parent.parent / ".env")
+
+_test_db_url = (os.getenv("TEST_DATABASE_URL") or os.getenv("DATABASE_URL") or "").strip()
+if not _test_db_url:
+    pytest.skip(
+        "Нет TEST_DATABASE_URL/DATABASE_URL — пропуск интеграционного теста свёртки биллинга",
+        allow_module_level=True,
+    )
+
+# Подмена URL до импорта session (там читается os.environ при загрузке модуля).
+os.environ["DATABASE_URL"] = _test_db_url
+
+from app.db.session import AsyncSessionLocal
+from app.modules.billing.model import BillingDailySummary, BillingUsageEvent
+from app.modules.billing.service import BillingService
+from app.modules.entity.model import ThemeStats
+import app.modules.site.models  # noqa: F401 — UserSite/ThemeSite для relationship User/Theme
+from app.modules.theme.model import Theme
+from app.modules.user.model import User
+
+_T0 = datetime(2000, 1, 2, 3, 0, tzinfo=timezone.utc)
+
+
+def _event(theme_id: uuid.UUID, occurred_at: datetime, *, quantity: int = 1, ccy: str = "RUB") -> BillingUsageEvent:
+    return BillingUsageEvent(
+        theme_id=theme_id,
+        occurred_at=occurred_at,
+        service_type="llm",
+        task_type="rollup_test",
+        service_impl="impl",
+        quantity=Decimal(quantity),
+        quantity_unit_code="tokens",
+        cost_tariff_currency=Decimal("0.1"),
+        tariff_currency_code="usd",
+        cost_display_currency=Decimal("10"),
+        display_currency_code=ccy,
+    )
+
+
+async def _themes(session, n: int) -> list[uuid.UUID]:
+    uid = uuid.uuid4()
+    session.add(User(id=uid, email=f"billing_rollup_test_{uid.hex[:12]}@example.invalid"))
+    tids = [uuid.uuid4() for _ in range(n)]
+    for tid in tids:
+        session.add(Theme(id=tid, user_id=uid, title="billing rollup test", description="test"))
+    await session.flush()
+    return tids
+
+
+async def _summaries(session, theme_id: uuid.UUID) -> list[BillingDailySummary]:
+    res = await session.execute(
+        select(BillingDailySummary)
+        .where(BillingDailySummary.theme_id == theme_id)
+        .order_by(BillingDailySummary.summary_local_date)
+    )
+    return list(res.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_rollup_sums_slice_split_across_chunks() -> None:
+    async with AsyncSessionLocal() as session:
+        try:
+            (tid,) = await _themes(session, 1)
+            session.add_all([_event(tid, _T0 + timedelta(minutes=i), quantity=i + 1) for i in range(5)])
+            await session.flush()
+
+            total = await BillingService().rollup_usage_events_to_daily(session, chunk_size=2)
+
+            assert total >= 5
+            (row,) = await _summaries(session, tid)
+            assert row.sum_quantity == Decimal(15) and row.sum_cost_display_currency == Decimal(50)
+            assert row.tariff_currency_code == "USD" and row.service_impl == "impl"
+            left = await session.execute(
+                select(BillingUsageEvent.id).where(
+                    BillingUsageEvent.theme_id == tid, BillingUsageEvent.deleted.is_(False)
+                )
+            )
+            assert left.all() == []
+        finally:
+            await session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_rollup_uses_theme_timezone_for_local_date() -> None:
+    async with AsyncSessionLocal() as session:
+        try:
+            new_york, unknown_zone, no_stats = await _themes(session, 3)
+            session.add(ThemeStats(theme_id=new_york, billing_timezone="America/New_York"))
+            session.add(ThemeStats(theme_id=unknown_zone, billing_timezone="Mars/Olympus"))
+            # 03:00 UTC 2 января: в Нью-Йорке ещё 1 января, в UTC — 2-е
+            session.add_all([_event(new_york, _T0), _event(unknown_zone, _T0)])
+            # 20:00 UTC 1 января: в Asia/Krasnoyarsk (UTC+7) уже 2 января
+            session.add(_event(no_stats, _T0 - timedelta(hours=7)))
+            await session.flush()
+
+            await BillingService().rollup_usage_events_to_daily(session)
+
+            assert [r.summary_local_date for r in await _summaries(session, new_york)] == [date(2000, 1, 1)]
+            assert [r.summary_local_date for r in await _summaries(session, unknown_zone)] == [date(2000, 1, 2)]
+            assert [r.summary_local_date for r in await _summaries(session, no_stats)] == [date(2000, 1, 2)]
+        finally:
+            await session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_rollup_takes_display_currency_of_earliest_event() -> None:
+    async with AsyncSessionLocal() as session:
+        try:
+            (tid,) = await _themes(session, 1)
+            session.add_all(
+                [
+                    _event(tid, _T0 + timedelta(minutes=2), ccy="EUR"),
+                    _event(tid, _T0, ccy="usd"),
+                    _event(tid, _T0 + timedelta(minutes=1), ccy="EUR"),
+                ]
+            )
+            await session.flush()
+
+            await BillingService().rollup_usage_events_to_daily(session)
+
+            (row,) = await _summaries(session, tid)
+            assert row.display_currency_code == "USD" and row.sum_quantity == Decimal(3)
+        finally:
+            await session.rollback()
@@ -0,0 +1,160 @@
+"""
+Глубокая пагинация OpenAlex по курсору: страницы добираются, пока не набрано limit валидных
+квантов без повторов; следующая страница запрашивается заранее, только если текущей не хватит;
+биллинг — строка на каждый успешный запрос страницы.
+"""
+import asyncio
+import time
+import uuid
+from typing import Any
+
+from app.integrations.search.retrievers.publication.openalex import adapter as openalex_adapter
+from app.integrations.search.retrievers.publication.openalex.adapter import OpenAlexPublicationAdapter
+from app.integrations.search.retrievers.publication.paging import PagingStats, collect_cursor_pages
+from app.integrations.search.retrievers.publication.retriever import _run_source
+from app.integrations.search.ports import RetrieverResult
+from app.integrations.search.schemas import KeywordGroup, KeywordsBlock, QueryModel
+
+THEME_ID = str(uuid.uuid4())
+
+
+def _work(i: int) -> dict[str, Any]:
+    # Каждая вторая работа без абстракта — маппер её пропускает
+    return {
+        "id": f"https://openalex.org/W{i}",
+        "display_name": f"Work {i}",
+        "publication_date": "2024-01-01",
+        "abstract_inverted_index": None if i % 2 else {"abstract": [0], str(i): [1]},
+    }
+
+
+class _FakeOpenAlex:
+    def __init__(self, pages: int, per_page: int) -> None:
+        self.pages = pages
+        self.per_page = per_page
+        self.cursors: list[str | None] = []
+        self.cancelled = 0
+
+    async def search_works(self, *, cursor: str | None = None, **_: Any) -> dict[str, Any]:
+        self.cursors.append(cursor)
+        n = 0 if cursor == "*" else int(str(cursor))
+        try:
+            await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        # Последняя работа страницы повторяется в начале следующей
+        start = max(0, n * self.per_page - 1)
+        results = [_work(i) for i in range(start, (n + 1) * self.per_page)]
+        next_cursor = str(n + 1) if n + 1 < self.pages else None
+        return {"meta": {"next_cursor": next_cursor}, "results": results}
+
+
+async def test_openalex_follows_cursor_until_limit_and_bills_each_page(monkeypatch) -> None:
+    fake = _FakeOpenAlex(pages=10, per_page=20)
+    monkeypatch.setattr(openalex_adapter, "openalex_search_works", fake.search_works)
+    result = await OpenAlexPublicationAdapter(max_pages=10).search_publications(
+        QueryModel(keywords=KeywordsBlock(groups=[KeywordGroup(terms=["x"])])),
+        {},
+        language="en",
+        theme_id=THEME_ID,
+        limit=25,
+    )
+    ids = [q.verification_url for q in result.items]
+    assert len(ids) == 25 and len(set(ids)) == 25
+    # 10 валидных работ на страницу: нужно 3 страницы; курсор идёт по next_cursor
+    assert fake.cursors[:3] == ["*", "1", "2"]
+    assert len(result.billing_lines) == len(fake.cursors) - fake.cancelled
+
+
+async def test_paging_prefetches_only_when_needed_and_respects_max_pages() -> None:
+    fetched: list[str | None] = []
+    cancelled: list[str | None] = []
+
+    async def fetch_page(cursor: str | None):
+        fetched.append(cursor)
+        try:
+            await asyncio.sleep(0.05 if cursor else 0)
+        except asyncio.CancelledError:
+            cancelled.append(cursor)
+            raise
+        n = int(cursor or 0)
+        return [{"id": f"{n}-{i}"} for i in range(10)], str(n + 1)
+
+    stats = PagingStats()
+    quanta = await collect_cursor_pages(
+        fetch_page,
+        lambda rec: rec["id"],  # type: ignore[arg-type,return-value]
+        lambda rec: rec["id"],
+        want=5,
+        first_cursor=None,
+        max_pages=3,
+        stats=stats,
+        provider="test",
+    )
+    # Первой страницы хватило — заранее страницу не запрашиваем
+    assert len(quanta) == 5 and fetched == [None] and stats.pages == 1
+
+    fetched.clear()
+    stats = PagingStats()
+    quanta = await collect_cursor_pages(
+        fetch_page,
+        lambda rec: rec["id"],  # type: ignore[arg-type,return-value]
+        lambda rec: rec["id"],
+        want=100,
+        first_cursor=None,
+        max_pages=3,
+        stats=stats,
+        provider="test",
+    )
+    assert len(quanta) == 30 and fetched == [None, "1", "2"] and not cancelled
+
+
+async def test_prefetched_page_is_fetched_while_current_page_is_mapped() -> None:
+    async def fetch_page(cursor: str | None):
+        await asyncio.sleep(0.2)
+        n = int(cursor or 0)
+        return [{"id": f"{n}-{i}"} for i in range(10)], str(n + 1)
+
+    def map_record(rec):
+        time.sleep(0.025)  # синхронный маппинг: 0.25 с на страницу
+        return rec["id"]
+
+    started = time.monotonic()
+    quanta = await collect_cursor_pages(
+        fetch_page,
+        map_record,  # type: ignore[arg-type]
+        lambda rec: rec["id"],
+        want=30,
+        first_cursor=None,
+        max_pages=3,
+        stats=PagingStats(),
+        provider="test",
+    )
+    elapsed = time.monotonic() - started
+    # Последовательно: 3 × (0.2 + 0.25) = 1.35 с; с prefetch запросы 2-й и 3-й страниц идут во время маппинга
+    assert len(quanta) == 30 and elapsed < 1.15
+
+
+async def test_source_timeout_keeps_collected_pages_and_billing(monkeypatch) -> None:
+    fake = _FakeOpenAlex(pages=10, per_page=20)
+
+    async def search_works(*, cursor: str | None = None, **kw: Any) -> dict[str, Any]:
+        if cursor not in (None, "*"):
+            await asyncio.sleep(10)  # вторая страница зависает
+        return await fake.search_works(cursor=cursor, **kw)
+
+    monkeypatch.setattr(openalex_adapter, "openalex_search_works", search_works)
+    partial = RetrieverResult(items=[], billing_lines=[])
+    coro = OpenAlexPublicationAdapter(max_pages=10).search_publications(
+        QueryModel(keywords=KeywordsBlock(groups=[KeywordGroup(terms=["x"])])),
+        {},
+        language="en",
+        theme_id=THEME_ID,
+        limit=25,
+        partial=partial,
+    )
+    name, result, meta = await _run_source("openalex", coro, 0.3, step_id="s1", partial=partial)
+    assert name == "openalex" and meta["status"] == "timeout" and meta["partial"] is True
+    # Первая страница (10 валидных работ) и её оплаченный запрос не потеряны
+    assert result is partial and meta["returned"] == 10 and len(result.billing_lines) == 1
@@ -0,0 +1,160 @@
+"""
+Батчевые эмбеддинги (EmbeddingService.embed_many) на провайдере-заглушке: разбиение на пачки,
+порядок результатов, обработка неудачных пачек, кеш по text_hash.
+"""
+import contextlib
+import copy
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import get_settings
+from app.integrations.embedding import EmbeddingBatchResult, EmbeddingCost, EmbeddingService
+from app.integrations.embedding.cache import EmbeddingCache, lookup_embeddings_by_hash
+from app.integrations.embedding.service import _chunk_indices
+
+
+class _FakeProvider:
+    name = "openai"
+
+    def __init__(self, fail_on: str | None = None) -> None:
+        self.calls: list[list[str]] = []
+        self.fail_on = fail_on
+
+    async def embed_many(self, texts, model, dimensions, cost_per_token) -> EmbeddingBatchResult:
+        self.calls.append(list(texts))
+        if self.fail_on is not None and self.fail_on in texts:
+            raise RuntimeError("boom")
+        return EmbeddingBatchResult(
+            vectors=[[float(len(t))] for t in texts],
+            cost=EmbeddingCost(total_tokens=10 * len(texts), total_cost=Decimal(0)),
+        )
+
+
+def _service(provider: _FakeProvider, max_items: int) -> EmbeddingService:
+    settings = copy.copy(get_settings())
+    settings.EMBEDDING_BATCH_MAX_ITEMS = max_items
+    svc = EmbeddingService(settings)
+    svc._registry = {"openai": provider}
+    svc._cache = EmbeddingCache(max_items=0)
+    return svc
+
+
+def test_chunk_indices_respects_items_and_tokens() -> None:
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 400, "e"]
+    # 40 символов ≈ 10 токенов; лимит 25 токенов — по два коротких текста в пачке
+    assert _chunk_indices(texts, max_items=10, max_tokens=25) == [[0, 1], [2], [3], [4]]
+    assert _chunk_indices(texts, max_items=2, max_tokens=10_000) == [[0, 1], [2, 3], [4]]
+
+
+async def test_embed_many_keeps_input_order_across_chunks() -> None:
+    provider = _FakeProvider()
+    texts = ["x" * n for n in range(1, 8)]
+    results = await _service(provider, max_items=3).embed_many(texts)
+
+    assert len(provider.calls) == 3
+    assert [r["vector"] for r in results] == [[float(n)] for n in range(1, 8)]
+    assert sum(r["cost"]["total_tokens"] for r in results) == 70
+
+
+async def test_embed_many_failed_chunk() -> None:
+    provider = _FakeProvider(fail_on="bad")
+    texts = ["ok1", "ok2", "bad", "ok3"]
+    svc = _service(provider, max_items=2)
+
+    results = await svc.embed_many(texts, skip_failed_chunks=True)
+    assert results[0] is not None and results[1] is not None
+    assert results[2] is None and results[3] is None
+
+    with pytest.raises(RuntimeError):
+        await svc.embed_many(texts)
+
+
+async def test_embed_many_uses_cache_and_sends_only_misses() -> None:
+    """Повторные и уже известные тексты берутся из LRU, к провайдеру уходят только промахи."""
+    provider = _FakeProvider()
+    svc = _service(provider, max_items=10)
+    svc._cache = EmbeddingCache(max_items=100)
+
+    first = await svc.embed_many(["aa", "bbb", "aa"])
+    assert provider.calls == [["aa", "bbb"]]
+    assert first[0]["vector"] == first[2]["vector"] == [2.0]
+
+    # Повтор оплачен один раз: сумма cost по результатам равна токенам провайдера
+    assert sum(r["cost"]["total_tokens"] for r in first) == 20
+    assert first[2]["cost"]["total_tokens"] == 0 and first[0] is not first[2]
+
+    second = await svc.embed_many(["bbb", "cccc"])
+    assert provider.calls[-1] == ["cccc"]
+    assert second[0]["cached"] is True and second[0]["vector"] == [3.0]
+    assert second[0]["cost"]["total_tokens"] == 0
+
+
+class _FakeBilling:
+    def __init__(self) -> None:
+        self.quantities: list[Decimal] = []
+
+    async def record_usage(self, session, *, quantity, **kwargs) -> None:
+        self.quantities.append(quantity)
+
+
+async def test_embed_many_bills_successful_chunks_before_raising() -> None:
+    provider = _FakeProvider(fail_on="bad")
+    svc = _service(provider, max_items=2)
+    svc._billing_service = billing = _FakeBilling()  # type: ignore[assignment]
+
+    with pytest.raises(RuntimeError):
+        await svc.embed_many(
+            ["bad", "ok1", "ok2", "ok3"],
+            billing_session=object(),
+            billing_theme_id=uuid.uuid4(),
+            billing_task_type="test",
+        )
+    # Первая пачка упала, но вторая (2 текста × 10 токенов) оплачена и записана в биллинг
+    assert billing.quantities == [Decimal(20)]
+
+
+class _BrokenSession:
+    """Сессия, у которой SELECT падает; считает savepoint'ы."""
+
+    def __init__(self) -> None:
+        self.savepoints = 0
+
+    @contextlib.asynccontextmanager
+    async def begin_nested(self):
+        self.savepoints += 1
+        yield
+
+    async def execute(self, stmt):
+        raise RuntimeError("db down")
+
+
+async def test_cache_db_lookup_runs_in_savepoint_and_survives_errors() -> None:
+    cache = EmbeddingCache(max_items=10)
+    session = _BrokenSession()
+    assert await cache.lookup("m", 1, ["h1", "h2"], session=session) == {}
+    assert session.savepoints == 1 and cache.misses == 2
+
+
+class _RowsSession:
+    """Сессия, отдающая заданные строки (text_hash, vector) и запоминающая запросы."""
+
+    def __init__(self, rows: list[tuple[str, list[float]]]) -> None:
+        self.rows = rows
+        self.statements: list = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return SimpleNamespace(all=lambda: self.rows)
+
+
+async def test_db_lookup_keeps_freshest_vector_per_hash() -> None:
+    # Строки приходят по text_hash, внутри — от свежих к старым
+    session = _RowsSession([("h1", [1.0]), ("h1", [0.0]), ("h2", [2.0])])
+    assert await lookup_embeddings_by_hash(session, "m", 1, ["h1", "h2"]) == {"h1": [1.0], "h2": [2.0]}
+    sql = " ".join(str(session.statements[0].compile(dialect=postgresql.dialect())).split())
+    assert "DISTINCT" not in sql
+    assert "ORDER BY embeddings.text_hash, embeddings.updated_at DESC, embeddings.id" in sql
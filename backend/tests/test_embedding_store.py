@@ -0,0 +1,38 @@
+"""
+Пакетная запись эмбеддингов (upsert_embeddings): один многострочный INSERT ... ON CONFLICT
+по ключу uq_embeddings_theme_object_kind_model, повторы объекта схлопываются.
+"""
+import uuid
+
+from sqlalchemy.dialects import postgresql
+
+from app.integrations.embedding.store import upsert_embeddings
+
+
+class _RecordingSession:
+    def __init__(self) -> None:
+        self.statements: list = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+
+
+async def test_upsert_embeddings_single_statement_and_collapses_duplicates() -> None:
+    session = _RecordingSession()
+    a, b = uuid.uuid4(), uuid.uuid4()
+    written = await upsert_embeddings(
+        session,
+        theme_id=uuid.uuid4(),
+        object_type="quantum",
+        embedding_kind="relevance",
+        model="m",
+        dims=2,
+        items=[(a, [0.1, 0.2], "h1"), (b, [0.3, 0.4], "h2"), (a, [0.5, 0.6], "h3")],
+    )
+
+    assert written == 2
+    assert len(session.statements) == 1
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (theme_id, object_type, object_id, embedding_kind, model) DO UPDATE" in sql
+    params = session.statements[0].compile(dialect=postgresql.dialect()).params
+    assert params["text_hash_m0"] == "h3"
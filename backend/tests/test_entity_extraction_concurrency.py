@@ -0,0 +1,93 @@
+"""
+Извлечение tech/явлений по батчу: кванты обрабатываются конкурентно под семафором,
+повторы после ошибок разбора ответа ограничены общим на батч запасом; оплаченные явления
+применяются и без tech-сущностей.
+"""
+import asyncio
+import json
+import uuid
+from types import SimpleNamespace
+
+from app.core.config import get_settings
+from app.modules.entity import service as entity_service
+from app.modules.entity.service import EntitiesExtractionService, _RetryBudget
+
+
+def _quantum(n: int) -> SimpleNamespace:
+    return SimpleNamespace(id=uuid.uuid4(), theme_id=uuid.uuid4(), title=f"title {n}", summary_text="summary")
+
+
+async def test_extract_concurrently_bounds_parallelism_and_shares_retry_budget() -> None:
+    service = EntitiesExtractionService(None, None, get_settings())  # type: ignore[arg-type]
+    quanta = [_quantum(n) for n in range(6)]
+    failing = {quanta[0].id: 5, quanta[1].id: 1, quanta[2].id: 1}
+    texts_to_id = {service._build_text_for_quantum(q): q.id for q in quanta}
+    state = {"active": 0, "peak": 0}
+
+    async def extract(text: str, *, billing_session, billing_theme_id):
+        qid = texts_to_id[text]
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        if failing.get(qid, 0) > 0:
+            failing[qid] -= 1
+            if qid == quanta[2].id:
+                raise RuntimeError("provider down")
+            raise json.JSONDecodeError("bad json", "{", 1)
+        return qid
+
+    results = await service._extract_concurrently(
+        None,  # type: ignore[arg-type]
+        quanta,  # type: ignore[arg-type]
+        extract,
+        kind="tech",
+        semaphore=asyncio.Semaphore(3),
+        retry_budget=_RetryBudget(2),
+    )
+    assert state["peak"] == 3
+    # Квант 1 восстановился за один повтор; квант 0 исчерпал общий запас и пропущен;
+    # квант 2 упал не на разборе ответа — без повтора
+    assert quanta[1].id in results and quanta[0].id not in results and quanta[2].id not in results
+    assert len(results) == 4
+
+
+class _Session:
+    def __init__(self) -> None:
+        self.statements: list = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+
+    async def flush(self) -> None:
+        pass
+
+
+async def test_batch_without_tech_entities_still_applies_paid_phenomena(monkeypatch) -> None:
+    service = EntitiesExtractionService(None, None, get_settings())  # type: ignore[arg-type]
+    quanta = [_quantum(n) for n in range(2)]
+    applied: dict = {}
+
+    async def fetch(session, *, theme_id=None):
+        return quanta
+
+    async def no_tech(text, **kw):
+        return SimpleNamespace(entities=[])
+
+    async def phenomena(text, **kw):
+        return SimpleNamespace(phenomena=["p"])
+
+    async def apply_phenomena(session, batch, per_quantum):
+        applied.update(per_quantum)
+
+    monkeypatch.setattr(service, "_fetch_quanta_batch", fetch)
+    monkeypatch.setattr(service._extractor, "extract_for_text", no_tech)
+    monkeypatch.setattr(service._phenomenon_extractor, "extract_for_text", phenomena)
+    monkeypatch.setattr(service, "_apply_phenomenon_results", apply_phenomena)
+    monkeypatch.setattr(entity_service, "collect_candidates", lambda batch: [])
+    session = _Session()
+
+    assert await service.process_next_batch(session) == 2  # type: ignore[arg-type]
+    assert set(applied) == {q.id for q in quanta}
+    # Кванты помечены версией извлечения — явления не будут оплачены повторно
+    assert len(session.statements) == 1 and "entity_extraction_version" in str(session.statements[0])
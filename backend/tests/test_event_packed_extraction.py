@@ -0,0 +1,69 @@
+"""
+Пакетное извлечение событий: несколько квантов одной темы в одном промпте,
+ответ разбирается обратно по ключам квантов; неразобранные кванты уходят в одиночные промпты.
+"""
+import json
+import logging
+import uuid
+from types import SimpleNamespace
+
+from app.core.config import get_settings
+from app.integrations.prompts.service import get_prompt_service
+from app.modules.event import service as event_service
+from app.modules.event.service import EventExtractionService, _event_packs
+
+
+class _FakeLLM:
+    def __init__(self, responses: list[str]) -> None:
+        self.responses = responses
+        self.prompts: list[str] = []
+
+    async def generate_text(self, messages, **kwargs):
+        self.prompts.append(messages[0]["content"])
+        return SimpleNamespace(text=self.responses.pop(0))
+
+
+def _item(theme_id: uuid.UUID, n: int) -> tuple:
+    q = SimpleNamespace(id=uuid.uuid4(), theme_id=theme_id)
+    return (q, f"text {n}", [])
+
+
+def test_event_packs_do_not_mix_themes() -> None:
+    t1, t2 = uuid.uuid4(), uuid.uuid4()
+    items = [_item(t1, 0), _item(t2, 1), _item(t1, 2), _item(t1, 3)]
+    packs = _event_packs(items, 2)
+    assert [[it[1] for it in pack] for pack in packs] == [["text 0", "text 2"], ["text 3"], ["text 1"]]
+
+
+async def test_packed_response_is_parsed_back_by_quantum_key(monkeypatch) -> None:
+    # Отладочный лог событий пишет в файл в backend/logs — в тестах не трогаем рабочее дерево
+    quiet = logging.getLogger("events_llm_debug.test")
+    quiet.addHandler(logging.NullHandler())
+    quiet.propagate = False
+    monkeypatch.setattr(event_service, "_debug_logger", quiet)
+    theme_id = uuid.uuid4()
+    pack = [_item(theme_id, n) for n in range(3)]
+    event = {"plot_code": "p", "predicate_text": "x"}
+    llm = _FakeLLM(
+        [
+            json.dumps(
+                {
+                    "quanta": [
+                        {"quantum_id": "Q1", "events": [event]},
+                        {"quantum_id": "Q2", "events": None},
+                        {"quantum_id": "Q9", "events": [event]},
+                    ]
+                }
+            ),
+            "not json",
+        ]
+    )
+    service = EventExtractionService(llm, get_prompt_service(get_settings()), get_settings())  # type: ignore[arg-type]
+
+    by_quantum = await service._extract_events_packed(None, pack, plots_json="[]")  # type: ignore[arg-type]
+    # Q3 в ответе нет — вызывающий код отправит его одиночным промптом
+    assert by_quantum == {pack[0][0].id: [event], pack[1][0].id: []}
+    # Каталог сюжетов и тексты всех квантов — в одном промпте
+    assert len(llm.prompts) == 1 and "text 0" in llm.prompts[0] and "text 2" in llm.prompts[0]
+
+    assert await service._extract_events_packed(None, pack, plots_json="[]") == {}  # type: ignore[arg-type]
@@ -0,0 +1,32 @@
+"""
+Реестр общих HTTP-клиентов: один клиент на (upstream, proxy), закрытие в shutdown,
+borrow_client не закрывает переданный общий клиент.
+"""
+import copy
+
+import pytest
+
+from app.core.config import get_settings
+from app.integrations.http import HttpClientRegistry, borrow_client
+
+
+async def test_registry_reuses_clients_and_closes_them() -> None:
+    registry = HttpClientRegistry(copy.copy(get_settings()))
+    a = registry.get("openalex")
+    assert registry.get("openalex") is a
+    assert registry.get("arxiv") is not a
+
+    async with borrow_client(a) as client:
+        assert client is a
+    assert not a.is_closed
+
+    await registry.aclose()
+    assert a.is_closed
+    with pytest.raises(RuntimeError):
+        registry.get("openalex")
+
+
+async def test_borrow_client_without_shared_creates_temporary() -> None:
+    async with borrow_client(None, timeout=5.0) as client:
+        assert not client.is_closed
+    assert client.is_closed
@@ -0,0 +1,127 @@
+"""
+Ранний дедуп публикаций между источниками: дубликат по DOI/PMID/arXiv id отбрасывается до маппинга,
+его идентификаторы дописываются в уцелевший квант, счётчики пересечений — по источникам;
+при сбое источника уцелевшего кванта возвращается квант дубликата.
+"""
+import asyncio
+import copy
+import uuid
+from typing import Any
+
+from app.core.config import get_settings
+from app.integrations.search.ports import RetrieverContext, RetrieverResult
+from app.integrations.search.retrievers.publication import retriever as retriever_module
+from app.integrations.search.retrievers.publication.id_index import PublicationIdIndex
+from app.integrations.search.retrievers.publication.retriever import PublicationRetriever
+from app.integrations.search.schemas import KeywordGroup, KeywordsBlock, QueryModel, QueryStep
+from app.integrations.search.retrievers.publication.semanticscholar.mapper import semanticscholar_paper_ids
+from app.modules.quanta.schemas import QuantumCreate, QuantumIdentifier
+
+THEME_ID = str(uuid.uuid4())
+
+
+def _quantum(source: str, *ids: tuple[str, str]) -> QuantumCreate:
+    return QuantumCreate(
+        theme_id=THEME_ID,
+        entity_kind="publication",
+        title=f"Paper from {source}",
+        summary_text="Abstract",
+        verification_url=f"https://example.org/{source}",
+        source_system=source,
+        retriever_name="publication_retriever",
+        identifiers=[QuantumIdentifier(scheme=s, value=v) for s, v in ids],
+    )
+
+
+def test_duplicates_are_dropped_and_identifiers_merged() -> None:
+    index = PublicationIdIndex()
+    openalex, s2, arxiv = (index.for_source(n) for n in ("openalex", "semanticscholar", "arxiv"))
+
+    oa_ids = [("doi", "10.1000/ABC"), ("pubmed", "12345"), ("openalex", "https://openalex.org/W1")]
+    survivor = _quantum("openalex", ("doi", "10.1000/ABC"), ("openalex", "https://openalex.org/W1"))
+    assert not openalex.is_duplicate(oa_ids)
+    assert openalex.admit(oa_ids, survivor)
+
+    paper = {"paperId": "s2-1", "externalIds": {"DOI": "10.1000/abc", "ArXiv": "2401.00001"}}
+    assert s2.is_duplicate(semanticscholar_paper_ids(paper))
+    # arXiv id пришёл от Semantic Scholar — версия в id arXiv не мешает совпадению
+    assert arxiv.is_duplicate([("arxiv", "2401.00001v2")])
+
+    schemes = {(i.scheme, i.value) for i in survivor.identifiers}
+    assert {("pubmed", "12345"), ("semanticscholar", "s2-1"), ("arxiv", "2401.00001")} <= schemes
+    assert len([i for i in survivor.identifiers if i.scheme == "doi"]) == 1
+    assert dict(s2.overlap) == {"openalex": 1} and arxiv.duplicates_dropped == 1
+    assert len(index) == 1
+
+
+def test_concurrent_admit_keeps_first_and_release_recovers_duplicate() -> None:
+    index = PublicationIdIndex()
+    pubmed, openalex = index.for_source("pubmed"), index.for_source("openalex")
+
+    first = _quantum("pubmed", ("pubmed", "777"))
+    assert pubmed.admit([("pubmed", "777")], first)
+    # Параллельный источник смапил ту же работу раньше, чем узнал о дубликате
+    late = _quantum("openalex", ("openalex", "W7"))
+    assert not openalex.admit([("pubmed", "https://pubmed.ncbi.nlm.nih.gov/777"), ("openalex", "W7")], late)
+    assert dict(openalex.overlap) == {"pubmed": 1}
+
+    # PubMed не уложился в таймаут — вместо его кванта возвращается квант OpenAlex
+    recovered = pubmed.release()
+    assert recovered == [("openalex", late)]
+    assert not index.for_source("arxiv").is_duplicate([("doi", "10.1/none")])
+    assert index.for_source("semanticscholar").is_duplicate([("pubmed", "777")])
+
+
+def _fake_adapter(source: str, dois: list[str], delay_s: float) -> type:
+    """Адаптер-заглушка: отдаёт работы по DOI, уступая цикл между записями."""
+
+    class _Adapter:
+        def __init__(self, **_: Any) -> None:
+            pass
+
+        async def search_publications(self, *args: Any, id_index=None, partial=None, **kw: Any) -> RetrieverResult:
+            items = partial.items
+            for doi in dois:
+                await asyncio.sleep(delay_s)
+                ids = [("doi", doi)]
+                if id_index.is_duplicate(ids):
+                    continue
+                q = _quantum(f"{source}/{doi}", *ids)
+                if id_index.admit(ids, q):
+                    items.append(q)
+            return RetrieverResult(items=items)
+
+    return _Adapter
+
+
+async def test_concurrent_steps_do_not_take_works_from_each_other(monkeypatch) -> None:
+    sources = {
+        "OpenAlexPublicationAdapter": _fake_adapter("openalex", ["10.1/a", "10.1/b"], 0.01),
+        "SemanticScholarPublicationAdapter": _fake_adapter("semanticscholar", ["10.1/b", "10.1/c"], 0.025),
+        "ArxivPublicationAdapter": _fake_adapter("arxiv", [], 0),
+        "PubMedPublicationAdapter": _fake_adapter("pubmed", [], 0),
+    }
+    for name, cls in sources.items():
+        monkeypatch.setattr(retriever_module, name, cls)
+    settings = copy.copy(get_settings())
+    settings.SEARCH_PUBLICATION_EARLY_DEDUP = True
+    ctx = RetrieverContext(settings=settings, theme_id=uuid.UUID(THEME_ID))
+
+    def step(n: int) -> QueryStep:
+        return QueryStep(
+            step_id=f"s{n}",
+            retriever="publication_retriever",
+            source_query_id=uuid.uuid4(),
+            order_index=n,
+            query_model=QueryModel(keywords=KeywordsBlock(groups=[KeywordGroup(terms=["x"])])),
+            max_results=10,
+        )
+
+    # Два шага с одинаковой выдачей идут параллельно в одном контексте прогона
+    results = await asyncio.gather(*(PublicationRetriever().retrieve(step(n), ctx) for n in range(2)))
+    for result in results:
+        # Каждый шаг получает все три работы: дубликат отброшен только между источниками шага
+        dois = sorted(i.value for q in result.items for i in q.identifiers)
+        assert dois == ["10.1/a", "10.1/b", "10.1/c"]
+        assert result.meta["sources"]["semanticscholar"]["duplicates_dropped"] == 1
+        assert result.meta["sources"]["openalex"]["duplicates_dropped"] == 0
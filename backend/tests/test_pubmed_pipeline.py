@@ -0,0 +1,95 @@
+"""
+PubMed: конвейерный режим (esearch следующей страницы параллельно с efetch текущей)
+возвращает те же кванты, что и последовательный, и не держит страницы строго по очереди;
+XML efetch разбирается вне event loop.
+"""
+import asyncio
+import threading
+import uuid
+from collections.abc import AsyncGenerator
+
+from app.integrations.search.retrievers.publication.pubmed.adapter import PubMedPublicationAdapter
+from app.integrations.search.retrievers.publication.pubmed.mapper import PubmedEfetchStreamParser
+from app.integrations.search.schemas import KeywordGroup, KeywordsBlock, QueryModel
+
+THEME_ID = str(uuid.uuid4())
+_TOTAL = 450
+
+
+def _efetch_xml(pmids: list[str]) -> str:
+    # Каждая третья статья без абстракта — маппер её пропускает (require_abstract)
+    articles = "".join(
+        "<PubmedArticle><MedlineCitation>"
+        f"<PMID>{p}</PMID><Article><ArticleTitle>Title {p}</ArticleTitle>"
+        + ("" if int(p) % 3 == 0 else f"<Abstract><AbstractText>Abstract {p}</AbstractText></Abstract>")
+        + "</Article></MedlineCitation></PubmedArticle>"
+        for p in pmids
+    )
+    return f"<PubmedArticleSet>{articles}</PubmedArticleSet>"
+
+
+class _FakeNcbi:
+    def __init__(self) -> None:
+        self.events: list[str] = []
+
+    async def esearch(self, compiled: str, retstart: int, retmax: int) -> tuple[list[str], int | None]:
+        self.events.append(f"esearch:{retstart}:start")
+        await asyncio.sleep(0.01)
+        self.events.append(f"esearch:{retstart}:end")
+        return [str(i) for i in range(retstart + 1, min(_TOTAL, retstart + retmax) + 1)], _TOTAL
+
+    async def efetch_stream(self, pmids: list[str]) -> AsyncGenerator[bytes, None]:
+        self.events.append(f"efetch:{pmids[0]}:start")
+        body = _efetch_xml(pmids).encode()
+        # Ответ приходит кусками, границы не совпадают с границами статей
+        for i in range(0, len(body), 1000):
+            await asyncio.sleep(0.001)
+            yield body[i : i + 1000]
+        self.events.append(f"efetch:{pmids[0]}:end")
+
+
+async def _search(pipelined: bool, limit: int) -> tuple[list[str], list[str]]:
+    adapter = PubMedPublicationAdapter(tool="analyst", email="test@example.invalid", pipelined=pipelined)
+    fake = _FakeNcbi()
+    adapter._esearch = fake.esearch  # type: ignore[method-assign]
+    adapter._efetch_stream = fake.efetch_stream  # type: ignore[method-assign]
+    result = await adapter.search_publications(
+        QueryModel(keywords=KeywordsBlock(groups=[KeywordGroup(terms=["x"])])),
+        {},
+        language="en",
+        theme_id=THEME_ID,
+        limit=limit,
+    )
+    return [q.title for q in result.items], fake.events
+
+
+async def test_pipelined_mode_matches_sequential_results() -> None:
+    sequential, _ = await _search(False, limit=250)
+    pipelined, events = await _search(True, limit=250)
+    assert pipelined == sequential
+    assert len(pipelined) == 250
+    # esearch второй страницы ушёл до окончания efetch первой
+    assert events.index("esearch:200:start") < events.index("efetch:1:end")
+
+
+async def test_pipelined_mode_stops_when_results_run_out() -> None:
+    titles, _ = await _search(True, limit=1000)
+    # 450 PMID, каждая третья статья без абстракта
+    assert len(titles) == _TOTAL - _TOTAL // 3
+
+
+async def test_efetch_xml_is_parsed_off_the_event_loop(monkeypatch) -> None:
+    loop_thread = threading.get_ident()
+    parse_threads: set[int] = set()
+    feed = PubmedEfetchStreamParser.feed
+
+    def recording_feed(self, chunk: bytes):
+        parse_threads.add(threading.get_ident())
+        return feed(self, chunk)
+
+    monkeypatch.setattr(PubmedEfetchStreamParser, "feed", recording_feed)
+    for pipelined in (False, True):
+        parse_threads.clear()
+        titles, _ = await _search(pipelined, limit=50)
+        assert len(titles) == 50
+        assert parse_threads and loop_thread not in parse_threads
@@ -3,7 +3,13 @@ from datetime import datetime, timezone
 
 from sqlalchemy.dialects import postgresql
 
-from app.modules.quanta.crud import build_dedup_key, build_fingerprint, build_upsert_stmt
+from app.modules.quanta.crud import (
+    _split_upsert_rounds,
+    build_dedup_key,
+    build_fingerprint,
+    build_quantum_values,
+    build_upsert_stmt,
+)
 
 
 def test_build_dedup_key_prefers_doi() -> None:
@@ -94,3 +100,45 @@ def test_upsert_stmt_uses_unique_theme_id_dedup_key_on_conflict() -> None:
     assert "ON CONFLICT" in sql
     assert "theme_id" in sql and "dedup_key" in sql
 
+
+def _values(theme_id: uuid.UUID, url: str) -> dict:
+    return build_quantum_values(
+        theme_id=theme_id,
+        run_id=None,
+        entity_kind="webpage",
+        title="t",
+        summary_text="s",
+        key_points=None,
+        language=None,
+        date_at=None,
+        verification_url=url,
+        canonical_url=url,
+        dedup_key=None,
+        fingerprint=None,
+        identifiers=None,
+        matched_terms=None,
+        matched_term_ids=None,
+        retriever_query=None,
+        rank_score=None,
+        source_system="web",
+        site_id=None,
+        retriever_name="retriever",
+        retriever_version=None,
+        attrs=None,
+        raw_payload_ref=None,
+        content_ref=None,
+    )
+
+
+def test_bulk_upsert_stmt_is_multi_row_and_rounds_split_duplicates() -> None:
+    theme_id = uuid.uuid4()
+    rows = [_values(theme_id, f"https://example.com/{n}") for n in (1, 2, 1, 3, 1)]
+    assert rows[0]["dedup_key"] == "url:https://example.com/1"
+
+    # Повторы (theme_id, dedup_key) уходят в следующие раунды, порядок внутри раунда сохраняется
+    assert _split_upsert_rounds(rows) == [[0, 1, 3], [2], [4]]
+
+    stmt = build_upsert_stmt(values=[rows[i] for i in (0, 1, 3)])
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert sql.count("ON CONFLICT") == 1
+    assert "dedup_key_m2" in sql
@@ -0,0 +1,78 @@
+"""
+Оценка релевантности квантов пачками (score_quanta_relevance): пачки и модели выполняются
+конкурентно, оценки сводятся по глобальному индексу, неудавшаяся пачка повторяется отдельно.
+"""
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+
+from app.modules.quanta.schemas import QuantumCreate
+from app.modules.quanta.service import _relevance_batches, score_quanta_relevance
+
+
+def _quantum(n: int) -> QuantumCreate:
+    return QuantumCreate(
+        theme_id="00000000-0000-0000-0000-000000000001",
+        entity_kind="publication",
+        title=f"T{n}",
+        summary_text="s",
+        verification_url=f"https://example.com/{n}",
+        source_system="fake",
+        retriever_name="fake",
+    )
+
+
+class _FakeLLM:
+    """Оценка = номер кванта из заголовка / 100; первая попытка для пачки с T3 падает."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.failed_once = False
+
+    async def generate_from_prompt(self, prompt_name, vars, prompt_service, provider=None, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            lines = vars["titles_list"].splitlines()
+            if "T3" in vars["titles_list"] and not self.failed_once:
+                self.failed_once = True
+                return SimpleNamespace(text='{"1": 0.1, "2"')  # обрезанный JSON
+            scores = {}
+            for line in lines:
+                pos, title = line.split(". ", 1)
+                scores[pos] = int(re.sub(r"\D", "", title)) / 100
+            return SimpleNamespace(text=json.dumps(scores))
+        finally:
+            self.active -= 1
+
+
+def test_relevance_batches_respect_item_limit() -> None:
+    items = [_quantum(n) for n in range(7)]
+    assert _relevance_batches(items, max_items=3, max_tokens=10_000) == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+async def test_score_quanta_relevance_merges_batches_by_global_index() -> None:
+    items = [_quantum(n) for n in range(10)]
+    llm = _FakeLLM()
+    result = await score_quanta_relevance(
+        "theme",
+        items,
+        model_names=["m1", "m2"],
+        llm_service=llm,
+        prompt_service=None,
+        batch_max_items=4,
+        max_concurrency=3,
+    )
+
+    assert len(result) == 10
+    for n, r in enumerate(result):
+        assert [o["model"] for o in r["opinion_score"]] == ["m1", "m2"]
+        assert all(o["score"] == n / 100 for o in r["opinion_score"])
+    # 2 модели x 3 пачки + один повтор пачки с обрезанным JSON
+    assert llm.calls == 7
+    assert 1 < llm.max_active <= 3
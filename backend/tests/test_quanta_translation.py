@@ -0,0 +1,123 @@
+"""
+Перевод квантов пачками (translate_quanta_create_items): пакеты выполняются конкурентно,
+по таймауту остаются готовые; отмена пакета не прерывает запись биллинга уже оплаченного вызова LLM.
+"""
+import asyncio
+import copy
+import json
+import uuid
+from types import SimpleNamespace
+
+from app.core.config import get_settings
+from app.integrations.llm import service as llm_service_module
+from app.integrations.llm.service import LLMService
+from app.modules.quanta.schemas import QuantumCreate
+from app.modules.quanta.service import translate_quanta_create_items
+
+
+def _quantum(n: int) -> QuantumCreate:
+    return QuantumCreate(
+        theme_id="00000000-0000-0000-0000-000000000001",
+        entity_kind="publication",
+        title=f"T{n}",
+        summary_text="s",
+        verification_url=f"https://example.com/{n}",
+        source_system="fake",
+        retriever_name="fake",
+    )
+
+
+def _translations(items_json: str) -> str:
+    batch = json.loads(items_json)
+    return json.dumps({"translations": [{"id": b["id"], "title_translated": b["title"].upper()} for b in batch]})
+
+
+class _SlowTranslateLLM:
+    """Перевод = заголовок в верхнем регистре; пакет с T0 отвечает долго (не успевает к таймауту)."""
+
+    def __init__(self) -> None:
+        self.active = 0
+        self.max_active = 0
+
+    async def generate_from_prompt(self, prompt_name, vars, prompt_service, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            batch = json.loads(vars["items"])
+            await asyncio.sleep(5 if any(b["title"] == "T0" for b in batch) else 0.01)
+            return SimpleNamespace(text=_translations(vars["items"]))
+        finally:
+            self.active -= 1
+
+
+async def test_translate_batches_run_concurrently_and_keep_partial_results_on_timeout() -> None:
+    items = [_quantum(n) for n in range(9)]
+    llm = _SlowTranslateLLM()
+    by_index = await translate_quanta_create_items(
+        items,
+        "ru",
+        llm,
+        None,
+        titles_only=True,
+        batch_max_items=3,
+        max_concurrency=3,
+        timeout_s=0.5,
+    )
+
+    assert llm.max_active == 3
+    # Пакет [0, 1, 2] отменён по таймауту, остальные переводы сохранены
+    assert sorted(by_index) == [3, 4, 5, 6, 7, 8]
+    assert by_index[4]["title_translated"] == "T4"
+    assert by_index[4]["summary_text_translated"] is None
+
+
+class _Prompts:
+    async def render(self, name, vars):
+        return SimpleNamespace(text=vars["items"], response_format="json", warnings=[])
+
+
+class _Provider:
+    async def generate(self, request):
+        return {
+            "text": _translations(request.messages[0].content),
+            "model": "m",
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+
+
+class _Session:
+    """Заглушка сессии биллинга (LLMService держит на неё слабую ссылку)."""
+
+
+class _SlowBilling:
+    """Запись биллинга дольше таймаута перевода."""
+
+    def __init__(self) -> None:
+        self.started = 0
+        self.finished = 0
+
+    async def record_usage_many(self, session, items) -> None:
+        self.started += 1
+        await asyncio.sleep(0.3)
+        self.finished += 1
+
+
+async def test_translate_timeout_does_not_interrupt_llm_billing(monkeypatch) -> None:
+    monkeypatch.setattr(llm_service_module, "get_provider", lambda *a, **kw: _Provider())
+    billing = _SlowBilling()
+    clients = SimpleNamespace(get=lambda name: object())  # общий клиент: временный не создаётся
+    llm = LLMService(copy.copy(get_settings()), billing_service=billing, http_clients=clients)  # type: ignore[arg-type]
+
+    by_index = await translate_quanta_create_items(
+        [_quantum(n) for n in range(2)],
+        "ru",
+        llm,
+        _Prompts(),  # type: ignore[arg-type]
+        titles_only=True,
+        billing_session=_Session(),  # type: ignore[arg-type]
+        billing_theme_id=uuid.uuid4(),
+        timeout_s=0.1,
+    )
+    # Пакет отменён по таймауту, но оплаченный вызов записан в биллинг до возврата
+    assert by_index == {}
+    assert billing.started == billing.finished == 1
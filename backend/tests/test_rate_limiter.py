@@ -0,0 +1,146 @@
+"""
+Лимиты частоты запросов к источникам: token bucket выдаёт резервации с интервалом 1 / rate,
+backoff (429) задерживает следующий вызов ровно на delay_s, реестр выбирает параметры по upstream;
+PostgresTokenBucket резервирует одним UPSERT и при сбое БД переходит на локальный bucket.
+"""
+import asyncio
+import contextlib
+import copy
+import logging
+from typing import Any
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import get_settings
+from app.integrations.ratelimit import RateLimiterRegistry, TokenBucket, rate_limit_spec
+from app.integrations.ratelimit import buckets as buckets_module
+from app.integrations.ratelimit.buckets import _BACKOFF_SQL, _RESERVE_SQL, PostgresTokenBucket
+from app.integrations.search.retrievers.publication.arxiv import client as arxiv_client
+
+
+def test_token_bucket_spaces_reservations_after_burst() -> None:
+    bucket = TokenBucket(rate_per_s=10.0, burst=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[0] == 0.0 and waits[1] == 0.0
+    assert waits[2] == pytest.approx(0.1, abs=0.01)
+    assert waits[3] == pytest.approx(0.2, abs=0.01)
+
+
+async def test_token_bucket_backoff_delays_next_reservation() -> None:
+    bucket = TokenBucket(rate_per_s=1.0)
+    await bucket.backoff(5.0)
+    assert bucket.reserve() == pytest.approx(5.0, abs=0.05)
+    # Дальше — обычный интервал 1 / rate
+    assert bucket.reserve() == pytest.approx(6.0, abs=0.05)
+
+
+def test_registry_reuses_limiters_and_derives_ncbi_rate_from_api_key() -> None:
+    settings = copy.copy(get_settings())
+    settings.RATE_LIMIT_BACKEND = "postgres"
+    settings.NCBI_API_KEY = ""
+    settings.RATE_LIMIT_PER_S = {"ncbi": 0.0, "arxiv": 0.5}
+    registry = RateLimiterRegistry(settings)
+    # Без фабрики сессий общий (Postgres) лимит недоступен — bucket в памяти процесса
+    assert registry.backend == "memory"
+    arxiv = registry.get("arxiv")
+    assert isinstance(arxiv, TokenBucket) and arxiv.rate_per_s == 0.5
+    assert registry.get("arxiv") is arxiv
+
+    assert rate_limit_spec(settings, "ncbi").rate_per_s == 2.8
+    with_key = copy.copy(settings)
+    with_key.NCBI_API_KEY = "key"
+    assert rate_limit_spec(with_key, "ncbi").rate_per_s == 9.0
+    with pytest.raises(ValueError):
+        rate_limit_spec(settings, "unknown")
+
+
+class _FakeDb:
+    """Фабрика сессий-заглушек: запоминает (SQL, параметры), RETURNING tokens — из очереди ответов."""
+
+    def __init__(self, tokens: list[float | Exception]) -> None:
+        self.tokens = tokens
+        self.calls: list[tuple[Any, dict[str, Any]]] = []
+
+    def __call__(self) -> Any:
+        db = self
+
+        class _Session:
+            @contextlib.asynccontextmanager
+            async def begin(self):
+                yield
+
+            async def execute(self, stmt: Any, params: dict[str, Any]) -> Any:
+                db.calls.append((stmt, params))
+                answer = db.tokens.pop(0) if db.tokens else 0.0
+                if isinstance(answer, Exception):
+                    raise answer
+                return type("_R", (), {"scalar_one": lambda self: answer})()
+
+        @contextlib.asynccontextmanager
+        async def _session():
+            yield _Session()
+
+        return _session()
+
+
+def test_postgres_bucket_statements_upsert_by_name() -> None:
+    reserve_sql = " ".join(str(_RESERVE_SQL.compile(dialect=postgresql.dialect())).split())
+    backoff_sql = " ".join(str(_BACKOFF_SQL.compile(dialect=postgresql.dialect())).split())
+    for sql in (reserve_sql, backoff_sql):
+        assert "INSERT INTO rate_limit_buckets AS b" in sql and "ON CONFLICT (name) DO UPDATE SET" in sql
+        assert "clock_timestamp() - b.updated_at" in sql
+    assert "RETURNING tokens" in reserve_sql
+    assert "LEAST(LEAST(" in backoff_sql and "CAST(%(cap)s AS double precision)" in backoff_sql
+
+
+async def test_postgres_bucket_sleeps_for_debt_and_sends_backoff_cap(monkeypatch) -> None:
+    db = _FakeDb([-0.5, 0.0])
+    slept: list[float] = []
+
+    async def fake_sleep(delay: float) -> None:
+        slept.append(delay)
+
+    monkeypatch.setattr(buckets_module.asyncio, "sleep", fake_sleep)
+    bucket = PostgresTokenBucket("arxiv", db, rate_per_s=2.0, burst=3)  # type: ignore[arg-type]
+    await bucket.acquire(2.0)
+    # Запас после списания −0.5 токена при 2 токенах/с — ждать 0.25 с
+    assert slept == [0.25]
+    assert db.calls[0][1] == {"name": "arxiv", "rate": 2.0, "burst": 3.0, "cost": 2.0}
+
+    await bucket.backoff(5.0)
+    # Через 5 с пополнение (2/с) доводит запас с −9 до 1 — ровно на следующий запрос
+    assert db.calls[1][0] is _BACKOFF_SQL and db.calls[1][1]["cap"] == -9.0
+
+
+async def test_postgres_bucket_falls_back_to_local_bucket_while_db_fails(monkeypatch, caplog) -> None:
+    db = _FakeDb([RuntimeError("no table"), RuntimeError("still down"), 1.0])
+    bucket = PostgresTokenBucket("ncbi", db, rate_per_s=10.0, burst=1)  # type: ignore[arg-type]
+    used: list[float] = []
+
+    async def fallback_acquire(cost: float = 1.0) -> None:
+        used.append(cost)
+
+    monkeypatch.setattr(bucket._fallback, "acquire", fallback_acquire)
+    with caplog.at_level(logging.INFO, logger=buckets_module.__name__):
+        await bucket.acquire()
+        await bucket.acquire()
+        await bucket.acquire()
+
+    assert used == [1.0, 1.0] and len(db.calls) == 3
+    messages = [r.getMessage() for r in caplog.records]
+    # Одно предупреждение на период деградации и одно сообщение о восстановлении
+    assert sum("недоступен" in m for m in messages) == 1
+    assert sum("снова доступен" in m for m in messages) == 1
+
+
+def test_arxiv_in_flight_semaphore_is_per_event_loop() -> None:
+    async def grab() -> asyncio.Semaphore:
+        sem = arxiv_client._in_flight_semaphore()
+        assert arxiv_client._in_flight_semaphore() is sem
+        async with sem:
+            return sem
+
+    first = asyncio.run(grab())
+    second = asyncio.run(grab())
+    assert first is not second
@@ -0,0 +1,175 @@
+"""
+RunWorker: запуски без heartbeat возвращаются в очередь и подхватываются снова;
+остановка воркера прерывает захваченный запуск и возвращает его в очередь без attempt + 1.
+"""
+import asyncio
+import contextlib
+import uuid
+from types import SimpleNamespace
+from typing import Any
+
+from sqlalchemy.dialects import postgresql
+
+import app.modules.site.models  # noqa: F401 — UserSite/ThemeSite для relationship User/Theme
+import app.modules.user.model  # noqa: F401
+from app.modules.search_run import worker as worker_module
+from app.modules.search_run.jobs import RUN_HANDLERS
+from app.modules.search_run.service import requeue_stale_runs
+from app.modules.search_run.worker import RunWorker
+
+
+class _FakeSession:
+    def __init__(self, log: list[str]) -> None:
+        self.log = log
+        self.statements: list[Any] = []
+
+    @contextlib.asynccontextmanager
+    async def begin(self):
+        yield self
+
+    async def execute(self, stmt: Any) -> Any:
+        self.statements.append(stmt)
+        return SimpleNamespace(all=lambda: [])
+
+    async def commit(self) -> None:
+        self.log.append("commit")
+
+    async def rollback(self) -> None:
+        self.log.append("rollback")
+
+
+class _FakeQueue:
+    """search_runs в памяти: статусы запусков и вызовы функций очереди, которые делает воркер."""
+
+    def __init__(self, runs: list[SimpleNamespace]) -> None:
+        self.runs = {r.id: r for r in runs}
+        self.log: list[str] = []
+
+    def session_factory(self) -> Any:
+        @contextlib.asynccontextmanager
+        async def _session():
+            yield _FakeSession(self.log)
+
+        return _session()
+
+    def install(self, monkeypatch) -> None:
+        async def claim_next_run(session, run_types):
+            for run in self.runs.values():
+                if run.status == "queued" and run.run_type in run_types:
+                    run.status = "running"
+                    self.log.append(f"claim {run.id}")
+                    return run
+            return None
+
+        async def requeue_stale_runs(session, *, stale_after_s, max_attempts):
+            self.log.append(f"requeue_stale {stale_after_s} {max_attempts}")
+            n = 0
+            for run in self.runs.values():
+                if run.status == "running" and run.stale:
+                    run.status = "queued" if run.attempt < max_attempts else "failed"
+                    run.attempt += 1
+                    run.stale = False
+                    n += 1
+            return n
+
+        async def set_status(status: str, session, run_id, **kwargs):
+            self.runs[run_id].status = status
+            self.log.append(f"{status} {run_id}")
+
+        async def touch_run(session, run_id, **kwargs):
+            self.log.append(f"touch {run_id}")
+
+        monkeypatch.setattr(worker_module, "claim_next_run", claim_next_run)
+        monkeypatch.setattr(worker_module, "requeue_stale_runs", requeue_stale_runs)
+        monkeypatch.setattr(worker_module, "touch_run", touch_run)
+        for name, status in (("finish_run", "done"), ("fail_run", "failed"), ("requeue_run", "queued")):
+            monkeypatch.setattr(worker_module, name, lambda s, rid, _st=status, **kw: set_status(_st, s, rid, **kw))
+
+
+def _run(status: str, *, stale: bool = False) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        run_type="landscape_build",
+        theme_id=uuid.uuid4(),
+        params={},
+        trigger_context={},
+        status=status,
+        attempt=0,
+        stale=stale,
+    )
+
+
+def _worker(queue: _FakeQueue) -> RunWorker:
+    return RunWorker(
+        SimpleNamespace(settings=None),  # type: ignore[arg-type]
+        queue.session_factory,  # type: ignore[arg-type]
+        concurrency=1,
+        poll_interval_s=0.1,
+        stale_after_s=60,
+        max_attempts=3,
+    )
+
+
+async def test_requeue_stale_statements_respect_lease_and_attempts() -> None:
+    session = _FakeSession([])
+    await requeue_stale_runs(session, stale_after_s=600, max_attempts=3)  # type: ignore[arg-type]
+    requeue_sql, fail_sql = (str(s.compile(dialect=postgresql.dialect())) for s in session.statements)
+    for sql in (requeue_sql, fail_sql):
+        assert "search_runs.updated_at < now() - " in sql and "search_runs.deleted_at IS NULL" in sql
+    assert "search_runs.attempt < " in requeue_sql and "attempt=(search_runs.attempt + " in requeue_sql
+    assert "search_runs.attempt >= " in fail_sql and "attempt=" not in fail_sql
+
+
+async def test_stale_running_run_is_requeued_and_picked_up_again(monkeypatch) -> None:
+    queue = _FakeQueue([_run("running", stale=True)])
+    queue.install(monkeypatch)
+    (run,) = queue.runs.values()
+    executed: list[uuid.UUID] = []
+
+    async def handler(ctx):
+        executed.append(ctx.run_id)
+        return {"ok": True}
+
+    monkeypatch.setitem(RUN_HANDLERS, "landscape_build", handler)
+    worker = _worker(queue)
+    worker.start()
+    try:
+        for _ in range(100):
+            if run.status == "done":
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await worker.stop()
+
+    assert queue.log[0] == "requeue_stale 60 3"
+    assert executed == [run.id] and run.status == "done" and run.attempt == 1
+    assert queue.log.index(f"claim {run.id}") > 0 and "commit" in queue.log
+
+
+async def test_stop_requeues_claimed_run_without_finishing_it(monkeypatch) -> None:
+    queue = _FakeQueue([_run("queued")])
+    queue.install(monkeypatch)
+    (run,) = queue.runs.values()
+    started = asyncio.Event()
+    cancelled: list[bool] = []
+
+    async def handler(ctx):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return {}
+
+    monkeypatch.setitem(RUN_HANDLERS, "landscape_build", handler)
+    worker = _worker(queue)
+    worker.start()
+    await asyncio.wait_for(started.wait(), timeout=2)
+    await worker.stop()
+
+    assert cancelled == [True]
+    # Прерванный запуск — снова queued, без attempt + 1; сделанная в сессии работа откатана
+    assert run.status == "queued" and run.attempt == 0
+    assert "rollback" in queue.log and "commit" not in queue.log
+    assert f"done {run.id}" not in queue.log and f"failed {run.id}" not in queue.log
@@ -0,0 +1,111 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.integrations.search.exec import SearchExecutor, _cosine_similarity
+from app.integrations.search.ports import RetrieverContext, RetrieverResult
+from app.integrations.search.schemas import (
+    KeywordGroup,
+    KeywordsBlock,
+    QueryModel,
+    QueryStep,
+    SearchPlan,
+)
+from app.integrations.search.scoring import RelevanceScorer
+from app.modules.quanta.schemas import QuantumCreate
+
+THEME_ID = str(uuid.uuid4())
+
+
+def _step(idx: int, retriever: str = "fake") -> QueryStep:
+    return QueryStep(
+        step_id=f"s{idx}",
+        retriever=retriever,
+        source_query_id=uuid.uuid4(),
+        order_index=idx,
+        query_model=QueryModel(keywords=KeywordsBlock(groups=[KeywordGroup(terms=["x"])])),
+        max_results=10,
+    )
+
+
+def _quantum(n: int) -> QuantumCreate:
+    return QuantumCreate(
+        theme_id=THEME_ID,
+        entity_kind="publication",
+        title=f"Title {n}",
+        summary_text="summary",
+        verification_url=f"https://example.com/{n}",
+        canonical_url=f"https://example.com/{n}",
+        source_system="fake",
+        retriever_name="fake",
+    )
+
+
+class _FakeRetriever:
+    """Ретривер-заглушка: задержка обратна номеру шага, считает одновременные вызовы."""
+
+    name = "fake"
+
+    def __init__(self, per_step: int) -> None:
+        self.per_step = per_step
+        self.active = 0
+        self.max_active = 0
+
+    async def retrieve(self, step: QueryStep, ctx: RetrieverContext) -> RetrieverResult:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01 * (10 - step.order_index))
+            base = step.order_index * 100
+            return RetrieverResult(items=[_quantum(base + i) for i in range(self.per_step)])
+        finally:
+            self.active -= 1
+
+
+def _executor(retriever: _FakeRetriever, steps: int, per_retriever: int) -> SearchExecutor:
+    settings = SimpleNamespace(
+        SEARCH_MAX_CONCURRENT_STEPS=steps,
+        SEARCH_MAX_CONCURRENT_PER_RETRIEVER={"fake": per_retriever},
+    )
+    return SearchExecutor(registry={"fake": retriever}, settings=settings)
+
+
+async def test_executor_runs_steps_concurrently_in_plan_order() -> None:
+    """Шаги идут параллельно в пределах лимитов, step_results и кванты — в порядке плана."""
+    retriever = _FakeRetriever(per_step=2)
+    plan = SearchPlan(steps=[_step(i) for i in range(6)])
+    result = await _executor(retriever, steps=4, per_retriever=3).execute(
+        plan, None, 100, RetrieverContext(settings=None)
+    )
+
+    assert retriever.max_active == 3
+    assert [r.step_id for r in result.step_results] == [f"s{i}" for i in range(6)]
+    assert all(r.status == "done" for r in result.step_results)
+    assert [q.title for q in result.items] == [f"Title {i * 100 + j}" for i in range(6) for j in range(2)]
+
+
+async def test_executor_stops_at_target_and_skips_remaining_steps() -> None:
+    """После достижения global_target_links оставшиеся шаги отменяются и помечаются skipped."""
+    retriever = _FakeRetriever(per_step=3)
+    plan = SearchPlan(steps=[_step(0), _step(1, retriever="missing"), _step(2), _step(3)])
+    result = await _executor(retriever, steps=4, per_retriever=4).execute(
+        plan, None, 5, RetrieverContext(settings=None)
+    )
+
+    statuses = [(r.step_id, r.status) for r in result.step_results]
+    assert statuses == [("s0", "done"), ("s1", "failed"), ("s2", "done"), ("s3", "skipped")]
+    assert result.step_results[3].error == "Target links reached"
+    assert len(result.items) == 5
+
+
+def test_relevance_scorer_matches_cosine_similarity() -> None:
+    """Пакетный RelevanceScorer совпадает с поэлементной _cosine_similarity, включая невалидные векторы."""
+    theme = [0.5, -1.0, 2.0]
+    vectors = [[1.0, 0.0, 0.0], [0.5, -1.0, 2.0], [0.0, 0.0, 0.0], None, [1.0, 2.0], [-3.0, 1.0, 0.5]]
+    scores = RelevanceScorer(theme).score(vectors)
+
+    expected = [_cosine_similarity(v, theme) if v else 0.0 for v in vectors]
+    assert scores.tolist() == pytest.approx(expected)
+    assert RelevanceScorer.mask(scores, 0.5).tolist() == [s >= 0.5 for s in expected]
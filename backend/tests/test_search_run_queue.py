@@ -0,0 +1,41 @@
+"""
+Очередь фоновых запусков поверх search_runs: захват одним UPDATE с SKIP LOCKED,
+проверка параметров по run_type до постановки в очередь.
+"""
+import uuid
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.modules.site.models  # noqa: F401 — UserSite/ThemeSite для relationship User/Theme
+import app.modules.user.model  # noqa: F401
+from app.modules.search_run.jobs import RUN_HANDLERS, RunParamsError, validate_run_params
+from app.modules.search_run.service import build_claim_stmt
+
+
+def test_claim_statement_skips_locked_rows_and_returns_run() -> None:
+    sql = str(build_claim_stmt(RUN_HANDLERS.keys()).compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert sql.count("UPDATE search_runs SET status=") == 1
+    assert "RETURNING search_runs.id" in sql
+
+
+def test_validate_run_params_normalizes_per_run_type() -> None:
+    theme_id = uuid.uuid4()
+    params = validate_run_params(
+        "search_collect",
+        theme_id,
+        {"published_from": "2026-01-01T00:00:00Z", "published_to": "2026-02-01T00:00:00Z", "target_links": 30},
+    )
+    assert params == {
+        "published_from": "2026-01-01T00:00:00Z",
+        "published_to": "2026-02-01T00:00:00Z",
+        "target_links": 30,
+    }
+    assert validate_run_params("event_extraction", theme_id, {}) == {"max_batches": 50}
+    assert validate_run_params("landscape_build", theme_id, {"ignored": 1}) == {}
+
+    with pytest.raises(RunParamsError):
+        validate_run_params("entity_extraction", theme_id, {"max_batches": 0})
+    with pytest.raises(RunParamsError):
+        validate_run_params("search_collect", theme_id, {"target_links": "many"})
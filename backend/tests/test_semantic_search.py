@@ -0,0 +1,86 @@
+"""
+Семантический поиск по embeddings: k-NN запрос через оператор <=> (HNSW, vector_cosine_ops),
+только активные кванты темы с фильтрами по виду и дате; выдача по убыванию сходства.
+Итеративный обход HNSW включается, чтобы фильтры после индекса не урезали выдачу.
+"""
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.integrations.embedding.semantic_search import build_knn_stmt, semantic_search
+
+
+def test_knn_stmt_orders_by_cosine_distance_with_quantum_filters() -> None:
+    stmt = build_knn_stmt(
+        theme_id=uuid.uuid4(),
+        query_vector=[0.1, 0.2, 0.3],
+        model="text-embedding-3-small",
+        object_types=["quantum"],
+        limit=15,
+        entity_kind="publication",
+        date_from=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+    sql = " ".join(str(stmt.compile(dialect=postgresql.dialect())).split())
+
+    assert "embeddings.embedding <=> %(embedding_1)s" in sql
+    assert "ORDER BY embeddings.embedding <=> %(embedding_1)s LIMIT" in sql
+    assert "JOIN theme_quanta" in sql and "LEFT OUTER JOIN" not in sql
+    # Фильтры квантов применяются напрямую: других типов объектов в выдаче нет
+    assert "theme_quanta.status = " in sql
+    assert "theme_quanta.entity_kind = " in sql and "theme_quanta.date_at >= " in sql
+    assert "object_type != " not in sql
+
+
+class _Session:
+    """Сессия-заглушка: k-NN возвращает строки по возрастанию расстояния, затем метаданные квантов."""
+
+    def __init__(self, knn_rows: list[tuple], meta_rows: list[tuple]) -> None:
+        self.results = [[], knn_rows, meta_rows]
+        self.statements: list = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        rows = self.results.pop(0)
+        return SimpleNamespace(all=lambda: rows)
+
+
+async def test_semantic_search_ranks_quanta_by_similarity() -> None:
+    near, far = uuid.uuid4(), uuid.uuid4()
+    session = _Session(
+        # relaxed_order возвращает строки в приблизительном порядке
+        knn_rows=[("quantum", far, 0.6), ("quantum", near, 0.1)],
+        meta_rows=[
+            (far, "Far", SimpleNamespace(value="patent"), None),
+            (near, "Near", SimpleNamespace(value="publication"), None),
+        ],
+    )
+    hits = await semantic_search(
+        session,  # type: ignore[arg-type]
+        theme_id=uuid.uuid4(),
+        query_vector=[1.0, 0.0],
+        model="m",
+        limit=150,
+        ef_search=40,
+    )
+    assert [(h.object_id, h.title, h.kind) for h in hits] == [(near, "Near", "publication"), (far, "Far", "patent")]
+    assert [round(h.similarity, 6) for h in hits] == [0.9, 0.4]
+    # ef_search не меньше limit; итеративный обход — в той же транзакции, тем же запросом
+    set_config = session.statements[0].compile(dialect=postgresql.dialect())
+    settings = list(set_config.params.values())
+    assert "150" in settings
+    assert settings[settings.index("hnsw.iterative_scan") + 1] == "relaxed_order"
+    assert "set_config" in str(set_config) and len(session.statements) == 3
+
+
+async def test_semantic_search_ignores_unsupported_object_types() -> None:
+    session = _Session([], [])
+    hits = await semantic_search(
+        session,  # type: ignore[arg-type]
+        theme_id=uuid.uuid4(),
+        query_vector=[1.0],
+        model="m",
+        object_types=["entity", "event_plot"],
+    )
+    assert hits == [] and session.statements == []
@@ -0,0 +1,105 @@
+"""
+Память переводов: нормализация ключа и перевод квантов через TranslationService —
+в переводчик уходят только кванты, которых нет в памяти, повторный перевод не тарифицируется.
+"""
+import contextlib
+import copy
+from types import SimpleNamespace
+
+from app.core.config import get_settings
+from app.integrations.translation.memory import TranslationMemory, translation_text_hash
+from app.integrations.translation.ports import TranslationCost, TranslationResult
+from app.integrations.translation.service import TranslationService
+from app.modules.quanta.schemas import QuantumCreate
+
+
+class _FakeTranslator:
+    name = "fake_translator"
+
+    def __init__(self) -> None:
+        self.sent: list[str] = []
+
+    async def translate(self, items, source_lang, target_lang) -> TranslationResult:
+        n = 0
+        out: dict[int, dict[str, object]] = {}
+        for idx, title, summary, points in items:
+            self.sent.append(title)
+            n += len(title) + len(summary) + sum(len(p) for p in points)
+            out[idx] = {
+                "title_translated": f"{title} [t]",
+                "summary_text_translated": f"{summary} [t]",
+                "key_points_translated": [f"{p} [t]" for p in points],
+            }
+        return TranslationResult(translations_by_index=out, cost=TranslationCost(input_characters=n))
+
+
+def _quantum(title: str) -> QuantumCreate:
+    return QuantumCreate(
+        theme_id="00000000-0000-0000-0000-000000000001",
+        entity_kind="publication",
+        title=title,
+        summary_text="s",
+        key_points=["p1"],
+        language="en",
+        verification_url="https://example.com/x",
+        source_system="fake",
+        retriever_name="fake",
+    )
+
+
+def test_text_hash_ignores_whitespace_differences() -> None:
+    assert translation_text_hash("  Hello \n  world ") == translation_text_hash("Hello world")
+    assert translation_text_hash("Hello world") != translation_text_hash("hello world")
+
+
+async def test_translate_sends_only_memory_misses() -> None:
+    settings = copy.copy(get_settings())
+    settings.QUANTA_TRANSLATION_LIMIT = 0
+    svc = TranslationService(settings, memory=TranslationMemory(max_items=100))
+    fake = _FakeTranslator()
+    svc._get_translator = lambda: fake  # type: ignore[method-assign]
+
+    first, cost1 = await svc.translate_quanta_create_items([_quantum("A"), _quantum("B")], target_lang="ru")
+    assert fake.sent == ["A", "B"]
+    assert cost1.input_characters == 2 * (1 + 1 + 2)
+
+    fake.sent.clear()
+    second, cost2 = await svc.translate_quanta_create_items(
+        [_quantum("B"), _quantum("C"), _quantum("A")], target_lang="ru"
+    )
+    assert fake.sent == ["C"]
+    assert cost2.input_characters == 1 + 1 + 2
+    assert second[0] == first[1]
+    assert second[2]["title_translated"] == "A [t]"
+    assert second[2]["key_points_translated"] == ["p1 [t]"]
+
+
+class _MemorySession:
+    """Сессия с одной записью translation_memory; считает savepoint'ы и SELECT'ы."""
+
+    def __init__(self, rows: list[tuple[str, str]]) -> None:
+        self.rows = rows
+        self.savepoints = 0
+        self.selects = 0
+
+    @contextlib.asynccontextmanager
+    async def begin_nested(self):
+        self.savepoints += 1
+        yield
+
+    async def execute(self, stmt):
+        self.selects += 1
+        return SimpleNamespace(all=lambda: self.rows)
+
+
+async def test_memory_lookup_reads_db_in_savepoint_and_fills_lru() -> None:
+    memory = TranslationMemory(max_items=10)
+    session = _MemorySession([(translation_text_hash("Hello  world"), "Привет, мир")])
+
+    found = await memory.lookup("t", "en", "ru", ["Hello world", " Hello  world ", "Other"], session=session)
+    assert found == {"Hello world": "Привет, мир", " Hello  world ": "Привет, мир"}
+    assert session.savepoints == 1 and memory.db_hits == 1 and memory.misses == 1
+
+    # Второй раз — из LRU, без запроса к БД
+    assert await memory.lookup("t", "en", "ru", ["Hello world"], session=session) == {"Hello world": "Привет, мир"}
+    assert session.selects == 1 and memory.hits == 1
@@ -0,0 +1,81 @@
+"""
+Потоковый разбор XML arXiv/PubMed: записи отдаются по мере подачи кусков ответа,
+обработанные элементы удаляются из дерева, результат совпадает с разбором целой строки.
+"""
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from app.integrations.search.retrievers.publication.arxiv.mapper import (
+    ArxivAtomStreamParser,
+    parse_arxiv_atom,
+)
+from app.integrations.search.retrievers.publication.pubmed.mapper import (
+    PubmedEfetchStreamParser,
+    iter_pubmed_medline_citations,
+)
+
+_ATOM = (
+    '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+    "<opensearch:totalResults>42</opensearch:totalResults>"
+    + "".join(
+        f"<entry><id>http://arxiv.org/abs/2401.{i:05d}v1</id><title>Paper {i}</title>"
+        f"<summary>Summary {i}</summary><published>2024-01-0{i % 9 + 1}T00:00:00Z</published></entry>"
+        for i in range(5)
+    )
+    + "</feed>"
+)
+
+_EFETCH = (
+    "<PubmedArticleSet>"
+    + "".join(
+        f"<PubmedArticle><MedlineCitation><PMID>{p}</PMID><Article><ArticleTitle>T{p}</ArticleTitle>"
+        "</Article></MedlineCitation><PubmedData/></PubmedArticle>"
+        for p in range(1, 6)
+    )
+    + "</PubmedArticleSet>"
+)
+
+
+def _chunks(text: str, size: int) -> list[bytes]:
+    data = text.encode()
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def test_arxiv_stream_parser_yields_entries_incrementally() -> None:
+    parser = ArxivAtomStreamParser()
+    per_feed = [len(parser.feed(c)) for c in _chunks(_ATOM, 64)]
+    per_feed.append(len(parser.close()))
+    # Записи приходят по ходу загрузки, а не одной пачкой в конце
+    assert sum(per_feed) == 5 and max(per_feed) == 1
+    assert parser.total_hint == 42 and parser.entries_seen == 5
+    # Обработанные entry удалены из дерева
+    assert list(parser._stack) == []
+
+    entries, total = parse_arxiv_atom(_ATOM)
+    assert total == 42
+    assert [e["arxiv_id"] for e in entries] == [f"2401.{i:05d}v1" for i in range(5)]
+
+
+def test_pubmed_stream_parser_keeps_citations_and_drops_articles() -> None:
+    parser = PubmedEfetchStreamParser()
+    root: ET.Element | None = None
+    citations: list[ET.Element] = []
+    for chunk in _chunks(_EFETCH, 50):
+        citations.extend(parser.feed(chunk))
+        if root is None and parser._stack:
+            root = parser._stack[0]
+    assert root is not None and len(root) == 0
+    citations.extend(parser.close())
+    assert parser.articles_seen == 5
+    assert [c.findtext("PMID") for c in citations] == ["1", "2", "3", "4", "5"]
+    assert [c.findtext("PMID") for c in iter_pubmed_medline_citations(_EFETCH)] == ["1", "2", "3", "4", "5"]
+
+
+def test_stream_parser_keeps_entries_before_broken_tail() -> None:
+    parser = PubmedEfetchStreamParser()
+    got = parser.feed(_EFETCH[: _EFETCH.index("<PubmedArticle>", 200)] + "<PubmedArticle><oops")
+    assert got
+    with pytest.raises(ET.ParseError):
+        parser.close()
+    assert iter_pubmed_medline_citations(_EFETCH[:-10] + "<<") == []